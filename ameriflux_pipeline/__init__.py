@@ -12,7 +12,15 @@ import ameriflux_pipeline.met_data_processor
 import ameriflux_pipeline.pre_pyfluxpro
 import ameriflux_pipeline.post_pyfluxpro
 import ameriflux_pipeline.utils.data_util
-from ameriflux_pipeline.utils.syncdata import SyncData
+from ameriflux_pipeline.utils.unitframe import UnitFrame
+from ameriflux_pipeline.utils.controlfile import ControlFile, ControlSection, ControlToken
+from ameriflux_pipeline.utils.keycache import KeyCache
+from ameriflux_pipeline.utils.metnames import MetNames
+from ameriflux_pipeline.utils.stagescheduler import StageScheduler
+from ameriflux_pipeline.utils.stagecache import StageCache
+from ameriflux_pipeline.utils.folderwatcher import FolderWatcher
+from ameriflux_pipeline.utils.controlfilepatch import ControlFilePatch
+from ameriflux_pipeline.utils.syncdata import SyncData, SFTPPool
 from ameriflux_pipeline.eddypro.eddyproformat import EddyProFormat
 from ameriflux_pipeline.eddypro.runeddypro import RunEddypro
 from ameriflux_pipeline.master_met.mastermetprocessor import MasterMetProcessor
@@ -20,4 +28,7 @@ from ameriflux_pipeline.pyfluxpro.pyfluxproformat import PyFluxProFormat
 from ameriflux_pipeline.pyfluxpro.amerifluxformat import AmeriFluxFormat
 from ameriflux_pipeline.pyfluxpro.l1format import L1Format
 from ameriflux_pipeline.pyfluxpro.l2format import L2Format
+from ameriflux_pipeline.pyfluxpro.controlfilebatch import ControlFileBatch
+from ameriflux_pipeline.pyfluxpro.netcdfreader import NetCDFReader
 from ameriflux_pipeline.pyfluxpro.outputformat import OutputFormat
+from ameriflux_pipeline.pyfluxpro.timestampalignment import TimestampAlignment
@@ -6,15 +6,22 @@
 
 # configs file
 import os
-from dotenv import load_dotenv
+import logging
+from dotenv import load_dotenv, dotenv_values
 
 # Load .env file
 load_dotenv()
 
+# create log object with current module name
+log = logging.getLogger(__name__)
+
 
 class Config:
     """
-    class to list all configuration settings required for preprocessing and formatting for EddyPro and PyFluxPro
+    class to list all configuration settings required for preprocessing and formatting for EddyPro and PyFluxPro.
+    The class attributes are the settings read from the environment when this module is loaded.
+    A Config object holds the settings of one run and cannot be changed, so that runs with different settings can be
+    done in one process. Create one with Config.load from a .env file and a dictionary of settings.
     """
     # obtaining ghg files using rsync
     # user confirmation to perform rsync
@@ -26,6 +33,22 @@ class Config:
     SFTP_GHG_LOCAL_PATH = os.getenv('SFTP_GHG_LOCAL_PATH')
     SFTP_MET_REMOTE_PATH = os.getenv('SFTP_MET_REMOTE_PATH')
     SFTP_MET_LOCAL_PATH = os.getenv('SFTP_MET_LOCAL_PATH')
+    # number of SFTP connections downloading files in parallel
+    SFTP_CONNECTIONS = os.getenv('SFTP_CONNECTIONS', 4)
+    # flag to keep the sha256 checksum of the synced files in the sync manifest and check the local files against it
+    SFTP_VERIFY_CHECKSUM = False  # setting to true reads all synced files on each sync
+    # flag to sync the sub directories of SFTP_GHG_REMOTE_PATH and SFTP_MET_REMOTE_PATH
+    SFTP_RECURSIVE = False
+    # comma separated patterns of the GHG files to sync, like *.ghg. All files are synced if empty
+    SFTP_GHG_INCLUDE = os.getenv('SFTP_GHG_INCLUDE', '')
+    # comma separated patterns of the GHG files and sub directories not to sync, like archive,*.tmp
+    SFTP_GHG_EXCLUDE = os.getenv('SFTP_GHG_EXCLUDE', '')
+    # comma separated patterns of the met files to sync, like *.dat. All files are synced if empty
+    SFTP_MET_INCLUDE = os.getenv('SFTP_MET_INCLUDE', '')
+    # comma separated patterns of the met files and sub directories not to sync, like archive,*.tmp
+    SFTP_MET_EXCLUDE = os.getenv('SFTP_MET_EXCLUDE', '')
+    # flag to sync only the GHG files with EDDYPRO_FILE_PROTOTYPE dates in the period of EDDYPRO_PROJ_FILE_TEMPLATE
+    SFTP_GHG_PERIOD_ONLY = False  # setting to true skips GHG files that the EddyPro run does not use
 
     # input data for creating master meteorology data
     # input met data path
@@ -142,3 +165,115 @@ class Config:
     # PyFluxpro overlap timestamp
     # flag to check if fulloutput and metdata sheet in pyfluxpro_input.xlsx sheet has overlapping timestamps
     PYFLUXPRO_OVERLAP_TIMESTAMP = True  # setting to true checks for overlap
+    # flag to remove the rows of fulloutput and metdata sheet outside of their overlapping timestamps
+    PYFLUXPRO_TRIM_TIMESTAMP = False  # setting to true trims the sheets to the overlap
+
+    # Numeric storage type
+    # floating point type used to hold met and flux data in memory. 'float64' by default, 'float32' to save memory
+    DATA_DTYPE = os.getenv('DATA_DTYPE', 'float64')
+
+    # Reference key cache
+    # directory for the parsed Ameriflux-Mainstem, L1 erroring variables and Soils keys. Keys are not cached if empty
+    KEY_CACHE_DIR = os.getenv('KEY_CACHE_DIR', '')
+
+    # Control file patch mode
+    # flag to patch the generated L1 and L2 control files with only the blocks changed since the previous generation
+    CONTROL_FILE_PATCH_MODE = False  # setting to true keeps a manifest and a diff report next to the control files
+
+    # Pipeline stage cache
+    # directory for the manifest of pre-pyfluxpro stages. Stages with unchanged inputs are skipped. All stages are run
+    # if empty
+    STAGE_CACHE_DIR = os.getenv('STAGE_CACHE_DIR', '')
+
+    # Ameriflux output by year
+    # flag to write one Ameriflux csv file for each calendar year of the PyFluxPro L2 run output. See NOTES 26
+    AMERIFLUX_OUTPUT_BY_YEAR = False  # setting to true formats the years in parallel, one file for each year
+
+    # Watch folder daemon
+    # seconds between polls of SFTP_MET_LOCAL_PATH and SFTP_GHG_LOCAL_PATH for new files
+    WATCH_POLL_INTERVAL = os.getenv('WATCH_POLL_INTERVAL', 30)
+    # seconds without new files before a burst of new files is processed
+    WATCH_DEBOUNCE = os.getenv('WATCH_DEBOUNCE', 120)
+    # maximum seconds new files wait while more files keep arriving
+    WATCH_MAX_WAIT = os.getenv('WATCH_MAX_WAIT', 900)
+    # number of failed merges in a row after which a met file is set aside until it changes
+    WATCH_MAX_FAILURES = os.getenv('WATCH_MAX_FAILURES', 3)
+    # directory for the list of processed files and the latency report of the watcher. Set empty to not keep them
+    WATCH_STATE_DIR = os.getenv('WATCH_STATE_DIR', '/Users/ameriflux-pipeline/ameriflux_pipeline/data/cache/watch')
+
+    def __init__(self, values=None):
+        """
+        Constructor for the class. Settings not given take the values of the class attributes
+
+        Args:
+            values (dict): Setting name to value
+        """
+        values = values or {}
+        names = Config.get_setting_names()
+        unknown_names = [name for name in values if name not in names]
+        if unknown_names:
+            raise ValueError("Settings {} are not config settings".format(unknown_names))
+        settings = {name: getattr(Config, name) for name in names}
+        settings.update({name: Config.parse_value(name, value) for name, value in values.items()})
+        # settings are set once here, as the object cannot be changed afterwards
+        self.__dict__.update(settings)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Config object cannot be changed. Create a new one with Config.load")
+
+    def __delattr__(self, name):
+        raise AttributeError("Config object cannot be changed. Create a new one with Config.load")
+
+    @staticmethod
+    def get_setting_names():
+        """
+        Get the names of all settings
+
+        Returns:
+            (list): Names of the settings in the order they are listed
+        """
+        return [name for name in vars(Config) if name.isupper()]
+
+    @staticmethod
+    def parse_value(name, value):
+        """
+        Parse the value of a setting read as a string, like from a .env file, for the flags that are not strings
+
+        Args:
+            name (str): Name of the setting
+            value (obj): Value of the setting
+        Returns:
+            (obj): True or False for flags given as a string, else the value as it is
+        """
+        if isinstance(getattr(Config, name), bool) and isinstance(value, str):
+            return value.strip().lower() in ['true', 'y', 'yes', '1']
+        return value
+
+    @staticmethod
+    def load(env_file=None, values=None):
+        """
+        Load the settings from a .env file, like the one saved by enveditor, and a dictionary of settings.
+        Settings in the dictionary replace the ones in the .env file. Settings in neither of them take the values
+        read from the environment when this module is loaded.
+
+        Args:
+            env_file (str): A file path for the .env file. Not read if None
+            values (dict): Setting name to value
+        Returns:
+            (obj): Config object. None if the .env file does not exist or a setting is not a config setting
+        """
+        settings = {}
+        if env_file:
+            if not os.path.isfile(env_file):
+                log.error("Env file %s does not exist", env_file)
+                return None
+            names = Config.get_setting_names()
+            # other variables in the .env file are not used by the pipeline
+            settings.update({name: value for name, value in dotenv_values(env_file).items()
+                             if name in names and value is not None})
+        settings.update(values or {})
+        try:
+            return Config(settings)
+        except ValueError as e:
+            log.error("Cannot load config: %s", e)
+            return None
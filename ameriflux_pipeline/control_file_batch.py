@@ -0,0 +1,71 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import argparse
+import os
+import time
+import logging
+import sys
+
+from config import Config
+from pyfluxpro.controlfilebatch import ControlFileBatch
+
+# create and configure logger
+logging.basicConfig(level=logging.INFO, datefmt='%Y-%m-%dT%H:%M:%S',
+                    format='%(asctime)-15s.%(msecs)03dZ %(levelname)-7s [%(processName)-10s] : %(name)s - %(message)s',
+                    handlers=[logging.FileHandler("control_file_batch.log"), logging.StreamHandler(sys.stdout)])
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+def run(manifest_file, max_workers=None, cfg=None):
+    """
+    Main function to write PyFluxPro L1 and L2 control files for all sites and years in the manifest.
+    Input control files and keys are read from the config.
+
+    Args:
+        manifest_file (str): A file path for the manifest csv file with site, year, pyfluxpro_input and output_dir
+        max_workers (int): Number of worker processes. Number of CPUs if None
+        cfg (obj): Config object with the settings of the run. The settings read from the environment if None
+    Returns:
+        (bool): True if control files are written for all rows, False if not
+    """
+    if cfg is None:
+        cfg = Config()
+    # by default we do not replace the erroring variables to ameriflux naming standards
+    erroring_variable_flag = 'N'
+    if cfg.AMERIFLUX_VARIABLE_USER_CONFIRMATION.lower() in ['y', 'yes']:
+        erroring_variable_flag = 'Y'
+    full_output_sheet_name = os.path.splitext(os.path.basename(cfg.FULL_OUTPUT_PYFLUXPRO))[0]
+    met_data_sheet_name = os.path.splitext(os.path.basename(cfg.MET_DATA_30_PYFLUXPRO))[0]
+
+    start = time.time()
+    results = ControlFileBatch.run(manifest_file, cfg.L1_MAINSTEM_INPUT, cfg.L1_AMERIFLUX_ONLY_INPUT,
+                                   cfg.L2_MAINSTEM_INPUT, cfg.L2_AMERIFLUX_ONLY_INPUT, cfg.L1_AMERIFLUX_MAINSTEM_KEY,
+                                   erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY,
+                                   cfg.INPUT_SOIL_KEY, met_data_sheet_name, full_output_sheet_name, max_workers,
+                                   cfg.KEY_CACHE_DIR)
+    end = time.time()
+    hours, rem = divmod(end - start, 3600)
+    minutes, seconds = divmod(rem, 60)
+    log.info("Total elapsed time is : {:0>2}:{:0>2}:{:05.2f}".format(int(hours), int(minutes), seconds))
+    return results is not None and all(job['success'] for job in results)
+
+
+if __name__ == '__main__':
+    log.info('-' * 50)
+    log.info("############# Process Started #############")
+    # get arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", action="store", required=True,
+                        help="Manifest csv file with site, year, pyfluxpro_input and output_dir columns")
+    parser.add_argument("--workers", action="store", type=int, default=None,
+                        help="Number of worker processes. Default is the number of CPUs")
+    args = parser.parse_args()
+    if run(args.manifest, args.workers):
+        log.info("Successfully written control files for all rows of %s", args.manifest)
+    else:
+        log.error('-' * 10 + "Control file batch resulted in an error." + '-' * 10)
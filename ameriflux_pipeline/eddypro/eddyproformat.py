@@ -4,14 +4,12 @@
 # terms of the Mozilla Public License v2.0 which accompanies this distribution,
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
-import numpy as np
 import pandas as pd
-import shutil
 import re
 import logging
 
-from utils.process_validation import DataValidation
 import utils.data_util as data_util
+from utils.keycache import KeyCache
 
 # create log object with current module name
 log = logging.getLogger(__name__)
@@ -24,24 +22,22 @@ class EddyProFormat:
 
     # main method which calls other functions
     @staticmethod
-    def data_formatting(input_data_path, input_soil_key, file_meta, output_path):
+    def data_formatting(met_data, input_soil_key, file_meta, key_cache_dir):
         """
         Formats the master met data for EddyPRo run.
 
         Args:
-            input_data_path (str): A file path for the input met data.
+            met_data (obj): UnitFrame object. Master met data with units of all variables
             input_soil_key (str): A file path for input soil key sheet
             file_meta (obj) : A pandas dataframe containing meta data about the input met data file
-            output_path (str): A file path for the output data.
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
         Returns:
-            obj: Pandas DataFrame object. Met tower data formatted for EddyPro run.
+            obj: UnitFrame object. Met tower data formatted for EddyPro run.
             site_soil_moisture_variables(dict): Dictionary for soil moisture variable details from Soils key file
             site_soil_temp_variables (dict): Dictionary for soil temperature variable details from Soils key file
         """
-        input_path = input_data_path  # path of input data csv file
         input_soil_key = input_soil_key  # path for soil key
         file_meta = file_meta  # df containing meta data of file
-        output_path = output_path  # path to write the formatted meteorological data file
 
         # extract site name from file meta data
         # NOTE 3
@@ -50,10 +46,10 @@ class EddyProFormat:
         site_name = data_util.get_site_name(file_site_name)
 
         # read soil key file. File contains the mapping for met variables and eddypro labels for soil temp and moisture
-        df_soil_key = data_util.read_excel(input_soil_key)
-        if not DataValidation.is_valid_soils_key(df_soil_key):
+        df_soil_key = KeyCache.read_soils_key(input_soil_key, key_cache_dir)
+        if df_soil_key is None:
             log.error("Soils_key.xlsx file invalid format. Aborting")
-            return None
+            return None, None, None
         # get the soil temp and moisture keys for the site
         site_soil_moisture_variables, site_soil_temp_variables = EddyProFormat.get_soil_keys(df_soil_key, site_name)
         # get mapping of soil temp and moisture met tower names to eddypro labels
@@ -61,20 +57,16 @@ class EddyProFormat:
                                         site_soil_moisture_variables.items()}
         eddypro_soil_temp_labels = {key: value['Eddypro label'] for key, value in
                                     site_soil_temp_variables.items()}
-        # read data file to dataframe. step 1 of guide
-        df = EddyProFormat.read_rename(input_path, output_path)
-
-        # all empty values are replaced by 'NAN' in preprocessor.replace_empty() function
-        # replace 'NAN' with np.nan for ease of manipulation
-        df.replace('NAN', np.nan, inplace=True)
+        # copy master met data for further processing. step 1 of guide
+        met_data = met_data.copy()
 
         # step 3 of guide. change timestamp format
-        df = EddyProFormat.timestamp_format(df)  # change / to -
+        met_data = EddyProFormat.timestamp_format(met_data)  # change / to -
 
         # rename air temp column names
-        eddypro_air_temp_labels = EddyProFormat.air_temp_colnames(df.columns)
+        eddypro_air_temp_labels = EddyProFormat.air_temp_colnames(met_data.columns)
         # rename shf measurement
-        eddypro_shf_labels = EddyProFormat.shf_colnames(df.columns)
+        eddypro_shf_labels = EddyProFormat.shf_colnames(met_data.columns)
         # rename met variables to eddypro labels
         eddypro_col_labels = {'TIMESTAMP': 'TIMESTAMP', 'RH_Avg': 'RH', 'TargTempK_Avg': 'Tc', 'albedo_Avg': 'Rr',
                               'Rn_Avg': 'Rn', 'LWDnCo_Avg': 'LWin', 'LWUpCo_Avg': 'LWout', 'SWDn_Avg': 'SWin',
@@ -85,23 +77,22 @@ class EddyProFormat:
         eddypro_labels = EddyProFormat.merge_dicts(eddypro_col_labels, eddypro_air_temp_labels, eddypro_shf_labels,
                                                    eddypro_soil_temp_labels, eddypro_soil_moisture_labels)
 
-        df.rename(columns=eddypro_labels, inplace=True)
+        met_data.rename(eddypro_labels)
 
         # skip step 5 as it will be managed in pyfluxPro
 
         # step 6 in guide. convert temperature measurements from celsius to kelvin
-        df = EddyProFormat.convert_temp_unit(df)
+        met_data = EddyProFormat.convert_temp_unit(met_data)
 
-        # step 7 in guide. Change all NaN or non-numeric values to -9999
-        df = EddyProFormat.replace_nonnumeric(df)
+        # step 7 in guide. All NaN or non-numeric values are written as -9999 while writing the data
         # get units for EddyPro labels
-        df = EddyProFormat.replace_units(df)
+        met_data = EddyProFormat.replace_units(met_data)
 
         # check if required columns from meteorological file are in df
-        EddyProFormat.check_req_columns(df)
+        EddyProFormat.check_req_columns(met_data.data)
 
-        # return formatted df and all the soil temp and moisture labels and depth dictionaries
-        return df, site_soil_moisture_variables, site_soil_temp_variables
+        # return formatted data and all the soil temp and moisture labels and depth dictionaries
+        return met_data, site_soil_moisture_variables, site_soil_temp_variables
 
     @staticmethod
     def get_soil_keys(df_soil_key, site_name):
@@ -165,34 +156,19 @@ class EddyProFormat:
         return site_soil_moisture_variables, site_soil_temp_variables
 
     @staticmethod
-    def read_rename(input_path, output_path):
-        """
-        Copy and rename input data file. Rename the file as output_path. Use this df for further processing. Return df
-
-        Args:
-            input_path (str): A file path for the input data.
-            output_path (str): A file path for the output data.
-        Returns:
-            df(obj): Pandas DataFrame object
-        """
-        shutil.copyfile(input_path, output_path)
-        df = data_util.read_csv_file(output_path, dtype='unicode')
-        return df
-
-    @staticmethod
-    def timestamp_format(df):
+    def timestamp_format(met_data):
         """
-        Function to change TIMESTAMP format in df. Replace inplace / with -
+        Function to change TIMESTAMP format in data. Replace inplace / with -
 
         Args:
-            df (object): Pandas DataFrame object
+            met_data (object): UnitFrame object
         Returns:
-            df (object): Pandas DataFrame object
+            met_data (object): UnitFrame object
         """
-        df = df.astype({'TIMESTAMP': str})
-        df['TIMESTAMP'] = df['TIMESTAMP'].map(lambda t: t.replace('/', '-'))
-        df['TIMESTAMP'][0] = 'yyyy-mm-dd HH:MM'  # Change unit TS to yyyy-mm-dd HH:MM to match eddypro format
-        return df
+        # Change unit TS to yyyy-mm-dd HH:MM to match eddypro format
+        met_data.add_column('TIMESTAMP', met_data.data['TIMESTAMP'].astype(str).str.replace('/', '-', regex=False),
+                            'yyyy-mm-dd HH:MM')
+        return met_data
 
     @staticmethod
     def air_temp_colnames(df_cols):
@@ -268,58 +244,44 @@ class EddyProFormat:
         return result
 
     @staticmethod
-    def convert_temp_unit(df):
+    def convert_temp_unit(met_data):
         """
-        Method to change temperature measurement unit from celsius to kelvin. Convert inplace
+        Method to change temperature measurement unit from celsius to kelvin.
+        Converted temperature variables are moved to the end of the data.
 
         Args:
-            df (object): Pandas DataFrame object
+            met_data (object): UnitFrame object
         Returns:
-            df (object): Processed Pandas DataFrame object
+            met_data (object): Processed UnitFrame object
         """
-        # get all temp variables : get all variables where the unit(2nd row) is 'Deg C' or 'degC'
-        temp_cols = [c for c in df.columns if str(df.iloc[0][c]).lower() in ['deg c', 'degc', 'deg_c']]
-        df_temp = df[temp_cols]
-        df_temp = df_temp.iloc[1:, :]  # make sure not to reset index here as we need to insert unit row at index 0
-        df_temp = df_temp.apply(pd.to_numeric, errors='coerce')  # convert string to numerical
+        # get all temp variables : get all variables where the unit is 'Deg C' or 'degC'
+        temp_cols = [c for c in met_data.columns if str(met_data.get_unit(c)).lower() in ['deg c', 'degc', 'deg_c']]
+        df_temp = met_data.data[temp_cols].apply(pd.to_numeric, errors='coerce')  # make sure values are numerical
         df_temp += 273.15
-        df_temp.loc[0] = ['K'] * df_temp.shape[1]  # add units as Kelvin as row index 0
-        df_temp = df_temp.sort_index()  # sorting by index
-        df_temp.round(3)
-        df.drop(temp_cols, axis=1, inplace=True)
-        df = df.join(df_temp)  # join 2 df on index
-
-        return df
-
-    @staticmethod
-    def replace_nonnumeric(df):
-        """
-        Method to convert all NaNs to -9999 inplace. Step 7 in guide.
+        met_data.drop(temp_cols)
+        for col in temp_cols:
+            met_data.add_column(col, df_temp[col], 'K')  # add units as Kelvin
 
-        Args:
-            df (object): Pandas DataFrame object
-        Returns:
-            df (object): Processed Pandas DataFrame object
-        """
-        df.fillna(value=-9999, inplace=True)
-        return df
+        return met_data
 
     @staticmethod
-    def replace_units(df):
+    def replace_units(met_data):
         """
         Replace met tower variable units to Eddypro label units
 
         Args:
-            df (object): Pandas DataFrame object
+            met_data (object): UnitFrame object
         Returns:
-            df (object): Processed Pandas DataFrame object
+            met_data (object): Processed UnitFrame object
         """
-        df.replace({'(?i)W/m^2': 'W+1m-2', '√Ç¬µmols/m√Ç¬≤/s': 'umol+1m-2s-1', '¬µmols/m¬≤/s': 'umol+1m-2s-1',
-                    '(?i)Kelvin': 'K', 'm/s': 'm+1s-1', '(?i)Deg': 'degrees', '(?i)vwc': 'm+3m-3'},
-                   regex=True, inplace=True)  # replace units using regex. (?i) is for case-insensitive
+        df_meta = met_data.get_units_row()
+        df_meta.replace({'(?i)W/m^2': 'W+1m-2', '√Ç¬µmols/m√Ç¬≤/s': 'umol+1m-2s-1', '¬µmols/m¬≤/s': 'umol+1m-2s-1',
+                         '(?i)Kelvin': 'K', 'm/s': 'm+1s-1', '(?i)Deg': 'degrees', '(?i)vwc': 'm+3m-3'},
+                        regex=True, inplace=True)  # replace units using regex. (?i) is for case-insensitive
         # replace the text which has word µmols/m
-        df = df.replace(to_replace=r".*mols/m.*", value='umol+1m-2s-1', regex=True)
-        return df
+        df_meta = df_meta.replace(to_replace=r".*mols/m.*", value='umol+1m-2s-1', regex=True)
+        met_data.units = df_meta.iloc[0].to_dict()
+        return met_data
 
     @staticmethod
     def check_req_columns(df):
@@ -29,20 +29,22 @@ class EnvEditor:
         self.SHOW_DATA_SYNC = False
 
         self.LINE_SFTP = 0
-        self.LINE_SFTP_LENGTH = 36
+        self.LINE_SFTP_LENGTH = 56
 
         if self.SHOW_DATA_SYNC:
-            self.LINE_EDDYPRO_FORMAT = 36
-            self.LINE_EDDYPRO_RUN = 86
-            self.LINE_PYFLUX_PRO = 141
-            self.LINE_PYFLUX_L1 = 170
-            self.LINE_SAVE_ENV = 217
+            self.LINE_EDDYPRO_FORMAT = 56
+            self.LINE_EDDYPRO_RUN = 106
+            self.LINE_PYFLUX_PRO = 161
+            self.LINE_PYFLUX_L1 = 190
+            self.LINE_PIPELINE = 237
+            self.LINE_SAVE_ENV = 273
         else:
-            self.LINE_EDDYPRO_FORMAT = 36 - self.LINE_SFTP_LENGTH
-            self.LINE_EDDYPRO_RUN = 86 - self.LINE_SFTP_LENGTH
-            self.LINE_PYFLUX_PRO = 141 - self.LINE_SFTP_LENGTH
-            self.LINE_PYFLUX_L1 = 170 - self.LINE_SFTP_LENGTH
-            self.LINE_SAVE_ENV = 217 - self.LINE_SFTP_LENGTH
+            self.LINE_EDDYPRO_FORMAT = 56 - self.LINE_SFTP_LENGTH
+            self.LINE_EDDYPRO_RUN = 106 - self.LINE_SFTP_LENGTH
+            self.LINE_PYFLUX_PRO = 161 - self.LINE_SFTP_LENGTH
+            self.LINE_PYFLUX_L1 = 190 - self.LINE_SFTP_LENGTH
+            self.LINE_PIPELINE = 237 - self.LINE_SFTP_LENGTH
+            self.LINE_SAVE_ENV = 273 - self.LINE_SFTP_LENGTH
 
         # ftp rsync variables
         self.SFTP_LABEL = " Sync files from the server"
@@ -76,6 +78,28 @@ class EnvEditor:
         self.DESC_SFTP_MET_LOCAL_PATH = " Directory path for MET files in the local machine that will be synced"
         self.INFO_SFTP_MET_LOCAL_PATH = "Directory path for MET files in the local machine. The files in the remote " \
                                         "directory will be synced here."
+        self.BROWSE_SFTP_CONNECTIONS = " Number of connections to the server"
+        self.DESC_SFTP_CONNECTIONS = " number of files downloaded in parallel from the remote FTP server [NUMBER]"
+        self.INFO_SFTP_CONNECTIONS = "Number of connections to the remote FTP server used to download the GHG and " \
+                                     "MET files in parallel. By default, 4 connections are used."
+        self.BROWSE_SFTP_GHG_INCLUDE = " GHG files to sync"
+        self.DESC_SFTP_GHG_INCLUDE = " comma separated patterns of the GHG files to sync, like *.ghg [PATTERNS]"
+        self.INFO_SFTP_GHG_INCLUDE = "Only the GHG files matching one of these patterns are synced. All files are " \
+                                     "synced if empty."
+        self.BROWSE_SFTP_GHG_EXCLUDE = " GHG files not to sync"
+        self.DESC_SFTP_GHG_EXCLUDE = " comma separated patterns of the GHG files and sub directories not to sync " \
+                                     "[PATTERNS]"
+        self.INFO_SFTP_GHG_EXCLUDE = "The GHG files and sub directories matching one of these patterns, like " \
+                                     "archive,*.tmp, are not synced."
+        self.BROWSE_SFTP_MET_INCLUDE = " MET files to sync"
+        self.DESC_SFTP_MET_INCLUDE = " comma separated patterns of the MET files to sync, like *.dat [PATTERNS]"
+        self.INFO_SFTP_MET_INCLUDE = "Only the MET files matching one of these patterns are synced. All files are " \
+                                     "synced if empty."
+        self.BROWSE_SFTP_MET_EXCLUDE = " MET files not to sync"
+        self.DESC_SFTP_MET_EXCLUDE = " comma separated patterns of the MET files and sub directories not to sync " \
+                                     "[PATTERNS]"
+        self.INFO_SFTP_MET_EXCLUDE = "The MET files and sub directories matching one of these patterns, like " \
+                                     "archive,*.tmp, are not synced."
 
         # user confirmation variable
         self.MISSING_TIME_USER_CONFIRMATION_LABEL = " User confirmation"
@@ -301,6 +325,44 @@ class EnvEditor:
                                  "with Ameriflux variable names. You will run this control file in PyFluxPro when " \
                                  "processing for Ameriflux."
 
+        # pipeline settings
+        self.PIPELINE_VARIABLE = " Variables for pipeline runs"
+        self.BROWSE_DATA_DTYPE = " Numeric storage type"
+        self.DESC_DATA_DTYPE = " floating point type of the met and flux data held in memory"
+        self.INFO_DATA_DTYPE = "The met and flux data are held in memory as float64 by default. Choose float32 to " \
+                               "use half of the memory for long data sets."
+        self.BROWSE_KEY_CACHE_DIR = " Directory for cached keys"
+        self.DESC_KEY_CACHE_DIR = " directory for the parsed Ameriflux-Mainstem, erroring variables and Soils keys " \
+                                  "[DIRECTORY]"
+        self.INFO_KEY_CACHE_DIR = "The keys parsed from the excel files are kept here and read again only when the " \
+                                  "files change. Keys are not cached if empty."
+        self.BROWSE_STAGE_CACHE_DIR = " Directory for the stage cache"
+        self.DESC_STAGE_CACHE_DIR = " directory for the results and status of the pre_pyfluxpro stages [DIRECTORY]"
+        self.INFO_STAGE_CACHE_DIR = "The pre_pyfluxpro stages with inputs unchanged since the previous run are " \
+                                    "skipped, and a failed run can be resumed. All stages are run if empty."
+        self.BROWSE_WATCH_POLL_INTERVAL = " Watcher poll interval"
+        self.DESC_WATCH_POLL_INTERVAL = " seconds between checks of the local GHG and MET directories for new files " \
+                                        "[SECONDS]"
+        self.INFO_WATCH_POLL_INTERVAL = "pipeline_watcher checks the local GHG and MET directories for new files " \
+                                        "this often. By default, every 30 seconds."
+        self.BROWSE_WATCH_DEBOUNCE = " Watcher debounce time"
+        self.DESC_WATCH_DEBOUNCE = " seconds without new files before new files are processed [SECONDS]"
+        self.INFO_WATCH_DEBOUNCE = "New files arriving in a burst are processed together once no new file has " \
+                                   "arrived for this long. By default, 120 seconds."
+        self.BROWSE_WATCH_MAX_WAIT = " Watcher maximum wait"
+        self.DESC_WATCH_MAX_WAIT = " maximum seconds new files wait while more files keep arriving [SECONDS]"
+        self.INFO_WATCH_MAX_WAIT = "New files are processed after this long even if more files keep arriving. " \
+                                   "By default, 900 seconds."
+        self.BROWSE_WATCH_MAX_FAILURES = " Watcher maximum failures"
+        self.DESC_WATCH_MAX_FAILURES = " number of failed merges after which a MET file is set aside [NUMBER]"
+        self.INFO_WATCH_MAX_FAILURES = "A MET file that cannot be merged this many times in a row is set aside " \
+                                       "until it changes, so that the other files are processed. By default, 3."
+        self.BROWSE_WATCH_STATE_DIR = " Directory for the watcher state"
+        self.DESC_WATCH_STATE_DIR = " directory for the processed files and the latency report of the watcher " \
+                                    "[DIRECTORY]"
+        self.INFO_WATCH_STATE_DIR = "pipeline_watcher keeps the list of processed files here, so that they are not " \
+                                    "processed again after a restart. Not kept if empty."
+
         # save
         self.SAVE_LABEL = "Save .env file"
         self.SAVE_ENV_FILE = "Save"
@@ -322,6 +384,12 @@ class EnvEditor:
         self.SFTP_GHG_LOCAL_PATH = os.getenv('SFTP_GHG_LOCAL_PATH')
         self.SFTP_MET_REMOTE_PATH = os.getenv('SFTP_MET_REMOTE_PATH')
         self.SFTP_MET_LOCAL_PATH = os.getenv('SFTP_MET_LOCAL_PATH')
+        # settings added after the first .env files are saved with their default values if missing
+        self.SFTP_CONNECTIONS = os.getenv('SFTP_CONNECTIONS', '4')
+        self.SFTP_GHG_INCLUDE = os.getenv('SFTP_GHG_INCLUDE', '')
+        self.SFTP_GHG_EXCLUDE = os.getenv('SFTP_GHG_EXCLUDE', '')
+        self.SFTP_MET_INCLUDE = os.getenv('SFTP_MET_INCLUDE', '')
+        self.SFTP_MET_EXCLUDE = os.getenv('SFTP_MET_EXCLUDE', '')
 
         self.MISSING_TIME_USER_CONFIRMATION = os.getenv('MISSING_TIME_USER_CONFIRMATION')
 
@@ -359,6 +427,16 @@ class EnvEditor:
         self.L2_AMERIFLUX_RUN_OUTPUT = os.getenv('L2_AMERIFLUX_RUN_OUTPUT')
         self.L2_AMERIFLUX = os.getenv('L2_AMERIFLUX')
 
+        self.DATA_DTYPE = os.getenv('DATA_DTYPE', 'float64')
+        self.KEY_CACHE_DIR = os.getenv('KEY_CACHE_DIR', '')
+        self.STAGE_CACHE_DIR = os.getenv('STAGE_CACHE_DIR', '')
+        self.WATCH_POLL_INTERVAL = os.getenv('WATCH_POLL_INTERVAL', '30')
+        self.WATCH_DEBOUNCE = os.getenv('WATCH_DEBOUNCE', '120')
+        self.WATCH_MAX_WAIT = os.getenv('WATCH_MAX_WAIT', '900')
+        self.WATCH_MAX_FAILURES = os.getenv('WATCH_MAX_FAILURES', '3')
+        self.WATCH_STATE_DIR = os.getenv('WATCH_STATE_DIR', os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                                                                         'data', 'cache', 'watch'))
+
         self.run()
 
     def run(self):
@@ -552,7 +630,24 @@ class EnvEditor:
             self.path_sftp_met_local_path.grid(sticky="w", row=i + 32, column=0, columnspan=3)
             label_separation = tk.Label(master=second_frame, text=self.SEPARATION_LABEL_SUB). \
                 grid(sticky="w", row=i+33, column=0, columnspan=3)
-            label_separation = tk.Label(master=second_frame, text="").grid(sticky="w", row=i+34, columnspan=3)
+
+            # create sftp connections, and include and exclude patterns
+            self.sftp_connections = self.create_entry(
+                second_frame, i+34, self.BROWSE_SFTP_CONNECTIONS, self.DESC_SFTP_CONNECTIONS,
+                self.on_click_sftp_connections, self.SFTP_CONNECTIONS, 10)
+            self.sftp_ghg_include = self.create_entry(
+                second_frame, i+38, self.BROWSE_SFTP_GHG_INCLUDE, self.DESC_SFTP_GHG_INCLUDE,
+                self.on_click_sftp_ghg_include, self.SFTP_GHG_INCLUDE, 40)
+            self.sftp_ghg_exclude = self.create_entry(
+                second_frame, i+42, self.BROWSE_SFTP_GHG_EXCLUDE, self.DESC_SFTP_GHG_EXCLUDE,
+                self.on_click_sftp_ghg_exclude, self.SFTP_GHG_EXCLUDE, 40)
+            self.sftp_met_include = self.create_entry(
+                second_frame, i+46, self.BROWSE_SFTP_MET_INCLUDE, self.DESC_SFTP_MET_INCLUDE,
+                self.on_click_sftp_met_include, self.SFTP_MET_INCLUDE, 40)
+            self.sftp_met_exclude = self.create_entry(
+                second_frame, i+50, self.BROWSE_SFTP_MET_EXCLUDE, self.DESC_SFTP_MET_EXCLUDE,
+                self.on_click_sftp_met_exclude, self.SFTP_MET_EXCLUDE, 40)
+            label_separation = tk.Label(master=second_frame, text="").grid(sticky="w", row=i+54, columnspan=3)
 
         # ########################################################
         # i = self.LINE_MISSING_TIME_USER_CONFIRMATION
@@ -1143,6 +1238,60 @@ class EnvEditor:
         label_separation = tk.Label(master=second_frame,
                                     text=self.SEPARATION_LABEL_SUB).grid(sticky="w", row=i+47, column=0, columnspan=3)
 
+        #############################################################
+        # create pipeline settings main title
+        i = self.LINE_PIPELINE
+        label_separation = tk.Label(master=second_frame, text="").grid(sticky="w", row=i, column=0, columnspan=3)
+        label_separation = tk.Label(master=second_frame, text="").grid(sticky="w", row=i+1, column=0, columnspan=3)
+        label_pipeline = tk.Label(master=second_frame, text=self.PIPELINE_VARIABLE,
+                                  font=self.MAIN_BOLD_FONT).grid(sticky="w", row=i+2, column=0, columnspan=3)
+        label_separation = tk.Label(master=second_frame, text=self.SEPARATION_LABEL). \
+            grid(sticky="w", row=i+3, column=0, columnspan=3)
+
+        # create numeric storage type
+        browse_data_dtype = tk.Label(second_frame, text=self.BROWSE_DATA_DTYPE, font=self.BOLD_FONT). \
+            grid(sticky="w", row=i+4, column=0)
+        button_data_dtype = tk.Button(second_frame, text=self.INFO_TITLE, command=self.on_click_data_dtype). \
+            grid(sticky="w", row=i+4, column=1)
+        desc_data_dtype = tk.Label(second_frame, text=self.DESC_DATA_DTYPE, font=self.DESC_FONT). \
+            grid(sticky="w", row=i+5, columnspan=3)
+        data_dtype_list = ("float64", "float32")
+        data_dtype_index = 0
+        for index, value in enumerate(data_dtype_list):
+            if value == self.DATA_DTYPE:
+                data_dtype_index = index
+        self.combo_data_dtype = ttk.Combobox(second_frame)
+        self.combo_data_dtype['values'] = data_dtype_list
+        self.combo_data_dtype.current(data_dtype_index)
+        self.combo_data_dtype.grid(sticky="w", row=i+6, columnspan=3)
+        label_separation = tk.Label(master=second_frame, text=self.SEPARATION_LABEL_SUB). \
+            grid(sticky="w", row=i+7, column=0, columnspan=3)
+
+        # create cache directories. caches are disabled if empty, so they are typed in instead of browsed
+        self.key_cache_dir = self.create_entry(
+            second_frame, i+8, self.BROWSE_KEY_CACHE_DIR, self.DESC_KEY_CACHE_DIR, self.on_click_key_cache_dir,
+            self.KEY_CACHE_DIR, 60)
+        self.stage_cache_dir = self.create_entry(
+            second_frame, i+12, self.BROWSE_STAGE_CACHE_DIR, self.DESC_STAGE_CACHE_DIR, self.on_click_stage_cache_dir,
+            self.STAGE_CACHE_DIR, 60)
+
+        # create watcher settings
+        self.watch_poll_interval = self.create_entry(
+            second_frame, i+16, self.BROWSE_WATCH_POLL_INTERVAL, self.DESC_WATCH_POLL_INTERVAL,
+            self.on_click_watch_poll_interval, self.WATCH_POLL_INTERVAL, 10)
+        self.watch_debounce = self.create_entry(
+            second_frame, i+20, self.BROWSE_WATCH_DEBOUNCE, self.DESC_WATCH_DEBOUNCE, self.on_click_watch_debounce,
+            self.WATCH_DEBOUNCE, 10)
+        self.watch_max_wait = self.create_entry(
+            second_frame, i+24, self.BROWSE_WATCH_MAX_WAIT, self.DESC_WATCH_MAX_WAIT, self.on_click_watch_max_wait,
+            self.WATCH_MAX_WAIT, 10)
+        self.watch_max_failures = self.create_entry(
+            second_frame, i+28, self.BROWSE_WATCH_MAX_FAILURES, self.DESC_WATCH_MAX_FAILURES,
+            self.on_click_watch_max_failures, self.WATCH_MAX_FAILURES, 10)
+        self.watch_state_dir = self.create_entry(
+            second_frame, i+32, self.BROWSE_WATCH_STATE_DIR, self.DESC_WATCH_STATE_DIR, self.on_click_watch_state_dir,
+            self.WATCH_STATE_DIR, 60)
+
         #############################################################
         # create save frame
         i = self.LINE_SAVE_ENV
@@ -1155,6 +1304,21 @@ class EnvEditor:
 
         root.mainloop()
 
+    def create_entry(self, frame, row, browse_text, desc_text, command, value, width):
+        # create a label with an info button, a description and a text entry filled with the value, in four rows
+        label_entry = tk.Label(master=frame, text=browse_text, font=self.BOLD_FONT).grid(sticky="w", row=row, column=0)
+        info_entry = tk.Button(frame, text=self.INFO_TITLE, font=self.MAIN_FONT, command=command). \
+            grid(sticky="w", row=row, column=1)
+        desc_entry = tk.Label(frame, text=desc_text, font=self.DESC_FONT). \
+            grid(sticky="w", row=row+1, column=0, columnspan=3)
+        entry = tk.Entry(master=frame, width=width, font=self.MAIN_FONT)
+        if value is not None:
+            entry.insert(0, value)
+        entry.grid(sticky="w", row=row+2, column=0, columnspan=3)
+        label_separation = tk.Label(master=frame, text=self.SEPARATION_LABEL_SUB). \
+            grid(sticky="w", row=row+3, column=0, columnspan=3)
+        return entry
+
     def browse_sftp_ghg_local_path(self):
         filepath = self.SFTP_GHG_LOCAL_PATH
         initialdir = os.getcwd() if filepath == "" else filepath
@@ -1434,6 +1598,11 @@ class EnvEditor:
         self.SFTP_GHG_LOCAL_PATH = current_dir + "/data/eddypro/input"
         self.SFTP_MET_REMOTE_PATH = "remote/path/for/met/data"
         self.SFTP_MET_LOCAL_PATH = current_dir + "/data/master_met/input"
+        self.SFTP_CONNECTIONS = "4"
+        self.SFTP_GHG_INCLUDE = "*.ghg"
+        self.SFTP_GHG_EXCLUDE = ""
+        self.SFTP_MET_INCLUDE = ""
+        self.SFTP_MET_EXCLUDE = ""
 
         self.MISSING_TIME_USER_CONFIRMATION = "Y"
 
@@ -1477,6 +1646,15 @@ class EnvEditor:
         self.L2_AMERIFLUX_RUN_OUTPUT = current_dir + "/data/pyfluxpro/output_ameriflux"
         self.L2_AMERIFLUX = current_dir + "/data/pyfluxpro/output_ameriflux"
 
+        self.DATA_DTYPE = "float64"
+        self.KEY_CACHE_DIR = ""
+        self.STAGE_CACHE_DIR = ""
+        self.WATCH_POLL_INTERVAL = "30"
+        self.WATCH_DEBOUNCE = "120"
+        self.WATCH_MAX_WAIT = "900"
+        self.WATCH_MAX_FAILURES = "3"
+        self.WATCH_STATE_DIR = current_dir + "/data/cache/watch"
+
     def save_env(self):
         sftp_title_line = "# Sync files from the server"
         if self.SHOW_DATA_SYNC:
@@ -1488,6 +1666,11 @@ class EnvEditor:
             sftp_ghg_local_path_line = "SFTP_GHG_LOCAL_PATH=" + self.SFTP_GHG_LOCAL_PATH
             sftp_met_remote_path_line = "SFTP_MET_REMOTE_PATH=" + str(self.sftp_met_remote_path.get())
             sftp_met_local_path_line = "SFTP_MET_LOCAL_PATH=" + self.SFTP_MET_LOCAL_PATH
+            sftp_connections_line = "SFTP_CONNECTIONS=" + str(self.sftp_connections.get())
+            sftp_ghg_include_line = "SFTP_GHG_INCLUDE=" + str(self.sftp_ghg_include.get())
+            sftp_ghg_exclude_line = "SFTP_GHG_EXCLUDE=" + str(self.sftp_ghg_exclude.get())
+            sftp_met_include_line = "SFTP_MET_INCLUDE=" + str(self.sftp_met_include.get())
+            sftp_met_exclude_line = "SFTP_MET_EXCLUDE=" + str(self.sftp_met_exclude.get())
         else:
             sftp_confirm_line = "SFTP_CONFIRMATION=N"
             sftp_server_line = "SFTP_SERVER="
@@ -1497,6 +1680,12 @@ class EnvEditor:
             sftp_ghg_local_path_line = "SFTP_GHG_LOCAL_PATH="
             sftp_met_remote_path_line = "SFTP_MET_REMOTE_PATH="
             sftp_met_local_path_line = "SFTP_MET_LOCAL_PATH="
+            # settings not shown are kept as they are read
+            sftp_connections_line = "SFTP_CONNECTIONS=" + self.SFTP_CONNECTIONS
+            sftp_ghg_include_line = "SFTP_GHG_INCLUDE=" + self.SFTP_GHG_INCLUDE
+            sftp_ghg_exclude_line = "SFTP_GHG_EXCLUDE=" + self.SFTP_GHG_EXCLUDE
+            sftp_met_include_line = "SFTP_MET_INCLUDE=" + self.SFTP_MET_INCLUDE
+            sftp_met_exclude_line = "SFTP_MET_EXCLUDE=" + self.SFTP_MET_EXCLUDE
         eddypro_input_title_line = "# Variables for EddyPro formatting"
         user_conform_line = "MISSING_TIME_USER_CONFIRMATION=" + self.combo_confirm.get()
         eddypro_input_met_line = "INPUT_MET=" + self.INPUT_MET
@@ -1538,10 +1727,21 @@ class EnvEditor:
         pyfluxpro_l2_ameriflux_run_output_line = "L2_AMERIFLUX_RUN_OUTPUT=" + self.L2_AMERIFLUX_RUN_OUTPUT
         pyfluxpro_l2_ameriflux_line = "L2_AMERIFLUX=" + self.L2_AMERIFLUX
 
+        pipeline_title_line = "# Variables for pipeline runs"
+        pipeline_data_dtype_line = "DATA_DTYPE=" + self.combo_data_dtype.get()
+        pipeline_key_cache_dir_line = "KEY_CACHE_DIR=" + str(self.key_cache_dir.get())
+        pipeline_stage_cache_dir_line = "STAGE_CACHE_DIR=" + str(self.stage_cache_dir.get())
+        pipeline_watch_poll_interval_line = "WATCH_POLL_INTERVAL=" + str(self.watch_poll_interval.get())
+        pipeline_watch_debounce_line = "WATCH_DEBOUNCE=" + str(self.watch_debounce.get())
+        pipeline_watch_max_wait_line = "WATCH_MAX_WAIT=" + str(self.watch_max_wait.get())
+        pipeline_watch_max_failures_line = "WATCH_MAX_FAILURES=" + str(self.watch_max_failures.get())
+        pipeline_watch_state_dir_line = "WATCH_STATE_DIR=" + str(self.watch_state_dir.get())
+
         lines = [
             sftp_title_line, sftp_confirm_line, sftp_server_line, sftp_username_line,
             sftp_password_line, sftp_ghg_remote_path_line, sftp_ghg_local_path_line,
-            sftp_met_remote_path_line, sftp_met_local_path_line,
+            sftp_met_remote_path_line, sftp_met_local_path_line, sftp_connections_line, sftp_ghg_include_line,
+            sftp_ghg_exclude_line, sftp_met_include_line, sftp_met_exclude_line,
             "",
             eddypro_input_title_line, user_conform_line, eddypro_input_met_line, eddypro_input_precip_line,
             eddypro_missing_time_line, eddypro_master_met_line, eddypro_input_soil_key_line,
@@ -1557,7 +1757,11 @@ class EnvEditor:
             pyfluxpro_l1_ameriflux_only_input_line, pyfluxpro_l1_ameriflux_mainstem_key_line,
             pyfluxpro_l1_ameriflux_run_output_line, pyfluxpro_l1_ameriflux_line, pyfluxpro_l1_error_variables_key_line,
             pyfluxpro_l2_mainstem_input_line, pyfluxpro_l2_ameriflux_only_input_line,
-            pyfluxpro_l2_ameriflux_run_output_line, pyfluxpro_l2_ameriflux_line
+            pyfluxpro_l2_ameriflux_run_output_line, pyfluxpro_l2_ameriflux_line,
+            "",
+            pipeline_title_line, pipeline_data_dtype_line, pipeline_key_cache_dir_line, pipeline_stage_cache_dir_line,
+            pipeline_watch_poll_interval_line, pipeline_watch_debounce_line, pipeline_watch_max_wait_line,
+            pipeline_watch_max_failures_line, pipeline_watch_state_dir_line
         ]
 
         outfile = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -1599,6 +1803,21 @@ class EnvEditor:
     def on_click_sftp_met_local_path(self):
         tk.messagebox.showinfo("Info", self.INFO_SFTP_MET_LOCAL_PATH)
 
+    def on_click_sftp_connections(self):
+        tk.messagebox.showinfo("Info", self.INFO_SFTP_CONNECTIONS)
+
+    def on_click_sftp_ghg_include(self):
+        tk.messagebox.showinfo("Info", self.INFO_SFTP_GHG_INCLUDE)
+
+    def on_click_sftp_ghg_exclude(self):
+        tk.messagebox.showinfo("Info", self.INFO_SFTP_GHG_EXCLUDE)
+
+    def on_click_sftp_met_include(self):
+        tk.messagebox.showinfo("Info", self.INFO_SFTP_MET_INCLUDE)
+
+    def on_click_sftp_met_exclude(self):
+        tk.messagebox.showinfo("Info", self.INFO_SFTP_MET_EXCLUDE)
+
     def on_click_user_confirm(self):
         tk.messagebox.showinfo("Info", self.INFO_MISSING_TIME_USER_CONFIRMATION)
 
@@ -1692,6 +1911,30 @@ class EnvEditor:
     def on_click_l2_ameriflux(self):
         tk.messagebox.showinfo("Info", self.INFO_L2_AMERIFLUX)
 
+    def on_click_data_dtype(self):
+        tk.messagebox.showinfo("Info", self.INFO_DATA_DTYPE)
+
+    def on_click_key_cache_dir(self):
+        tk.messagebox.showinfo("Info", self.INFO_KEY_CACHE_DIR)
+
+    def on_click_stage_cache_dir(self):
+        tk.messagebox.showinfo("Info", self.INFO_STAGE_CACHE_DIR)
+
+    def on_click_watch_poll_interval(self):
+        tk.messagebox.showinfo("Info", self.INFO_WATCH_POLL_INTERVAL)
+
+    def on_click_watch_debounce(self):
+        tk.messagebox.showinfo("Info", self.INFO_WATCH_DEBOUNCE)
+
+    def on_click_watch_max_wait(self):
+        tk.messagebox.showinfo("Info", self.INFO_WATCH_MAX_WAIT)
+
+    def on_click_watch_max_failures(self):
+        tk.messagebox.showinfo("Info", self.INFO_WATCH_MAX_FAILURES)
+
+    def on_click_watch_state_dir(self):
+        tk.messagebox.showinfo("Info", self.INFO_WATCH_STATE_DIR)
+
 
 if __name__ == '__main__':
     app = EnvEditor()
@@ -13,6 +13,7 @@ import logging
 
 import utils.data_util as data_util
 from utils.process_validation import DataValidation
+from utils.unitframe import UnitFrame
 
 pd.options.mode.chained_assignment = None
 
@@ -29,10 +30,11 @@ class MasterMetProcessor:
     # main method which calls other functions
     @staticmethod
     def data_preprocess(input_met_path, input_precip_path, precip_lower, precip_upper,
-                        missing_time_threshold, user_confirmation, met_timeperiod, precip_timeperiod):
+                        missing_time_threshold, user_confirmation, met_timeperiod, precip_timeperiod,
+                        data_dtype='float64'):
         """
         Cleans and process the dataframe as per the guide. Process dataframe inplace
-        Returns processed df and file meta df which is used in eddyproformat.py
+        Returns processed data with its units and file meta df which is used in eddyproformat.py
 
         Args:
             input_met_path (str): A file path for the input data.
@@ -44,8 +46,9 @@ class MasterMetProcessor:
                                         ignore or ask during runtime in case of large number of missing timestamps
             met_timeperiod (float): Time period for one record of meteorological data
             precip_timeperiod (float): Time period for one record of precipitation data
+            data_dtype (str): Numeric storage type of the data. float64 or float32
         Returns:
-            df (obj): Pandas DataFrame object, processed df
+            met_data (obj): UnitFrame object, processed met data with units of all variables
             file_meta (obj) : Pandas DataFrame object, meta data of file
         """
 
@@ -60,6 +63,7 @@ class MasterMetProcessor:
         if df_meta is None:
             log.error("Please check met data file. Aborting")
             return None, None
+        descriptions = MasterMetProcessor.get_descriptions(file_df_meta)
         # NOTE 4
         df_meta = MasterMetProcessor.add_U_V_units(df_meta)
 
@@ -130,7 +134,7 @@ class MasterMetProcessor:
         except KeyError:
             log.warning("AhFromRH calculation failed. Check if columns 'AirTC_Avg' and 'RH_Avg' exists.")
 
-        # Step 4 in guide
+        # Step 4 in guide. Empty values are written as 'NAN' while writing master met data
         df = MasterMetProcessor.replace_empty(df)
 
         # NOTE 6
@@ -194,16 +198,16 @@ class MasterMetProcessor:
             df_meta[albedo_col[0]] = SW_unit  # add shortwave radiation units
 
         # NOTE 2
-        # concat the meta df and df if number of columns is the same
-        if df_meta.shape[1] == df.shape[1]:
-            df = pd.concat([df_meta, df], ignore_index=True)
-        else:
+        # units of all variables are kept along with the data if number of columns is the same
+        if df_meta.shape[1] != df.shape[1]:
             log.error("Number of columns in met data {} not the same as number of columns in meta data {}".
                       format(df.shape[1], df_meta.shape[1]))
             return None, None
+        df = data_util.set_data_dtype(df, data_dtype)
+        met_data = UnitFrame.from_units_row(df, df_meta, descriptions)
 
-        # return processed and merged df and metadata.
-        return df, file_meta
+        # return processed data with units and metadata.
+        return met_data, file_meta
 
     @staticmethod
     def read_met_data(data_path):
@@ -263,6 +267,19 @@ class MasterMetProcessor:
         df_meta = df_meta.head(1)  # dropping the last row of Min / Avg
         return df_meta, file_meta
 
+    @staticmethod
+    def get_descriptions(file_df_meta):
+        """
+        Method to get the descriptions of met tower variables from meta data.
+        The fourth row of meta data has the description of how the variable is sampled, like Min / Avg.
+
+        Args :
+            file_df_meta (obj): pandas dataframe consisting of all meta data
+        Returns :
+            (dict) : Mapping of variable name to its description
+        """
+        return dict(zip(file_df_meta.iloc[1], file_df_meta.iloc[3]))
+
     @staticmethod
     def add_U_V_units(df):
         """
@@ -663,15 +680,14 @@ class MasterMetProcessor:
     @staticmethod
     def replace_empty(df):
         """
-        Function to replace empty and NaN cells
+        Function to replace empty cells with NaN. NaNs are written as 'NAN'
 
         Args:
             df (object): Pandas DataFrame object
         Returns :
             obj: Pandas DataFrame object
         """
-        df = df.replace('', 'NAN')  # replace empty cells with 'NAN'
-        df = df.replace(np.nan, 'NAN', regex=True)  # replace NaN with 'NAN'
+        df = df.replace('', np.nan)  # replace empty cells with NaN
         return df
 
     @staticmethod
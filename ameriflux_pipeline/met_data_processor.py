@@ -19,6 +19,7 @@ import sys
 
 import utils.data_util as data_util
 from utils.process_validation import DataValidation
+from utils.metnames import MetNames
 
 # create and configure logger
 logging.basicConfig(level=logging.INFO, datefmt='%Y-%m-%dT%H:%M:%S',
@@ -145,41 +146,12 @@ def read_met_data(data_path, key_df):
         df.rename(columns=key_df.set_index('Original')['Target'], inplace=True)
 
     # NOTES 20
-    # rename certain columns
-    col_labels = {}
-    # find albedo column and rename
-    albedo_col = df.filter(regex=re.compile('^albedo', re.IGNORECASE)).columns.to_list()
-    if len(albedo_col) > 0:
-        col_labels[albedo_col[0]] = 'Albedo_Avg'
-    # remove sensor number from CNRTC and CNRTK
-    cnrtc_col = df.filter(regex=re.compile('^CNR[1-9]_?T_?C', re.IGNORECASE)).columns.to_list()
-    if cnrtc_col:
-        col_labels[cnrtc_col[0]] = 'CNRTC_Avg'
-    cnrtk_col = df.filter(regex=re.compile('^CNR[1-9]_?T_?K', re.IGNORECASE)).columns.to_list()
-    if cnrtk_col:
-        col_labels[cnrtk_col[0]] = 'CNRTK_Avg'
-
-    # rename columns
+    # rename old datalogger variable names to the standard names
+    col_labels = {col: new_col for col, new_col in zip(df.columns, MetNames.normalize_columns(df.columns))
+                  if col != new_col}
     df.rename(columns=col_labels, inplace=True)
     df_meta.rename(columns=col_labels, inplace=True)
 
-    # change VWC to VWC1
-    vwc_col = df.filter(regex=re.compile('^VWC_', re.IGNORECASE)).columns.to_list()
-    if vwc_col:
-        vwc_labels = {}
-        for col in vwc_col:
-            vwc_labels[col] = 'VWC1_' + col.split('_')[1] + '_Avg'
-        df.rename(columns=vwc_labels, inplace=True)
-        df_meta.rename(columns=vwc_labels, inplace=True)
-    # change TC to TC1
-    tc_col = df.filter(regex=re.compile('^TC_', re.IGNORECASE)).columns.to_list()
-    if tc_col:
-        tc_labels = {}
-        for col in tc_col:
-            tc_labels[col] = 'TC1_' + col.split('_')[1] + '_Avg'
-        df.rename(columns=tc_labels, inplace=True)
-        df_meta.rename(columns=tc_labels, inplace=True)
-
     # after renaming check if column names are unique
     if len(df.columns.to_list()) != len(df.columns.unique()):
         counter_1 = Counter(df.columns.to_list())
@@ -295,6 +267,82 @@ def data_processing(files, start_date, end_date, key_file):
         return None, None
 
 
+def write_met_data(df, file_meta, output_file):
+    """
+    Write the merged met data with the file meta data as the first line
+
+    Args:
+        df (obj): Pandas dataframe object - merged met data including units and meta data
+        file_meta (list): First line of file - meta data of file
+        output_file (str): Full file path to write the merged csv
+    Returns:
+        None
+    """
+    # make file_meta and df the same length to read as proper csv
+    file_meta = list(file_meta)
+    num_columns = df.shape[1]
+    for _ in range(len(file_meta), num_columns):
+        file_meta.append(' ')
+    file_meta_line = ','.join(file_meta)
+    # write processed df to output path
+    data_util.write_data_to_csv(df, output_file)
+    # Prepend the file_meta to the met data csv
+    with open(output_file, 'r+') as f:
+        content = f.read()
+        f.seek(0, 0)
+        f.write(file_meta_line.rstrip('\r\n') + '\n' + content)
+
+
+def merge_new_data(files, output_file, key_file):
+    """
+    Merge new and changed .dat files into an existing merged met data file. Only the given files are read.
+    Records of the new files replace the records with the same timestamps in the merged file. See NOTES 27
+
+    Args:
+        files (list(str)): List of filepath to read met data
+        output_file (str): Full file path of the merged csv. Created if it does not exist
+        key_file (str): file for metmerger variable name change. None by default
+    Returns:
+        (bool): True if the merged file is written, False if not
+    """
+    df, file_meta = data_processing(files, '9999-99-99', '9999-99-99', key_file)
+    if df is None:
+        log.error("New met data cannot be merged into %s", output_file)
+        return False
+    if os.path.isfile(output_file):
+        # merged file is already renamed. No key is applied
+        merged_df, merged_file_meta, merged_meta, merged_site_name = read_met_data(output_file, None)
+        if merged_df is None:
+            log.error("Merged met data %s not readable", output_file)
+            return False
+        # empty values of the merged file are read as nan strings. Write them back as empty values
+        merged_df = merged_df.replace('nan', np.nan)
+        merged_meta = merged_meta.replace('nan', np.nan)
+        site_name = data_util.get_site_name(file_meta[5])
+        if merged_site_name != site_name:
+            log.error("Data merge for different sites not recommended. %s has site %s, new data has site %s",
+                      output_file, merged_site_name, site_name)
+            return False
+        if merged_df.columns.to_list() != df.columns.to_list():
+            log.error("Met data columns of new files do not match %s. Merge the files with met_data_processor",
+                      output_file)
+            return False
+        new_data = df.iloc[2:, :]  # first 2 rows are units and min/avg
+        met_data = pd.concat([merged_df, new_data], axis=0, ignore_index=True)
+        met_data.replace(r'^\s*$', np.nan, regex=True, inplace=True)
+        timestamp_col = met_data.filter(regex=re.compile('TIMESTAMP', re.IGNORECASE)).columns.to_list()[0]
+        met_data['TIMESTAMP_datetime'] = pd.to_datetime(met_data[timestamp_col])
+        # stable sort keeps the new records after the merged records with the same timestamp
+        met_data = met_data.sort_values(by='TIMESTAMP_datetime', kind='stable')
+        met_data.drop_duplicates(subset='TIMESTAMP_datetime', keep='last', inplace=True)
+        met_data.drop(columns=['TIMESTAMP_datetime'], inplace=True)
+        df = pd.concat([merged_meta, met_data], ignore_index=True)
+        log.info("Met data of %d files merged into %s. %d new records", len(files), output_file,
+                 len(met_data) - len(merged_df))
+    write_met_data(df, file_meta, output_file)
+    return True
+
+
 def main(files, start_date, end_date, output_file, key_file):
     """
        Main function to pre-process dat files. Calls other functions
@@ -309,18 +357,7 @@ def main(files, start_date, end_date, output_file, key_file):
     """
     df, file_meta = data_processing(files, start_date, end_date, key_file)
     if df is not None:
-        # make file_meta and df the same length to read as proper csv
-        num_columns = df.shape[1]
-        for _ in range(len(file_meta), num_columns):
-            file_meta.append(' ')
-        file_meta_line = ','.join(file_meta)
-        # write processed df to output path
-        data_util.write_data_to_csv(df, output_file)
-        # Prepend the file_meta to the met data csv
-        with open(output_file, 'r+') as f:
-            content = f.read()
-            f.seek(0, 0)
-            f.write(file_meta_line.rstrip('\r\n') + '\n' + content)
+        write_met_data(df, file_meta, output_file)
         log.info("Merging of met files completed. Merged file %s", output_file)
     else:
         log.error('-' * 10 + "Data merge failed. Aborting" + '-' * 10)
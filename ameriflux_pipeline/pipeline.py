@@ -265,21 +265,21 @@ class Pipeline:
             tk.messagebox.showerror("Error", self.POST_PYFLUXPRO_FAIL)
 
     def run_eddypro_processing(self):
-        is_success = prepy.run(2)
+        is_success = prepy.run(prepy.EDDYPRO_PREPROCESSING_TARGETS)
         if is_success:
             tk.messagebox.showinfo("Info", self.EDDYPRO_PREP_SUCCESS)
         else:
             tk.messagebox.showerror("Error", self.EDDYPRO_PREP_FAIL)
 
     def run_eddypro(self):
-        is_success = prepy.run(3)
+        is_success = prepy.run(prepy.EDDYPRO_RUN_TARGETS)
         if is_success:
             tk.messagebox.showinfo("Info", self.EDDYPRO_SUCCESS)
         else:
             tk.messagebox.showerror("Error", self.EDDYPRO_FAIL)
 
     def run_pyfluxpro(self):
-        is_success = prepy.run(4)
+        is_success = prepy.run(prepy.PYFLUXPRO_TARGETS)
         if is_success:
             tk.messagebox.showinfo("Info", self.PYFLUXPRO_SUCCESS)
         else:
@@ -0,0 +1,258 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import argparse
+import multiprocessing
+import os
+import time
+import logging
+import sys
+import pandas as pd
+
+from config import Config
+import pre_pyfluxpro
+import post_pyfluxpro
+
+# format of the batch log and the job logs, with the worker process of the job and the thread of the stage
+LOG_FORMAT = '%(asctime)-15s.%(msecs)03dZ %(levelname)-7s [%(processName)-10s %(threadName)-10s] : %(name)s - ' \
+             '%(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# create and configure logger. Replaces the logger configured by the pipeline modules when they are imported
+logging.basicConfig(level=logging.INFO, datefmt=LOG_DATE_FORMAT, format=LOG_FORMAT,
+                    handlers=[logging.FileHandler("pipeline_batch.log"), logging.StreamHandler(sys.stdout)], force=True)
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+# columns of the manifest that are not config settings
+SITE_COLUMN = 'site'
+ENV_FILE_COLUMN = 'env_file'
+# setting of the stage cache directory. Sites not setting it in the manifest get a sub directory of their own
+STAGE_CACHE_COLUMN = 'STAGE_CACHE_DIR'
+# settings asking the user for confirmation. Jobs run without a terminal, so these cannot be set to ask
+CONFIRMATION_SETTINGS = ['AMERIFLUX_VARIABLE_USER_CONFIRMATION', 'MISSING_TIME_USER_CONFIRMATION']
+# processes run for each job
+PRE_PYFLUXPRO = 'pre_pyfluxpro'
+POST_PYFLUXPRO = 'post_pyfluxpro'
+# summary report written to the log directory
+SUMMARY_FILE = 'summary.csv'
+
+
+def read_manifest(manifest_file):
+    """
+    Read the batch manifest. Each row is a site with the config settings for the site.
+    The site column names the job. The optional env_file column is a .env file for the site, created by enveditor.
+    Other columns are config settings like INPUT_MET or L1_AMERIFLUX, overriding the .env file. Empty values are not
+    overridden.
+
+    Args:
+        manifest_file (str): A file path for the manifest csv file
+    Returns:
+        (list): List of dictionaries with site, env_file and the config settings of each row.
+                None if the manifest is not valid
+    """
+    try:
+        manifest = pd.read_csv(manifest_file, dtype=str, keep_default_na=False)
+    except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+        log.error("Cannot read manifest %s: %s", manifest_file, e)
+        return None
+    manifest.columns = manifest.columns.str.strip()
+    columns = {col: col.lower() if col.lower() in [SITE_COLUMN, ENV_FILE_COLUMN] else col.upper()
+               for col in manifest.columns}
+    manifest.rename(columns=columns, inplace=True)
+    if SITE_COLUMN not in manifest.columns:
+        log.error("Column %s not present in manifest %s", SITE_COLUMN, manifest_file)
+        return None
+    setting_names = Config.get_setting_names()
+    unknown_settings = [col for col in manifest.columns
+                        if col not in [SITE_COLUMN, ENV_FILE_COLUMN] and col not in setting_names]
+    if unknown_settings:
+        log.error("Columns %s of manifest %s are not config settings", unknown_settings, manifest_file)
+        return None
+    sites = manifest[SITE_COLUMN].str.strip()
+    if (sites == '').any() or sites.duplicated().any():
+        log.error("Site names in manifest %s are to be unique and not empty", manifest_file)
+        return None
+    if STAGE_CACHE_COLUMN in manifest.columns:
+        stage_cache_dirs = manifest[STAGE_CACHE_COLUMN].str.strip()
+        stage_cache_dirs = stage_cache_dirs[stage_cache_dirs != '']
+        if stage_cache_dirs.map(os.path.abspath).duplicated().any():
+            log.error("Sites in manifest %s cannot share a %s", manifest_file, STAGE_CACHE_COLUMN)
+            return None
+
+    rows = []
+    for row in manifest.to_dict('records'):
+        row = {key: value.strip() for key, value in row.items()}
+        rows.append({SITE_COLUMN: row.pop(SITE_COLUMN), ENV_FILE_COLUMN: row.pop(ENV_FILE_COLUMN, ''),
+                     'settings': {key: value for key, value in row.items() if value}})
+    return rows
+
+
+def get_job(row, log_dir, processes, targets, resume=False):
+    """
+    Get the job for a row of the manifest
+
+    Args:
+        row (dict): Row of the manifest from read_manifest
+        log_dir (str): Directory for the log file of the job
+        processes (list): Processes to run. pre_pyfluxpro and/or post_pyfluxpro
+        targets (list): Target stages of pre_pyfluxpro. All stages if None
+        resume (bool): True to resume the previous pre_pyfluxpro run of the site
+    Returns:
+        (dict): Settings and log file of the job
+    """
+    return dict(row, log_file=os.path.join(log_dir, row[SITE_COLUMN] + '.log'), processes=processes,
+                targets=targets, resume=resume)
+
+
+def set_job_logging(log_file):
+    """
+    Log everything in the worker process to the log file of the job
+
+    Args:
+        log_file (str): A file path for the log file of the job
+    Returns:
+        None
+    """
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(log_file, mode='w')
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def run_job(job):
+    """
+    Run pre-pyfluxpro and post-pyfluxpro processes for a site with its own config. The settings are taken from the
+    .env file of the pipeline, then from the env_file of the job and then from the manifest.
+    If the manifest does not set STAGE_CACHE_DIR for the site, the site uses a sub directory named by the site,
+    so that sites running together do not share the stage manifest, results, status and EddyPro checkpoint.
+
+    Args:
+        job (dict): Job from get_job
+    Returns:
+        (dict): Site, status of each process, elapsed time, log file and error of the job.
+                Status is True if the process is successful, False if it failed and None if it is not run
+    """
+    start = time.time()
+    result = {SITE_COLUMN: job[SITE_COLUMN], PRE_PYFLUXPRO: None, POST_PYFLUXPRO: None, 'elapsed': 0.0,
+              'log_file': job['log_file'], 'error': ''}
+    set_job_logging(job['log_file'])
+    try:
+        job_cfg = Config.load(job[ENV_FILE_COLUMN] or None, job['settings'])
+        if job_cfg is None:
+            result['error'] = "Config settings of the site cannot be loaded"
+            return result
+        if job_cfg.STAGE_CACHE_DIR and STAGE_CACHE_COLUMN not in job['settings']:
+            stage_cache_dir = os.path.join(job_cfg.STAGE_CACHE_DIR, job[SITE_COLUMN])
+            job_cfg = Config.load(job[ENV_FILE_COLUMN] or None,
+                                  dict(job['settings'], **{STAGE_CACHE_COLUMN: stage_cache_dir}))
+            log.info("Stage cache of site %s is in %s", job[SITE_COLUMN], stage_cache_dir)
+        interactive_settings = [name for name in CONFIRMATION_SETTINGS
+                                if str(getattr(job_cfg, name)).lower() in ['a', 'ask']]
+        if interactive_settings:
+            result['error'] = "Settings {} cannot be ask in a batch run".format(interactive_settings)
+            log.error(result['error'])
+            return result
+        if PRE_PYFLUXPRO in job['processes']:
+            result[PRE_PYFLUXPRO] = pre_pyfluxpro.run(job['targets'], job_cfg, job['resume'])
+            if not result[PRE_PYFLUXPRO]:
+                result['error'] = "Pre-pyfluxpro process failed"
+        if POST_PYFLUXPRO in job['processes'] and not result['error']:
+            if os.path.exists(job_cfg.L2_AMERIFLUX_RUN_OUTPUT):
+                result[POST_PYFLUXPRO] = post_pyfluxpro.run(job_cfg)
+                if not result[POST_PYFLUXPRO]:
+                    result['error'] = "Post-pyfluxpro process failed"
+            else:
+                # PyFluxPro is run manually after the control files are created
+                log.warning("PyFluxPro L2 run output %s not present. Post-pyfluxpro process is not run",
+                            job_cfg.L2_AMERIFLUX_RUN_OUTPUT)
+    except Exception as e:
+        log.exception("Job for site %s failed: %s", job[SITE_COLUMN], e)
+        result['error'] = str(e)
+    result['elapsed'] = round(time.time() - start, 2)
+    return result
+
+
+def write_summary(results, summary_file):
+    """
+    Write the summary report of the batch and log it
+
+    Args:
+        results (list): List of job results from run_job
+        summary_file (str): A file path for the summary csv file
+    Returns:
+        None
+    """
+    df = pd.DataFrame(results, columns=[SITE_COLUMN, PRE_PYFLUXPRO, POST_PYFLUXPRO, 'elapsed', 'log_file', 'error'])
+    df.insert(1, 'success', df['error'] == '')
+    df.to_csv(summary_file, index=False)
+    for result in df.to_dict('records'):
+        log.info("%-20s success: %-5s pre_pyfluxpro: %-5s post_pyfluxpro: %-5s elapsed: %8.2fs log: %s %s",
+                 result[SITE_COLUMN], result['success'], result[PRE_PYFLUXPRO], result[POST_PYFLUXPRO],
+                 result['elapsed'], result['log_file'], result['error'])
+    log.info("Jobs successful for %d of %d sites. Summary written to %s", df['success'].sum(), len(df), summary_file)
+
+
+def run(manifest_file, log_dir, processes=(PRE_PYFLUXPRO, POST_PYFLUXPRO), targets=None, max_workers=None,
+        resume=False):
+    """
+    Main function to run pre-pyfluxpro and post-pyfluxpro processes for all sites in the manifest on a process pool
+
+    Args:
+        manifest_file (str): A file path for the manifest csv file with site, env_file and config setting columns
+        log_dir (str): Directory for the log file of each job and the summary report
+        processes (list): Processes to run. pre_pyfluxpro and/or post_pyfluxpro
+        targets (list): Target stages of pre_pyfluxpro. All stages if None
+        max_workers (int): Number of worker processes. Number of CPUs if None
+        resume (bool): True to resume the previous pre_pyfluxpro run of each site
+    Returns:
+        (bool): True if the jobs are successful for all sites, False if not
+    """
+    rows = read_manifest(manifest_file)
+    if rows is None:
+        return False
+    os.makedirs(log_dir, exist_ok=True)
+    jobs = [get_job(row, log_dir, list(processes), targets, resume) for row in rows]
+
+    start = time.time()
+    # a new process is started for each job, so that log handlers and cached keys are not shared between the sites
+    with multiprocessing.get_context('spawn').Pool(processes=max_workers, maxtasksperchild=1) as pool:
+        results = pool.map(run_job, jobs, chunksize=1)
+    end = time.time()
+    write_summary(results, os.path.join(log_dir, SUMMARY_FILE))
+    hours, rem = divmod(end - start, 3600)
+    minutes, seconds = divmod(rem, 60)
+    log.info("Total elapsed time is : {:0>2}:{:0>2}:{:05.2f}".format(int(hours), int(minutes), seconds))
+    return all(result['error'] == '' for result in results)
+
+
+if __name__ == '__main__':
+    log.info('-' * 50)
+    log.info("############# Process Started #############")
+    # get arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--manifest", action="store", required=True,
+                        help="Manifest csv file with site, optional env_file and config setting columns")
+    parser.add_argument("--log-dir", action="store", default="batch_logs",
+                        help="Directory for the log file of each site and the summary report")
+    parser.add_argument("--process", action="append", choices=[PRE_PYFLUXPRO, POST_PYFLUXPRO], default=None,
+                        dest="processes", help="Process to run. Can be repeated. Default is both")
+    parser.add_argument("--target", action="append", default=None, dest="targets",
+                        help="Pre-pyfluxpro stage to run along with the stages it needs. Default is all stages")
+    parser.add_argument("--workers", action="store", type=int, default=None,
+                        help="Number of worker processes. Default is the number of CPUs")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume the previous pre-pyfluxpro run of each site without syncing data or running "
+                             "EddyPro again")
+    args = parser.parse_args()
+    if run(args.manifest, args.log_dir, args.processes or [PRE_PYFLUXPRO, POST_PYFLUXPRO], args.targets,
+           args.workers, args.resume):
+        log.info("Successfully completed the jobs for all sites of %s", args.manifest)
+    else:
+        log.error('-' * 10 + "Pipeline batch resulted in an error." + '-' * 10)
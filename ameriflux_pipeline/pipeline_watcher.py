@@ -0,0 +1,263 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import argparse
+import os
+import json
+import time
+import tempfile
+from datetime import datetime
+import logging
+import sys
+
+from config import Config
+from utils.folderwatcher import FolderWatcher
+from utils.stagescheduler import StageScheduler
+from utils.input_validation import InputValidation
+import met_data_processor
+import pre_pyfluxpro
+
+# create and configure logger. Replaces the logger configured by the pipeline modules when they are imported
+logging.basicConfig(level=logging.INFO, datefmt='%Y-%m-%dT%H:%M:%S',
+                    format='%(asctime)-15s.%(msecs)03dZ %(levelname)-7s [%(threadName)-10s] : %(name)s - %(message)s',
+                    handlers=[logging.FileHandler("pipeline_watcher.log"), logging.StreamHandler(sys.stdout)],
+                    force=True)
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+# file name patterns of the raw met data files and the GHG files synced from the server
+MET_PATTERNS = ['*.dat', '*.backup']
+GHG_PATTERNS = ['*.ghg']
+# files in WATCH_STATE_DIR
+MET_STATE_FILE = 'met_files.json'
+GHG_STATE_FILE = 'ghg_files.json'
+LATENCY_FILE = 'latency.json'
+# number of processed bursts kept in the latency report
+MAX_LATENCY_RECORDS = 100
+# settings asking the user for confirmation. The watcher runs without a terminal, so these cannot be set to ask
+CONFIRMATION_SETTINGS = ['AMERIFLUX_VARIABLE_USER_CONFIRMATION', 'MISSING_TIME_USER_CONFIRMATION']
+
+
+def get_watcher(watch_dir, patterns, state_file_name, cfg):
+    """
+    Get the watcher of a local directory synced from the server
+
+    Args:
+        watch_dir (str): Directory to watch
+        patterns (list): File name patterns of the files to watch
+        state_file_name (str): File name for the processed files in WATCH_STATE_DIR
+        cfg (obj): Config object with the settings of the run
+    Returns:
+        (obj): FolderWatcher object
+    """
+    state_file = os.path.join(cfg.WATCH_STATE_DIR, state_file_name) if cfg.WATCH_STATE_DIR else None
+    return FolderWatcher([watch_dir], patterns, float(cfg.WATCH_DEBOUNCE), float(cfg.WATCH_MAX_WAIT), state_file,
+                         int(cfg.WATCH_MAX_FAILURES))
+
+
+def get_stage_elapsed(cfg, since):
+    """
+    Get the time taken by the pre-pyfluxpro stages run since the given time, from the stage status file
+
+    Args:
+        cfg (obj): Config object with the settings of the run
+        since (datetime): Start time of the run
+    Returns:
+        (dict): Stage name to status and seconds taken. Empty if STAGE_CACHE_DIR is not set
+    """
+    if not cfg.STAGE_CACHE_DIR:
+        return {}
+    status_file = os.path.join(cfg.STAGE_CACHE_DIR, pre_pyfluxpro.STAGE_STATUS_FILE)
+    status = StageScheduler(status_file=status_file).read_status()
+    # status is updated to the second
+    since = since.replace(microsecond=0)
+    return {name: {'status': stage['status'], 'elapsed': stage['elapsed']} for name, stage in status.items()
+            if datetime.fromisoformat(stage['updated']) >= since}
+
+
+def merge_files(files, cfg, key_file='None'):
+    """
+    Merge new met files into INPUT_MET one at a time, so that a file that cannot be merged, like a file with other
+    columns after a datalogger program change, does not keep the other files from being merged
+
+    Args:
+        files (list): File paths of the new met files
+        cfg (obj): Config object with the settings of the run
+        key_file (str): file for metmerger variable name change
+    Returns:
+        (list, list): File paths merged, and file paths that failed to be merged
+    """
+    merged_files, failed_files = [], []
+    # files are merged in order, so that the records of later files replace the records of earlier files
+    for file_path in sorted(files):
+        try:
+            is_merged = met_data_processor.merge_new_data([file_path], cfg.INPUT_MET, key_file)
+        except Exception as e:
+            log.exception("Merge of %s failed: %s", file_path, e)
+            is_merged = False
+        if is_merged:
+            merged_files.append(file_path)
+        else:
+            log.error("%s cannot be merged into %s", file_path, cfg.INPUT_MET)
+            failed_files.append(file_path)
+    return merged_files, failed_files
+
+
+def process_files(folder, files, pending_since, cfg, targets, key_file='None'):
+    """
+    Process a burst of new files. New met files are merged into INPUT_MET, then the target stages of
+    pre-pyfluxpro are run if any file is merged. Stages with unchanged inputs are skipped by the stage cache.
+
+    Args:
+        folder (str): met or ghg
+        files (dict): File path to [modification time in ns, size] of the new files
+        pending_since (float): Time the new files were found, in seconds since epoch
+        cfg (obj): Config object with the settings of the run
+        targets (list): Target stages of pre-pyfluxpro. No stage is run if empty
+        key_file (str): file for metmerger variable name change. Used for met files
+    Returns:
+        (dict): Latency record with the time taken by each step, in seconds, and the met files that failed to be
+                merged. Success is True if the stages are run for the other files
+    """
+    start = time.time()
+    started = datetime.now()
+    oldest_file_time = min(stat[0] for stat in files.values()) / 1e9
+    record = {'folder': folder, 'files': len(files),
+              'oldest_file_time': datetime.fromtimestamp(oldest_file_time).isoformat(timespec='seconds'),
+              'started': started.isoformat(timespec='seconds'),
+              'wait': round(start - pending_since, 2), 'merge': None, 'failed_files': [], 'stages': {},
+              'latency': None, 'success': False}
+    log.info("Processing %d new %s files", len(files), folder)
+    if folder == 'met':
+        merge_start = time.time()
+        merged_files, record['failed_files'] = merge_files(files, cfg, key_file)
+        record['merge'] = round(time.time() - merge_start, 2)
+        if not merged_files:
+            return record
+    if targets:
+        is_success = pre_pyfluxpro.run(targets, cfg)
+        record['stages'] = get_stage_elapsed(cfg, started)
+        if not is_success:
+            return record
+    end = time.time()
+    # latency from the oldest new file written to the outputs updated
+    record['latency'] = round(end - oldest_file_time, 2)
+    record['success'] = True
+    log.info("Processed %d new %s files in %.2fs. Latency from the oldest new file is %.2fs",
+             len(files) - len(record['failed_files']), folder, end - start, record['latency'])
+    return record
+
+
+def write_latency(record, latency_file):
+    """
+    Add the latency record to the latency report, keeping the last MAX_LATENCY_RECORDS records
+
+    Args:
+        record (dict): Latency record from process_files
+        latency_file (str): A file path for the json latency report. Not written if None
+    Returns:
+        None
+    """
+    if not latency_file:
+        return
+    records = []
+    if os.path.isfile(latency_file):
+        try:
+            with open(latency_file) as f:
+                records = json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Cannot read latency report %s: %s", latency_file, e)
+    records = (records + [record])[-MAX_LATENCY_RECORDS:]
+    try:
+        latency_dir = os.path.dirname(os.path.abspath(latency_file))
+        os.makedirs(latency_dir, exist_ok=True)
+        # written to a temporary file and moved, so that a partly written report is never read
+        fd, tmp_file = tempfile.mkstemp(dir=latency_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(records, f, indent=2)
+        os.replace(tmp_file, latency_file)
+    except OSError as e:
+        log.warning("Cannot write latency report to %s: %s", latency_file, e)
+
+
+def run(cfg=None, met_targets=tuple(pre_pyfluxpro.EDDYPRO_PREPROCESSING_TARGETS), ghg_targets=(), key_file='None'):
+    """
+    Main function to watch the local met and GHG directories and process new files as they arrive.
+    Runs until interrupted.
+
+    Args:
+        cfg (obj): Config object with the settings of the run. The settings read from the environment if None
+        met_targets (list): Target stages of pre-pyfluxpro run after new met files are merged
+        ghg_targets (list): Target stages of pre-pyfluxpro run after new GHG files arrive
+        key_file (str): file for metmerger variable name change. None by default
+    Returns:
+        (bool): False if the watcher cannot be started
+    """
+    if cfg is None:
+        cfg = Config()
+    if not InputValidation.watcher(cfg):
+        log.error("Please check pipeline watcher input variables")
+        return False
+    if not cfg.SFTP_MET_LOCAL_PATH or not os.path.isdir(cfg.SFTP_MET_LOCAL_PATH):
+        log.error("SFTP_MET_LOCAL_PATH %s is not a directory", cfg.SFTP_MET_LOCAL_PATH)
+        return False
+    interactive_settings = [name for name in CONFIRMATION_SETTINGS if str(getattr(cfg, name)).lower() in ['a', 'ask']]
+    if interactive_settings:
+        log.error("Settings %s cannot be ask in the watcher", interactive_settings)
+        return False
+
+    watchers = [('met', get_watcher(cfg.SFTP_MET_LOCAL_PATH, MET_PATTERNS, MET_STATE_FILE, cfg), list(met_targets))]
+    if cfg.SFTP_GHG_LOCAL_PATH and os.path.isdir(cfg.SFTP_GHG_LOCAL_PATH):
+        watchers.append(('ghg', get_watcher(cfg.SFTP_GHG_LOCAL_PATH, GHG_PATTERNS, GHG_STATE_FILE, cfg),
+                         list(ghg_targets)))
+    else:
+        log.warning("SFTP_GHG_LOCAL_PATH %s is not a directory. GHG files are not watched", cfg.SFTP_GHG_LOCAL_PATH)
+    latency_file = os.path.join(cfg.WATCH_STATE_DIR, LATENCY_FILE) if cfg.WATCH_STATE_DIR else None
+    poll_interval = float(cfg.WATCH_POLL_INTERVAL)
+    log.info("Watching %s every %.0fs", [watcher.dirs[0] for _, watcher, _ in watchers], poll_interval)
+
+    while True:
+        for folder, watcher, targets in watchers:
+            files = watcher.poll()
+            if not files:
+                continue
+            try:
+                record = process_files(folder, files, watcher.get_pending_since(), cfg, targets, key_file)
+            except Exception as e:
+                log.exception("Processing of new %s files failed: %s", folder, e)
+                record = None
+            if record is not None:
+                write_latency(record, latency_file)
+            if record is not None and record['success']:
+                watcher.commit({path: stat for path, stat in files.items() if path not in record['failed_files']})
+            if record is not None and record['failed_files']:
+                # files that cannot be merged are retried, and set aside after WATCH_MAX_FAILURES failures
+                watcher.fail({path: files[path] for path in record['failed_files']})
+            elif record is None or not record['success']:
+                log.error("Processing of new %s files failed. Retrying after %.0fs", folder, watcher.debounce)
+                watcher.retry_later()
+        time.sleep(poll_interval)
+
+
+if __name__ == '__main__':
+    log.info('-' * 50)
+    log.info("############# Process Started #############")
+    # get arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--met-target", action="append", default=None, dest="met_targets",
+                        help="Pre-pyfluxpro stage to run after new met files are merged. Can be repeated. "
+                             "Default is eddypro_biomet")
+    parser.add_argument("--ghg-target", action="append", default=None, dest="ghg_targets",
+                        help="Pre-pyfluxpro stage to run after new GHG files arrive. Can be repeated. "
+                             "Default is no stage")
+    parser.add_argument("--key", action="store", default='None', help="Full file path for met merger variable keys")
+    args = parser.parse_args()
+    try:
+        if not run(None, args.met_targets or pre_pyfluxpro.EDDYPRO_PREPROCESSING_TARGETS, args.ghg_targets or [],
+                   args.key):
+            log.error('-' * 10 + "Pipeline watcher could not be started." + '-' * 10)
+    except KeyboardInterrupt:
+        log.info("Pipeline watcher stopped")
@@ -11,7 +11,7 @@ import time
 import sys
 import logging
 
-from config import Config as cfg
+from config import Config
 import utils.data_util as data_util
 from pyfluxpro.outputformat import OutputFormat
 
@@ -24,7 +24,7 @@ log = logging.getLogger(__name__)
 
 
 def pyfluxpro_output_ameriflux_processing(l2_run_output, file_meta_data_file, erroring_variable_flag,
-                                          erroring_variable_key):
+                                          erroring_variable_key, by_year=False, key_cache_dir=''):
     """
     Function to run PyFluxPro output file formatting for AmeriFlux. Calls other functions
 
@@ -36,31 +36,40 @@ def pyfluxpro_output_ameriflux_processing(l2_run_output, file_meta_data_file, er
         erroring_variable_key (str): Variable name key used to match the original variable names to Ameriflux names
                                 for variables throwing an error in PyFluxPro L1.
                                 This is an excel file named L1_erroring_variables.xlsx
+        by_year (bool): True to write one Ameriflux csv file for each calendar year, False to write one file
+        key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
     Returns:
         (bool): True if processing is successful, False if not
     """
-    ameriflux_df, ameriflux_file_name = OutputFormat.data_formatting(l2_run_output, file_meta_data_file,
-                                                                     erroring_variable_flag, erroring_variable_key)
-    if ameriflux_file_name is None:
+    # the ameriflux csv file is written to the same directory as the L2 run output
+    directory_name = os.path.dirname(l2_run_output)
+    if by_year:
+        output_file = OutputFormat.write_ameriflux_csv_by_year(l2_run_output, file_meta_data_file,
+                                                               erroring_variable_flag, erroring_variable_key,
+                                                               directory_name, key_cache_dir=key_cache_dir)
+    else:
+        output_file = OutputFormat.write_ameriflux_csv(l2_run_output, file_meta_data_file, erroring_variable_flag,
+                                                       erroring_variable_key, directory_name,
+                                                       key_cache_dir=key_cache_dir)
+    if output_file is None:
         log.error("PyFluxPro run output not formatted for Ameriflux")
         return False
-    ameriflux_file_name = ameriflux_file_name + '.csv'
-    directory_name = os.path.dirname(l2_run_output)
-    output_file = os.path.join(directory_name, ameriflux_file_name)
-    data_util.write_data_to_csv(ameriflux_df, output_file)
     return True
 
 
-def run():
+def run(cfg=None):
     """
     Function for running whole post pyfluxpro process
 
-    Args: None
+    Args:
+        cfg (obj): Config object with the settings of the run. The settings read from the environment if None
 
     return:
         (bool): True if processing is successful, False if not
     """
 
+    if cfg is None:
+        cfg = Config()
     # Main function which calls method for post processing of PyFluxPro output
     log.info('-' * 50)
     log.info("############# Process Started #############")
@@ -87,7 +96,8 @@ def run():
     start = time.time()
     log.info("Post-processing of PyFluxPro run output has been started")
     is_success = pyfluxpro_output_ameriflux_processing(cfg.L2_AMERIFLUX_RUN_OUTPUT, file_meta_data_file,
-                                                       erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY)
+                                                       erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY,
+                                                       cfg.AMERIFLUX_OUTPUT_BY_YEAR, cfg.KEY_CACHE_DIR)
     if is_success:
         log.info("Post-processing of PyFluxPro L2 run output is successful")
     else:
@@ -4,6 +4,7 @@
 # terms of the Mozilla Public License v2.0 which accompanies this distribution,
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
+import argparse
 import os
 import shutil
 import pandas as pd
@@ -11,18 +12,24 @@ import time
 from datetime import datetime
 import logging
 import sys
+import threading
 
-from config import Config as cfg
+from config import Config
 import utils.data_util as data_util
 from utils.syncdata import SyncData as syncdata
+from utils.keycache import KeyCache
 from utils.process_validation import DataValidation
 from utils.input_validation import InputValidation
+from utils.unitframe import UnitFrame
+from utils.stagescheduler import StageScheduler
+from utils.stagecache import StageCache
 
 from master_met.mastermetprocessor import MasterMetProcessor
 from eddypro.eddyproformat import EddyProFormat
 from eddypro.runeddypro import RunEddypro
 from pyfluxpro.pyfluxproformat import PyFluxProFormat
 from pyfluxpro.amerifluxformat import AmeriFluxFormat
+from pyfluxpro.timestampalignment import TimestampAlignment
 from pyfluxpro.l1format import L1Format
 from pyfluxpro.l2format import L2Format
 
@@ -45,18 +52,41 @@ logging.basicConfig(level=logging.INFO, datefmt='%Y-%m-%dT%H:%M:%S',
 # create log object with current module name
 log = logging.getLogger(__name__)
 
-# flag to check if fulloutput and metdata sheet in pyfluxpro_input.xlsx sheet has overlapping timestamps
-pyfluxpro_overlap_timestamp_check = cfg.PYFLUXPRO_OVERLAP_TIMESTAMP  # setting to true checks for overlap
+# stage cache of each STAGE_CACHE_DIR, shared by the runs using the same directory
+stage_caches = {}
+stage_caches_lock = threading.Lock()
+# file in STAGE_CACHE_DIR with the status of each stage from the latest run
+STAGE_STATUS_FILE = 'status.json'
 
+# target stages run by the pipeline GUI and the command line
+EDDYPRO_PREPROCESSING_TARGETS = ['eddypro_biomet']
+EDDYPRO_RUN_TARGETS = ['eddypro_run']
+PYFLUXPRO_TARGETS = ['pyfluxpro_ameriflux_input', 'l2_control_file']
 
-def input_validation():
+
+def get_stage_cache(cfg):
+    """
+    Get the stage cache for STAGE_CACHE_DIR. Stages with inputs unchanged since the previous run are skipped
+    Args:
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (obj): StageCache object
+    """
+    with stage_caches_lock:
+        if cfg.STAGE_CACHE_DIR not in stage_caches:
+            stage_caches[cfg.STAGE_CACHE_DIR] = StageCache(cfg.STAGE_CACHE_DIR)
+        return stage_caches[cfg.STAGE_CACHE_DIR]
+
+
+def input_validation(cfg):
     """
     Method to check user input validation from config file
-    Args: None
+    Args:
+        cfg (obj): Config object with the settings of the run
     Returns :
         (bool): True if input data is valid, False if not
     """
-    if InputValidation.validate():
+    if InputValidation.validate(cfg):
         log.info("User input validations complete")
         return True
     else:
@@ -64,17 +94,55 @@ def input_validation():
         return False
 
 
-def eddypro_preprocessing(file_meta_data_file):
+def eddypro_preprocessing(file_meta_data_file, cfg):
     """
     Main function to run EddyPro processing. Calls other functions.
-    This creates the master met data and formats the same for EddyPro
+    This creates the master met data and formats the same for EddyPro.
+    Master met and EddyPro biomet stages are skipped if their inputs are unchanged since the previous run.
     Args:
         file_meta_data_file (str) : Filepath to write the meta data, typically the first line of Met data
+        cfg (obj): Config object with the settings of the run
     Returns :
         eddypro_formatted_met_file (str) : File name of the Met data formatted for eddypro
         site_soil_moisture_variables (dict): Dictionary for soil moisture variable details from Soils key file
         site_soil_temp_variables (dict): Dictionary for soil temperature variable details from Soils key file
     """
+    stage_cache = get_stage_cache(cfg)
+    master_met_inputs = stage_cache.get_input_hashes(
+        {'input_met': cfg.INPUT_MET, 'input_precip': cfg.INPUT_PRECIP},
+        {'missing_time': cfg.MISSING_TIME, 'missing_time_user_confirmation': cfg.MISSING_TIME_USER_CONFIRMATION,
+         'qc_precip_lower': cfg.QC_PRECIP_LOWER, 'qc_precip_upper': cfg.QC_PRECIP_UPPER,
+         'met_timeperiod': cfg.MET_TIMEPERIOD, 'precip_timeperiod': cfg.PRECIP_TIMEPERIOD,
+         'data_dtype': cfg.DATA_DTYPE})
+    master_met_outputs = [cfg.MASTER_MET, file_meta_data_file]
+    # master met data is kept in memory for EddyPro formatting when it is created in this run
+    met_data, file_meta = None, None
+    if stage_cache.get_result('master_met', master_met_inputs, master_met_outputs) is None:
+        met_data, file_meta = master_met_processing(file_meta_data_file, cfg)
+        if met_data is None:
+            return None
+        stage_cache.save('master_met', master_met_inputs, master_met_outputs, True)
+
+    # create file for master met formatted for eddypro
+    # filename is selected to be master_met_eddypro
+    eddypro_formatted_met_file = data_util.create_eddypro_output_met_file_name(cfg.MASTER_MET)
+    return stage_cache.run('eddypro_biomet', eddypro_biomet_processing,
+                           {'master_met': cfg.MASTER_MET, 'file_meta': file_meta_data_file,
+                            'soil_key': cfg.INPUT_SOIL_KEY},
+                           {'data_dtype': cfg.DATA_DTYPE}, [eddypro_formatted_met_file],
+                           args=(file_meta_data_file, eddypro_formatted_met_file, cfg, met_data, file_meta))
+
+
+def master_met_processing(file_meta_data_file, cfg):
+    """
+    Function to create the master met data from met and precipitation data
+    Args:
+        file_meta_data_file (str) : Filepath to write the meta data, typically the first line of Met data
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        met_data (obj): UnitFrame object of master met data. None if failed
+        file_meta (obj): Pandas DataFrame object with meta data of the met data file. None if failed
+    """
     # set configuration variables
     missing_time = int(cfg.MISSING_TIME)
     qc_precip_lower = float(cfg.QC_PRECIP_LOWER)
@@ -84,41 +152,58 @@ def eddypro_preprocessing(file_meta_data_file):
     precip_timeperiod = float(cfg.PRECIP_TIMEPERIOD)
 
     # start preprocessing data
-    df, file_meta = \
+    met_data, file_meta = \
         MasterMetProcessor.data_preprocess(cfg.INPUT_MET, cfg.INPUT_PRECIP, qc_precip_lower,
                                            qc_precip_upper, missing_time,
                                            cfg.MISSING_TIME_USER_CONFIRMATION,
-                                           met_timeperiod, precip_timeperiod)
-    if df is None:
+                                           met_timeperiod, precip_timeperiod, cfg.DATA_DTYPE)
+    if met_data is None:
         log.error("Creation of master met data has failed.")
-        return None
-    # write processed df to output path
-    data_util.write_data_to_csv(df, cfg.MASTER_MET)
+        return None, None
+    # write processed data to output path. step 4 in guide, empty values are written as 'NAN'
+    met_data.write_csv(cfg.MASTER_MET, na_rep='NAN')
 
     # Write file meta data to another file
     data_util.write_data_to_csv(file_meta, file_meta_data_file)  # write meta data of file to file. One row.
+    return met_data, file_meta
 
-    # create file for master met formatted for eddypro
-    # filename is selected to be master_met_eddypro
-    eddypro_formatted_met_file = data_util.create_eddypro_output_met_file_name(cfg.MASTER_MET)
+
+def eddypro_biomet_processing(file_meta_data_file, eddypro_formatted_met_file, cfg, met_data=None, file_meta=None):
+    """
+    Function to format the master met data for EddyPro
+    Args:
+        file_meta_data_file (str) : File containing the meta data, typically the first line of Met data
+        eddypro_formatted_met_file (str) : Filename to write the Met data formatted for eddypro
+        cfg (obj): Config object with the settings of the run
+        met_data (obj): UnitFrame object of master met data. Read from the master met file if None
+        file_meta (obj): Pandas DataFrame object with meta data of the met data file. Read from file if None
+    Returns :
+        (tuple): File name of the Met data formatted for eddypro and the soil moisture and soil temperature
+                variable dictionaries from Soils key file. None if failed
+    """
+    if met_data is None or file_meta is None:
+        # master met stage was skipped
+        met_data = UnitFrame.read_csv(cfg.MASTER_MET, cfg.DATA_DTYPE)
+        file_meta = data_util.read_csv_file(file_meta_data_file)
 
     # start formatting data
-    df, site_soil_moisture_variables, site_soil_temp_variables = \
-        EddyProFormat.data_formatting(cfg.MASTER_MET, cfg.INPUT_SOIL_KEY, file_meta, eddypro_formatted_met_file)
-    if df is None:
+    eddypro_met_data, site_soil_moisture_variables, site_soil_temp_variables = \
+        EddyProFormat.data_formatting(met_data, cfg.INPUT_SOIL_KEY, file_meta, cfg.KEY_CACHE_DIR)
+    if eddypro_met_data is None:
         log.error("Eddypro formatting of master met data failed.")
         return None
-    # write formatted df to output path
-    data_util.write_data_to_csv(df, eddypro_formatted_met_file)
+    # write formatted data to output path. step 7 in guide, all NaN or non-numeric values are written as -9999
+    eddypro_met_data.write_csv(eddypro_formatted_met_file, na_rep='-9999')
 
     return eddypro_formatted_met_file, site_soil_moisture_variables, site_soil_temp_variables
 
 
-def run_eddypro(eddypro_formatted_met_file):
+def run_eddypro(eddypro_formatted_met_file, cfg):
     """
     Method to run EddyPro software headless
     Args:
         eddypro_formatted_met_file (str): File path for Met data file formatted for EddyPro
+        cfg (obj): Config object with the settings of the run
     Returns: None
     """
     RunEddypro.run_eddypro(eddypro_bin_loc=cfg.EDDYPRO_BIN_LOC, proj_file_template=cfg.EDDYPRO_PROJ_FILE_TEMPLATE,
@@ -129,7 +214,7 @@ def run_eddypro(eddypro_formatted_met_file):
                            biom_file=eddypro_formatted_met_file)
 
 
-def pyfluxpro_processing(eddypro_full_output, full_output_pyfluxpro, met_data_30_input, met_data_30_pyfluxpro):
+def pyfluxpro_processing(eddypro_full_output, full_output_pyfluxpro, met_data_30_input, met_data_30_pyfluxpro, cfg):
     """
     Main function to run PyFluxPro processing. Calls other functions
 
@@ -138,47 +223,42 @@ def pyfluxpro_processing(eddypro_full_output, full_output_pyfluxpro, met_data_30
         full_output_pyfluxpro (str): Filename to write the full_output formatted for PyFluxPro
         met_data_30_input (str): Input meteorological file path
         met_data_30_pyfluxpro (str): Meteorological file used as input for PyFluxPro.
+        cfg (obj): Config object with the settings of the run
     Returns :
         (bool) : True if pyfluxpro input sheet is successfully created, else False
     """
-    full_output_df = PyFluxProFormat.data_formatting(eddypro_full_output)
-    if full_output_df is None:
+    full_output = PyFluxProFormat.data_formatting(eddypro_full_output, cfg.DATA_DTYPE)
+    if full_output is None:
         log.error("Formatting of eddypro full output sheet failed.")
         return False
-    # met_data has data from row index 1. EddyPro full_output will be formatted to have data from row index 1 also.
-    # This is step 3a in guide.
-
-    # convert timestamp to datetime format so that pyfluxpro can read without error
-    full_output_df['TIMESTAMP'][1:] = pd.to_datetime(full_output_df['TIMESTAMP'][1:])
+    # met_data and EddyPro full_output have the units in the row after the column names. This is step 3a in guide.
+    # TIMESTAMP of full_output is in datetime format so that pyfluxpro can read without error
 
-    # write pyfluxpro formatted df to output path
-    data_util.write_data_to_csv(full_output_df, full_output_pyfluxpro)
+    # write pyfluxpro formatted data to output path
+    full_output.write_csv(full_output_pyfluxpro, na_rep='NAN')
     # copy and rename the met data file
     shutil.copyfile(met_data_30_input, met_data_30_pyfluxpro)
 
-    met_data_df = data_util.read_csv_file(met_data_30_pyfluxpro, dtype='unicode')
+    met_data = UnitFrame.read_csv(met_data_30_pyfluxpro, cfg.DATA_DTYPE)
     # convert timestamp to datetime format so that pyfluxpro can read without error
-    met_data_df['TIMESTAMP'][1:] = pd.to_datetime(met_data_df['TIMESTAMP'][1:])
+    met_data.data['TIMESTAMP'] = pd.to_datetime(met_data.data['TIMESTAMP'])
 
     # check for timestamp overlap
-    if pyfluxpro_overlap_timestamp_check:
-        # get the starting and ending timestamp of met data
-        met_data_timestamp_start = met_data_df['TIMESTAMP'][1]
-        met_data_timestamp_end = met_data_df['TIMESTAMP'][len(met_data_df['TIMESTAMP']) - 1]
-        # get the starting and ending timestamp of full output
-        full_output_timestamp_start = full_output_df['TIMESTAMP'][1]
-        full_output_timestamp_end = full_output_df['TIMESTAMP'][len(full_output_df['TIMESTAMP']) - 1]
-        # get overlapping periods
-        latest_start = max(met_data_timestamp_start, full_output_timestamp_start)
-        earliest_end = min(met_data_timestamp_end, full_output_timestamp_end)
-        delta = (earliest_end - latest_start).total_seconds()  # find delta and convert to seconds
-        overlap = max(0, delta)
-        if not overlap:
-            log.error("The met data and full output does not have overlapping timestamps.")
-            return False
-
-    full_output_col_list = full_output_df.columns
-    met_data_col_list = met_data_df.columns
+    if cfg.PYFLUXPRO_OVERLAP_TIMESTAMP or cfg.PYFLUXPRO_TRIM_TIMESTAMP:
+        alignment = TimestampAlignment.get_alignment(full_output.data, met_data.data)
+        if alignment is None:
+            if cfg.PYFLUXPRO_OVERLAP_TIMESTAMP:
+                log.error("The met data and full output does not have overlapping timestamps.")
+                return False
+            log.warning("The met data and full output does not have overlapping timestamps. Sheets are not trimmed.")
+        else:
+            TimestampAlignment.log_alignment(alignment)
+            if cfg.PYFLUXPRO_TRIM_TIMESTAMP:
+                # rows outside the overlap are not used by PyFluxPro
+                TimestampAlignment.trim(full_output, alignment['start'], alignment['end'])
+                TimestampAlignment.trim(met_data, alignment['start'], alignment['end'])
+                log.info("Full output and met data trimmed to the overlapping timestamps")
+
     # join met_data and full_output in excel sheet
     # write df and met_data df to an excel spreadsheet in two separate tabs
     full_output_sheet_name = os.path.splitext(os.path.basename(full_output_pyfluxpro))[0]
@@ -189,17 +269,9 @@ def pyfluxpro_processing(eddypro_full_output, full_output_pyfluxpro, met_data_30
                             date_format='yyyy/mm/dd',
                             engine_kwargs={'options': {'strings_to_numbers': True}})
 
-    # remove header so as to remove built-in formatting of xlsxwriter
-    full_output_df.to_excel(writer, sheet_name=full_output_sheet_name, index=False, header=False, startrow=1)
-    met_data_df.to_excel(writer, sheet_name=met_data_sheet_name, index=False, header=False, startrow=1)
-
-    full_output_worksheet = writer.sheets[full_output_sheet_name]
-    met_data_worksheet = writer.sheets[met_data_sheet_name]
-
-    for idx, val in enumerate(full_output_col_list):
-        full_output_worksheet.write(0, idx, val)
-    for idx, val in enumerate(met_data_col_list):
-        met_data_worksheet.write(0, idx, val)
+    # missing values are written as 'NAN'
+    full_output.write_excel(writer, full_output_sheet_name, na_rep='NAN')
+    met_data.write_excel(writer, met_data_sheet_name, na_rep='NAN')
 
     writer.save()
     log.info("PyFluxPro input excel sheet saved in %s", cfg.PYFLUXPRO_INPUT_SHEET)
@@ -207,48 +279,53 @@ def pyfluxpro_processing(eddypro_full_output, full_output_pyfluxpro, met_data_30
     return True
 
 
-def pyfluxpro_ameriflux_processing(input_file, met_data_sheet_name, full_output_sheet_name, output_file):
+def pyfluxpro_ameriflux_formatting(input_file, met_data_sheet_name, full_output_sheet_name, cfg):
     """
-    Function to format PyFluxPro input excel sheet for AmeriFlux. Calls other functions
+    Function to format the sheets of PyFluxPro input excel sheet for AmeriFlux, without writing them
     Args:
         input_file (str): PyFluxPro input excel sheet file path
         met_data_sheet_name (str): Sheet name for met_data sheet
         full_output_sheet_name (str): Sheet name for full output
-        output_file (str): Filename to write the PyFluxPro formatted for AmeriFlux
+        cfg (obj): Config object with the settings of the run
     Returns :
-        ameriflux_full_output_df_col_list (list): List of full_output variable names
-        ameriflux_met_df_col_list (list): List of full_output variable names
+        ameriflux_full_output (obj): UnitFrame object of full output formatted for Ameriflux. None if failed
+        ameriflux_met_data (obj): UnitFrame object of met data formatted for Ameriflux. None if failed
     """
-    ameriflux_full_output_df, ameriflux_met_df = AmeriFluxFormat.data_formatting(input_file, full_output_sheet_name,
-                                                                                 met_data_sheet_name)
-    if ameriflux_full_output_df is None:
+    ameriflux_full_output, ameriflux_met_data = AmeriFluxFormat.data_formatting(input_file, full_output_sheet_name,
+                                                                                met_data_sheet_name, cfg.DATA_DTYPE)
+    if ameriflux_full_output is None:
         log.error("Processing of full_output for Ameriflux failed")
-        return False
-    if ameriflux_met_df is None:
+        return None, None
+    if ameriflux_met_data is None:
         log.error("Processing of Met_data_30 for Ameriflux failed")
-        return False
-    ameriflux_full_output_df_col_list = ameriflux_full_output_df.columns
-    ameriflux_met_df_col_list = ameriflux_met_df.columns
+        return None, None
+    return ameriflux_full_output, ameriflux_met_data
 
+
+def write_pyfluxpro_ameriflux(ameriflux_full_output, ameriflux_met_data, met_data_sheet_name, full_output_sheet_name,
+                              output_file):
+    """
+    Function to write the PyFluxPro input excel sheet formatted for AmeriFlux
+    Args:
+        ameriflux_full_output (obj): UnitFrame object of full output formatted for Ameriflux
+        ameriflux_met_data (obj): UnitFrame object of met data formatted for Ameriflux
+        met_data_sheet_name (str): Sheet name for met_data sheet
+        full_output_sheet_name (str): Sheet name for full output
+        output_file (str): Filename to write the PyFluxPro formatted for AmeriFlux
+    Returns :
+        (bool): True if the excel sheet is written
+    """
     # write df and met_data df to an excel spreadsheet in two separate tabs
     writer = pd.ExcelWriter(output_file, engine='xlsxwriter', datetime_format='yyyy/mm/dd HH:MM',
                             date_format='yyyy/mm/dd', engine_kwargs={'options': {'strings_to_numbers': True}})
 
-    # remove header so as to remove built-in formatting of xlsxwriter
-    ameriflux_full_output_df.to_excel(writer, sheet_name=full_output_sheet_name, index=False, header=False, startrow=1)
-    ameriflux_met_df.to_excel(writer, sheet_name=met_data_sheet_name, index=False, header=False, startrow=1)
-
-    full_output_worksheet = writer.sheets[full_output_sheet_name]
-    met_data_worksheet = writer.sheets[met_data_sheet_name]
-    for idx, val in enumerate(ameriflux_full_output_df_col_list):
-        full_output_worksheet.write(0, idx, val)
-    for idx, val in enumerate(ameriflux_met_df_col_list):
-        met_data_worksheet.write(0, idx, val)
+    # missing values are written as 'NAN'
+    ameriflux_full_output.write_excel(writer, full_output_sheet_name, na_rep='NAN')
+    ameriflux_met_data.write_excel(writer, met_data_sheet_name, na_rep='NAN')
 
     writer.save()
     log.info("AmeriFlux PyFluxPro excel sheet saved in %s", output_file)
-    # all processing successful
-    return ameriflux_full_output_df_col_list, ameriflux_met_df_col_list
+    return True
 
 
 def pyfluxpro_l1_ameriflux_processing(pyfluxpro_input, l1_mainstem, l1_ameriflux_only, ameriflux_mainstem_key,
@@ -256,7 +333,7 @@ def pyfluxpro_l1_ameriflux_processing(pyfluxpro_input, l1_mainstem, l1_ameriflux
                                       erroring_variable_flag, erroring_variable_key,
                                       site_soil_moisture_variables, site_soil_temp_variables,
                                       full_output_variables, met_data_variables,
-                                      met_data_sheet_name, full_output_sheet_name):
+                                      met_data_sheet_name, full_output_sheet_name, cfg):
     """
     Main function to run PyFluxPro L1 control file formatting for AmeriFlux. Calls other functions
     Args:
@@ -279,22 +356,39 @@ def pyfluxpro_l1_ameriflux_processing(pyfluxpro_input, l1_mainstem, l1_ameriflux
         met_data_variables (list): List of met_data variable names
         met_data_sheet_name (str): Sheet name for met_data sheet
         full_output_sheet_name (str): Sheet name for full output
+        cfg (obj): Config object with the settings of the run
 
     Returns:
         ameriflux_mapping (dict): Mapping of variable names to Ameriflux-friendly labels in L1_Ameriflux.txt
     """
+    input_files = {'l1_mainstem': l1_mainstem, 'l1_ameriflux_only': l1_ameriflux_only,
+                   'ameriflux_mainstem_key': ameriflux_mainstem_key, 'file_meta_data': file_meta_data_file}
+    if erroring_variable_flag.lower() in ['n', 'no']:
+        # erroring variables key is read only if the erroring variables are not renamed
+        input_files['erroring_variable_key'] = erroring_variable_key
+    config_values = {'pyfluxpro_input': pyfluxpro_input, 'l1_run_output': l1_run_output,
+                     'erroring_variable_flag': erroring_variable_flag,
+                     'site_soil_moisture_variables': site_soil_moisture_variables,
+                     'site_soil_temp_variables': site_soil_temp_variables,
+                     'full_output_variables': list(full_output_variables),
+                     'met_data_variables': list(met_data_variables),
+                     'met_data_sheet_name': met_data_sheet_name, 'full_output_sheet_name': full_output_sheet_name,
+                     'patch_mode': cfg.CONTROL_FILE_PATCH_MODE}
+    stage_cache = get_stage_cache(cfg)
     ameriflux_mapping = \
-        L1Format.data_formatting(pyfluxpro_input, l1_mainstem, l1_ameriflux_only, ameriflux_mainstem_key,
-                                 file_meta_data_file, l1_run_output, l1_ameriflux_output,
-                                 erroring_variable_flag, erroring_variable_key,
-                                 site_soil_moisture_variables, site_soil_temp_variables,
-                                 full_output_variables, met_data_variables,
-                                 met_data_sheet_name, full_output_sheet_name)
+        stage_cache.run('l1_control_file', L1Format.data_formatting, input_files, config_values, [l1_ameriflux_output],
+                        args=(pyfluxpro_input, l1_mainstem, l1_ameriflux_only, ameriflux_mainstem_key,
+                              file_meta_data_file, l1_run_output, l1_ameriflux_output,
+                              erroring_variable_flag, erroring_variable_key,
+                              site_soil_moisture_variables, site_soil_temp_variables,
+                              full_output_variables, met_data_variables,
+                              met_data_sheet_name, full_output_sheet_name),
+                        kwargs={'patch_mode': cfg.CONTROL_FILE_PATCH_MODE, 'key_cache_dir': cfg.KEY_CACHE_DIR})
     return ameriflux_mapping
 
 
 def pyfluxpro_l2_ameriflux_processing(ameriflux_mapping, l2_mainstem, l2_ameriflux_only,
-                                      l1_run_output, l2_run_output, l2_ameriflux_output):
+                                      l1_run_output, l2_run_output, l2_ameriflux_output, cfg):
     """
         Main function to run PyFluxPro L2 control file formatting for AmeriFlux. Calls other functions
 
@@ -305,15 +399,322 @@ def pyfluxpro_l2_ameriflux_processing(ameriflux_mapping, l2_mainstem, l2_amerifl
             l1_run_output (str): A file path for the output of L1 run. This typically has .nc extension
             l2_run_output (str): A file path for the output of L2 run. This typically has .nc extension
             l2_ameriflux_output (str): A file path for the generated L2.txt that is formatted for Ameriflux standards
+            cfg (obj): Config object with the settings of the run
         Returns:
             None
     """
-    is_success = L2Format.data_formatting(ameriflux_mapping, l2_mainstem, l2_ameriflux_only, l1_run_output,
-                                          l2_run_output, l2_ameriflux_output)
+    stage_cache = get_stage_cache(cfg)
+    is_success = \
+        stage_cache.run('l2_control_file', L2Format.data_formatting,
+                        {'l2_mainstem': l2_mainstem, 'l2_ameriflux_only': l2_ameriflux_only},
+                        {'ameriflux_mapping': ameriflux_mapping, 'l1_run_output': l1_run_output,
+                         'l2_run_output': l2_run_output, 'patch_mode': cfg.CONTROL_FILE_PATCH_MODE},
+                        [l2_ameriflux_output],
+                        args=(ameriflux_mapping, l2_mainstem, l2_ameriflux_only, l1_run_output, l2_run_output,
+                              l2_ameriflux_output),
+                        kwargs={'patch_mode': cfg.CONTROL_FILE_PATCH_MODE})
     return is_success
 
 
-def pre_processing(file_meta_data_file, erroring_variable_flag, run_flag):
+def sync_data(cfg, resume=False):
+    """
+    Function to sync the met and GHG data from the server
+    Args:
+        cfg (obj): Config object with the settings of the run
+        resume (bool): True to use the local data of the previous run without syncing
+    Returns :
+        (bool): True. Sync errors are logged and the local data is used
+    """
+    if resume:
+        log.info("Data sync skipped when resuming the previous run")
+        return True
+    syncdata.sync_data(cfg)
+    return True
+
+
+def read_keys(erroring_variable_flag, cfg):
+    """
+    Function to read the reference keys used for L1 control file, so that they are parsed while the data is synced
+    Args:
+        erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) are
+                                    renamed to Ameriflux labels. Y is renamed, N if not.
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (bool): True if Ameriflux-Mainstem key and Soils key are valid
+    """
+    # keys are kept by KeyCache for the stages using them
+    ameriflux_key = L1Format.get_ameriflux_key(cfg.L1_AMERIFLUX_MAINSTEM_KEY, cfg.KEY_CACHE_DIR)
+    soil_key = KeyCache.read_soils_key(cfg.INPUT_SOIL_KEY, cfg.KEY_CACHE_DIR)
+    L1Format.get_erroring_variable_key(erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY,
+                                       cfg.KEY_CACHE_DIR)
+    return ameriflux_key is not None and soil_key is not None
+
+
+def get_eddypro_output_files(cfg):
+    """
+    Function to list the files in EDDYPRO_OUTPUT_PATH
+    Args:
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (list): Sorted file paths of the EddyPro output
+    """
+    return sorted(os.path.join(cfg.EDDYPRO_OUTPUT_PATH, f) for f in os.listdir(cfg.EDDYPRO_OUTPUT_PATH)
+                  if os.path.isfile(os.path.join(cfg.EDDYPRO_OUTPUT_PATH, f)))
+
+
+def get_eddypro_run_inputs(eddypro_formatted_met_file, cfg):
+    """
+    Function to get the hashes of the inputs of the EddyPro run for its checkpoint.
+    GHG files are taken by their names, sizes and modification times, as they are too large to hash on each run.
+    Hidden files, like the sync manifest and partly downloaded files, are not inputs.
+    Args:
+        eddypro_formatted_met_file (str): File path for Met data file formatted for EddyPro
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (dict): Input name to hash. None if the stage cache is not used or an input file cannot be read
+    """
+    ghg_files = []
+    for root, _, files in os.walk(cfg.EDDYPRO_INPUT_GHG_PATH):
+        for file_name in files:
+            if file_name.startswith('.'):
+                continue
+            stat = os.stat(os.path.join(root, file_name))
+            ghg_files.append([os.path.relpath(os.path.join(root, file_name), cfg.EDDYPRO_INPUT_GHG_PATH),
+                              stat.st_size, stat.st_mtime_ns])
+    return get_stage_cache(cfg).get_input_hashes(
+        {'eddypro_biomet': eddypro_formatted_met_file, 'proj_file_template': cfg.EDDYPRO_PROJ_FILE_TEMPLATE,
+         'dyn_metadata': cfg.EDDYPRO_DYN_METADATA},
+        {'eddypro_bin_loc': cfg.EDDYPRO_BIN_LOC, 'proj_file_name': cfg.EDDYPRO_PROJ_FILE_NAME,
+         'project_id': cfg.EDDYPRO_PROJ_ID, 'project_title': cfg.EDDYPRO_PROJ_TITLE,
+         'file_prototype': cfg.EDDYPRO_FILE_PROTOTYPE, 'proj_file': cfg.EDDYPRO_PROJ_FILE,
+         'output_path': cfg.EDDYPRO_OUTPUT_PATH, 'ghg_files': sorted(ghg_files)})
+
+
+def eddypro_run_processing(cfg, resume=False):
+    """
+    Function to archive the previous EddyPro output and run EddyPro. A checkpoint with the hashes of the inputs and
+    the output files is saved after EddyPro is run. When resuming, EddyPro is not run if the checkpoint is valid.
+    The Met data file formatted for EddyPro is read from disk, as written by eddypro_preprocessing in this run or
+    in a previous run.
+    Args:
+        cfg (obj): Config object with the settings of the run
+        resume (bool): True to keep the EddyPro output of the previous run if its inputs and outputs are unchanged
+    Returns :
+        (bool): True if EddyPro is run, False if the formatted met data file does not exist
+    """
+    eddypro_formatted_met_file = data_util.create_eddypro_output_met_file_name(cfg.MASTER_MET)
+    # check if the eddypro_formatted_met_file exists
+    if not os.path.exists(eddypro_formatted_met_file):
+        # return failure
+        log.error("EddyPro Processing failed: " + eddypro_formatted_met_file + " does not exists.")
+        return False
+
+    stage_cache = get_stage_cache(cfg)
+    eddypro_run_inputs = get_eddypro_run_inputs(eddypro_formatted_met_file, cfg)
+    if resume:
+        # NOTES 28
+        if stage_cache.get_result('eddypro_run', eddypro_run_inputs, get_eddypro_output_files(cfg)) is not None:
+            log.info("EddyPro output of the previous run in %s is used", cfg.EDDYPRO_OUTPUT_PATH)
+            return True
+        log.warning("EddyPro checkpoint is missing or its inputs or outputs changed. Running EddyPro")
+
+    # archive old eddypro output path
+    outfile_list = os.listdir(cfg.EDDYPRO_OUTPUT_PATH)
+    if len(outfile_list) > 0:
+        # eddypro output dir not empty. move all files
+        source_dir = cfg.EDDYPRO_OUTPUT_PATH
+        # create a dir with timestamp name in the same path
+        dest_dir = os.path.dirname(
+            cfg.EDDYPRO_OUTPUT_PATH) + '_run_result_' + datetime.now().strftime('%Y-%m-%d_%H-%M')
+        os.makedirs(dest_dir)
+        for f in outfile_list:
+            # move each file
+            source = os.path.join(source_dir, f)
+            dest = os.path.join(dest_dir, f)
+            shutil.move(source, dest)
+
+    # run eddypro
+    run_eddypro(eddypro_formatted_met_file, cfg)
+    output_files = get_eddypro_output_files(cfg)
+    if any('full_output' in os.path.basename(f) for f in output_files):
+        stage_cache.save('eddypro_run', eddypro_run_inputs, output_files, True)
+    return True
+
+
+def pyfluxpro_input_processing(cfg):
+    """
+    Function to create the PyFluxPro input excel sheet from the EddyPro full output in EDDYPRO_OUTPUT_PATH
+    Args:
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (str): File path of the PyFluxPro input excel sheet. None if failed
+    """
+    stage_cache = get_stage_cache(cfg)
+    # grab eddypro full output
+    outfile_list = os.listdir(cfg.EDDYPRO_OUTPUT_PATH)
+    eddypro_full_outfile = None
+    is_pyfluxpro_processing_success = False
+    for outfile in outfile_list:
+        if 'full_output' in outfile:
+            eddypro_full_outfile = os.path.join(cfg.EDDYPRO_OUTPUT_PATH, outfile)
+            # filetype validation for eddypro_full_outfile
+            if not DataValidation.filetype_validation(eddypro_full_outfile, '.csv'):
+                log.error(".csv extension expected for file %s", eddypro_full_outfile)
+                # get the next full_output sheet if exists
+                continue
+            # run pyfluxpro formatting
+            is_pyfluxpro_processing_success = \
+                stage_cache.run('full_output_formatting', pyfluxpro_processing,
+                                {'eddypro_full_output': eddypro_full_outfile, 'master_met': cfg.MASTER_MET},
+                                {'data_dtype': cfg.DATA_DTYPE,
+                                 'overlap_timestamp_check': cfg.PYFLUXPRO_OVERLAP_TIMESTAMP,
+                                 'trim_timestamp': cfg.PYFLUXPRO_TRIM_TIMESTAMP},
+                                [cfg.FULL_OUTPUT_PYFLUXPRO, cfg.MET_DATA_30_PYFLUXPRO, cfg.PYFLUXPRO_INPUT_SHEET],
+                                args=(eddypro_full_outfile, cfg.FULL_OUTPUT_PYFLUXPRO, cfg.MASTER_MET,
+                                      cfg.MET_DATA_30_PYFLUXPRO, cfg))
+            if is_pyfluxpro_processing_success:
+                # pyfluxpro formatting is success, break out of loop.
+                break
+
+    # if eddypro full output file not present
+    if not eddypro_full_outfile:
+        log.error('-' * 10 + "EddyPro full output not present. Aborting" + '-' * 10)
+        # return failure
+        return None
+    if not is_pyfluxpro_processing_success:
+        log.error('-' * 10 + "PyFluxpro processing failed. Aborting" + '-' * 10)
+        return None
+    if not os.path.exists(cfg.PYFLUXPRO_INPUT_SHEET):
+        log.error('-' * 10 + "%s path does not exist. Aborting" + '-' * 10, cfg.PYFLUXPRO_INPUT_SHEET)
+        return None  # return failure
+    return cfg.PYFLUXPRO_INPUT_SHEET
+
+
+def ameriflux_formatting_processing(pyfluxpro_input_sheet, met_data_sheet_name, full_output_sheet_name, cfg):
+    """
+    Function to format the PyFluxPro input excel sheet for AmeriFlux. Formatting is skipped if the input sheet is
+    unchanged since the previous run, and the variable names are taken from the previous run.
+    Args:
+        pyfluxpro_input_sheet (str): PyFluxPro input excel sheet file path
+        met_data_sheet_name (str): Sheet name for met_data sheet
+        full_output_sheet_name (str): Sheet name for full output
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (dict): Lists of full_output and met_data variable names, the formatted sheets to be written
+                and the input hashes of the stage. None if failed
+    """
+    stage_cache = get_stage_cache(cfg)
+    input_hashes = stage_cache.get_input_hashes(
+        {'pyfluxpro_input': pyfluxpro_input_sheet},
+        {'data_dtype': cfg.DATA_DTYPE, 'met_data_sheet_name': met_data_sheet_name,
+         'full_output_sheet_name': full_output_sheet_name})
+    formatting = {'variables': stage_cache.get_result('ameriflux_workbook', input_hashes,
+                                                      [cfg.PYFLUXPRO_INPUT_AMERIFLUX]),
+                  'full_output': None, 'met_data': None, 'inputs': input_hashes}
+    if formatting['variables'] is None:
+        formatting['full_output'], formatting['met_data'] = \
+            pyfluxpro_ameriflux_formatting(pyfluxpro_input_sheet, met_data_sheet_name, full_output_sheet_name, cfg)
+        if formatting['full_output'] is None or formatting['met_data'] is None:
+            log.error('-' * 10 + "PyFluxpro input sheet formatting for Ameriflux failed. Aborting" + '-' * 10)
+            return None  # return failure
+        formatting['variables'] = list(formatting['full_output'].columns), list(formatting['met_data'].columns)
+    return formatting
+
+
+def write_ameriflux_workbook(formatting, met_data_sheet_name, full_output_sheet_name, output_file, cfg):
+    """
+    Function to write the PyFluxPro input excel sheet formatted for AmeriFlux, if it is formatted in this run
+    Args:
+        formatting (dict): Result of ameriflux_formatting_processing
+        met_data_sheet_name (str): Sheet name for met_data sheet
+        full_output_sheet_name (str): Sheet name for full output
+        output_file (str): Filename to write the PyFluxPro formatted for AmeriFlux
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        (bool): True if the excel sheet is written or is unchanged
+    """
+    if formatting['full_output'] is None:
+        return True
+    write_pyfluxpro_ameriflux(formatting['full_output'], formatting['met_data'], met_data_sheet_name,
+                              full_output_sheet_name, output_file)
+    get_stage_cache(cfg).save('ameriflux_workbook', formatting['inputs'], [output_file], formatting['variables'])
+    return True
+
+
+def l1_control_file_processing(eddypro_biomet, formatting, file_meta_data_file, erroring_variable_flag,
+                               met_data_sheet_name, full_output_sheet_name, cfg):
+    """
+    Function to create the L1 control file with the soil variables from EddyPro biomet stage and the variable names
+    from Ameriflux formatting stage
+    Args:
+        eddypro_biomet (tuple): Result of eddypro_preprocessing
+        formatting (dict): Result of ameriflux_formatting_processing
+        file_meta_data_file (str) : File containing the meta data, typically the first line of Met data
+        erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) are
+                                    renamed to Ameriflux labels. Y is renamed, N if not.
+        met_data_sheet_name (str): Sheet name for met_data sheet
+        full_output_sheet_name (str): Sheet name for full output
+        cfg (obj): Config object with the settings of the run
+    Returns :
+        ameriflux_mapping (dict): Mapping of variable names to Ameriflux-friendly labels in L1_Ameriflux.txt
+    """
+    _, site_soil_moisture_variables, site_soil_temp_variables = eddypro_biomet
+    full_output_variables, met_data_variables = formatting['variables']
+    return pyfluxpro_l1_ameriflux_processing(cfg.PYFLUXPRO_INPUT_AMERIFLUX, cfg.L1_MAINSTEM_INPUT,
+                                             cfg.L1_AMERIFLUX_ONLY_INPUT, cfg.L1_AMERIFLUX_MAINSTEM_KEY,
+                                             file_meta_data_file, cfg.L1_AMERIFLUX_RUN_OUTPUT, cfg.L1_AMERIFLUX,
+                                             erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY,
+                                             site_soil_moisture_variables, site_soil_temp_variables,
+                                             full_output_variables, met_data_variables,
+                                             met_data_sheet_name, full_output_sheet_name, cfg)
+
+
+def get_stage_scheduler(file_meta_data_file, erroring_variable_flag, cfg, resume=False):
+    """
+    Function to declare the stages of pre-pyfluxpro process. Each stage declares the stages whose results it uses
+    and the stages writing the files it reads.
+    Args:
+        file_meta_data_file (str): Filepath to write the meta data, typically the first line of Met data
+        erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
+                                    been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
+        cfg (obj): Config object with the settings of the run
+        resume (bool): True to resume the previous run. Data is not synced and EddyPro is not run again if its
+                       checkpoint is valid
+    Returns :
+        (obj): StageScheduler object
+    """
+    full_output_sheet_name = os.path.splitext(os.path.basename(cfg.FULL_OUTPUT_PYFLUXPRO))[0]
+    met_data_sheet_name = os.path.splitext(os.path.basename(cfg.MET_DATA_30_PYFLUXPRO))[0]
+    status_file = os.path.join(cfg.STAGE_CACHE_DIR, STAGE_STATUS_FILE) if cfg.STAGE_CACHE_DIR else None
+
+    scheduler = StageScheduler(status_file=status_file)
+    # keys are parsed while the data is synced
+    scheduler.add_stage('sync_data', sync_data, args=(cfg, resume))
+    scheduler.add_stage('read_keys', read_keys, args=(erroring_variable_flag, cfg))
+    scheduler.add_stage('eddypro_biomet', eddypro_preprocessing, args=(file_meta_data_file, cfg),
+                        after=['sync_data'])
+    # the master met formatted for EddyPro on disk is used if EddyPro biomet is not run
+    scheduler.add_stage('eddypro_run', eddypro_run_processing, args=(cfg, resume), after=['eddypro_biomet'])
+    # the EddyPro full output and master met data on disk are used if EddyPro is not run
+    scheduler.add_stage('pyfluxpro_input', pyfluxpro_input_processing, args=(cfg,),
+                        after=['eddypro_biomet', 'eddypro_run'])
+    scheduler.add_stage('ameriflux_formatting', ameriflux_formatting_processing, depends_on=['pyfluxpro_input'],
+                        args=(met_data_sheet_name, full_output_sheet_name, cfg))
+    # L1 needs only the variable names, so the control files are formatted while the excel sheet is written.
+    # L2 starts when the L1 variable name mapping is ready
+    scheduler.add_stage('pyfluxpro_ameriflux_input', write_ameriflux_workbook, depends_on=['ameriflux_formatting'],
+                        args=(met_data_sheet_name, full_output_sheet_name, cfg.PYFLUXPRO_INPUT_AMERIFLUX, cfg))
+    scheduler.add_stage('l1_control_file', l1_control_file_processing,
+                        depends_on=['eddypro_biomet', 'ameriflux_formatting'],
+                        args=(file_meta_data_file, erroring_variable_flag, met_data_sheet_name,
+                              full_output_sheet_name, cfg), after=['read_keys'])
+    scheduler.add_stage('l2_control_file', pyfluxpro_l2_ameriflux_processing, depends_on=['l1_control_file'],
+                        args=(cfg.L2_MAINSTEM_INPUT, cfg.L2_AMERIFLUX_ONLY_INPUT, cfg.L1_AMERIFLUX_RUN_OUTPUT,
+                              cfg.L2_AMERIFLUX_RUN_OUTPUT, cfg.L2_AMERIFLUX, cfg))
+    return scheduler
+
+
+def pre_processing(file_meta_data_file, erroring_variable_flag, cfg, targets=None, resume=False):
     """
        Function to run Master met, EddyPro and PyFluxPro file formatting for AmeriFlux. Calls other functions
 
@@ -321,159 +722,51 @@ def pre_processing(file_meta_data_file, erroring_variable_flag, run_flag):
            file_meta_data_file (str): Filepath to write the meta data, typically the first line of Met data
            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
                                        been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
-           run_flag (int): Number that indicates the process.
-                        1: Run whole process,
-                        2: Run eddypro pre processing,
-                        3: Run EddyPro
-                        4: Run pyfluxpro input file processing
+           cfg (obj): Config object with the settings of the run
+           targets (list): Names of the target stages. The stages they need are run too. All stages if None.
+                        EDDYPRO_PREPROCESSING_TARGETS: Run eddypro pre processing,
+                        EDDYPRO_RUN_TARGETS: Run EddyPro
+                        PYFLUXPRO_TARGETS: Run pyfluxpro input file processing
+           resume (bool): True to resume the previous run from its checkpoints
 
        Returns:
            (bool): True if method runs successfully, False if not
     """
-    # sync data from the server
-    if run_flag == 1:
-        syncdata.sync_data()
-
-    # run eddypro preprocessing and formatting
-    if run_flag == 1 or run_flag == 2:
-        eddypro_formatted_met_file, site_soil_moisture_variables, site_soil_temp_variables = \
-            eddypro_preprocessing(file_meta_data_file)
-
-        if not os.path.exists(eddypro_formatted_met_file):
-            # return failure
-            log.error("EddyPro Processing failed: " + eddypro_formatted_met_file + " does not exists.")
-            return False
-
-    if run_flag == 1 or run_flag == 3:
-        # check if edddypro_formatted_met_file variable got defined
-        try:
-            eddypro_formatted_met_file
-        except (NameError, UnboundLocalError) as e:
-            eddypro_formatted_met_file = None
-
-        if eddypro_formatted_met_file is None:
-            eddypro_formatted_met_file = data_util.create_eddypro_output_met_file_name(cfg.MASTER_MET)
-
-        # check if the eddypro_formatted_met_file exists
-        if not os.path.exists(eddypro_formatted_met_file):
-            # return failure
-            log.error("EddyPro Processing failed: " + eddypro_formatted_met_file + " does not exists.")
-            return False
-
-        # archive old eddypro output path
-        outfile_list = os.listdir(cfg.EDDYPRO_OUTPUT_PATH)
-        if len(outfile_list) > 0:
-            # eddypro output dir not empty. move all files
-            source_dir = cfg.EDDYPRO_OUTPUT_PATH
-            # create a dir with timestamp name in the same path
-            dest_dir = os.path.dirname(
-                cfg.EDDYPRO_OUTPUT_PATH) + '_run_result_' + datetime.now().strftime('%Y-%m-%d_%H-%M')
-            os.makedirs(dest_dir)
-            for f in outfile_list:
-                # move each file
-                source = os.path.join(source_dir, f)
-                dest = os.path.join(dest_dir, f)
-                shutil.move(source, dest)
-
-        # run eddypro
-        run_eddypro(eddypro_formatted_met_file)
-
-    if run_flag == 1 or run_flag == 4:
-        try:
-            eddypro_formatted_met_file
-            site_soil_moisture_variables
-            site_soil_temp_variables
-        except (NameError, UnboundLocalError) as e:
-            eddypro_formatted_met_file, site_soil_moisture_variables, site_soil_temp_variables = \
-                eddypro_preprocessing(file_meta_data_file)
-
-        # grab eddypro full output
-        outfile_list = os.listdir(cfg.EDDYPRO_OUTPUT_PATH)
-        eddypro_full_outfile = None
-        is_pyfluxpro_processing_success = False
-        for outfile in outfile_list:
-            if 'full_output' in outfile:
-                eddypro_full_outfile = os.path.join(cfg.EDDYPRO_OUTPUT_PATH, outfile)
-                # filetype validation for eddypro_full_outfile
-                if not DataValidation.filetype_validation(eddypro_full_outfile, '.csv'):
-                    log.error(".csv extension expected for file %s", eddypro_full_outfile)
-                    # get the next full_output sheet if exists
-                    continue
-                # run pyfluxpro formatting
-                is_pyfluxpro_processing_success = pyfluxpro_processing(eddypro_full_outfile, cfg.FULL_OUTPUT_PYFLUXPRO,
-                                                                       cfg.MASTER_MET, cfg.MET_DATA_30_PYFLUXPRO)
-                if is_pyfluxpro_processing_success:
-                    # pyfluxpro formatting is success, break out of loop.
-                    break
-
-        # if eddypro full output file not present
-        if not eddypro_full_outfile:
-            log.error('-' * 10 + "EddyPro full output not present. Aborting" + '-' * 10)
-            # return failure
-            return False
-        if not is_pyfluxpro_processing_success:
-            log.error('-' * 10 + "PyFluxpro processing failed. Aborting" + '-' * 10)
-            return False
-
-        # run ameriflux formatting of pyfluxpro input
-        full_output_sheet_name = os.path.splitext(os.path.basename(cfg.FULL_OUTPUT_PYFLUXPRO))[0]
-        met_data_sheet_name = os.path.splitext(os.path.basename(cfg.MET_DATA_30_PYFLUXPRO))[0]
-        full_output_variables, met_data_variables = [], []  # get list of fulloutput and metdata variable names
-        if os.path.exists(cfg.PYFLUXPRO_INPUT_SHEET):
-            full_output_variables, met_data_variables = \
-                pyfluxpro_ameriflux_processing(cfg.PYFLUXPRO_INPUT_SHEET, met_data_sheet_name,
-                                               full_output_sheet_name, cfg.PYFLUXPRO_INPUT_AMERIFLUX)
-            if len(full_output_variables) == 0 and len(met_data_variables) == 0:
-                log.error('-' * 10 + "PyFluxpro input sheet formatting for Ameriflux failed. Aborting" + '-' * 10)
-                return False  # return failure
-        else:
-            log.error('-' * 10 + "%s path does not exist. Aborting" + '-' * 10, cfg.PYFLUXPRO_INPUT_SHEET)
-            return False  # return failure
-
-        # run ameriflux formatting of pyfluxpro L1 control file
-        ameriflux_mapping = \
-            pyfluxpro_l1_ameriflux_processing(cfg.PYFLUXPRO_INPUT_AMERIFLUX, cfg.L1_MAINSTEM_INPUT,
-                                              cfg.L1_AMERIFLUX_ONLY_INPUT, cfg.L1_AMERIFLUX_MAINSTEM_KEY,
-                                              file_meta_data_file, cfg.L1_AMERIFLUX_RUN_OUTPUT, cfg.L1_AMERIFLUX,
-                                              erroring_variable_flag, cfg.L1_AMERIFLUX_ERRORING_VARIABLES_KEY,
-                                              site_soil_moisture_variables, site_soil_temp_variables,
-                                              full_output_variables, met_data_variables,
-                                              met_data_sheet_name, full_output_sheet_name)
-        if ameriflux_mapping is None:
-            log.error('-' * 10 + "PyFluxPro L1 processing failed. Aborting" + '-' * 10)
-            return False  # return failure
-
-        # run ameriflux formatting of pyfluxpro L2 control file
-        is_success = pyfluxpro_l2_ameriflux_processing(ameriflux_mapping, cfg.L2_MAINSTEM_INPUT,
-                                                       cfg.L2_AMERIFLUX_ONLY_INPUT, cfg.L1_AMERIFLUX_RUN_OUTPUT,
-                                                       cfg.L2_AMERIFLUX_RUN_OUTPUT, cfg.L2_AMERIFLUX)
-        if is_success:
-            log.info("Run PyFluxPro V3.3.2 with the generated L1 and L2 control files")
-            log.info("Generated control files in %s %s", cfg.L1_AMERIFLUX, cfg.L2_AMERIFLUX)
-            return True  # all processing done return success
-        else:
-            log.error('-' * 10 + "PyFluxPro L2 processing failed. Aborting" + '-' * 10)
-            return False  # return failure
-
+    scheduler = get_stage_scheduler(file_meta_data_file, erroring_variable_flag, cfg, resume)
+    results = scheduler.run(targets)
+    if not scheduler.is_success(results):
+        log.error('-' * 10 + "Pre-pyfluxpro stages %s failed or skipped. Aborting" + '-' * 10,
+                  [name for name, result in results.items() if StageScheduler.is_failed(result)])
+        return False  # return failure
+    if 'l2_control_file' in results:
+        log.info("Run PyFluxPro V3.3.2 with the generated L1 and L2 control files")
+        log.info("Generated control files in %s %s", cfg.L1_AMERIFLUX, cfg.L2_AMERIFLUX)
     # all runs are successful
     return True
 
 
-def run(run_flag=1):
+def run(targets=None, cfg=None, resume=False):
     """
     Main function to run. Calls other function
     Args :
-        run_flag (int): Number that indicates the modules to run".
-                        1: Run whole process,
-                        2: Run eddypro pre processing,
-                        3: Run EddyPro
-                        4: Run pyfluxpro input file processing
+        targets (list): Names of the target stages to run. The stages they need are run too. All stages if None.
+                        EDDYPRO_PREPROCESSING_TARGETS: Run eddypro pre processing,
+                        EDDYPRO_RUN_TARGETS: Run EddyPro
+                        PYFLUXPRO_TARGETS: Run pyfluxpro input file processing
+        cfg (obj): Config object with the settings of the run. The settings read from the environment if None
+        resume (bool): True to resume the previous run. Data is not synced, and EddyPro and the stages with unchanged
+                       inputs are not run again. Needs STAGE_CACHE_DIR
 
     Returns :
         (bool): True if success, False if failure
     """
+    if cfg is None:
+        cfg = Config()
+    if resume and not cfg.STAGE_CACHE_DIR:
+        log.error('-' * 10 + "STAGE_CACHE_DIR is to be set to resume the previous run. Aborting" + '-' * 10)
+        return False
     # Main function
-    is_valid_config = input_validation()
+    is_valid_config = input_validation(cfg)
     if not is_valid_config:
         log.error('-' * 10 + "Check .env file and fix configurations. Aborting" + '-' * 10)
         return False
@@ -501,7 +794,7 @@ def run(run_flag=1):
     start = time.time()
     log.info("Pre-processing of PyFluxPro run output has been started")
 
-    is_success = pre_processing(file_meta_data_file, erroring_variable_flag, run_flag)
+    is_success = pre_processing(file_meta_data_file, erroring_variable_flag, cfg, targets, resume)
     if is_success:
         log.info("Successfully completed pre-processing of PyFluxPro L1 and L2")
     else:
@@ -519,5 +812,12 @@ def run(run_flag=1):
 if __name__ == '__main__':
     log.info('-' * 50)
     log.info("############# Process Started #############")
+    # get arguments
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--target", action="append", default=None, dest="targets",
+                        help="Stage to run along with the stages it needs. Can be repeated. Default is all stages")
+    parser.add_argument("--resume", action="store_true",
+                        help="Resume the previous run without syncing data or running EddyPro again")
+    args = parser.parse_args()
     # Call main function
-    run()
+    run(args.targets, resume=args.resume)
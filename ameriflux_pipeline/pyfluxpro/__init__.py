@@ -8,4 +8,7 @@ from pyfluxpro.pyfluxproformat import PyFluxProFormat
 from pyfluxpro.amerifluxformat import AmeriFluxFormat
 from pyfluxpro.l1format import L1Format
 from pyfluxpro.l2format import L2Format
+from pyfluxpro.controlfilebatch import ControlFileBatch
+from pyfluxpro.netcdfreader import NetCDFReader
 from pyfluxpro.outputformat import OutputFormat
+from pyfluxpro.timestampalignment import TimestampAlignment
@@ -6,10 +6,11 @@
 
 import pandas as pd
 import numpy as np
-from datetime import timedelta
 import re
 import logging
 
+from utils.unitframe import UnitFrame
+
 # create log object with current module name
 log = logging.getLogger(__name__)
 
@@ -21,7 +22,7 @@ class AmeriFluxFormat:
 
     # main method which calls other functions
     @staticmethod
-    def data_formatting(input_file, full_output_sheet_name, met_data_sheet_name):
+    def data_formatting(input_file, full_output_sheet_name, met_data_sheet_name, data_dtype='float64'):
         """
         Method to implement data formatting for PyFluxPro input excel sheet. Calls other methods.
 
@@ -29,88 +30,36 @@ class AmeriFluxFormat:
             input_file (str): A file path for the input data. This is the PyFluxPro input excel sheet
             full_output_sheet_name (str): full_output sheet name
             met_data_sheet_name (str): Met_data_30 sheet name
+            data_dtype (str): Numeric storage type of the data. float64 or float32
         Returns:
-            obj: Pandas DataFrame object.
+            full_output (obj): UnitFrame object. Formatted full_output sheet
+            met_data (obj): UnitFrame object. Formatted Met_data_30 sheet
         """
-
-        full_output_df = pd.read_excel(input_file, sheet_name=full_output_sheet_name)
-        met_df = pd.read_excel(input_file, sheet_name=met_data_sheet_name)
-
-        # get column names and its units
-        full_output_df_meta = AmeriFluxFormat.get_meta_data(full_output_df)
-        met_df_meta = AmeriFluxFormat.get_meta_data(met_df)
-
-        # remove meta data from dataframe
-        full_output_df = full_output_df.iloc[1:, :]
-        met_df = met_df.iloc[1:, :]
-        full_output_df.reset_index(drop=True, inplace=True)  # reset index after dropping rows
-        met_df.reset_index(drop=True, inplace=True)  # reset index after dropping rows
-
-        # convert -9999 and empty cells to NaN. To make numerical conversions easier.
-        full_output_df = AmeriFluxFormat.replace_empty(full_output_df)
-        met_df = AmeriFluxFormat.replace_empty(met_df)
+        # read data with units. 'NAN' and empty cells are read as NaN
+        full_output = UnitFrame.read_excel(input_file, full_output_sheet_name, data_dtype)
+        met_data = UnitFrame.read_excel(input_file, met_data_sheet_name, data_dtype)
 
         # step 3,4,5,6,7 in guide
-        full_output_df, full_output_df_meta, met_df, met_df_meta = AmeriFluxFormat.\
-            var_unit_changes(full_output_df, full_output_df_meta, met_df, met_df_meta)
-
-        # Step 1 of guide. convert NaNs back
-        full_output_df.replace(np.nan, 'NAN', inplace=True)
-        met_df.replace(np.nan, 'NAN', inplace=True)
-
-        # concat the meta df and df if number of columns is the same
-        if full_output_df_meta.shape[1] == full_output_df.shape[1]:
-            full_output_df = pd.concat([full_output_df_meta, full_output_df], ignore_index=True)
-        else:
-            log.error("Number of columns in Full_output meta data {} not the same as number of columns in data {}".
-                      format(full_output_df_meta.shape[1], full_output_df.shape[1]))
-            full_output_df = None
-        if met_df_meta.shape[1] == met_df.shape[1]:
-            met_df = pd.concat([met_df_meta, met_df], ignore_index=True)
-        else:
-            log.error("Number of columns in Met_data_30 meta data {} not the same as number of columns in data {}".
-                      format(met_df_meta.shape[1], met_df.shape[1]))
-            met_df = None
+        full_output, met_data = AmeriFluxFormat.var_unit_changes(full_output, met_data)
 
-        return full_output_df, met_df
-
-    @staticmethod
-    # get the units column as a meta df
-    def get_meta_data(df):
-        df_meta = df.head(1)
-        return df_meta
-
-    @staticmethod
-    def replace_empty(df):
-        """
-        Function to replace empty and NaN cells
-
-        Args:
-            df (object): Pandas DataFrame object
-        Returns :
-            obj: Pandas DataFrame object
-        """
-        df = df.replace('', np.nan)  # replace empty cells with 'NAN'
-        df = df.replace('NAN', np.nan)
-        return df
+        # Step 1 of guide. NaNs are written as 'NAN' while writing the data
+        return full_output, met_data
 
     @staticmethod
-    def var_unit_changes(full_output_df, full_output_df_meta, met_df, met_df_meta):
+    def var_unit_changes(full_output, met_data):
         """
         Function to change units of selected variables from full_output and met_data_30
 
         Args:
-            full_output_df (object): Full output of EddyPro dataframe. full_output sheet in pyfluxpro input
-            full_output_df_meta (object): Meta data of full output. Contains col names and units
-            met_df (object): Met_data_30 sheet of pyfluxpro
-            met_df_meta (object): Meta data of met data. Contains col names and units
+            full_output (object): Full output of EddyPro. full_output sheet in pyfluxpro input
+            met_data (object): Met_data_30 sheet of pyfluxpro
         Returns :
-            (obj): full_output_df processed Pandas DataFrame object
-            (obj): full_output_df_meta processed Pandas DataFrame object
-            (obj): met_df processed Pandas DataFrame object
-            (obj): met_df_meta processed Pandas DataFrame object
+            (obj): full_output processed UnitFrame object
+            (obj): met_data processed UnitFrame object
 
         """
+        full_output_df = full_output.data
+        met_df = met_data.data
         # convert columns given in AmeriFlux mainstem keys
         # get Albedo column and convert to ALB
         try:
@@ -119,43 +68,40 @@ class AmeriFluxFormat:
             log.warning("Albedo column not present")
             albedo_col = None
         if albedo_col:
-            met_df = met_df.astype({albedo_col: float})
+            albedo = pd.to_numeric(met_df[albedo_col], errors='coerce')
             # NOTES 23
-            met_df['ALB'] = met_df[albedo_col].apply(lambda x: float(x)*100 if (0 <= float(x) <= 1) else np.nan)
-            met_df_meta['ALB'] = '%'
+            met_data.add_column('ALB', albedo.where((albedo >= 0) & (albedo <= 1)) * 100, '%')
         vpd_col = full_output_df.filter(regex=re.compile('^vpd', re.IGNORECASE)).columns.to_list()
         if vpd_col:
-            full_output_df['VPD'] = full_output_df[vpd_col[0]] / 100
-            full_output_df_meta['VPD'].iloc[0] = '[hPa]'
+            full_output.add_column('VPD', full_output_df[vpd_col[0]] / 100, '[hPa]')
         else:
             log.warning("VPD column not present in full_output")
         tau_col = full_output_df.filter(regex=re.compile('^tau', re.IGNORECASE)).columns.to_list()
         if tau_col:
-            full_output_df['Tau'] = full_output_df[tau_col[0]] * -1.0
-            full_output_df_meta['Tau'].iloc[0] = '[kg+1m-1s-2]'
+            full_output.add_column('Tau', full_output_df[tau_col[0]] * -1.0, '[kg+1m-1s-2]')
         else:
             log.warning("Tau column not present in full_output")
         # convert soil moisture variables into percentage values
         soil_moisture_col = [col for col in met_df if col.lower().startswith('moisture')]
         soil_moisture_col.extend(col for col in met_df if col.startswith('VWC'))
         for col in soil_moisture_col:
-            met_df[col] = met_df[col] * 100
-            met_df_meta[col].iloc[0] = '%'
+            met_data.add_column(col, met_df[col] * 100, '%')
 
         # convert variances to std deviations in full_output
         variance_vars = [col for col in full_output_df if col.lower().endswith('_var')]
         for col in variance_vars:
             col_sd = col.split('_')[0] + '_sd'
-            full_output_df[col] = pd.to_numeric(full_output_df[col], errors='coerce')  # convert column to numeric
+            variance = pd.to_numeric(full_output_df[col], errors='coerce')  # convert column to numeric
             # convert negative values to nan to prevent errors while calculating std deviation
-            full_output_df[col] = full_output_df[col].apply(lambda x: np.nan if x < 0 else x)
+            variance = variance.where(~(variance < 0))
+            full_output_df[col] = variance
             # convert to sqrt
-            full_output_df[col_sd] = np.sqrt(full_output_df[col])
-            if full_output_df_meta[col].iloc[0] == '[m+2s-2]':
-                full_output_df_meta[col_sd] = '[m+1s-1]'
-            elif full_output_df_meta[col].iloc[0] == '[K+2]':
-                full_output_df_meta[col_sd] = '[K]'
+            if full_output.get_unit(col) == '[m+2s-2]':
+                col_sd_unit = '[m+1s-1]'
+            elif full_output.get_unit(col) == '[K+2]':
+                col_sd_unit = '[K]'
             else:
-                full_output_df_meta[col_sd] = ''
+                col_sd_unit = ''
+            full_output.add_column(col_sd, np.sqrt(variance), col_sd_unit)
 
-        return full_output_df, full_output_df_meta, met_df, met_df_meta
+        return full_output, met_data
@@ -0,0 +1,250 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+import utils.data_util as data_util
+from utils.keycache import KeyCache
+from eddypro.eddyproformat import EddyProFormat
+from pyfluxpro.l1format import L1Format
+from pyfluxpro.l2format import L2Format
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class ControlFileBatch:
+    """
+    Class to generate PyFluxPro L1 and L2 control files for many sites and years.
+    The input control files and keys are read once and shared by a pool of worker processes.
+    """
+    # columns required in the manifest
+    MANIFEST_COLUMNS = ['site', 'year', 'pyfluxpro_input', 'output_dir']
+    # inputs read once and shared with the workers
+    _shared = None
+
+    @staticmethod
+    def read_manifest(manifest_file):
+        """
+        Read the batch manifest. Each row is a site and year with the PyFluxPro input excel sheet formatted for
+        Ameriflux and the directory to write the control files.
+        Optional columns soil_key, met_data_sheet_name and full_output_sheet_name override the defaults for the row.
+
+        Args:
+            manifest_file (str): A file path for the manifest csv file
+        Returns:
+            (list): List of dictionaries, one for each row. None if the manifest is not valid
+        """
+        try:
+            manifest = pd.read_csv(manifest_file, dtype=str, keep_default_na=False)
+        except (OSError, pd.errors.ParserError, pd.errors.EmptyDataError) as e:
+            log.error("Cannot read manifest %s: %s", manifest_file, e)
+            return None
+        manifest.columns = manifest.columns.str.strip().str.lower()
+        missing_cols = [col for col in ControlFileBatch.MANIFEST_COLUMNS if col not in manifest.columns]
+        if missing_cols:
+            log.error("Columns %s not present in manifest %s", missing_cols, manifest_file)
+            return None
+        return [{key: value.strip() for key, value in row.items()} for row in manifest.to_dict('records')]
+
+    @staticmethod
+    def get_job(row, soil_key, met_data_sheet_name, full_output_sheet_name):
+        """
+        Get the inputs and output file paths for a row of the manifest
+
+        Args:
+            row (dict): Row of the manifest
+            soil_key (str): Default file path for Soils key
+            met_data_sheet_name (str): Default sheet name for met_data sheet
+            full_output_sheet_name (str): Default sheet name for full output
+        Returns:
+            (dict): Inputs and outputs of the job
+        """
+        prefix = "{}_{}".format(row['site'], row['year'])
+        output_dir = row['output_dir']
+        return {'site': row['site'],
+                'year': row['year'],
+                'pyfluxpro_input': row['pyfluxpro_input'],
+                'soil_key': row.get('soil_key') or soil_key,
+                'met_data_sheet_name': row.get('met_data_sheet_name') or met_data_sheet_name,
+                'full_output_sheet_name': row.get('full_output_sheet_name') or full_output_sheet_name,
+                'l1_run_output': os.path.join(output_dir, prefix + '_L1.nc'),
+                'l1_ameriflux_output': os.path.join(output_dir, prefix + '_L1.txt'),
+                'l2_run_output': os.path.join(output_dir, prefix + '_L2.nc'),
+                'l2_ameriflux_output': os.path.join(output_dir, prefix + '_L2.txt')}
+
+    @staticmethod
+    def read_shared_inputs(jobs, l1_mainstem, l1_ameriflux_only, l2_mainstem, l2_ameriflux_only,
+                           ameriflux_mainstem_key, erroring_variable_flag, erroring_variable_key,
+                           met_data_sheet_name, full_output_sheet_name, key_cache_dir):
+        """
+        Read the input control files and keys used by all jobs
+
+        Args:
+            jobs (list): List of jobs from get_job
+            l1_mainstem (str): A file path for the input L1.txt. This is the PyFluxPro original/mainstem L1 control file
+            l1_ameriflux_only (str): A file path for the L1.txt that contains only Ameriflux-friendly variables
+            l2_mainstem (str): A file path for the input L2.txt. This is the PyFluxPro original/mainstem L2 control file
+            l2_ameriflux_only (str): A file path for the L2.txt that contains only Ameriflux-friendly variables
+            ameriflux_mainstem_key (str): A file path for Ameriflux-Mainstem-Key.xlsx
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) are
+                                        renamed to Ameriflux labels in L1. Y is renamed, N if not.
+            erroring_variable_key (str): A file path for L1_erroring_variables.xlsx
+            met_data_sheet_name (str): Default sheet name for met_data sheet, used to validate L1 input
+            full_output_sheet_name (str): Default sheet name for full output, used to validate L1 input
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (dict): Parsed control files and keys. None if any of them is not valid
+        """
+        shared = {'l1_mainstem_file': L1Format.read_template(l1_mainstem, met_data_sheet_name,
+                                                             full_output_sheet_name),
+                  'l1_ameriflux_file': L1Format.read_template(l1_ameriflux_only, met_data_sheet_name,
+                                                              full_output_sheet_name),
+                  'l2_mainstem_file': L2Format.read_template(l2_mainstem),
+                  'l2_ameriflux_file': L2Format.read_template(l2_ameriflux_only),
+                  'ameriflux_key': L1Format.get_ameriflux_key(ameriflux_mainstem_key, key_cache_dir)}
+        if any(value is None for value in shared.values()) or shared['ameriflux_key'].empty:
+            return None
+        shared['erroring_variable_key'] = L1Format.get_erroring_variable_key(erroring_variable_flag,
+                                                                             erroring_variable_key, key_cache_dir)
+        # soils keys used by the jobs
+        shared['soil_keys'] = {}
+        for soil_key in {job['soil_key'] for job in jobs}:
+            df_soil_key = KeyCache.read_soils_key(soil_key, key_cache_dir)
+            if df_soil_key is None:
+                log.error("%s file invalid format. Aborting", soil_key)
+                return None
+            shared['soil_keys'][soil_key] = df_soil_key
+        return shared
+
+    @staticmethod
+    def init_worker(shared):
+        """
+        Set the inputs shared by all jobs in the worker process
+
+        Args:
+            shared (dict): Parsed control files and keys from read_shared_inputs
+        Returns:
+            None
+        """
+        ControlFileBatch._shared = shared
+
+    @staticmethod
+    def get_sheet_variables(pyfluxpro_input, met_data_sheet_name, full_output_sheet_name):
+        """
+        Read the variable names in full output and met data sheets of PyFluxPro input excel sheet
+
+        Args:
+            pyfluxpro_input (str): A file path for the PyFluxPro input excel sheet formatted for Ameriflux
+            met_data_sheet_name (str): Sheet name for met_data sheet
+            full_output_sheet_name (str): Sheet name for full output
+        Returns:
+            full_output_variables (list): List of full_output variable names. Empty if sheet is not read
+            met_data_variables (list): List of met_data variable names. Empty if sheet is not read
+        """
+        try:
+            # only the header row is read
+            sheets = pd.read_excel(pyfluxpro_input, sheet_name=[full_output_sheet_name, met_data_sheet_name],
+                                   nrows=0)
+        except (OSError, ValueError) as e:
+            log.error("Cannot read sheets of %s: %s", pyfluxpro_input, e)
+            return [], []
+        return sheets[full_output_sheet_name].columns.to_list(), sheets[met_data_sheet_name].columns.to_list()
+
+    @staticmethod
+    def run_job(job):
+        """
+        Write L1 and L2 control files for a site and year
+
+        Args:
+            job (dict): Inputs and outputs of the job from get_job
+        Returns:
+            (dict): The job with success set to True if both control files are written, else False
+        """
+        shared = ControlFileBatch._shared
+        job = dict(job, success=False)
+        log.info("Writing control files for %s %s", job['site'], job['year'])
+        full_output_variables, met_data_variables = \
+            ControlFileBatch.get_sheet_variables(job['pyfluxpro_input'], job['met_data_sheet_name'],
+                                                 job['full_output_sheet_name'])
+        if len(full_output_variables) == 0 and len(met_data_variables) == 0:
+            return job
+        if not data_util.get_directory(job['l1_ameriflux_output']):
+            log.error("Output directory not given for %s %s", job['site'], job['year'])
+            return job
+        os.makedirs(data_util.get_directory(job['l1_ameriflux_output']), exist_ok=True)
+
+        site_soil_moisture_variables, site_soil_temp_variables = \
+            EddyProFormat.get_soil_keys(shared['soil_keys'][job['soil_key']], job['site'])
+        ameriflux_mapping = \
+            L1Format.write_control_file(shared['l1_mainstem_file'], shared['l1_ameriflux_file'],
+                                        shared['ameriflux_key'], shared['erroring_variable_key'], job['site'],
+                                        job['pyfluxpro_input'], job['l1_run_output'], job['l1_ameriflux_output'],
+                                        site_soil_moisture_variables, site_soil_temp_variables,
+                                        full_output_variables, met_data_variables,
+                                        job['met_data_sheet_name'], job['full_output_sheet_name'])
+        if ameriflux_mapping is None:
+            log.error("PyFluxPro L1 processing failed for %s %s", job['site'], job['year'])
+            return job
+        job['success'] = L2Format.write_control_file(ameriflux_mapping, shared['l2_mainstem_file'],
+                                                     shared['l2_ameriflux_file'], job['l1_run_output'],
+                                                     job['l2_run_output'], job['l2_ameriflux_output'])
+        return job
+
+    @staticmethod
+    def run(manifest_file, l1_mainstem, l1_ameriflux_only, l2_mainstem, l2_ameriflux_only, ameriflux_mainstem_key,
+            erroring_variable_flag, erroring_variable_key, soil_key, met_data_sheet_name, full_output_sheet_name,
+            max_workers=None, key_cache_dir=''):
+        """
+        Main method for the class. Write L1 and L2 control files for all rows of the manifest
+
+        Args:
+            manifest_file (str): A file path for the manifest csv file
+            l1_mainstem (str): A file path for the input L1.txt. This is the PyFluxPro original/mainstem L1 control file
+            l1_ameriflux_only (str): A file path for the L1.txt that contains only Ameriflux-friendly variables
+            l2_mainstem (str): A file path for the input L2.txt. This is the PyFluxPro original/mainstem L2 control file
+            l2_ameriflux_only (str): A file path for the L2.txt that contains only Ameriflux-friendly variables
+            ameriflux_mainstem_key (str): A file path for Ameriflux-Mainstem-Key.xlsx
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) are
+                                        renamed to Ameriflux labels in L1. Y is renamed, N if not.
+            erroring_variable_key (str): A file path for L1_erroring_variables.xlsx
+            soil_key (str): A file path for Soils key, used for rows without soil_key
+            met_data_sheet_name (str): Sheet name for met_data sheet, used for rows without met_data_sheet_name
+            full_output_sheet_name (str): Sheet name for full output, used for rows without full_output_sheet_name
+            max_workers (int): Number of worker processes. Number of CPUs if None. Jobs run in this process if 1
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (list): List of jobs with success flag. None if the manifest or the shared inputs are not valid
+        """
+        rows = ControlFileBatch.read_manifest(manifest_file)
+        if rows is None:
+            return None
+        jobs = [ControlFileBatch.get_job(row, soil_key, met_data_sheet_name, full_output_sheet_name) for row in rows]
+        shared = ControlFileBatch.read_shared_inputs(jobs, l1_mainstem, l1_ameriflux_only, l2_mainstem,
+                                                     l2_ameriflux_only, ameriflux_mainstem_key,
+                                                     erroring_variable_flag, erroring_variable_key,
+                                                     met_data_sheet_name, full_output_sheet_name, key_cache_dir)
+        if shared is None:
+            log.error("Check the input control files and keys. Aborting")
+            return None
+
+        if max_workers == 1 or len(jobs) <= 1:
+            ControlFileBatch.init_worker(shared)
+            results = [ControlFileBatch.run_job(job) for job in jobs]
+        else:
+            # the shared inputs are sent once to each worker process
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=ControlFileBatch.init_worker,
+                                     initargs=(shared,)) as executor:
+                results = list(executor.map(ControlFileBatch.run_job, jobs))
+
+        failed = [job for job in results if not job['success']]
+        log.info("Control files written for %d of %d site years", len(results) - len(failed), len(results))
+        for job in failed:
+            log.error("Control files not written for %s %s", job['site'], job['year'])
+        return results
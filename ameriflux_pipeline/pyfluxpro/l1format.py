@@ -10,7 +10,11 @@ import re
 import logging
 
 import utils.data_util as data_util
-from utils.process_validation import DataValidation, L1Validation
+from utils.process_validation import L1Validation
+from utils.keycache import KeyCache
+from utils.metnames import MetNames
+from utils.controlfile import ControlFile, ControlSection
+from utils.controlfilepatch import ControlFilePatch
 
 # create log object with current module name
 log = logging.getLogger(__name__)
@@ -25,17 +29,6 @@ class L1Format:
     LEVEL_LINE = "level = L1"  # set the level
 
     # define patterns to match
-    # variable names have alphanumeric characters and underscores with two square brackets
-    VAR_PATTERN = '^\\[\\[[a-zA-Z0-9_]+\\]\\]$'
-    # variable name lines starts with 4 spaces followed by
-    # characters and/or digits within two square brackets and ends with new line
-    VAR_PATTERN_WITH_SPACE = '^ {4}\\[\\[[a-zA-Z0-9_]+\\]\\]\n$'
-    XL_PATTERN = '^\\[\\[\\[xl\\]\\]\\]$'  # to match [[[xl]]] line
-    ATTR_PATTERN = '^\\[\\[\\[Attr\\]\\]\\]$|^\\[\\[\\[attr\\]\\]\\]$'  # to match [[[Attr]]] or [[[attr]]] line
-    UNITS_PATTERN = 'units'
-    LONG_NAME_PATTERN = 'long_name'
-    NAME_PATTERN = 'name'
-    SHEET_PATTERN = 'sheet'
     # set site name regex pattern.
     # Starts with site_name followed by optional space and then equal sign followed by
     # a word with min of 3 and max of 50 characters
@@ -48,7 +41,7 @@ class L1Format:
                         site_soil_moisture_variables, site_soil_temp_variables,
                         full_output_variables, met_data_variables,
                         met_data_sheet_name, full_output_sheet_name,
-                        spaces=SPACES, level_line=LEVEL_LINE):
+                        spaces=SPACES, level_line=LEVEL_LINE, patch_mode=False, key_cache_dir=''):
         """
         Main method for the class.
 
@@ -74,25 +67,34 @@ class L1Format:
             full_output_sheet_name (str): Sheet name for full output
             spaces (str): Spaces to be inserted before each section and line
             level_line (str): Line specifying the level. L1 for this section.
+            patch_mode (bool): True to patch the existing L1_Ameriflux.txt with only the changed blocks.
+                                The file is not formatted again if the inputs are unchanged since the previous run
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
         Returns:
             ameriflux_mapping (dict): Mapping of variable names to Ameriflux-friendly labels
                                         for variables in L1_Ameriflux.txt
         """
-        # read lines from l1 inputs
-        l1_mainstem_lines = data_util.read_file_lines(l1_mainstem)
-        # check if input L1 have the same format as expected
-        if (not l1_mainstem_lines) or \
-                (not L1Validation.check_l1_format(l1_mainstem_lines, met_data_sheet_name, full_output_sheet_name)):
-            log.error("Check input L1.txt format %s", l1_mainstem)
+        patch_inputs = None
+        if patch_mode:
+            # hash the inputs before formatting, as the soil variables are changed while formatting
+            patch_inputs = L1Format.get_patch_inputs(
+                pyfluxpro_input, l1_mainstem, l1_ameriflux_only, ameriflux_mainstem_key, file_meta_data_file,
+                outfile, erroring_variable_flag, erroring_variable_key, site_soil_moisture_variables,
+                site_soil_temp_variables, full_output_variables, met_data_variables, met_data_sheet_name,
+                full_output_sheet_name, spaces, level_line)
+            manifest = ControlFilePatch.read_manifest(l1_ameriflux_output)
+            if ControlFilePatch.is_up_to_date(manifest, patch_inputs, l1_ameriflux_output):
+                log.info("Inputs unchanged since %s was generated. Skipping L1 formatting", l1_ameriflux_output)
+                return manifest['result']
+
+        # read and parse l1 inputs
+        l1_mainstem_file = L1Format.read_template(l1_mainstem, met_data_sheet_name, full_output_sheet_name)
+        if l1_mainstem_file is None:
             return None
-        l1_ameriflux_lines = data_util.read_file_lines(l1_ameriflux_only)
-        if (not l1_ameriflux_lines) or \
-                (not L1Validation.check_l1_format(l1_ameriflux_lines, met_data_sheet_name, full_output_sheet_name)):
-            log.error("Check input L1.txt format %s", l1_ameriflux_only)
+        l1_ameriflux_file = L1Format.read_template(l1_ameriflux_only, met_data_sheet_name, full_output_sheet_name)
+        if l1_ameriflux_file is None:
             return None
 
-        l1_output_lines = []  # comma separated list of lines to be written
-
         # read file_meta
         file_meta = data_util.read_csv_file(file_meta_data_file)
         # get the site name
@@ -100,93 +102,176 @@ class L1Format:
         site_name = data_util.get_site_name(file_site_name)
 
         # get AmeriFlux-Mainstem variable name matching key
-        ameriflux_key = L1Format.get_ameriflux_key(ameriflux_mainstem_key)
-        if ameriflux_key.empty:
+        ameriflux_key = L1Format.get_ameriflux_key(ameriflux_mainstem_key, key_cache_dir)
+        if ameriflux_key is None or ameriflux_key.empty:
+            return None
+        erroring_variable_key = L1Format.get_erroring_variable_key(erroring_variable_flag, erroring_variable_key,
+                                                                   key_cache_dir)
+
+        return L1Format.write_control_file(l1_mainstem_file, l1_ameriflux_file, ameriflux_key, erroring_variable_key,
+                                           site_name, pyfluxpro_input, outfile, l1_ameriflux_output,
+                                           site_soil_moisture_variables, site_soil_temp_variables,
+                                           full_output_variables, met_data_variables,
+                                           met_data_sheet_name, full_output_sheet_name, spaces, level_line,
+                                           patch_inputs)
+
+    @staticmethod
+    def get_patch_inputs(pyfluxpro_input, l1_mainstem, l1_ameriflux_only, ameriflux_mainstem_key,
+                         file_meta_data_file, outfile, erroring_variable_flag, erroring_variable_key,
+                         site_soil_moisture_variables, site_soil_temp_variables,
+                         full_output_variables, met_data_variables,
+                         met_data_sheet_name, full_output_sheet_name, spaces, level_line):
+        """
+        Get the hashes of the inputs of L1 formatting, used in patch mode to find the changes since the previous run.
+        Arguments are the same as data_formatting.
+
+        Returns:
+            (dict): Input name to hash
+        """
+        input_files = {'l1_mainstem': l1_mainstem,
+                       'l1_ameriflux_only': l1_ameriflux_only,
+                       'ameriflux_mainstem_key': ameriflux_mainstem_key,
+                       'file_meta_data': file_meta_data_file}
+        if erroring_variable_flag.lower() in ['n', 'no']:
+            input_files['erroring_variable_key'] = erroring_variable_key
+        input_values = {'erroring_variable_flag': erroring_variable_flag,
+                        'files': [pyfluxpro_input, outfile],
+                        'soil_moisture_variables': site_soil_moisture_variables,
+                        'soil_temp_variables': site_soil_temp_variables,
+                        'full_output_variables': sorted(full_output_variables),
+                        'met_data_variables': sorted(met_data_variables),
+                        'sheet_names': [met_data_sheet_name, full_output_sheet_name],
+                        'format': [spaces, level_line]}
+        return ControlFilePatch.get_input_hashes(input_files, input_values)
+
+    @staticmethod
+    def read_template(l1_template, met_data_sheet_name, full_output_sheet_name):
+        """
+        Read, parse and validate input L1 control file
+
+        Args:
+            l1_template (str): A file path for the input L1.txt
+            met_data_sheet_name (str): Sheet name for met_data sheet
+            full_output_sheet_name (str): Sheet name for full output
+        Returns:
+            (obj): ControlFile object. None if the file is not in the expected format
+        """
+        l1_file = ControlFile.read(l1_template)
+        if l1_file is None:
+            log.error("Check input L1.txt format %s", l1_template)
+            return None
+        # validation adds to the diagnostics found while parsing the file
+        L1Validation.check_l1_format(l1_file, met_data_sheet_name, full_output_sheet_name)
+        l1_file.log_diagnostics(l1_template)
+        if not l1_file.is_valid():
+            log.error("Check input L1.txt format %s", l1_template)
             return None
+        return l1_file
 
+    @staticmethod
+    def get_erroring_variable_key(erroring_variable_flag, erroring_variable_key, key_cache_dir):
+        """
+        Read erroring variables key if the erroring variables are not to be renamed
+
+        Args:
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) are
+                                        renamed to Ameriflux labels in L1. Y is renamed, N if not.
+            erroring_variable_key (str): A file path for L1_erroring_variables.xlsx
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (str/obj): Pandas DataFrame object of the key. The file path if erroring variables are to be renamed.
+                        Empty string if the key is not valid
+        """
         if erroring_variable_flag.lower() in ['n', 'no']:
             # if user chose not to replace the variable name, read the name mapping
             # if this file is read, the instance becomes a dataframe, if not the variable type is a string
-            erroring_variable_key = pd.read_excel(erroring_variable_key)  # read L1 erroring variable name matching file
-            if DataValidation.is_valid_erroring_variables_key(erroring_variable_key):
-                # strip column names of extra spaces and convert to lowercase
-                erroring_variable_key.columns = erroring_variable_key.columns.str.strip().str.lower()
-                ameriflux_col = erroring_variable_key.filter(regex="ameriflux").columns.to_list()
-                pyfluxpro_col = erroring_variable_key.filter(regex="pyfluxpro").columns.to_list()
-                erroring_variable_key['Ameriflux label'] = erroring_variable_key[ameriflux_col]
-                erroring_variable_key['PyFluxPro label'] = erroring_variable_key[pyfluxpro_col]
-            else:
+            # read L1 erroring variable name matching file
+            erroring_variable_key = KeyCache.read_erroring_variables_key(erroring_variable_key, key_cache_dir)
+            if erroring_variable_key is None:
                 log.warning("L1 Erroring Variables.xlsx file invalid format. Proceeding without replacing label")
                 # make erroring_variable_key a string to proceed with pipeline.
                 erroring_variable_key = ''
+        return erroring_variable_key
 
-        # writing to output file
+    @staticmethod
+    def write_control_file(l1_mainstem_file, l1_ameriflux_file, ameriflux_key, erroring_variable_key, site_name,
+                           pyfluxpro_input, outfile, l1_ameriflux_output,
+                           site_soil_moisture_variables, site_soil_temp_variables,
+                           full_output_variables, met_data_variables,
+                           met_data_sheet_name, full_output_sheet_name,
+                           spaces=SPACES, level_line=LEVEL_LINE, patch_inputs=None):
+        """
+        Format the parsed input L1 control files for a site and write the L1 control file for Ameriflux.
+        The input control files are not modified, so that they can be used for other sites and years.
+
+        Args:
+            l1_mainstem_file (obj): ControlFile object. The PyFluxPro original/mainstem L1 control file
+            l1_ameriflux_file (obj): ControlFile object. The L1 control file with only Ameriflux-friendly variables
+            ameriflux_key (obj): Pandas DataFrame object. AmeriFlux-Mainstem key read with get_ameriflux_key
+            erroring_variable_key (str/obj): Erroring variables key read with get_erroring_variable_key
+            site_name (str): Name of the site
+            pyfluxpro_input (str): A file path for the PyFluxPro input excel sheet formatted for Ameriflux
+            outfile (str): A file path for the output of L1 run. This typically has .nc extension
+            l1_ameriflux_output (str): A file path for the L1.txt that is formatted for Ameriflux standards
+            site_soil_moisture_variables (dict): Dictionary for soil moisture variable details from Soils key file
+            site_soil_temp_variables (dict): Dictionary for soil temperature variable details from Soils key file
+            full_output_variables (list): List of full_output variable names
+            met_data_variables (list): List of met_data variable names
+            met_data_sheet_name (str): Sheet name for met_data sheet
+            full_output_sheet_name (str): Sheet name for full output
+            spaces (str): Spaces to be inserted before each section and line
+            level_line (str): Line specifying the level. L1 for this section.
+            patch_inputs (dict): Input hashes from get_patch_inputs to patch the existing file with only the changed
+                                blocks. The file is written again if None
+        Returns:
+            ameriflux_mapping (dict): Mapping of variable names to Ameriflux-friendly labels
+                                        for variables in L1_Ameriflux.txt
+        """
+        # build lookups once for all variables
+        ameriflux_key_index = L1Format.get_ameriflux_key_index(ameriflux_key, 'Input sheet variable name')
+        ameriflux_name_index = L1Format.get_ameriflux_key_index(ameriflux_key, 'Ameriflux variable name')
+        erroring_variables = L1Format.get_erroring_variables(erroring_variable_key)
+        full_output_variables = set(full_output_variables)
+        met_data_variables = set(met_data_variables)
 
-        # write the level line
-        l1_output_lines.append(level_line.strip())
+        # create the output control file
+        l1_output = ControlFile(level_line.strip())
 
         # write Files section
-        files_lines = []
-        files_lines.append("[Files]")
+        files_section = ControlSection("Files", 1)
         filename = os.path.basename(pyfluxpro_input)
         file_path = os.path.dirname(pyfluxpro_input)
         out_filename = os.path.basename(outfile)
-
-        file_path_line = spaces + "file_path = " + file_path
-        files_lines.append(file_path_line)
-        in_filename_line = spaces + "in_filename = " + filename
-        files_lines.append(in_filename_line)
-        in_headerrow_line = spaces + "in_headerrow = " + '1'
-        files_lines.append(in_headerrow_line)
-        in_firstdatarow_line = spaces + "in_firstdatarow = " + '3'
-        files_lines.append(in_firstdatarow_line)
-        out_filename_line = spaces + "out_filename = " + out_filename
-        files_lines.append(out_filename_line)
-        # write lines to l1 output
-        l1_output_lines.extend(files_lines)
-
-        # get Global section
-        mainstem_global_lines, mainstem_variable_ind = L1Format.get_global_lines(l1_mainstem_lines, site_name)
-        ameriflux_global_lines, ameriflux_variable_ind = L1Format.get_global_lines(l1_ameriflux_lines, site_name)
-        # write global section lines to l1 output
-        l1_output_lines.extend(mainstem_global_lines)
-
-        # write variable line
-        variable_line = ["[Variables]"]
-        l1_output_lines.extend(variable_line)
-
-        # write the variables section to dataframe. this is used to get the indexes easily
-        mainstem_var_df = pd.DataFrame(l1_mainstem_lines[mainstem_variable_ind + 1:], columns=['Text'])
-        # remove newline and extra spaces from each line
-        mainstem_var_df['Text'] = mainstem_var_df['Text'].apply(lambda x: x.strip())
-        # get df with only variables and a list of variable start and end indexes
-        mainstem_variables, mainstem_var_start_end = L1Format.get_variables_index(mainstem_var_df['Text'])
-        # get the mainstem variable lines to be written and variable name mapping
-        mainstem_var_lines_out, mainstem_variable_ameriflux_mapping = \
-            L1Format.format_mainstem_var(mainstem_var_df, mainstem_var_start_end,
-                                         ameriflux_key, erroring_variable_key,
+        files_section.lines.append("file_path = " + file_path)
+        files_section.lines.append("in_filename = " + filename)
+        files_section.lines.append("in_headerrow = " + '1')
+        files_section.lines.append("in_firstdatarow = " + '3')
+        files_section.lines.append("out_filename = " + out_filename)
+        l1_output.add_section(files_section)
+
+        # write Global section from mainstem L1
+        l1_output.add_section(L1Format.format_global_section(l1_mainstem_file.get_section("Global"), site_name))
+
+        # write Variables section
+        variables_section = ControlSection("Variables", 1)
+        l1_output.add_section(variables_section)
+        # get the mainstem variables to be written and variable name mapping
+        mainstem_variables = l1_mainstem_file.get_section("Variables").sections
+        mainstem_var_out, mainstem_variable_ameriflux_mapping = \
+            L1Format.format_mainstem_var(mainstem_variables, ameriflux_key_index, erroring_variables,
                                          site_soil_moisture_variables, site_soil_temp_variables,
                                          full_output_variables, met_data_variables,
                                          met_data_sheet_name, full_output_sheet_name)
+        variables_section.sections.extend(mainstem_var_out)
 
-        # write variables section lines to l1 output
-        l1_output_lines.extend(mainstem_var_lines_out)
-
-        # read from Ameriflux only L1 file
-        ameriflux_var_df = pd.DataFrame(l1_ameriflux_lines[ameriflux_variable_ind + 1:], columns=['Text'])
-        # remove newline and extra spaces from each line
-        ameriflux_var_df['Text'] = ameriflux_var_df['Text'].apply(lambda x: x.strip())
-        # get df with only variables and a list of variable start and end indexes
-        ameriflux_variables, ameriflux_var_start_end = L1Format.get_variables_index(ameriflux_var_df['Text'])
-        # get the variable lines to be written
-        ameriflux_var_lines_out, ameriflux_variable_ameriflux_mapping = \
-            L1Format.format_ameriflux_var(ameriflux_var_df, ameriflux_var_start_end, ameriflux_key,
+        # get the variables to be written from Ameriflux only L1 file
+        ameriflux_variables = l1_ameriflux_file.get_section("Variables").sections
+        ameriflux_var_out, ameriflux_variable_ameriflux_mapping = \
+            L1Format.format_ameriflux_var(ameriflux_variables, ameriflux_key_index, ameriflux_name_index,
                                           full_output_variables, met_data_variables,
                                           met_data_sheet_name, full_output_sheet_name,
                                           mainstem_variable_ameriflux_mapping)
-
-        # write variables section lines to l1 output
-        l1_output_lines.extend(ameriflux_var_lines_out)
+        variables_section.sections.extend(ameriflux_var_out)
 
         # create dictionary mapping of variables . variable names : ameriflux labels
         ameriflux_mapping = mainstem_variable_ameriflux_mapping.copy()
@@ -194,163 +279,101 @@ class L1Format:
 
         # write output lines to file
         log.info("Writting Ameriflux L1 control file to " + l1_ameriflux_output)
-        data_util.write_list_to_file(l1_output_lines, l1_ameriflux_output)
+        if patch_inputs is None:
+            l1_output.write(l1_ameriflux_output, spaces)
+        else:
+            ControlFilePatch.write(l1_output, l1_ameriflux_output, patch_inputs, ameriflux_mapping, spaces)
 
         # return pyfluxpro to ameriflux label mapping
         return ameriflux_mapping
 
     @staticmethod
-    def get_ameriflux_key(ameriflux_mainstem_key):
+    def get_ameriflux_key(ameriflux_mainstem_key, key_cache_dir):
         """
         Method to get ameriflux key dataframe
         Args :
             ameriflux_mainstem_key (str): path to ameriflux key file
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
         Returns :
             df_ameriflux_key (obj): ameriflux key dataframe
         """
-        # read AmeriFlux-Mainstem variable name matching file
-        df_ameriflux_key = data_util.read_excel(ameriflux_mainstem_key)
-        if not DataValidation.is_valid_ameriflux_mainstem_key(df_ameriflux_key):
+        # read AmeriFlux-Mainstem variable name matching file. columns are renamed to standard names
+        df_ameriflux_key = KeyCache.read_ameriflux_mainstem_key(ameriflux_mainstem_key, key_cache_dir)
+        if df_ameriflux_key is None:
             log.error("%s file invalid format.", ameriflux_mainstem_key)
             return None
-        # get column names matching Ameriflux
-        ameriflux_cols = df_ameriflux_key.filter(regex=re.compile("^ameriflux", re.IGNORECASE)).columns.to_list()
-        # get column names matching Original
-        original_cols = df_ameriflux_key.filter(regex=re.compile("^original", re.IGNORECASE)).columns.to_list()
-        # get column names matching Input sheet or Met tower
-        input_cols = df_ameriflux_key.filter(regex=re.compile("^input|^met", re.IGNORECASE)).columns.to_list()
-        # get units column
-        units_col = df_ameriflux_key.filter(regex=re.compile("^units", re.IGNORECASE)).columns.to_list()
-        # rename columns
-        df_ameriflux_key.rename(columns={ameriflux_cols[0]: 'Ameriflux variable name',
-                                         original_cols[0]: 'Original variable name',
-                                         input_cols[0]: 'Input sheet variable name',
-                                         units_col[0]: 'Units after formatting'}, inplace=True)
-
         return df_ameriflux_key
 
     @staticmethod
-    def get_global_lines(lines, site_name, site_name_line_pattern=SITE_NAME_LINE_PATTERN, spaces=SPACES):
+    def format_global_section(global_section, site_name, site_name_line_pattern=SITE_NAME_LINE_PATTERN):
         """
-            Get Global section from L1.txt
+            Format Global section from L1.txt with the site name read from met data
 
             Args:
-                lines (list): List of the strings that are read fom L1.txt
+                global_section (obj): ControlSection object for Global section of input L1.txt
                 site_name (str): Name of site read from met data
                 site_name_line_pattern (str): Regex pattern to match site name line
-                spaces (str): Spaces to be inserted before each section and line
-
-            Returns:
-                global_lines (list): List of strings to be written to l1_output
-                ind (integer): Index of [Variables] section
-        """
-        global_lines = []
-        global_start_writing = False  # flag to check if Global section is over
-        for ind, line in enumerate(lines):
-            if line.strip() == "[Global]":
-                global_lines.append(line.strip())
-                global_start_writing = True
-                continue
-            if global_start_writing:
-                site_line_matched = re.match(site_name_line_pattern, line.strip().lower())
-                if bool(site_line_matched):
-                    site_name_parameter = line.strip().split('=')[0]  # get the portion with site name
-                    site_name_line = site_name_parameter + ' = ' + site_name
-                    global_lines.append(spaces + site_name_line)
-                elif line.strip() == "[Variables]":
-                    global_start_writing = False
-                    return global_lines, ind
-                else:
-                    # write line
-                    global_lines.append(spaces + line.strip())
-
-    @staticmethod
-    def get_variable_line_index(lines):
-        """
-            Get Variables section starting line index
 
-            Args:
-                lines (list): List of the strings that are read fom L1.txt
             Returns:
-                ind (integer): Index of [Variables] section
+                (obj): ControlSection object for Global section to be written to l1_output
         """
-        for ind, line in enumerate(lines):
-            if line.strip() == "[Variables]":
-                return ind
+        global_out = global_section.copy()
+        for ind, line in enumerate(global_out.lines):
+            site_line_matched = re.match(site_name_line_pattern, line.strip().lower())
+            if bool(site_line_matched):
+                site_name_parameter = line.strip().split('=')[0]  # get the portion with site name
+                global_out.lines[ind] = site_name_parameter + ' = ' + site_name
+        return global_out
 
     @staticmethod
-    def get_ameriflux_variables(lines, pattern=VAR_PATTERN_WITH_SPACE):
+    def get_xl_attr_sections(var):
         """
-            Get list of variable names from l1_ameriflux_lines
-
+            Get xl and attr sections of a variable
             Args:
-                lines (list): List of the strings that are read fom L1_ameriflux.txt
-                pattern (str): Regex pattern for variable names including whitespaces
+                var (obj): ControlSection object of the variable
             Returns:
-                ameriflux_var_list (list): List of variable names
+                xl (obj) : ControlSection object for xl section of the variable. None if not found
+                attr (obj): ControlSection object for attr section of the variable. None if not found
         """
-        r = re.compile(pattern)
-        ameriflux_var_list = list(filter(r.match, lines))
-        # strip spaces and brackets to get only the variable name
-        ameriflux_var_list = [x.strip().strip('[]') for x in ameriflux_var_list]
-        return ameriflux_var_list
+        xl = var.get_section('xl')
+        # get the [[[Attr]]] OR [[[attr]]] section
+        attr = var.get_section('Attr') or var.get_section('attr')
+        if xl is None or attr is None:
+            log.warning("Variable %s does not have xl and Attr sections. Skipping variable", var.name)
+            return None, None
+        return xl, attr
 
     @staticmethod
-    def get_variables_index(text, var_pattern=VAR_PATTERN):
+    def is_variable_in_sheet(var_name, met_tower_var_name, sheet_name, full_output_variables, met_data_variables,
+                             met_data_sheet_name, full_output_sheet_name):
         """
-            Get all variables and start and end index for each variable from L1.txt
-
-            Args:
-                text (obj): Pandas series with all variable lines from L1.txt
-                var_pattern (str): Regex pattern to find the starting line for [Variables] section
-            Returns:
-                variables (obj) : Pandas series. This is a subset of the input dataframe with only variable names
-                var_start_end (list): List of tuple, the starting and ending index for each variable
-        """
-        variables = text[text.str.contains(var_pattern)]
-        var_start_end = []
-        end_ind = text.first_valid_index()  # initialize end index
-        for i in range(len(variables.index) - 1):
-            start_ind = variables.index[i]
-            end_ind = variables.index[i + 1]
-            var_start_end.append((start_ind, end_ind))
-        # append the start and end index of the last variable
-        var_start_end.append((end_ind, text.last_valid_index()+1))
-        return variables, var_start_end
-
-    @staticmethod
-    def get_var_xl_attr_df(df, start, end, xl_pattern=XL_PATTERN, attr_pattern=ATTR_PATTERN):
+        Check if the met tower variable is present in the sheet given in xl section of the variable
+        Args:
+            var_name (str): Variable name in L1.txt
+            met_tower_var_name (str): Met tower variable name given in xl section
+            sheet_name (str): Sheet name given in xl section
+            full_output_variables (set): Set of full_output variable names
+            met_data_variables (set): Set of met_data variable names
+            met_data_sheet_name (str): Sheet name for met_data sheet
+            full_output_sheet_name (str): Sheet name for full output
+        Returns:
+            (bool): True if variable is present in the sheet
         """
-            Get xl and attr sections from variable dataframe
-            Args:
-                df (obj): Pandas dataframe with all variable lines from L1.txt
-                start (int): Starting index of the variable section
-                end (int): Ending index of the variable section
-                xl_pattern (str): Regex pattern to find the [[[xl]]] section within Variables section
-                attr_pattern (str): Regex pattern to find the [[[Attr]]] section within Variables section
-            Returns:
-                var (obj) : Pandas dataframe with the specific variable section
-                xl_df (obj): Pandas dataframe with xl section for the variable
-                attr_df (obj): Pandas dataframe with attr section for the variable
-        """
-        # get variable in a dataframe
-        var = df[start:end]
-        # get the [[[xl]]] section
-        xl = var[var['Text'].str.contains(xl_pattern)]
-        # get the [[[Attr]]] OR [[[attr]]] section
-        attr = var[var['Text'].str.contains(attr_pattern)]
-
-        # check which section comes first
-        if xl.index[0] > attr.index[0]:
-            # attr section comes first
-            xl_df = df[xl.index[0]:end]
-            attr_df = df[attr.index[0]:xl.index[0]]
+        if sheet_name == full_output_sheet_name:
+            if not L1Format.check_variable_exists(met_tower_var_name, full_output_variables):
+                log.warning("Variable %s not found in %s sheet. Skipping variable",
+                            met_tower_var_name, full_output_sheet_name)
+                return False
+        elif sheet_name == met_data_sheet_name:
+            if not L1Format.check_variable_exists(met_tower_var_name, met_data_variables):
+                log.warning("Variable %s not found in %s sheet. Skipping variable",
+                            met_tower_var_name, met_data_sheet_name)
+                return False
         else:
-            # xl section comes first
-            attr_df = df[attr.index[0]:end]
-            xl_df = df[xl.index[0]:attr.index[0]]
-
-        return var, xl_df, attr_df
+            # sheet name is not found
+            log.warning("Sheet name %s not found for %s. Skipping variable", sheet_name, var_name)
+            return False
+        return True
 
     @staticmethod
     def check_variable_exists(var_name, variable_list):
@@ -368,31 +391,13 @@ class L1Format:
     def get_corrected_met_tower_var_name(met_tower_var_name):
         """
             Get corrected met tower variable name. See NOTES#20 for details.
-            Some met tower variable names are changed in met merger. Get corrected name.
+            Some met tower variable names are changed in met merger. Get corrected name with the same rules.
             Args:
                 met_tower_var_name (str): Met tower variable name
             Returns:
                 corrected_met_tower_var_name (str): Corrected met tower variable name
         """
-        corrected_met_tower_var_name = met_tower_var_name  # set initial value as same
-        # if VWC change to VWC1
-        if bool(re.match('^VWC_', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'VWC1_' + met_tower_var_name.split('_')[1] + '_Avg'
-        # if TC change to TC1
-        elif bool(re.match('^TC_', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'TC1_' + met_tower_var_name.split('_')[1] + '_Avg'
-        # remove numbers from CNRTC and CNRTK variables
-        elif bool(re.match('^CNR[1-9]_?T_?C', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'CNRTC_Avg'
-        elif bool(re.match('^CNR[1-9]_?T_?K', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'CNRTK_Avg'
-        # get NetRs and NetRl renamed
-        elif bool(re.match('^Rs_net', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'NetRs_Avg'
-        elif bool(re.match('^Rl_net', met_tower_var_name, re.I)):
-            corrected_met_tower_var_name = 'NetRl_Avg'
-
-        return corrected_met_tower_var_name
+        return MetNames.normalize(met_tower_var_name)
 
     @staticmethod
     def get_corrected_height(height):
@@ -408,138 +413,94 @@ class L1Format:
         return str(round(int(height) / 100, 2))
 
     @staticmethod
-    def format_mainstem_var(df, var_start_end, ameriflux_key, erroring_variable_key,
+    def format_mainstem_var(variables, ameriflux_key_index, erroring_variables,
                             site_soil_moisture_variables, site_soil_temp_variables,
                             full_output_variables, met_data_variables,
-                            met_data_sheet_name, full_output_sheet_name,
-                            spaces=SPACES):
+                            met_data_sheet_name, full_output_sheet_name):
         """
             Change variable names and units to AmeriFlux standard
 
             Args:
-                df (obj): Pandas dataframe with all variable lines from L1_mainstem.txt
-                var_start_end (list): List of tuple, the starting and ending index for each variable
-                ameriflux_key (obj): Pandas dataframe of AmeriFlux-Mainstem varible name sheet
-                erroring_variable_key (str/obj): Variable name key used to match the original variable names to
-                                        Ameriflux names for variables throwing an error in PyFluxPro L1.
+                variables (list): List of ControlSection objects for variables in L1_mainstem.txt
+                ameriflux_key_index (dict): Rows of AmeriFlux-Mainstem key indexed by input sheet variable name
+                erroring_variables (set): PyFluxPro labels of variables throwing an error in PyFluxPro L1.
+                                        These variables are not renamed
                 site_soil_moisture_variables (dict): Dictionary for soil moisture variable details from Soils key file
                 site_soil_temp_variables (dict): Dictionary for soil temperature variable details from Soils key file
-                full_output_variables (list): List of full_output variable names
-                met_data_variables (list): List of met_data variable names
+                full_output_variables (set): Set of full_output variable names
+                met_data_variables (set): Set of met_data variable names
                 met_data_sheet_name (str): Sheet name for met_data sheet
                 full_output_sheet_name (str): Sheet name for full output
-                spaces (str): Spaces to be inserted before each section and line
             Returns:
-                variable_lines_out (list) : List of variables lines to be written to l1_ameriflux
+                variables_out (list) : List of ControlSection objects for variables to be written to l1_ameriflux
                 variables_mapping (dict) : Mapping of variable to ameriflux-friendly variable names in L1
         """
-        # define spaces for formatting in L1
-        var_spaces = spaces
-        attr_spaces = spaces + spaces
-        xl_spaces = spaces + spaces
-        other_spaces = spaces + spaces + spaces
-
-        variables_lines_out = []  # variable lines to be written
+        variables_out = []  # variables to be written
         # mapping for variables to be written
         variable_ameriflux_mapping = {}  # dictionary of mapping variable names to ameriflux-friendly names
+        ameriflux_names = set()  # ameriflux-friendly names in the mapping
         # get xl and attr sections for soil moisture and temperature variables
-        moisture_xl_df, moisture_attr_df, temp_xl_df, temp_attr_df = None, None, None, None
+        moisture_xl, moisture_attr, temp_xl, temp_attr = None, None, None, None
         # iterate over the variables
-        for start, end in var_start_end:
+        for var in variables:
             # NOTES 13
             var_flag = False  # flag to see if variable is to be written or not
-            # get variable, xl and attr sections as separate dataframes
-            var, xl_df, attr_df = L1Format.get_var_xl_attr_df(df, start, end)
-            var_name = var['Text'].iloc[0].strip('[]')  # get variable name
+            var_name = var.name  # get variable name
             # check if variable is already written to L1
-            if (var_name in variable_ameriflux_mapping.keys()) or (var_name in variable_ameriflux_mapping.values()):
+            if (var_name in variable_ameriflux_mapping) or (var_name in ameriflux_names):
                 log.warning("Variable " + var_name + " is already written to L1. Skipping this variable.")
                 continue
-            var_name_index = var.index[0]  # get index of variable name
+            var_out = var.copy()
+            # get xl and attr sections
+            xl, attr = L1Format.get_xl_attr_sections(var_out)
+            if xl is None:
+                continue
             # get met tower variable name
-            xl_name_row = xl_df[xl_df['Text'].apply(lambda x: x.strip().startswith("name"))]
-            xl_var_name = xl_name_row['Text'].iloc[0].split('=')[1].strip()
+            xl_var_name = xl.get_value("name")
             # get the corrected met tower variable name
             met_tower_var_name = L1Format.get_corrected_met_tower_var_name(xl_var_name)
             # get which sheet
-            sheet_row = xl_df[xl_df['Text'].apply(lambda x: x.strip().startswith("sheet"))]
-            sheet_name = sheet_row['Text'].iloc[0].split('=')[1].strip()
+            sheet_name = xl.get_value("sheet")
 
             # check if variable present in specified sheet
-            if sheet_name == full_output_sheet_name:
-                found_full_output = L1Format.check_variable_exists(met_tower_var_name, full_output_variables)
-                if not found_full_output:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable",
-                                met_tower_var_name, full_output_sheet_name)
-                    continue
-            elif sheet_name == met_data_sheet_name:
-                found_met_data = L1Format.check_variable_exists(met_tower_var_name, met_data_variables)
-                if not found_met_data:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable",
-                                met_tower_var_name, met_data_sheet_name)
-                    continue
-            else:
-                # sheet name is not found
-                log.warning("Sheet name %s not found for %s. Skipping variable", sheet_name, var_name)
+            if not L1Format.is_variable_in_sheet(var_name, met_tower_var_name, sheet_name,
+                                                 full_output_variables, met_data_variables,
+                                                 met_data_sheet_name, full_output_sheet_name):
                 continue
 
-            units_row = attr_df[attr_df['Text'].apply(lambda x: x.strip().startswith("unit"))]
-            height_row = attr_df[attr_df['Text'].apply(lambda x: x.strip().startswith("height"))]
-            instrument_row = attr_df[attr_df['Text'].apply(lambda x: x.strip().startswith("instrument"))]
-
-            # format text as per L1
-            xl_name_row_index = xl_name_row.index[0]
-            xl_df['Text'].iloc[xl_df.index == xl_name_row_index] = "name = " + met_tower_var_name
-            xl_df['Text'].iloc[0] = xl_spaces + xl_df['Text'].iloc[0]
-            xl_df['Text'].iloc[1:] = other_spaces + xl_df['Text'].iloc[1:]
-
             # format text as per L1
-            attr_df['Text'].iloc[0] = attr_spaces + attr_df['Text'].iloc[0]
-            attr_df['Text'].iloc[1:] = other_spaces + attr_df['Text'].iloc[1:]
-
-            # update the variable df
-            var.update(xl_df)
-            var.update(attr_df)
+            xl.set_value("name", met_tower_var_name)
 
             # check if the variable is one of the erroring variables in L1 PyFluxPro
-            # check if the erroring_variable_key is a dataframe.
-            if isinstance(erroring_variable_key, pd.DataFrame) and \
-                    erroring_variable_key['PyFluxPro label'].isin([var_name]).any():
+            if var_name in erroring_variables:
                 # the variable name is one of the erroring variables.
                 # do not replace the variable name with ameriflux label
                 var_flag = True
                 # add to the mapping
-                variable_ameriflux_mapping[var_name] = var_name
-                var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_name + "]]"
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, var_name, var_name)
 
             # if the erroring variable is to be replaced, the Ameriflux friendly variable name is in ameriflux_key
-            elif ameriflux_key['Input sheet variable name'].isin([met_tower_var_name]).any():
+            elif met_tower_var_name in ameriflux_key_index:
                 var_flag = True
                 # check if var name should be changed for Ameriflux
-                var_ameriflux_name = ameriflux_key.loc[ameriflux_key['Input sheet variable name'] == met_tower_var_name,
-                                                       'Ameriflux variable name'].iloc[0]
+                var_ameriflux_name = ameriflux_key_index[met_tower_var_name]['Ameriflux variable name']
                 # add to the mapping, both met tower and original pyfluxpro names
-                variable_ameriflux_mapping[var_name] = var_ameriflux_name
-                variable_ameriflux_mapping[met_tower_var_name] = var_ameriflux_name
-                var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_ameriflux_name + "]]"
-
-                if units_row.shape[0] > 0:
-                    # check if units need to be changed
-                    var_units_index = units_row.index[0]
-                    var_ameriflux_units = \
-                        ameriflux_key.loc[ameriflux_key['Input sheet variable name'] == met_tower_var_name,
-                                          'Units after formatting'].iloc[0]
-                    if not pd.isnull(var_ameriflux_units):
-                        # if unit needs to be changed, if its not NaN in the ameriflux-mainstem sheet
-                        # replace units only if it is not empty
-                        var['Text'].iloc[var.index == var_units_index] = other_spaces + \
-                                                                         "units = " + var_ameriflux_units
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, var_name, var_ameriflux_name)
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, met_tower_var_name,
+                                        var_ameriflux_name)
+                var_out.rename(var_ameriflux_name)
+
+                # check if units need to be changed
+                var_ameriflux_units = ameriflux_key_index[met_tower_var_name]['Units after formatting']
+                if not pd.isnull(var_ameriflux_units):
+                    # if unit needs to be changed, if its not NaN in the ameriflux-mainstem sheet
+                    # replace units only if it is not empty
+                    attr.set_value("units", var_ameriflux_units)
             # check if variable is soil moisture
             elif var_name.lower().startswith("sws_"):
                 # soil moisture variable varies with site
                 # save moisture variable xl and attr sections
-                moisture_xl_df = xl_df
-                moisture_attr_df = attr_df
+                moisture_xl, moisture_attr = xl, attr
                 # format moisture variable lines
                 # get the ameriflux variable name from site_soil_moisture_variables. continue if not found
                 if met_tower_var_name not in site_soil_moisture_variables:
@@ -550,29 +511,16 @@ class L1Format:
                 # write to variable lines
                 var_flag = True
                 # add met tower name to the mapping
-                variable_ameriflux_mapping[met_tower_var_name] = var_ameriflux_name
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, met_tower_var_name,
+                                        var_ameriflux_name)
                 # add pyfluxpro name to the mapping
-                variable_ameriflux_mapping[var_pyfluxpro_name] = var_ameriflux_name
-                var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_ameriflux_name + "]]"
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, var_pyfluxpro_name,
+                                        var_ameriflux_name)
+                var_out.rename(var_ameriflux_name)
                 # change the unit to percentage
-                if units_row.shape[0] > 0:
-                    var_units_index = units_row.index[0]
-                    var['Text'].iloc[var.index == var_units_index] = other_spaces + "units = " + '%'
-
-                # correct the height row
-                var_height_index = height_row.index[0]
-                # get height from met variable name
-                height_cm = site_soil_moisture_variables[met_tower_var_name]['Depth (cm)']
-                height = L1Format.get_corrected_height(height_cm)
-                var['Text'].iloc[var.index == var_height_index] = \
-                    other_spaces + "height = " + '-' + height + 'm'
-
-                # change the instrument row
-                var_instrument_index = instrument_row.index[0]
-                instrument = site_soil_moisture_variables[met_tower_var_name]['Instrument']
-                if var_instrument_index is not None:
-                    var['Text'].iloc[var.index == var_instrument_index] = \
-                        other_spaces + "instrument = " + instrument
+                attr.set_value("units", '%')
+                # correct the height and instrument
+                L1Format.set_soil_height_instrument(attr, site_soil_moisture_variables[met_tower_var_name])
                 # delete key from labels
                 del site_soil_moisture_variables[met_tower_var_name]
 
@@ -580,10 +528,8 @@ class L1Format:
             elif var_name.lower().startswith("ts_"):
                 # soil temp variable varies with site
                 # save temp variable xl and attr sections
-                temp_xl_df = xl_df
-                temp_attr_df = attr_df
+                temp_xl, temp_attr = xl, attr
                 # format temp variable lines
-                var_name_index = var.index[0]
                 if met_tower_var_name not in site_soil_temp_variables:
                     # met variables not found in site_soil_temp_variables. skip writing to variable lines
                     continue
@@ -592,208 +538,208 @@ class L1Format:
                 # write to variable lines
                 var_flag = True
                 # add met tower name to the mapping
-                variable_ameriflux_mapping[met_tower_var_name] = var_ameriflux_name
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, met_tower_var_name,
+                                        var_ameriflux_name)
                 # add pyfluxpro name to the mapping
-                variable_ameriflux_mapping[var_pyfluxpro_name] = var_ameriflux_name
-                var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_ameriflux_name + "]]"
-
-                # correct the height row
-                var_height_index = height_row.index[0]
-                # get height from met variable name
-                height_cm = site_soil_temp_variables[met_tower_var_name]['Depth (cm)']
-                height = L1Format.get_corrected_height(height_cm)
-                var['Text'].iloc[var.index == var_height_index] = \
-                    other_spaces + "height = " + '-' + height + 'm'
-
-                # change the instrument row
-                var_instrument_index = instrument_row.index[0]
-                instrument = site_soil_temp_variables[met_tower_var_name]['Instrument']
-                if var_instrument_index is not None:
-                    var['Text'].iloc[var.index == var_instrument_index] = \
-                        other_spaces + "instrument = " + instrument
+                L1Format.add_to_mapping(variable_ameriflux_mapping, ameriflux_names, var_pyfluxpro_name,
+                                        var_ameriflux_name)
+                var_out.rename(var_ameriflux_name)
+                # correct the height and instrument
+                L1Format.set_soil_height_instrument(attr, site_soil_temp_variables[met_tower_var_name])
                 # delete key from labels
                 del site_soil_temp_variables[met_tower_var_name]
 
             if var_flag:
                 # write the modified variable to the output list
-                variables_lines_out.extend(var['Text'].tolist())
+                variables_out.append(var_out)
         # end of for loop. Variables in input L1 sheet are now formatted
 
         # if there are variables left in the labels, write them to the variables sheet
-        if len(site_soil_moisture_variables) > 0 and moisture_attr_df is not None and moisture_xl_df is not None:
+        if len(site_soil_moisture_variables) > 0 and moisture_attr is not None and moisture_xl is not None:
             # write moisture variables by modifying the attr and xl sections
             log.info("Writing additional soil moisture variables to L1 Variables")
-            for key, value in site_soil_moisture_variables.items():
-                # write if met variable in met_data sheet
-                if L1Format.check_variable_exists(key, met_data_variables):
-                    var_name_line = var_spaces + "[[" + value['Eddypro label'] + "]]"
-                    variables_lines_out.append(var_name_line)
-                    variable_ameriflux_mapping[key] = value['Eddypro label']  # add variable name to the mapping
-                    name_row = moisture_xl_df[moisture_xl_df['Text'].apply(lambda x: x.strip().startswith("name"))]
-                    moisture_xl_df.iloc[moisture_xl_df.index == name_row.index[0]] = other_spaces + "name = " + key
-                    height_row = moisture_attr_df[moisture_attr_df['Text'].apply(lambda x:
-                                                                                 x.strip().startswith("height"))]
-                    # get height from met variable name
-                    height_cm = value['Depth (cm)']
-                    height = L1Format.get_corrected_height(height_cm)
-                    moisture_attr_df.iloc[moisture_attr_df.index == height_row.index[0]] = \
-                        other_spaces + "height = " + '-' + height + 'm'
-                    # change instrument according to the met tower variable name
-                    instrument_row = moisture_attr_df[moisture_attr_df['Text'].apply(
-                        lambda x: x.strip().startswith("instrument"))]
-                    instrument = value['Instrument']
-                    moisture_attr_df.iloc[moisture_attr_df.index == instrument_row.index[0]] = \
-                        other_spaces + "instrument = " + instrument
-                    # write the modified sections
-                    variables_lines_out.extend(moisture_attr_df['Text'].tolist())
-                    variables_lines_out.extend(moisture_xl_df['Text'].tolist())
-                else:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable", key, met_data_sheet_name)
-
-        if len(site_soil_temp_variables) > 0 and temp_attr_df is not None and temp_xl_df is not None:
+            variables_out.extend(L1Format.get_additional_soil_var(site_soil_moisture_variables, moisture_xl,
+                                                                  moisture_attr, met_data_variables,
+                                                                  met_data_sheet_name, variable_ameriflux_mapping))
+
+        if len(site_soil_temp_variables) > 0 and temp_attr is not None and temp_xl is not None:
             log.info("Writing additional soil temperature variables to L1 Variables")
             # write temp variables by modifying the attr and xl sections
-            for key, value in site_soil_temp_variables.items():
-                # write if met variable in met_data sheet
-                if L1Format.check_variable_exists(key, met_data_variables):
-                    var_name_line = var_spaces + "[[" + value['Eddypro label'] + "]]"
-                    variables_lines_out.append(var_name_line)
-                    variable_ameriflux_mapping[key] = value['Eddypro label']  # add variable name to the mapping
-                    name_row = temp_xl_df[temp_xl_df['Text'].apply(lambda x: x.strip().startswith("name"))]
-                    temp_xl_df.iloc[temp_xl_df.index == name_row.index[0]] = other_spaces + "name = " + key
-                    height_row = temp_attr_df[temp_attr_df['Text'].apply(lambda x: x.strip().startswith("height"))]
-                    # get height from met variable name
-                    height_cm = value['Depth (cm)']
-                    height = L1Format.get_corrected_height(height_cm)
-                    temp_attr_df.iloc[temp_attr_df.index == height_row.index[0]] = \
-                        other_spaces + "height = " + '-' + height + 'm'
-                    # change instrument according to the met tower variable name
-                    instrument_row = temp_attr_df[temp_attr_df['Text'].apply(lambda x:
-                                                                             x.strip().startswith("instrument"))]
-                    instrument = value['Instrument']
-                    temp_attr_df.iloc[temp_attr_df.index == instrument_row.index[0]] = \
-                        other_spaces + "instrument = " + instrument
-                    # write the modified sections
-                    variables_lines_out.extend(temp_attr_df['Text'].tolist())
-                    variables_lines_out.extend(temp_xl_df['Text'].tolist())
-                else:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable", key, met_data_sheet_name)
+            variables_out.extend(L1Format.get_additional_soil_var(site_soil_temp_variables, temp_xl, temp_attr,
+                                                                  met_data_variables, met_data_sheet_name,
+                                                                  variable_ameriflux_mapping))
 
         # return the variables mapping and output list
-        return variables_lines_out, variable_ameriflux_mapping
+        return variables_out, variable_ameriflux_mapping
 
     @staticmethod
-    def format_ameriflux_var(df, var_start_end, ameriflux_key, full_output_variables, met_data_variables,
-                             met_data_sheet_name, full_output_sheet_name,
-                             mainstem_variables_mapping, spaces=SPACES):
+    def set_soil_height_instrument(attr, soil_variable):
         """
-            Change variable units for Ameriflux only variables
+            Set the height and instrument of soil variable from Soils key
+            Args:
+                attr (obj): ControlSection object for attr section of the soil variable
+                soil_variable (dict): Soil variable details from Soils key file
+            Returns:
+                None
+        """
+        # get height from met variable name
+        height = L1Format.get_corrected_height(soil_variable['Depth (cm)'])
+        attr.set_value("height", '-' + height + 'm')
+        # change instrument according to the met tower variable name
+        attr.set_value("instrument", soil_variable['Instrument'])
+
+    @staticmethod
+    def get_additional_soil_var(site_soil_variables, soil_xl, soil_attr, met_data_variables, met_data_sheet_name,
+                                variable_ameriflux_mapping):
+        """
+            Create variables for soil variables in Soils key that are not in input L1.
+            The xl and attr sections of the last soil variable in input L1 are used for the variables.
+            Args:
+                site_soil_variables (dict): Dictionary for soil variable details from Soils key file
+                soil_xl (obj): ControlSection object for xl section of a soil variable
+                soil_attr (obj): ControlSection object for attr section of a soil variable
+                met_data_variables (set): Set of met_data variable names
+                met_data_sheet_name (str): Sheet name for met_data sheet
+                variable_ameriflux_mapping (dict): Mapping of variable to ameriflux-friendly variable names in L1
+            Returns:
+                variables_out (list) : List of ControlSection objects for variables to be written to l1_ameriflux
+        """
+        variables_out = []
+        # copy the sections so that the variable they are read from is not modified
+        soil_xl, soil_attr = soil_xl.copy(), soil_attr.copy()
+        for key, value in site_soil_variables.items():
+            # write if met variable in met_data sheet
+            if L1Format.check_variable_exists(key, met_data_variables):
+                var_out = ControlSection(value['Eddypro label'], 2)
+                variable_ameriflux_mapping[key] = value['Eddypro label']  # add variable name to the mapping
+                soil_xl.set_value("name", key)
+                L1Format.set_soil_height_instrument(soil_attr, value)
+                # write the modified sections
+                var_out.add_section(soil_attr.copy())
+                var_out.add_section(soil_xl.copy())
+                variables_out.append(var_out)
+            else:
+                log.warning("Variable %s not found in %s sheet. Skipping variable", key, met_data_sheet_name)
+        return variables_out
 
+    @staticmethod
+    def get_ameriflux_key_index(ameriflux_key, key_column):
+        """
+            Index the rows of ameriflux key by a column. The first row is used for duplicate values.
             Args:
-                df (obj): Pandas dataframe with all variable lines from L1_ameriflux_only.txt
-                var_start_end (list): List of tuple, the starting and ending index for each ameriflux variable
                 ameriflux_key (obj): Pandas dataframe of AmeriFlux-Mainstem varible name sheet
-                full_output_variables (list): List of full_output variable names
-                met_data_variables (list): List of met_data variable names
+                key_column (str): Column name to index the rows
+            Returns:
+                (dict): Mapping of the column value to the row as a dictionary
+        """
+        key_index = {}
+        for row in ameriflux_key.to_dict('records'):
+            key_index.setdefault(row[key_column], row)
+        return key_index
+
+    @staticmethod
+    def get_erroring_variables(erroring_variable_key):
+        """
+            Get the PyFluxPro labels of erroring variables that are not to be renamed
+            Args:
+                erroring_variable_key (str/obj): Pandas dataframe of L1 erroring variables key.
+                                            String if the erroring variables are to be renamed
+            Returns:
+                (set): Set of PyFluxPro labels. Empty if erroring_variable_key is not a dataframe
+        """
+        if not isinstance(erroring_variable_key, pd.DataFrame):
+            return set()
+        return set(erroring_variable_key['PyFluxPro label'].dropna())
+
+    @staticmethod
+    def add_to_mapping(variable_mapping, ameriflux_names, var_name, var_ameriflux_name):
+        """
+            Add variable name to the mapping and keep the set of ameriflux names in the mapping updated
+            Args:
+                variable_mapping (dict): Mapping of variable to ameriflux-friendly variable names
+                ameriflux_names (set): Ameriflux-friendly names in the mapping
+                var_name (str): Variable name
+                var_ameriflux_name (str): Ameriflux-friendly variable name
+            Returns:
+                None
+        """
+        variable_mapping[var_name] = var_ameriflux_name
+        ameriflux_names.add(var_ameriflux_name)
+
+    @staticmethod
+    def format_ameriflux_var(variables, ameriflux_key_index, ameriflux_name_index,
+                             full_output_variables, met_data_variables,
+                             met_data_sheet_name, full_output_sheet_name, mainstem_variables_mapping):
+        """
+            Change variable units for Ameriflux only variables
+
+            Args:
+                variables (list): List of ControlSection objects for variables in L1_ameriflux_only.txt
+                ameriflux_key_index (dict): Rows of AmeriFlux-Mainstem key indexed by input sheet variable name
+                ameriflux_name_index (dict): Rows of AmeriFlux-Mainstem key indexed by ameriflux variable name
+                full_output_variables (set): Set of full_output variable names
+                met_data_variables (set): Set of met_data variable names
                 met_data_sheet_name (str): Sheet name for met_data sheet
                 full_output_sheet_name (str): Sheet name for full output
                 mainstem_variables_mapping (dict) : Mapping of mainstem variables
-                spaces (str): Spaces to be inserted before each section and line
             Returns:
-                variable_lines_out (list) : List of variables lines to be written to l1_ameriflux
+                variables_out (list) : List of ControlSection objects for variables to be written to l1_ameriflux
                 variables_mapping (dict) : Mapping of variables to ameriflux-friendly variable names in L1
         """
-        # define spaces for formatting in L1
-        var_spaces = spaces
-        attr_spaces = spaces + spaces
-        xl_spaces = spaces + spaces
-        other_spaces = spaces + spaces + spaces
-
-        variables_out = []  # variable lines to be written
+        variables_out = []  # variables to be written
         ameriflux_variables_mapping = {}
+        ameriflux_names = set()  # ameriflux-friendly names in the mapping
+        mainstem_ameriflux_names = set(mainstem_variables_mapping.values())
         # iterate over the variables
-        for start, end in var_start_end:
+        for var in variables:
             var_flag = False  # flag to see if variable has been changed or not
-            # get variable, xl and attr sections as separate dataframes
-            var, xl_df, attr_df = L1Format.get_var_xl_attr_df(df, start, end)
-            var_name = var['Text'].iloc[0].strip('[]')  # get variable name
+            var_name = var.name  # get variable name
             # check if variable is already written to L1
-            if (var_name in ameriflux_variables_mapping.keys()) or (var_name in ameriflux_variables_mapping.values()) \
-                    or (var_name in mainstem_variables_mapping.keys()) or \
-                    (var_name in mainstem_variables_mapping.values()):
+            if (var_name in ameriflux_variables_mapping) or (var_name in ameriflux_names) \
+                    or (var_name in mainstem_variables_mapping) or (var_name in mainstem_ameriflux_names):
                 log.warning("Variable " + var_name + " is already written to L1. Skipping this variable.")
                 continue
-            # set the spacing for variable name line
-            var_name_index = var.index[0]  # get index of variable name
-            var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_name + "]]"
-            ameriflux_variables_mapping[var_name] = var_name
+            L1Format.add_to_mapping(ameriflux_variables_mapping, ameriflux_names, var_name, var_name)
+            var_out = var.copy()
+            # get xl and attr sections
+            xl, attr = L1Format.get_xl_attr_sections(var_out)
+            if xl is None:
+                continue
 
             # get met tower variable name
-            xl_name_row = xl_df[xl_df['Text'].apply(lambda x: x.strip().startswith("name"))]
-            xl_var_name = xl_name_row['Text'].iloc[0].split('=')[1].strip()
+            xl_var_name = xl.get_value("name")
             # get the corrected met tower variable name
             met_tower_var_name = L1Format.get_corrected_met_tower_var_name(xl_var_name)
             # get which sheet
-            sheet_row = xl_df[xl_df['Text'].apply(lambda x: x.strip().startswith("sheet"))]
-            sheet_name = sheet_row['Text'].iloc[0].split('=')[1].strip()
+            sheet_name = xl.get_value("sheet")
 
             # check if variable present in specified sheet
-            if sheet_name == full_output_sheet_name:
-                found_full_output = L1Format.check_variable_exists(met_tower_var_name, full_output_variables)
-                if not found_full_output:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable",
-                                met_tower_var_name, full_output_sheet_name)
-                    continue
-            elif sheet_name == met_data_sheet_name:
-                found_met_data = L1Format.check_variable_exists(met_tower_var_name, met_data_variables)
-                if not found_met_data:
-                    log.warning("Variable %s not found in %s sheet. Skipping variable",
-                                met_tower_var_name, met_data_sheet_name)
-                    continue
-            else:
-                # sheet name is not found
-                log.warning("Sheet name %s not found for %s. Skipping variable", sheet_name, var_name)
+            if not L1Format.is_variable_in_sheet(var_name, met_tower_var_name, sheet_name,
+                                                 full_output_variables, met_data_variables,
+                                                 met_data_sheet_name, full_output_sheet_name):
                 continue
 
             # format text as per L1
-            xl_name_row_index = xl_name_row.index[0]
-            xl_df['Text'].iloc[xl_df.index == xl_name_row_index] = "name = " + met_tower_var_name
-            xl_df['Text'].iloc[0] = xl_spaces + xl_df['Text'].iloc[0]
-            xl_df['Text'].iloc[1:] = other_spaces + xl_df['Text'].iloc[1:]
-
-            # format text as per L1
-            attr_df['Text'].iloc[0] = attr_spaces + attr_df['Text'].iloc[0]
-            attr_df['Text'].iloc[1:] = other_spaces + attr_df['Text'].iloc[1:]
-
-            # update the variable df
-            var.update(xl_df)
-            var.update(attr_df)
-
-            units_row = attr_df[attr_df['Text'].apply(lambda x: x.strip().startswith("units"))]
+            xl.set_value("name", met_tower_var_name)
 
-            if ameriflux_key['Input sheet variable name'].isin([met_tower_var_name]).any():
+            if met_tower_var_name in ameriflux_key_index:
                 var_flag = True
                 # check if var name should be changed for Ameriflux
-                var_ameriflux_name = ameriflux_key.loc[ameriflux_key['Input sheet variable name'] == met_tower_var_name,
-                                                       'Ameriflux variable name'].iloc[0]
+                var_ameriflux_name = ameriflux_key_index[met_tower_var_name]['Ameriflux variable name']
                 # add to the mapping, both met tower and original pyfluxpro names
-                ameriflux_variables_mapping[var_name] = var_ameriflux_name
-                ameriflux_variables_mapping[met_tower_var_name] = var_ameriflux_name
-                var['Text'].iloc[var.index == var_name_index] = var_spaces + "[[" + var_ameriflux_name + "]]"
-                if units_row.shape[0] > 0:
-                    # check if units need to be changed
-                    var_units_index = units_row.index[0]
-                    var_ameriflux_units = \
-                        ameriflux_key.loc[ameriflux_key['Ameriflux variable name'] == var_ameriflux_name,
-                                          'Units after formatting'].iloc[0]
-                    if not pd.isnull(var_ameriflux_units):
-                        # if unit needs to be changed, if its not NaN in the ameriflux-mainstem sheet
-                        # replace units only if it is not empty
-                        # NOTES 12
-                        var['Text'].iloc[var.index == var_units_index] = other_spaces + \
-                                                                         "units = " + var_ameriflux_units
+                L1Format.add_to_mapping(ameriflux_variables_mapping, ameriflux_names, var_name, var_ameriflux_name)
+                L1Format.add_to_mapping(ameriflux_variables_mapping, ameriflux_names, met_tower_var_name,
+                                        var_ameriflux_name)
+                var_out.rename(var_ameriflux_name)
+                # check if units need to be changed
+                var_ameriflux_units = ameriflux_name_index[var_ameriflux_name]['Units after formatting']
+                if not pd.isnull(var_ameriflux_units):
+                    # if unit needs to be changed, if its not NaN in the ameriflux-mainstem sheet
+                    # replace units only if it is not empty
+                    # NOTES 12
+                    attr.set_value("units", var_ameriflux_units)
             if var_flag:
-                variables_out.extend(var['Text'].tolist())
+                variables_out.append(var_out)
 
         # end of for loop
         return variables_out, ameriflux_variables_mapping
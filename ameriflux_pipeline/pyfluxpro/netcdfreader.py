@@ -0,0 +1,171 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import pandas as pd
+import numpy as np
+import re
+# NOTES 18
+from netCDF4 import num2date
+import logging
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class NetCDFReader:
+    """
+    Class to read the variables of PyFluxPro netCDF output as columns of a single numerical array
+    """
+
+    # microseconds in one unit of the netCDF time axis
+    TIME_UNIT_MICROSECONDS = {'days': 86400000000, 'day': 86400000000, 'd': 86400000000,
+                              'hours': 3600000000, 'hour': 3600000000, 'hrs': 3600000000, 'hr': 3600000000,
+                              'h': 3600000000,
+                              'minutes': 60000000, 'minute': 60000000, 'mins': 60000000, 'min': 60000000,
+                              'seconds': 1000000, 'second': 1000000, 'secs': 1000000, 'sec': 1000000, 's': 1000000}
+
+    @staticmethod
+    def get_timestamps(time_var):
+        """
+        Convert the numerical time axis of netCDF file to datetime64 array.
+        Numeric time is converted with numpy datetime arithmetic. Time units that cannot be handled this way are
+        converted using netCDF4 num2date.
+
+        Args:
+            time_var (obj): netCDF4 Variable object for time
+        Returns:
+            (obj): Numpy datetime64 array with microsecond resolution
+        """
+        time_units = time_var.units
+        time_values = np.ma.filled(np.ma.asarray(time_var[:], dtype=np.float64), np.nan).reshape(-1)
+        match = re.match(r'^\s*(\w+)\s+since\s+(.+?)\s*$', time_units)
+        origin = None
+        if match and match.group(1).lower() in NetCDFReader.TIME_UNIT_MICROSECONDS:
+            # origins outside of pandas timestamp bounds, like the ones before gregorian calendar, raise an error
+            try:
+                origin = pd.Timestamp(match.group(2))
+            except ValueError:
+                origin = None
+        if origin is None or origin.tz is not None or np.isnan(time_values).any():
+            log.info("Converting time with num2date for time units %s", time_units)
+            # calendar can be 365_day / gregorian
+            time_data = num2date(time_var[:], units=time_units, calendar='gregorian').data.reshape(-1)
+            return np.array([t.isoformat() for t in time_data], dtype='datetime64[us]')
+
+        unit_microseconds = NetCDFReader.TIME_UNIT_MICROSECONDS[match.group(1).lower()]
+        # round to microseconds the same way as num2date. values 1 microsecond away from a whole second are
+        # float errors and are moved to the whole second
+        scaled_time = time_values.astype(np.longdouble) * unit_microseconds
+        offsets = np.rint(scaled_time).astype(np.int64)
+        offsets = np.where(offsets % 1000000 == 1, np.floor(scaled_time).astype(np.int64), offsets)
+        offsets = np.where(offsets % 1000000 == 999999, np.ceil(scaled_time).astype(np.int64), offsets)
+        return np.datetime64(origin.to_datetime64(), 'us') + offsets.astype('timedelta64[us]')
+
+    @staticmethod
+    def format_timestamps(timestamps):
+        """
+        Format datetime64 array as per ameriflux standards, YYYYMMDDHHMM
+
+        Args:
+            timestamps (obj): Numpy datetime64 array
+        Returns:
+            (obj): Numpy string array
+        """
+        # datetime_as_string gives YYYY-MM-DDTHH:MM. remove the separators
+        timestamps = np.datetime_as_string(timestamps, unit='m')
+        for separator in ['-', 'T', ':']:
+            timestamps = np.char.replace(timestamps, separator, '')
+        return timestamps
+
+    @staticmethod
+    def get_readable_variables(dataset, var_names, num_rows):
+        """
+        Get the variables having one value for each timestamp. Other variables can not be read as columns.
+
+        Args:
+            dataset (obj): netCDF4 Dataset object
+            var_names (list): List of variable names
+            num_rows (int): Number of values expected in each variable. Length of time axis
+        Returns:
+            (list): List of variable names that can be read
+        """
+        return [var_name for var_name in var_names if NetCDFReader.has_num_rows(dataset.variables[var_name], num_rows)]
+
+    @staticmethod
+    def get_integer_variables(dataset, var_names):
+        """
+        Get the integer variables without missing values. Integer variables with missing values are read as floats,
+        the same way as pandas reads the whole variable, so that all rows of a variable are written alike.
+
+        Args:
+            dataset (obj): netCDF4 Dataset object
+            var_names (list): List of variable names
+        Returns:
+            (list): List of variable names of the integer variables without missing values
+        """
+        return [var_name for var_name in var_names if np.issubdtype(dataset.variables[var_name].dtype, np.integer)
+                and not np.ma.is_masked(dataset.variables[var_name][:])]
+
+    @staticmethod
+    def read_variables(dataset, var_names, start, stop, decimals=3, columns=None, int_var_names=None):
+        """
+        Read the rows from start to stop of the variables of netCDF file into a single 2-D float array.
+        Masked values are read as NaN. Values are rounded to the given decimals.
+        Variables that are not numerical are read as NaN. Integer variables without missing values are kept as
+        integers.
+
+        Args:
+            dataset (obj): netCDF4 Dataset object
+            var_names (list): List of variable names to read. Variables should have one value for each timestamp
+            start (int): First row to read
+            stop (int): Row to stop reading at. This row is not read
+            decimals (int): Number of decimal points to round the values
+            columns (list): Column names for the variables, in the same order. Variable names if None
+            int_var_names (list): Variables kept as integers, from get_integer_variables. The integer variables
+                                without missing values in the rows read if None
+        Returns:
+            (obj): Pandas DataFrame object with variables as columns
+        """
+        if columns is None:
+            columns = var_names
+        values = np.full((stop - start, len(var_names)), np.nan)
+        int_cols = []
+        for col_idx, var_name in enumerate(var_names):
+            var = dataset.variables[var_name]
+            if not np.issubdtype(var.dtype, np.number):
+                continue
+            var_data = var[start:stop]
+            values[:, col_idx] = np.ma.filled(np.ma.asarray(var_data, dtype=np.float64), np.nan).reshape(-1)
+            if int_var_names is None:
+                is_int = np.issubdtype(var.dtype, np.integer) and not np.ma.is_masked(var_data)
+            else:
+                is_int = var_name in int_var_names
+            if is_int:
+                int_cols.append(columns[col_idx])
+        # round all variables at once
+        np.round(values, decimals=decimals, out=values)
+
+        df = pd.DataFrame(values, columns=columns)
+        if int_cols:
+            df[int_cols] = df[int_cols].astype(np.int64)
+        return df
+
+    @staticmethod
+    def has_num_rows(var, num_rows):
+        """
+        Check if the variable has the expected number of values along the time axis
+
+        Args:
+            var (obj): netCDF4 Variable object
+            num_rows (int): Number of values expected
+        Returns:
+            (bool): True if the variable has the number of values, False if not
+        """
+        if var.ndim < 1 or var.shape[0] != num_rows or var.size != num_rows:
+            log.warning("Variable %s has shape %s, expected %d values. Variable is not read", var.name, var.shape,
+                        num_rows)
+            return False
+        return True
@@ -6,15 +6,17 @@
 
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import os.path
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 # NOTES 18
-from netCDF4 import Dataset, num2date
+from netCDF4 import Dataset
 import logging
 
-from utils.process_validation import DataValidation
+from utils.keycache import KeyCache
 import utils.data_util as data_util
+from pyfluxpro.netcdfreader import NetCDFReader
 
 # create log object with current module name
 log = logging.getLogger(__name__)
@@ -25,117 +27,363 @@ class OutputFormat:
        Class to implement formatting of PyFluxPro output .nc file as per guide for Ameriflux submission
     """
 
+    # number of rows of netCDF output formatted and written to csv at a time. one year of 30min data
+    CHUNK_ROWS = 17520
+    # variables not written for Ameriflux
+    UNWANTED_VARIABLES = frozenset(['latitude', 'longitude', 'crs', 'station_name'])
+    QCFLAG_SUFFIX = '_QCFlag'
+    # met data variables not written for Ameriflux, matched ignoring the case. step 2 in guide
+    # precipitation data is removed from met data
+    UNWANTED_MET_DATA = frozenset(['xldatetime', 'time', 'hour', 'second', 'minute', 'day', 'month', 'year', 'hdh',
+                                   'ddd', 'fsd_syn', 'solar_altitude', 'co2_sigma', 'h2o_sigma',
+                                   'precip_iws', 'p_rain', 'rain', 'rainfall'])
+
     # main method which calls other functions
     @staticmethod
-    def data_formatting(input_file, file_meta_data_file, erroring_variable_flag, erroring_variable_key):
+    def data_formatting(input_file, file_meta_data_file, erroring_variable_flag, erroring_variable_key,
+                        key_cache_dir=''):
         """
         Method to implement data formatting for PyFluxPro output. Calls other methods.
+        The whole output is formatted in memory. Use write_ameriflux_csv to write large outputs.
 
         Args:
-            input_file (str): A file path for the input data. This is the PyFluxPro input excel sheet
+            input_file (str): A file path for the input data. This is the PyFluxPro L2 run output netCDF file
             file_meta_data_file (str) : Path for the file containing the meta data, typically the first line of Met data
             erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
                                         been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
             erroring_variable_key (str): Variable name key used to match the original variable names to Ameriflux names
                                         for variables throwing an error in PyFluxPro L1.
                                         This is an excel file named L1_erroring_variables.xlsx
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
         Returns:
             obj: Pandas DataFrame object formatted for Ameriflux
             filename (str): Filename for writing the dataframe to csv
         """
+        l2, l2_keys, time_data = OutputFormat.read_l2_output(input_file)
+        if l2 is None:
+            return None, None
+        column_labels = OutputFormat.get_column_labels(erroring_variable_flag, erroring_variable_key, key_cache_dir)
+        header = OutputFormat.get_header(l2_keys, column_labels)
+        int_keys = NetCDFReader.get_integer_variables(l2, l2_keys)
+        df = OutputFormat.format_rows(l2, l2_keys, int_keys, time_data, 0, len(time_data), header)
+        l2.close()
+
+        # fill all empty cells with -9999
+        df = df.astype(object).where(df.notna(), '-9999')
+        ameriflux_file_name = OutputFormat.get_ameriflux_file_name(file_meta_data_file, time_data)
+
+        # return processed dataframe and ameriflux filename
+        return df, ameriflux_file_name
+
+    @staticmethod
+    def write_ameriflux_csv(input_file, file_meta_data_file, erroring_variable_flag, erroring_variable_key,
+                            output_dir, chunk_rows=CHUNK_ROWS, key_cache_dir=''):
+        """
+        Method to format PyFluxPro output and write it to the Ameriflux csv file. Calls other methods.
+        The netCDF file is read, formatted and written chunk_rows timestamps at a time to keep the memory bounded.
+
+        Args:
+            input_file (str): A file path for the input data. This is the PyFluxPro L2 run output netCDF file
+            file_meta_data_file (str) : Path for the file containing the meta data, typically the first line of Met data
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
+                                        been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
+            erroring_variable_key (str): Variable name key used to match the original variable names to Ameriflux names
+                                        for variables throwing an error in PyFluxPro L1.
+                                        This is an excel file named L1_erroring_variables.xlsx
+            output_dir (str): Directory to write the Ameriflux csv file
+            chunk_rows (int): Number of rows formatted and written at a time
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (str): File path of the Ameriflux csv file. None if formatting is not successful
+        """
+        l2, l2_keys, time_data = OutputFormat.read_l2_output(input_file)
+        if l2 is None:
+            return None
+        column_labels = OutputFormat.get_column_labels(erroring_variable_flag, erroring_variable_key, key_cache_dir)
+        header = OutputFormat.get_header(l2_keys, column_labels)
+        ameriflux_file_name = OutputFormat.get_ameriflux_file_name(file_meta_data_file, time_data)
+        output_file = os.path.join(output_dir, ameriflux_file_name + '.csv')
+        # integer variables with missing values in any chunk are written as floats in all chunks
+        int_keys = NetCDFReader.get_integer_variables(l2, l2_keys)
+
+        OutputFormat.write_rows_csv(l2, l2_keys, int_keys, time_data, 0, len(time_data), header, output_file,
+                                    chunk_rows)
+        l2.close()
+        return output_file
+
+    @staticmethod
+    def write_ameriflux_csv_by_year(input_file, file_meta_data_file, erroring_variable_flag, erroring_variable_key,
+                                    output_dir, max_workers=None, chunk_rows=CHUNK_ROWS, key_cache_dir=''):
+        """
+        Method to format PyFluxPro output and write one Ameriflux csv file for each calendar year. See NOTES 26.
+        The years are formatted and written in parallel by a pool of worker processes.
+
+        Args:
+            input_file (str): A file path for the input data. This is the PyFluxPro L2 run output netCDF file
+            file_meta_data_file (str) : Path for the file containing the meta data, typically the first line of Met data
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
+                                        been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
+            erroring_variable_key (str): Variable name key used to match the original variable names to Ameriflux names
+                                        for variables throwing an error in PyFluxPro L1.
+                                        This is an excel file named L1_erroring_variables.xlsx
+            output_dir (str): Directory to write the Ameriflux csv files
+            max_workers (int): Number of worker processes. Number of CPUs if None
+            chunk_rows (int): Number of rows formatted and written at a time
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (list): File paths of the Ameriflux csv files in the order of years. None if formatting is not successful
+        """
+        l2, l2_keys, time_data = OutputFormat.read_l2_output(input_file, check_span=False)
+        if l2 is None:
+            return None
+        # integer variables with missing values in any year are written as floats in all years
+        int_keys = NetCDFReader.get_integer_variables(l2, l2_keys)
+        l2.close()
+        column_labels = OutputFormat.get_column_labels(erroring_variable_flag, erroring_variable_key, key_cache_dir)
+        header = OutputFormat.get_header(l2_keys, column_labels)
+
+        jobs = []
+        for year, start, stop in OutputFormat.get_year_rows(time_data):
+            year_time_data = time_data[start:stop]
+            start_timestamp = pd.Timestamp(year_time_data[0])
+            end_timestamp = pd.Timestamp(year_time_data[-1] + np.timedelta64(30, 'm'))
+            if not OutputFormat.check_timestamp_span(start_timestamp, end_timestamp):
+                log.warning("Timestamp start and Timestamp end of year %d does not span the whole year", year)
+            ameriflux_file_name = OutputFormat.get_ameriflux_file_name(file_meta_data_file, year_time_data)
+            jobs.append((input_file, l2_keys, int_keys, start, stop, header,
+                         os.path.join(output_dir, ameriflux_file_name + '.csv'), chunk_rows))
+        log.info("Write data of %d years to csv files in %s", len(jobs), output_dir)
+
+        # worker processes of a pool, like the jobs of pipeline_batch, cannot start their own workers
+        if max_workers == 1 or len(jobs) <= 1 or multiprocessing.current_process().daemon:
+            output_files = [OutputFormat.write_year_csv(*job) for job in jobs]
+        else:
+            # each worker opens the netCDF file and reads only the rows of its year
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                output_files = list(executor.map(OutputFormat.write_year_csv, *zip(*jobs)))
+        if None in output_files:
+            log.error("Ameriflux csv files not written for all years")
+            return None
+        return output_files
+
+    @staticmethod
+    def write_year_csv(input_file, l2_keys, int_keys, start, stop, header, output_file, chunk_rows=CHUNK_ROWS):
+        """
+        Method to format the rows of one year of PyFluxPro output and write them to an Ameriflux csv file.
+        Run in a worker process by write_ameriflux_csv_by_year.
+
+        Args:
+            input_file (str): A file path for the PyFluxPro L2 run output netCDF file
+            l2_keys (list): List of variable names to be written for Ameriflux
+            int_keys (list): List of variable names written as integers, from NetCDFReader.get_integer_variables
+            start (int): First row of the year
+            stop (int): Row to stop at. This row is not written
+            header (list): List of column names from get_header
+            output_file (str): A file path for the Ameriflux csv file
+            chunk_rows (int): Number of rows formatted and written at a time
+        Returns:
+            (str): File path of the Ameriflux csv file. None if the file is not written
+        """
+        try:
+            l2 = Dataset(input_file, mode='r')
+        except OSError as e:
+            log.error("Unable to read netCDF file %s %s", input_file, e)
+            return None
+        time_data = NetCDFReader.get_timestamps(l2.variables['time'])
+        OutputFormat.write_rows_csv(l2, l2_keys, int_keys, time_data, start, stop, header, output_file, chunk_rows)
+        l2.close()
+        return output_file
+
+    @staticmethod
+    def write_rows_csv(l2, l2_keys, int_keys, time_data, start, stop, header, output_file, chunk_rows=CHUNK_ROWS):
+        """
+        Method to format the rows from start to stop of PyFluxPro output and write them to a csv file,
+        chunk_rows timestamps at a time
+
+        Args:
+            l2 (obj): netCDF4 Dataset object
+            l2_keys (list): List of variable names to be written for Ameriflux
+            int_keys (list): List of variable names written as integers, from NetCDFReader.get_integer_variables
+            time_data (obj): Numpy datetime64 array of timestamps
+            start (int): First row to write
+            stop (int): Row to stop writing at. This row is not written
+            header (list): List of column names from get_header
+            output_file (str): A file path for the csv file
+            chunk_rows (int): Number of rows formatted and written at a time
+        Returns:
+            None
+        """
+        log.info("Write data to csv file %s", output_file)
+        with open(output_file, 'w', newline='') as f:
+            for chunk_start in range(start, stop, chunk_rows):
+                chunk_stop = min(chunk_start + chunk_rows, stop)
+                df = OutputFormat.format_rows(l2, l2_keys, int_keys, time_data, chunk_start, chunk_stop, header)
+                # fill all empty cells with -9999
+                df.to_csv(f, header=(chunk_start == start), index=False, na_rep='-9999')
+
+    @staticmethod
+    def get_year_rows(time_data):
+        """
+        Get the rows of each calendar year. A row belongs to the year of its TIMESTAMP_START, so that the row ending
+        at Jan 01 00:00 is the last row of the previous year. See NOTES 26.
+
+        Args:
+            time_data (obj): Numpy datetime64 array of timestamps in increasing order
+        Returns:
+            (list): List of year, first row and the row to stop at for each year in the data
+        """
+        years = time_data.astype('datetime64[Y]').astype(int) + 1970
+        # first row of each year
+        starts = np.flatnonzero(np.diff(years, prepend=years[0] - 1))
+        stops = np.append(starts[1:], len(time_data))
+        return [(int(years[start]), int(start), int(stop)) for start, stop in zip(starts, stops)]
+
+    @staticmethod
+    def read_l2_output(input_file, check_span=True):
+        """
+        Open the PyFluxPro L2 run output and get the variables to be written for Ameriflux and the timestamps
+
+        Args:
+            input_file (str): A file path for the PyFluxPro L2 run output netCDF file
+            check_span (bool): Warn if the timestamps do not span a whole year
+        Returns:
+            l2 (obj): netCDF4 Dataset object. None if the file is not valid
+            l2_keys (list): List of variable names to be written for Ameriflux
+            time_data (obj): Numpy datetime64 array of timestamps
+        """
         if os.path.splitext(input_file)[1] != '.nc':
             log.error("Run output file not in netCDF format. .nc extension expected")
-            return None, None
+            return None, None, None
         try:
             log.info("Reading netCDF file %s", input_file)
             l2 = Dataset(input_file, mode='r')  # read netCDF file
         except KeyError or IOError as e:
             log.error("Unable to read netCDF file %s %s", input_file, e)
-            return None, None
-
-        l2_keys = list(l2.variables.keys())
-        # list of unwanted variables to be removed
-        unwanted_variables = ['latitude', 'longitude', 'crs', 'station_name']
-        l2_keys = [ele for ele in l2_keys if ele not in unwanted_variables]
-        # remove QCFlag variables
-        l2_keys = [ele for ele in l2_keys if not ele.endswith('_QCFlag')]
+            return None, None, None
 
         # NOTES 16. Get time data
-        if 'time' not in l2_keys:
+        if 'time' not in l2.variables:
             log.error("time variable not in L2 output")
-            return None, None
-        time_var = l2.variables['time']
-        time_units = time_var.units
-        time = time_var[:]
-        time = num2date(time, units=time_units, calendar='gregorian')  # calendar can be 365_day / gregorian
-        time_data = time.data
+            l2.close()
+            return None, None, None
+        time_data = NetCDFReader.get_timestamps(l2.variables['time'])
         if len(time_data) < 1:
             log.error("Check timestamp column in file %s", input_file)
-            return None, None
+            l2.close()
+            return None, None, None
 
-        # create a dataframe
-        df = pd.DataFrame({'TIMESTAMP': [t.isoformat() for t in time_data]})
-        # NOTES 16
-        # insert TIMESTAMP_START and TIMESTAMP_END
-        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'])
-        # set timestamp as timestamp_start
-        # shift timestamp 30min ahead and store in timestamp_end. step 1 in guide
-        df.insert(1, 'TIMESTAMP_START', df['TIMESTAMP'])
-        df.insert(2, 'TIMESTAMP_END', df['TIMESTAMP'] + timedelta(minutes=30))
         # check if timestamp spans an entire year. Else throw a warning. Step 6 in guide
-        start_timestamp = df['TIMESTAMP_START'].iloc[0]
-        end_timestamp = df['TIMESTAMP_END'].iloc[-1]
-        if not OutputFormat.check_timestamp_span(start_timestamp, end_timestamp):
+        start_timestamp = pd.Timestamp(time_data[0])
+        end_timestamp = pd.Timestamp(time_data[-1] + np.timedelta64(30, 'm'))
+        if check_span and not OutputFormat.check_timestamp_span(start_timestamp, end_timestamp):
             log.warning("Timestamp start and Timestamp end does not span the whole year")
 
+        l2_keys = NetCDFReader.get_readable_variables(l2, OutputFormat.get_variables_to_read(l2), len(time_data))
+        return l2, l2_keys, time_data
+
+    @staticmethod
+    def get_variables_to_read(l2):
+        """
+        Get the variables to be written for Ameriflux from the variable names of the netCDF file.
+        The variables are selected before reading any data, so that the other variables are never read.
+
+        Args:
+            l2 (obj): netCDF4 Dataset object
+        Returns:
+            (list): List of variable names in the order of the file
+        """
+        var_names = []
+        for var_name in l2.variables:
+            if var_name in OutputFormat.UNWANTED_VARIABLES or var_name.endswith(OutputFormat.QCFLAG_SUFFIX) or \
+                    var_name.lower() in OutputFormat.UNWANTED_MET_DATA:
+                continue
+            if var_name in l2.dimensions:
+                # coordinate variables like time are not written as columns
+                continue
+            var_names.append(var_name)
+        return var_names
+
+    @staticmethod
+    def get_header(l2_keys, column_labels):
+        """
+        Get the column names of the Ameriflux csv file. Erroring variables are renamed back to Ameriflux-friendly
+        variables.
+
+        Args:
+            l2_keys (list): List of variable names to be written for Ameriflux
+            column_labels (dict): Mapping of PyFluxPro variable names to Ameriflux variable names
+        Returns:
+            (list): List of column names, starting with the timestamp columns
+        """
+        return ['TIMESTAMP_START', 'TIMESTAMP_END'] + [column_labels.get(var_name, var_name) for var_name in l2_keys]
+
+    @staticmethod
+    def format_rows(l2, l2_keys, int_keys, time_data, start, stop, header):
+        """
+        Format the rows from start to stop of PyFluxPro output for Ameriflux
+
+        Args:
+            l2 (obj): netCDF4 Dataset object
+            l2_keys (list): List of variable names to be written for Ameriflux
+            int_keys (list): List of variable names written as integers, from NetCDFReader.get_integer_variables
+            time_data (obj): Numpy datetime64 array of timestamps
+            start (int): First row to format
+            stop (int): Row to stop formatting at. This row is not formatted
+            header (list): List of column names from get_header
+        Returns:
+            obj: Pandas DataFrame object formatted for Ameriflux
+        """
+        # add met data to dataframe. values are read as numeric and rounded to 3 decimal points
+        # variables are named with the Ameriflux column names when they are read
+        df = NetCDFReader.read_variables(l2, l2_keys, start, stop, decimals=3, columns=header[2:],
+                                         int_var_names=int_keys)
+        # NOTES 16
+        # set timestamp as timestamp_start
+        # shift timestamp 30min ahead and store in timestamp_end. step 1 in guide
         # format timestamp columns as per ameriflux standards. step 5 in guide
-        timestamp_cols = ['TIMESTAMP_START', 'TIMESTAMP_END']
-        for col in timestamp_cols:
-            df[col] = df[col].map(lambda t: t.strftime('%Y%m%d%H%M'))
-        # drop additional time columns
-        df.drop(columns=['TIMESTAMP'], inplace=True)
-
-        # add met data to dataframe
-        for var_name in l2_keys:
-            df[var_name] = l2.variables[var_name][:].flatten()
-            # convert to numeric and round to 3 decimal points
-            df[var_name] = df[var_name].apply(pd.to_numeric, errors='coerce')
-            df[var_name] = df[var_name].round(decimals=3)
-
-        # drop some met data columns if exists
-        # step 2 in guide
-        # remove precipitation data from met sheet
-        unwanted_met_data = ['xldatetime', 'time', 'hour', 'second', 'minute', 'day', 'month', 'year', 'hdh', 'ddd',
-                             'fsd_syn', 'solar_altitude', 'co2_sigma', 'h2o_sigma',
-                             'precip_iws', 'p_rain', 'rain', 'rainfall']
-        # get columns that match unwanted met data.
-        met_data_col_delete = OutputFormat.find_met_data_cols(df, unwanted_met_data)
-        df.drop(columns=met_data_col_delete, errors='ignore', inplace=True)
-
-        # rename the erroring variables back to Ameriflux-friendly variables
+        timestamp = time_data[start:stop]
+        df.insert(0, header[0], NetCDFReader.format_timestamps(timestamp))
+        df.insert(1, header[1], NetCDFReader.format_timestamps(timestamp + np.timedelta64(30, 'm')))
+        return df
+
+    @staticmethod
+    def get_column_labels(erroring_variable_flag, erroring_variable_key, key_cache_dir):
+        """
+        Get the mapping to rename the erroring variables back to Ameriflux-friendly variables
+
+        Args:
+            erroring_variable_flag (str): A flag denoting whether some PyFluxPro variables (erroring variables) have
+                                        been renamed to Ameriflux labels. Y is renamed, N if not. By default it is N.
+            erroring_variable_key (str): Variable name key used to match the original variable names to Ameriflux names
+                                        for variables throwing an error in PyFluxPro L1.
+            key_cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (dict): Mapping of PyFluxPro variable names to Ameriflux variable names
+        """
+        column_labels = {}
         # convert erroring variables as a dictionary
         if erroring_variable_flag.lower() in ['n', 'no']:
             # if user chose not to replace the variable name, read the name mapping
-            erroring_variable_key = pd.read_excel(erroring_variable_key)  # read L1 erroring variable name matching file
-            if DataValidation.is_valid_erroring_variables_key(erroring_variable_key):
-                # strip column names of extra spaces and convert to lowercase
-                erroring_variable_key.columns = erroring_variable_key.columns.str.strip().str.lower()
-                ameriflux_col = erroring_variable_key.filter(regex="ameriflux").columns.to_list()
-                pyfluxpro_col = erroring_variable_key.filter(regex="pyfluxpro").columns.to_list()
-                if ameriflux_col and pyfluxpro_col:
-                    # the variable name mapping is valid and case sensitive as L2.txt is generated using the same
-                    erroring_variable_key['Ameriflux label'] = erroring_variable_key[ameriflux_col[0]]
-                    erroring_variable_key['PyFluxPro label'] = erroring_variable_key[pyfluxpro_col[0]]
-                    column_labels = dict(zip(erroring_variable_key['PyFluxPro label'],
-                                             erroring_variable_key['Ameriflux label']))
-                    df.rename(columns=column_labels, inplace=True)
+            # read L1 erroring variable name matching file
+            erroring_variable_key = KeyCache.read_erroring_variables_key(erroring_variable_key, key_cache_dir)
+            if erroring_variable_key is not None:
+                column_labels = dict(zip(erroring_variable_key['PyFluxPro label'],
+                                         erroring_variable_key['Ameriflux label']))
             else:
                 log.warning("L1 Erroring Variables.xlsx file invalid format. Proceeding without replacing label")
+        return column_labels
 
-        # fill all empty cells with -9999
-        df.replace(np.nan, '-9999', inplace=True)
-        df.replace('-9999.0', '-9999', inplace=True)
-        # create the filename used for Ameriflux submission
+    @staticmethod
+    def get_ameriflux_file_name(file_meta_data_file, time_data):
+        """
+        Create the filename used for Ameriflux submission
+
+        Args:
+            file_meta_data_file (str) : Path for the file containing the meta data, typically the first line of Met data
+            time_data (obj): Numpy datetime64 array of timestamps
+        Returns:
+            (str): Filename for the Ameriflux csv file, without extension
+        """
         # read file_meta
         file_meta = data_util.read_csv_file(file_meta_data_file)
         # get the site name from dataframe
@@ -144,12 +392,9 @@ class OutputFormat:
         ameriflux_site_name = OutputFormat.get_ameriflux_site_name(site_name)
         if ameriflux_site_name == ' ':
             log.warning("Site name not as expected.")
-        start_time = df['TIMESTAMP_START'].iloc[0]
-        end_time = df['TIMESTAMP_END'].iloc[-1]
-        ameriflux_file_name = 'US-Ui' + str(ameriflux_site_name) + '_HH_' + str(start_time) + '_' + str(end_time)
-
-        # return processed dataframe and ameriflux filename
-        return df, ameriflux_file_name
+        start_time = NetCDFReader.format_timestamps(time_data[:1])[0]
+        end_time = NetCDFReader.format_timestamps(time_data[-1:] + np.timedelta64(30, 'm'))[0]
+        return 'US-Ui' + str(ameriflux_site_name) + '_HH_' + str(start_time) + '_' + str(end_time)
 
     @staticmethod
     def check_timestamp_span(start, end):
@@ -194,22 +439,6 @@ class OutputFormat:
         else:
             return True
 
-    @staticmethod
-    def find_met_data_cols(df, unwanted_met_data):
-        """
-        Find the columns in the met data that matches columns to be deleted
-        Args:
-            df (DataFrame): Dataframe containing the data
-            unwanted_met_data (list): List of met data columns to be removed
-        Returns:
-            list: List of met data columns to be removed
-        """
-        met_data_cols = []
-        for col in df.columns:
-            if col.lower() in unwanted_met_data:
-                met_data_cols.append(col)
-        return met_data_cols
-
     @staticmethod
     def get_ameriflux_site_name(site_name):
         """
@@ -5,11 +5,10 @@
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
 import pandas as pd
-import numpy as np
 import logging
 
 from utils.process_validation import DataValidation
-import utils.data_util as data_util
+from utils.unitframe import UnitFrame
 
 # create log object with current module name
 log = logging.getLogger(__name__)
@@ -22,144 +21,97 @@ class PyFluxProFormat:
 
     # main method which calls other functions
     @staticmethod
-    def data_formatting(input_path):
+    def data_formatting(input_path, data_dtype='float64'):
         """
         Constructor for the class
 
         Args:
             input_path (str): A file path for the input data. This is the full output of EddyPro
+            data_dtype (str): Numeric storage type of the data. float64 or float32
         Returns:
-            obj: Pandas DataFrame object.
+            obj: UnitFrame object having the data and units of all variables
         """
-        df, df_meta = PyFluxProFormat.read_data(input_path)  # reads file and returns data and meta data
+        # reads file and returns data with units. -9999 is read as NaN
+        full_output = PyFluxProFormat.read_data(input_path, data_dtype)
         # check for required columns in eddypro full output sheet
-        is_valid = DataValidation.is_valid_full_output(df)
+        is_valid = DataValidation.is_valid_full_output(full_output.data)
         if not is_valid:
             log.error("EddyPro full output not in valid format")
             return None
-        # add columns and units to meta data if neccessary
-        df, df_meta = PyFluxProFormat.add_timestamp(df, df_meta)  # step 3b in guide
-        # convert -9999.0 to NaN. To make numerical conversions easier.
-        df.replace('-9999.0', np.nan, inplace=True)
-        df.replace('-9999', np.nan, inplace=True)
+        # add columns and units if neccessary
+        full_output = PyFluxProFormat.add_timestamp(full_output)  # step 3b in guide
 
         # step 3c. Convert temp unit from K to C
-        df, df_meta = PyFluxProFormat.convert_temp_unit(df, df_meta)
+        full_output = PyFluxProFormat.convert_temp_unit(full_output)
         # step 3d. Convert air pressure unit.
-        df, df_meta = PyFluxProFormat.convert_airpressure_unit(df, df_meta)
+        full_output = PyFluxProFormat.convert_airpressure_unit(full_output)
         # step 3e is skipped with time-gap filling settings in eddypro. so is step3.e.a
-        df = PyFluxProFormat.concat_df(df, df_meta)  # concatenate df and df meta
-        if df is None:
-            return None
-        # convert NaNs back
-        df.replace(np.nan, 'NAN', inplace=True)
-        # return formatted df
-        return df
+        # return formatted data. NaNs are written as 'NAN' while writing the data
+        return full_output
 
     @staticmethod
-    def read_data(path):
+    def read_data(path, data_dtype='float64'):
         """
         Reads data (This is the full output of EddyPro).
-        Returns dataframe containing the met data and another df containing meta data
+        Returns the data along with the units of all variables
 
         Args:
             path(str): input data file path
+            data_dtype (str): Numeric storage type of the data. float64 or float32
         Returns:
-            df (obj): Pandas DataFrame object
-            df_meta (obj) : Pandas DataFrame object having the meta data
+            obj: UnitFrame object
         """
-        df = data_util.read_csv_file(path, skiprows=1, dtype='unicode')  # skip the first row to skip file_info row
-        df_meta = df.head(1)  # the first row has the meta data. Row index 0 has the units of all variables
-        df = df.iloc[1:, :]  # drop the first row of units. Will be concatenated with df_meta later
-        df.reset_index(drop=True, inplace=True)  # reset index after dropping rows
-        return df, df_meta
+        # skip the first row to skip file_info row. Row after the column names has the units of all variables
+        return UnitFrame.read_csv(path, data_dtype, header_row=1)
 
     @staticmethod
-    def add_timestamp(df, df_meta):
+    def add_timestamp(full_output):
         """
-        Function to add TIMESTAMP column in df, as per step 3b in guide
-        Add date and time column. Replace inplace - with /.
-        Add new column and unit to meta dataframe
+        Function to add TIMESTAMP column in data, as per step 3b in guide
+        Add date and time column with its unit.
         Move TIMESTAMP column to index 1
 
         Args:
-            df (object): Pandas DataFrame object
-            df_meta (object): Pandas DataFrame object
+            full_output (object): UnitFrame object
         Returns:
-            df (object): Processed Pandas DataFrame object
-            df_meta (object): Processed Pandas DataFrame object
+            full_output (object): Processed UnitFrame object
         """
+        df = full_output.data
         # create new column and unit for TIMESTAMP by adding date and time columns
         date_col = df.filter(regex="date|Date").columns.to_list()[0]
         time_col = df.filter(regex="time|Time").columns.to_list()[0]
-        df['TIMESTAMP'] = df[date_col] + ' ' + df[time_col]
-        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'])
         # NOTES 22
         # shift timestamp 30min behind to get the start time of the data
-        df['TIMESTAMP'] = df['TIMESTAMP'] - pd.Timedelta(minutes=30)
-        df_meta['TIMESTAMP'] = 'yyyy/mm/dd HH:MM'  # add new variable and unit to meta df
-        # convert TIMESTAMP to string format
-        df['TIMESTAMP'] = df['TIMESTAMP'].map(lambda t: t.strftime('%Y/%m/%d %H:%M'))
-        # move TIMESTAMP column to first index
-        cols = list(df.columns)
-        cols.insert(1, cols.pop(cols.index('TIMESTAMP')))  # pop and insert TIMESTAMP at index 1
-        df = df.loc[:, cols]  # rearrange df
-        df_meta = df_meta.loc[:, cols]
-        return df, df_meta
+        timestamp = pd.to_datetime(df[date_col] + ' ' + df[time_col]) - pd.Timedelta(minutes=30)
+        # insert TIMESTAMP column at index 1
+        df.insert(1, 'TIMESTAMP', timestamp)
+        full_output.set_unit('TIMESTAMP', 'yyyy/mm/dd HH:MM')  # add unit of new variable
+        return full_output
 
     @staticmethod
-    def convert_temp_unit(df, df_meta):
+    def convert_temp_unit(full_output):
         """
         Method to change temperature measurement unit from kelvin to Celsius. Step 3c in guide.
 
         Args:
-            df (object): Pandas DataFrame object
-            df_meta (object): Pandas DataFrame object
+            full_output (object): UnitFrame object
         Returns:
-            df (object): Processed Pandas DataFrame object
-            df_meta (object): Processed Pandas DataFrame object
+            full_output (object): Processed UnitFrame object
         """
-        # convert string to numerical
-        df['sonic_temperature'] = df['sonic_temperature'].astype(float)
-        df['sonic_temperature_C'] = df.apply(lambda row: row.sonic_temperature - 273.15, axis=1)  # convert to celsius
-        df['sonic_temperature_C'] = df['sonic_temperature_C'].round(3)  # round to 3 decimal places
-        df_meta['sonic_temperature_C'] = '[C]'  # add new variable and unit to meta df
-        return df, df_meta
+        # convert to celsius and round to 3 decimal places
+        sonic_temperature_c = (full_output.data['sonic_temperature'] - 273.15).round(3)
+        full_output.add_column('sonic_temperature_C', sonic_temperature_c, '[C]')  # add new variable and unit
+        return full_output
 
     @staticmethod
-    def convert_airpressure_unit(df, df_meta):
+    def convert_airpressure_unit(full_output):
         """
         Method to change air pressure measurement unit from Pa to kPa. Step 3d in guide.
 
         Args:
-            df (object): Pandas DataFrame object
-            df_meta (object): Pandas DataFrame object
+            full_output (object): UnitFrame object
         Returns:
-            df (object): Processed Pandas DataFrame object
-            df_meta (object): Processed Pandas DataFrame object
+            full_output (object): Processed UnitFrame object
         """
-        df['air_pressure'] = df['air_pressure'].apply(pd.to_numeric, errors='coerce')  # convert string to numerical
-        df['air_pressure_kPa'] = df['air_pressure']/1000
-        df['air_pressure_kPa'].round(3)
-        df_meta['air_pressure_kPa'] = '[kPa]'
-        return df, df_meta
-
-    @staticmethod
-    def concat_df(df, df_meta):
-        """
-        Concatenates dataframes
-
-        Args:
-            df (obj): Pandas DataFrame object
-            df_meta (obj) : Pandas DataFrame object having the meta data
-        Returns:
-            df (obj): Merged Pandas DataFrame object
-        """
-        # concat the meta df and df if number of columns is the same
-        if df_meta.shape[1] == df.shape[1]:
-            df = pd.concat([df_meta, df], ignore_index=True)
-            return df
-        else:
-            log.error("Number of columns in met data {} not the same as number of columns in meta data {}".
-                      format(df.shape[1], df_meta.shape[1]))
-            return None
+        full_output.add_column('air_pressure_kPa', full_output.data['air_pressure'] / 1000, '[kPa]')
+        return full_output
@@ -0,0 +1,90 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import pandas as pd
+import logging
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class TimestampAlignment:
+    """
+    Class to check the timestamp alignment of EddyPro full output and met data before creating PyFluxPro input sheet
+    """
+
+    @staticmethod
+    def get_alignment(full_output_df, met_data_df):
+        """
+        Get the overlapping timestamp window of full output and met data, the gaps on each side of the window
+        and the fraction of timestamps in the window that are present in both the sheets.
+
+        Args:
+            full_output_df (obj): Pandas DataFrame object with datetime TIMESTAMP column. EddyPro full output
+            met_data_df (obj): Pandas DataFrame object with datetime TIMESTAMP column. Met data
+        Returns:
+            (dict): Alignment details. None if the sheets do not have overlapping timestamps
+        """
+        full_output_index = pd.DatetimeIndex(full_output_df['TIMESTAMP'])
+        met_data_index = pd.DatetimeIndex(met_data_df['TIMESTAMP'])
+        if full_output_index.empty or met_data_index.empty:
+            return None
+        # get overlapping periods
+        latest_start = max(full_output_index.min(), met_data_index.min())
+        earliest_end = min(full_output_index.max(), met_data_index.max())
+        if earliest_end <= latest_start:
+            return None
+
+        full_output_window = full_output_index[(full_output_index >= latest_start) &
+                                               (full_output_index <= earliest_end)]
+        met_data_window = met_data_index[(met_data_index >= latest_start) & (met_data_index <= earliest_end)]
+        # row-level join coverage is the fraction of timestamps in the window found in both sheets
+        matched = full_output_window.intersection(met_data_window)
+        window_timestamps = full_output_window.union(met_data_window)
+        coverage = len(matched) / len(window_timestamps)
+
+        return {'start': latest_start,
+                'end': earliest_end,
+                'full_output_rows_before': int((full_output_index < latest_start).sum()),
+                'full_output_rows_after': int((full_output_index > earliest_end).sum()),
+                'met_data_rows_before': int((met_data_index < latest_start).sum()),
+                'met_data_rows_after': int((met_data_index > earliest_end).sum()),
+                'matched_rows': len(matched),
+                'coverage': coverage}
+
+    @staticmethod
+    def log_alignment(alignment):
+        """
+        Log the alignment details of full output and met data
+
+        Args:
+            alignment (dict): Alignment details from get_alignment
+        Returns:
+            None
+        """
+        log.info("Full output and met data overlap from %s to %s", alignment['start'], alignment['end'])
+        log.info("Full output has %d rows before and %d rows after the overlap",
+                 alignment['full_output_rows_before'], alignment['full_output_rows_after'])
+        log.info("Met data has %d rows before and %d rows after the overlap",
+                 alignment['met_data_rows_before'], alignment['met_data_rows_after'])
+        log.info("%d timestamps are present in both sheets. Join coverage in the overlap is %.2f%%",
+                 alignment['matched_rows'], alignment['coverage'] * 100)
+
+    @staticmethod
+    def trim(unit_frame, start, end):
+        """
+        Remove the rows outside of the overlapping timestamp window
+
+        Args:
+            unit_frame (obj): UnitFrame object with datetime TIMESTAMP column
+            start (obj): Starting timestamp of the window
+            end (obj): Ending timestamp of the window
+        Returns:
+            None
+        """
+        df = unit_frame.data
+        in_window = (df['TIMESTAMP'] >= start) & (df['TIMESTAMP'] <= end)
+        unit_frame.data = df[in_window].reset_index(drop=True)
@@ -4,7 +4,15 @@
 # terms of the Mozilla Public License v2.0 which accompanies this distribution,
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
-from utils.syncdata import SyncData
+from utils.syncdata import SyncData, SFTPPool
 from utils import data_util
+from utils.unitframe import UnitFrame
+from utils.controlfile import ControlFile, ControlSection, ControlToken
+from utils.keycache import KeyCache
+from utils.metnames import MetNames
+from utils.stagescheduler import StageScheduler
+from utils.stagecache import StageCache
+from utils.folderwatcher import FolderWatcher
+from utils.controlfilepatch import ControlFilePatch
 from utils.input_validation import InputValidation
 from utils.process_validation import DataValidation
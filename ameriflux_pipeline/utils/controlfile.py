@@ -0,0 +1,430 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import copy
+import re
+import logging
+
+import utils.data_util as data_util
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class ControlToken:
+    """
+    Class to hold a line of PyFluxPro control file classified by the tokenizer.
+    A line is a section line like [[Fco2]], a key = value line, or text like the level line and blank lines.
+    """
+    SECTION = 'section'
+    KEY_VALUE = 'key_value'
+    TEXT = 'text'
+
+    def __init__(self, kind, line, name=None, depth=0, value=None):
+        """
+        Constructor for the class
+
+        Args:
+            kind (str): SECTION, KEY_VALUE or TEXT
+            line (str): Line as read from the file, without the newline
+            name (str): Section name for section lines, key for key = value lines
+            depth (int): Number of square brackets around the section name for section lines
+            value (str): Value for key = value lines, stripped of spaces
+        """
+        self.kind = kind
+        self.line = line
+        self.name = name
+        self.depth = depth
+        self.value = value
+
+
+class ControlSection:
+    """
+    Class to hold a section of PyFluxPro control file.
+    The section depth is the number of square brackets around the section name. [Variables] has depth 1,
+    a variable like [[Fco2]] has depth 2 and a variable subsection like [[[xl]]] or [[[RangeCheck]]] has depth 3.
+    Lines are kept as read from the file, without the newline. Indentation is set by the depth when writing.
+    """
+    # quotes of values continued on the next lines
+    TRIPLE_QUOTES = ("'''", '"""')
+
+    def __init__(self, name, depth, header=None):
+        """
+        Constructor for the class
+
+        Args:
+            name (str): Section name without the square brackets
+            depth (int): Number of square brackets around the section name
+            header (str): Section line as read from the file
+        """
+        self.name = name
+        self.depth = depth
+        self.header = header if header is not None else ControlSection.get_header(name, depth)
+        self.lines = []  # key = value lines of the section
+        self.sections = []  # subsections in the order of the file
+
+    @staticmethod
+    def get_header(name, depth):
+        """
+        Get the section line with square brackets
+
+        Args:
+            name (str): Section name
+            depth (int): Number of square brackets around the section name
+        Returns:
+            (str): Section line
+        """
+        return '[' * depth + name + ']' * depth
+
+    def rename(self, name):
+        """
+        Rename the section
+
+        Args:
+            name (str): New section name
+        Returns:
+            None
+        """
+        self.name = name
+        self.header = ControlSection.get_header(name, self.depth)
+
+    def get_section(self, name, ignore_case=False):
+        """
+        Get the first subsection with the name
+
+        Args:
+            name (str): Section name
+            ignore_case (bool): True to match the name ignoring the case
+        Returns:
+            (obj): ControlSection object. None if subsection is not found
+        """
+        for section in self.sections:
+            if section.name == name or (ignore_case and section.name.lower() == name.lower()):
+                return section
+        return None
+
+    def add_section(self, section):
+        """
+        Add a subsection at the end of the section
+
+        Args:
+            section (obj): ControlSection object
+        Returns:
+            None
+        """
+        self.sections.append(section)
+
+    def get_line_index(self, key):
+        """
+        Get the index of the first line starting with key
+
+        Args:
+            key (str): Starting of the line, typically the key of key = value line
+        Returns:
+            (int): Index of the line. None if not found
+        """
+        for ind, line in enumerate(self.lines):
+            if line.strip().startswith(key):
+                return ind
+        return None
+
+    def get_items(self):
+        """
+        Get the key = value lines of the section, classified by the tokenizer
+
+        Returns:
+            (list): List of ControlToken objects of KEY_VALUE kind in the order of the section
+        """
+        tokens = [ControlFile.tokenize_line(line) for line in self.lines]
+        return [token for token in tokens if token.kind == ControlToken.KEY_VALUE]
+
+    def get_value(self, key):
+        """
+        Get the value of the first line starting with key
+
+        Args:
+            key (str): Starting of the line, typically the key of key = value line
+        Returns:
+            (str): Value after the equal sign, stripped of spaces. None if not found
+        """
+        ind = self.get_line_index(key)
+        if ind is None:
+            return None
+        return self.lines[ind].split('=')[1].strip()
+
+    def set_value(self, key, value):
+        """
+        Replace the first line starting with key by key = value line
+
+        Args:
+            key (str): Key of the line
+            value (str): Value of the line
+        Returns:
+            (bool): True if the line is replaced, False if the key is not found
+        """
+        ind = self.get_line_index(key)
+        if ind is None:
+            return False
+        self.lines[ind] = key + " = " + value
+        return True
+
+    def copy(self):
+        """
+        Deep copy of the section with its subsections
+
+        Returns:
+            (obj): ControlSection object
+        """
+        return copy.deepcopy(self)
+
+    def get_raw_lines(self):
+        """
+        Get the section line, key lines and subsection lines of the section as read from the file
+
+        Returns:
+            (list): List of strings
+        """
+        raw_lines = [self.header]
+        raw_lines.extend(self.lines)
+        for section in self.sections:
+            raw_lines.extend(section.get_raw_lines())
+        return raw_lines
+
+    @staticmethod
+    def get_open_quote(value):
+        """
+        Get the triple quote of a value continued on the next lines, like the acknowledgement in [Global]
+
+        Args:
+            value (str): Value of key = value line
+        Returns:
+            (str): Triple quote opened and not closed in the value. None if the value is on one line
+        """
+        for quote in ControlSection.TRIPLE_QUOTES:
+            if value.startswith(quote) and value.count(quote) % 2 == 1:
+                return quote
+        return None
+
+    def to_lines(self, spaces):
+        """
+        Serialize the section with indentation set by the depth.
+        Key = value lines are indented, other lines like continuation lines of multi-line values and blank lines are
+        written as read from the file.
+
+        Args:
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            (list): List of strings to be written to control file
+        """
+        out_lines = [spaces * (self.depth - 1) + self.header.strip()]
+        quote = None  # triple quote of the multi-line value the line belongs to
+        for line in self.lines:
+            token = ControlFile.tokenize_line(line)
+            if quote is None and token.kind == ControlToken.KEY_VALUE:
+                out_lines.append(spaces * self.depth + line.strip())
+                quote = ControlSection.get_open_quote(token.value)
+            else:
+                out_lines.append(token.line)
+                if quote is not None and line.count(quote) % 2 == 1:
+                    quote = None
+        for section in self.sections:
+            out_lines.extend(section.to_lines(spaces))
+        return out_lines
+
+
+class ControlFile:
+    """
+    Class to parse and write PyFluxPro control files like L1.txt and L2.txt.
+    The file is parsed to a tree of Level line and sections like Files, Global, Variables and Plots.
+    Problems found while parsing and validating the file are kept as diagnostics with the tree.
+    """
+    SPACES = "    "  # set 4 spaces as default for a section in control file
+    # section lines have the same number of opening and closing square brackets around the name
+    SECTION_PATTERN = re.compile('^(\\[+)([^\\[\\]]+)(\\]+)$')
+    # key = value lines have a key without square brackets followed by the equal sign
+    KEY_VALUE_PATTERN = re.compile('^([^\\[\\]=]+?)\\s*=\\s*(.*)$')
+
+    def __init__(self, level_line=''):
+        """
+        Constructor for the class
+
+        Args:
+            level_line (str): Line specifying the level, like level = L1
+        """
+        self.level_line = level_line
+        self.sections = []  # top level sections in the order of the file
+        self.diagnostics = []  # tuples of logging level and message
+
+    def add_diagnostic(self, message, level=logging.WARNING):
+        """
+        Add a problem found in the control file
+
+        Args:
+            message (str): Description of the problem
+            level (int): Logging level. WARNING if the file can still be used, ERROR if not
+        Returns:
+            None
+        """
+        self.diagnostics.append((level, message))
+
+    def is_valid(self):
+        """
+        Check if there are no errors in the diagnostics
+
+        Returns:
+            (bool): True if no diagnostic has ERROR level or above
+        """
+        return all(level < logging.ERROR for level, _ in self.diagnostics)
+
+    def log_diagnostics(self, file_path):
+        """
+        Log the diagnostics of the control file
+
+        Args:
+            file_path (str): File path of the control file, added to each message
+        Returns:
+            None
+        """
+        for level, message in self.diagnostics:
+            log.log(level, "%s: %s", file_path, message)
+
+    def get_section(self, name):
+        """
+        Get the top level section with the name
+
+        Args:
+            name (str): Section name like Files, Global, Variables, Plots
+        Returns:
+            (obj): ControlSection object. None if section is not found
+        """
+        for section in self.sections:
+            if section.name == name:
+                return section
+        return None
+
+    def add_section(self, section):
+        """
+        Add a top level section at the end of the file
+
+        Args:
+            section (obj): ControlSection object
+        Returns:
+            None
+        """
+        self.sections.append(section)
+
+    @staticmethod
+    def tokenize_line(line, section_pattern=SECTION_PATTERN, key_value_pattern=KEY_VALUE_PATTERN):
+        """
+        Classify a line of control file
+
+        Args:
+            line (str): Line read from control file
+            section_pattern (obj): Compiled regex pattern to match section lines
+            key_value_pattern (obj): Compiled regex pattern to match key = value lines
+        Returns:
+            (obj): ControlToken object
+        """
+        line = line.rstrip('\r\n')
+        text = line.strip()
+        matched = section_pattern.match(text)
+        if matched and len(matched.group(1)) == len(matched.group(3)):
+            return ControlToken(ControlToken.SECTION, line, matched.group(2), len(matched.group(1)))
+        matched = key_value_pattern.match(text)
+        if matched:
+            return ControlToken(ControlToken.KEY_VALUE, line, matched.group(1), value=matched.group(2).strip())
+        return ControlToken(ControlToken.TEXT, line)
+
+    @staticmethod
+    def tokenize(lines):
+        """
+        Classify each line of control file once
+
+        Args:
+            lines (list): List of strings read from control file
+        Returns:
+            (generator): ControlToken objects in the order of the lines
+        """
+        for line in lines:
+            yield ControlFile.tokenize_line(line)
+
+    @staticmethod
+    def parse(lines):
+        """
+        Parse the lines of control file to a tree in one pass over the token stream
+
+        Args:
+            lines (list): List of strings read from control file
+        Returns:
+            (obj): ControlFile object
+        """
+        control_file = ControlFile()
+        stack = []  # path of sections from top level section to the current section
+        for line_number, token in enumerate(ControlFile.tokenize(lines), 1):
+            if token.kind == ControlToken.SECTION:
+                section = ControlSection(token.name, token.depth, token.line)
+                while stack and stack[-1].depth >= token.depth:
+                    stack.pop()
+                if token.depth > (stack[-1].depth if stack else 0) + 1:
+                    control_file.add_diagnostic("Line {}: section {} is more than one level below its parent"
+                                                .format(line_number, token.line.strip()))
+                if stack:
+                    stack[-1].add_section(section)
+                else:
+                    control_file.add_section(section)
+                stack.append(section)
+            elif stack:
+                if token.line.strip().startswith('['):
+                    control_file.add_diagnostic("Line {}: unbalanced square brackets in {}"
+                                                .format(line_number, token.line.strip()))
+                stack[-1].lines.append(token.line)
+            elif token.line.strip() and not control_file.level_line:
+                control_file.level_line = token.line
+            elif token.line.strip():
+                control_file.add_diagnostic("Line {}: {} is outside of a section"
+                                            .format(line_number, token.line.strip()))
+        return control_file
+
+    @staticmethod
+    def read(file_path):
+        """
+        Read and parse the control file
+
+        Args:
+            file_path (str): File path of the control file
+        Returns:
+            (obj): ControlFile object. None if file cannot be read
+        """
+        lines = data_util.read_file_lines(file_path)
+        if not lines:
+            return None
+        return ControlFile.parse(lines)
+
+    def to_lines(self, spaces=SPACES):
+        """
+        Serialize the control file with indentation set by the depth of each section
+
+        Args:
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            (list): List of strings to be written to control file
+        """
+        out_lines = [self.level_line.strip()]
+        for section in self.sections:
+            out_lines.extend(section.to_lines(spaces))
+        return out_lines
+
+    def write(self, file_path, spaces=SPACES):
+        """
+        Write the control file
+
+        Args:
+            file_path (str): File path to write the control file
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            None
+        """
+        data_util.write_list_to_file(self.to_lines(spaces), file_path)
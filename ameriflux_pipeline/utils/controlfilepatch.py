@@ -0,0 +1,244 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import json
+import difflib
+import hashlib
+import logging
+
+from utils.keycache import KeyCache
+from utils.controlfile import ControlFile, ControlSection
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class ControlFilePatch:
+    """
+    Class to patch a generated control file with the blocks changed since the previous generation.
+    A manifest written next to the control file holds the hashes of the inputs and of each generated block.
+    Blocks are the top level sections like Files, Global and Plots, and each variable in Variables section.
+    """
+    MANIFEST_SUFFIX = '.manifest.json'
+    DIFF_SUFFIX = '.diff.json'
+    VARIABLES_SECTION = 'Variables'
+
+    @staticmethod
+    def get_hash(text):
+        """
+        Get the SHA-256 hash of the text
+
+        Args:
+            text (str): Input string
+        Returns:
+            (str): Hexadecimal hash
+        """
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def get_input_hashes(input_files, input_values):
+        """
+        Get the hashes of the inputs of a control file
+
+        Args:
+            input_files (dict): Input name to file path. The file content is hashed
+            input_values (dict): Input name to a value that can be written to json, like variable lists and mappings
+        Returns:
+            (dict): Input name to hash
+        """
+        input_hashes = {}
+        for name, file_path in input_files.items():
+            input_hashes[name] = KeyCache.get_file_hash(file_path) if file_path else None
+        for name, value in input_values.items():
+            input_hashes[name] = ControlFilePatch.get_hash(json.dumps(value, sort_keys=True, default=str))
+        return input_hashes
+
+    @staticmethod
+    def read_manifest(control_file_path):
+        """
+        Read the manifest of the previous generation of the control file
+
+        Args:
+            control_file_path (str): A file path for the generated control file
+        Returns:
+            (dict): Manifest with inputs, blocks and result. None if the manifest does not exist or cannot be read
+        """
+        manifest_file = control_file_path + ControlFilePatch.MANIFEST_SUFFIX
+        if not os.path.isfile(manifest_file):
+            return None
+        try:
+            with open(manifest_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Cannot read manifest %s: %s", manifest_file, e)
+            return None
+
+    @staticmethod
+    def is_up_to_date(manifest, input_hashes, control_file_path):
+        """
+        Check if the control file was generated from the same inputs
+
+        Args:
+            manifest (dict): Manifest of the previous generation. None if there is no previous generation
+            input_hashes (dict): Input name to hash of the current inputs
+            control_file_path (str): A file path for the generated control file
+        Returns:
+            (bool): True if the inputs are unchanged and the control file exists
+        """
+        return manifest is not None and manifest.get('inputs') == input_hashes and os.path.isfile(control_file_path)
+
+    @staticmethod
+    def get_changed_inputs(manifest, input_hashes):
+        """
+        Get the names of the inputs changed since the previous generation
+
+        Args:
+            manifest (dict): Manifest of the previous generation. None if there is no previous generation
+            input_hashes (dict): Input name to hash of the current inputs
+        Returns:
+            (list): Sorted list of input names
+        """
+        previous_hashes = manifest.get('inputs', {}) if manifest else {}
+        names = set(previous_hashes) | set(input_hashes)
+        return sorted(name for name in names if previous_hashes.get(name) != input_hashes.get(name))
+
+    @staticmethod
+    def get_blocks(control_file):
+        """
+        Get the blocks of the control file in the order of the file
+
+        Args:
+            control_file (obj): ControlFile object
+        Returns:
+            (dict): Block name to ControlSection object. Variables are named as Variables/<variable name>
+        """
+        blocks = {}
+        for section in control_file.sections:
+            if section.name == ControlFilePatch.VARIABLES_SECTION:
+                for var in section.sections:
+                    blocks.setdefault(section.name + '/' + var.name, var)
+            else:
+                blocks.setdefault(section.name, section)
+        return blocks
+
+    @staticmethod
+    def patch(existing_file, new_file, previous_block_hashes, spaces):
+        """
+        Patch the existing control file with the new blocks. A block of the existing file is kept if its generated
+        content is unchanged since the previous generation, so that manual edits in the block are not lost.
+        The order of the blocks follows the new control file.
+
+        Args:
+            existing_file (obj): ControlFile object of the control file on disk. None if the file does not exist
+            new_file (obj): ControlFile object generated from the current inputs
+            previous_block_hashes (dict): Block name to hash of the previous generation
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            patched_file (obj): ControlFile object to be written
+            block_hashes (dict): Block name to hash of the new generation
+        """
+        existing_blocks = ControlFilePatch.get_blocks(existing_file) if existing_file is not None else {}
+        block_hashes = {}
+
+        def pick(name, new_block):
+            block_hash = ControlFilePatch.get_hash('\n'.join(new_block.to_lines(spaces)))
+            block_hashes[name] = block_hash
+            if previous_block_hashes.get(name) == block_hash and name in existing_blocks:
+                return existing_blocks[name]
+            return new_block
+
+        patched_file = ControlFile(new_file.level_line)
+        for section in new_file.sections:
+            if section.name == ControlFilePatch.VARIABLES_SECTION:
+                variables = ControlSection(section.name, section.depth, section.header)
+                variables.lines = list(section.lines)
+                for var in section.sections:
+                    variables.add_section(pick(section.name + '/' + var.name, var))
+                patched_file.add_section(variables)
+            else:
+                patched_file.add_section(pick(section.name, section))
+        return patched_file, block_hashes
+
+    @staticmethod
+    def get_diff(existing_file, patched_file, changed_inputs, spaces):
+        """
+        Get the structured diff of the patched control file against the control file on disk
+
+        Args:
+            existing_file (obj): ControlFile object of the control file on disk. None if the file does not exist
+            patched_file (obj): ControlFile object to be written
+            changed_inputs (list): Names of the inputs changed since the previous generation
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            (dict): Changed inputs, added, removed and changed blocks with unified diff of the changed blocks
+                    and the number of unchanged blocks
+        """
+        existing_blocks = ControlFilePatch.get_blocks(existing_file) if existing_file is not None else {}
+        patched_blocks = ControlFilePatch.get_blocks(patched_file)
+        diff = {'changed_inputs': changed_inputs, 'added': [], 'removed': [], 'changed': {}, 'unchanged': 0}
+        for name, block in patched_blocks.items():
+            if name not in existing_blocks:
+                diff['added'].append(name)
+                continue
+            existing_lines = existing_blocks[name].to_lines(spaces)
+            patched_lines = block.to_lines(spaces)
+            if existing_lines == patched_lines:
+                diff['unchanged'] += 1
+            else:
+                diff['changed'][name] = list(difflib.unified_diff(existing_lines, patched_lines, 'existing', 'patched',
+                                                                  lineterm=''))
+        diff['removed'] = [name for name in existing_blocks if name not in patched_blocks]
+        return diff
+
+    @staticmethod
+    def write(new_file, control_file_path, input_hashes, result, spaces=ControlFile.SPACES):
+        """
+        Patch the control file on disk with the blocks of the new control file that changed since the previous
+        generation. Write the manifest of this generation and the diff report next to the control file.
+
+        Args:
+            new_file (obj): ControlFile object generated from the current inputs
+            control_file_path (str): A file path for the generated control file
+            input_hashes (dict): Input name to hash of the current inputs
+            result (obj): Result of the generation that can be written to json, returned when the inputs are unchanged
+            spaces (str): Spaces to be inserted for each depth
+        Returns:
+            (dict): Structured diff from get_diff
+        """
+        manifest = ControlFilePatch.read_manifest(control_file_path)
+        existing_file = ControlFile.read(control_file_path) if os.path.isfile(control_file_path) else None
+        previous_block_hashes = manifest.get('blocks', {}) if manifest else {}
+        patched_file, block_hashes = ControlFilePatch.patch(existing_file, new_file, previous_block_hashes, spaces)
+        diff = ControlFilePatch.get_diff(existing_file, patched_file, ControlFilePatch.get_changed_inputs(
+            manifest, input_hashes), spaces)
+
+        if existing_file is None or diff['added'] or diff['removed'] or diff['changed'] or \
+                existing_file.level_line.strip() != patched_file.level_line.strip():
+            patched_file.write(control_file_path, spaces)
+        ControlFilePatch.write_json({'inputs': input_hashes, 'blocks': block_hashes, 'result': result},
+                                    control_file_path + ControlFilePatch.MANIFEST_SUFFIX)
+        ControlFilePatch.write_json(diff, control_file_path + ControlFilePatch.DIFF_SUFFIX)
+        log.info("Patched %s. %d blocks added, %d removed, %d changed and %d unchanged", control_file_path,
+                 len(diff['added']), len(diff['removed']), len(diff['changed']), diff['unchanged'])
+        return diff
+
+    @staticmethod
+    def write_json(data, file_path):
+        """
+        Write data to a json file
+
+        Args:
+            data (dict): Data that can be written to json
+            file_path (str): A file path for the json file
+        Returns:
+            None
+        """
+        try:
+            with open(file_path, 'w') as f:
+                json.dump(data, f, indent=2, default=str)
+        except OSError as e:
+            log.error("Failed to create file %s. %s", file_path, e)
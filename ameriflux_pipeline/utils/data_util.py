@@ -5,6 +5,7 @@
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
 import pandas as pd
+import numpy as np
 import re
 import pathlib
 import os
@@ -15,6 +16,11 @@ import logging
 # create log object with current module name
 log = logging.getLogger(__name__)
 
+# values used as missing data sentinels in met data, EddyPro and PyFluxPro files
+MISSING_VALUES = ['NAN', 'NaN', 'nan', '-9999', '-9999.0', '']
+# supported numeric storage types for the data frames
+DATA_DTYPES = {'float64': np.float64, 'float32': np.float32}
+
 
 def read_csv_file(file_path, **kwargs):
     """
@@ -44,6 +50,108 @@ def write_data_to_csv(df, output_data):
     df.to_csv(output_data, index=False)
 
 
+def get_data_dtype(data_dtype):
+    """
+        Get the numpy floating point type used to store numerical data
+
+        Args:
+            data_dtype (str): Name of the numeric storage type. float64 or float32
+        Returns:
+            (obj): numpy floating point type
+    """
+    if data_dtype not in DATA_DTYPES:
+        log.warning("Data type %s is not supported. Using float64", data_dtype)
+        return np.float64
+    return DATA_DTYPES[data_dtype]
+
+
+def set_data_dtype(df, data_dtype):
+    """
+        Cast all floating point columns in the dataframe to the numeric storage type.
+        Integer, text and datetime columns are not changed.
+
+        Args:
+            df (object): Pandas DataFrame object
+            data_dtype (str): Name of the numeric storage type. float64 or float32
+        Returns:
+            df (object): Pandas DataFrame object
+    """
+    dtype = get_data_dtype(data_dtype)
+    float_cols = df.select_dtypes(include='floating').columns
+    if len(float_cols) > 0:
+        df[float_cols] = df[float_cols].astype(dtype)
+    return df
+
+
+def read_data_with_units(file_path, data_dtype='float64', header_row=0):
+    """
+        Read csv file having column names followed by a row of units.
+        Data is read as numerical values with missing value sentinels converted to NaN.
+        The units are returned as a separate one row dataframe.
+
+        Args:
+            file_path (str): File path to read data
+            data_dtype (str): Name of the numeric storage type. float64 or float32
+            header_row (int): Row number of the column names. Units are expected in the next row
+        Returns:
+            df (object): Pandas DataFrame object having the numerical data
+            df_meta (object): Pandas DataFrame object having the units of all variables
+    """
+    log.info("Read csv file %s", file_path)
+    skip_rows = list(range(header_row))
+    df_meta = pd.read_csv(file_path, skiprows=skip_rows, nrows=1, dtype='unicode')
+    # round_trip keeps the parsed values identical to the values written in the file
+    df = pd.read_csv(file_path, skiprows=skip_rows + [header_row + 1], na_values=MISSING_VALUES,
+                     float_precision='round_trip', low_memory=False)
+    df = set_data_dtype(df, data_dtype)
+    return df, df_meta
+
+
+def write_data_with_units_to_csv(df, df_meta, output_data, na_rep=''):
+    """
+        Write the dataframe to csv file with the units written in the row below the column names
+
+        Args:
+            df (object): Pandas DataFrame object having the numerical data
+            df_meta (object): Pandas DataFrame object having the units of all variables
+            output_data (str): File path to save output data
+            na_rep (str): Missing value sentinel written in place of NaN
+        Returns:
+            None
+    """
+    log.info("Write data to csv file %s", output_data)
+    df_meta[df.columns].to_csv(output_data, index=False, na_rep=na_rep)
+    df.to_csv(output_data, index=False, header=False, na_rep=na_rep, mode='a')
+
+
+def write_data_with_units_to_excel(writer, df, df_meta, sheet_name, na_rep=''):
+    """
+        Write the dataframe to an excel sheet with the units written in the row below the column names
+
+        Args:
+            writer (object): Pandas ExcelWriter object using xlsxwriter engine
+            df (object): Pandas DataFrame object having the numerical data
+            df_meta (object): Pandas DataFrame object having the units of all variables
+            sheet_name (str): Name of the excel sheet
+            na_rep (str): Missing value sentinel written in place of NaN
+        Returns:
+            None
+    """
+    # float32 values are written through their shortest string form so that excel does not show
+    # the float64 expansion of the value. xlsxwriter converts the strings back to numbers.
+    float32_cols = df.select_dtypes(include=np.float32).columns
+    if len(float32_cols) > 0:
+        df = df.copy()
+        df[float32_cols] = df[float32_cols].astype(str).replace('nan', np.nan)
+    # remove header so as to remove built-in formatting of xlsxwriter
+    df_meta[df.columns].to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=1,
+                                 na_rep=na_rep)
+    df.to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=2, na_rep=na_rep)
+    worksheet = writer.sheets[sheet_name]
+    for idx, val in enumerate(df.columns):
+        worksheet.write(0, idx, val)
+
+
 def read_excel(file_path):
     """
         Read an excel sheet to dataframe
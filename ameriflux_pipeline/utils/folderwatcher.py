@@ -0,0 +1,216 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import json
+import time
+import fnmatch
+import tempfile
+import logging
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class FolderWatcher:
+    """
+    Class to watch directories for new and changed files by polling.
+    A file is identified by its modification time and size. Changes are reported when no file has changed for the
+    debounce time, so that a burst of files synced together is processed once. Changes are reported at the latest
+    after the maximum wait time, so that files that keep arriving are not held back.
+    Files are marked as processed with commit. Files that fail to be processed the maximum number of times in a row
+    are set aside with fail, and are not reported again until they change. Processed and set aside files can be kept
+    in a state file, so that files changed while the watcher was not running are reported when it starts.
+    """
+
+    def __init__(self, dirs, patterns=('*',), debounce=60.0, max_wait=600.0, state_file=None, max_failures=3):
+        """
+        Constructor for the class
+
+        Args:
+            dirs (list): Directories to watch. Sub directories are watched too
+            patterns (list): File name patterns of the files to watch, like *.dat
+            debounce (float): Seconds without a change before the changes are reported
+            max_wait (float): Maximum seconds from the first change before the changes are reported
+            state_file (str): A file path for the json file with the processed files. Not written if None
+            max_failures (int): Number of failures in a row after which a file is set aside
+        """
+        self.dirs = [d for d in dirs if d]
+        self.patterns = list(patterns)
+        self.debounce = debounce
+        self.max_wait = max_wait
+        self.state_file = state_file
+        self.max_failures = max_failures
+        state = self.read_state()
+        # file path to [modification time in ns, size] of the processed files
+        self.processed = state.get('processed', {})
+        # file path to [modification time in ns, size, number of failures] of the files that failed to be processed
+        self.failures = state.get('failures', {})
+        # file path to [modification time in ns, size] of the files set aside after max_failures failures
+        self.set_aside = state.get('set_aside', {})
+        # changed files that are not yet reported, and the times they were found to change
+        self.pending = {}
+        self.first_change = None
+        self.last_change = None
+
+    def get_snapshot(self):
+        """
+        Get the modification time and size of the watched files
+
+        Returns:
+            (dict): File path to [modification time in ns, size]
+        """
+        snapshot = {}
+        for watch_dir in self.dirs:
+            for root, _, files in os.walk(watch_dir):
+                for file_name in files:
+                    if not any(fnmatch.fnmatch(file_name, pattern) for pattern in self.patterns):
+                        continue
+                    file_path = os.path.join(root, file_name)
+                    try:
+                        stat = os.stat(file_path)
+                    except OSError:
+                        # file removed while listing
+                        continue
+                    snapshot[file_path] = [stat.st_mtime_ns, stat.st_size]
+        return snapshot
+
+    def poll(self, now=None):
+        """
+        Look for new and changed files since they were last processed
+
+        Args:
+            now (float): Time of the poll in seconds since epoch. Current time if None
+        Returns:
+            (dict): File path to [modification time in ns, size] of the changed files, when the debounce or maximum
+                    wait time has passed. Empty if there are no changes to report yet
+        """
+        now = time.time() if now is None else now
+        snapshot = self.get_snapshot()
+        # set aside files are reported again when they change
+        changed = {path: stat for path, stat in snapshot.items()
+                   if self.processed.get(path) != stat and self.set_aside.get(path) != stat}
+        if not changed:
+            self.pending = {}
+            self.first_change, self.last_change = None, None
+            return {}
+        if changed != self.pending:
+            # new files or files still being written
+            self.pending = changed
+            self.last_change = now
+            if self.first_change is None:
+                self.first_change = now
+        if now - self.last_change >= self.debounce or now - self.first_change >= self.max_wait:
+            return dict(self.pending)
+        return {}
+
+    def get_pending_since(self):
+        """
+        Get the time the reported changes were first found
+
+        Returns:
+            (float): Time in seconds since epoch. None if there are no changes
+        """
+        return self.first_change
+
+    def retry_later(self, now=None):
+        """
+        Report the changes again after the debounce time, like when processing the changes has failed
+
+        Args:
+            now (float): Time in seconds since epoch. Current time if None
+        Returns:
+            None
+        """
+        now = time.time() if now is None else now
+        self.first_change, self.last_change = now, now
+
+    def fail(self, files, now=None):
+        """
+        Count a failure of the files. Files failed max_failures times in a row are set aside, and the other files
+        are reported again after the debounce time
+
+        Args:
+            files (dict): File path to [modification time in ns, size], as reported by poll
+            now (float): Time in seconds since epoch. Current time if None
+        Returns:
+            (list): File paths set aside
+        """
+        set_aside = []
+        for path, stat in files.items():
+            failure = self.failures.get(path)
+            # failures of an earlier version of the file are not counted
+            count = failure[2] + 1 if failure is not None and failure[:2] == stat else 1
+            if count >= self.max_failures:
+                self.failures.pop(path, None)
+                self.set_aside[path] = stat
+                set_aside.append(path)
+                log.error("%s failed to be processed %d times. It is set aside until it changes", path, count)
+            else:
+                self.failures[path] = stat + [count]
+        self.retry_later(now)
+        self.write_state()
+        return set_aside
+
+    def commit(self, files):
+        """
+        Mark the files as processed. Files changed again after they were reported are reported in the next polls
+
+        Args:
+            files (dict): File path to [modification time in ns, size], as reported by poll
+        Returns:
+            None
+        """
+        self.processed.update(files)
+        for path in files:
+            self.failures.pop(path, None)
+            self.set_aside.pop(path, None)
+        # files removed from the directories are forgotten
+        existing = self.get_snapshot()
+        self.processed = {path: stat for path, stat in self.processed.items() if path in existing}
+        self.failures = {path: failure for path, failure in self.failures.items() if path in existing}
+        self.set_aside = {path: stat for path, stat in self.set_aside.items() if path in existing}
+        self.pending = {}
+        self.first_change, self.last_change = None, None
+        self.write_state()
+
+    def read_state(self):
+        """
+        Read the processed, failed and set aside files from the state file
+
+        Returns:
+            (dict): processed, failures and set_aside files, by file path. Empty if the state file is not set or
+                    cannot be read
+        """
+        if not self.state_file or not os.path.isfile(self.state_file):
+            return {}
+        try:
+            with open(self.state_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Cannot read watcher state %s: %s", self.state_file, e)
+            return {}
+
+    def write_state(self):
+        """
+        Write the processed, failed and set aside files to the state file
+
+        Returns:
+            None
+        """
+        if not self.state_file:
+            return
+        try:
+            state_dir = os.path.dirname(os.path.abspath(self.state_file))
+            os.makedirs(state_dir, exist_ok=True)
+            # written to a temporary file and moved, so that a partly written state is never read
+            fd, tmp_file = tempfile.mkstemp(dir=state_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'processed': self.processed, 'failures': self.failures, 'set_aside': self.set_aside}, f,
+                          indent=2)
+            os.replace(tmp_file, self.state_file)
+        except OSError as e:
+            log.warning("Cannot write watcher state to %s: %s", self.state_file, e)
@@ -9,7 +9,6 @@ Python module to check for user input validation
 This module is the first to be called from pre_pyfluxpro
 '''
 
-from config import Config as cfg
 import logging
 from utils.process_validation import DataValidation
 import utils.data_util as data_util
@@ -24,45 +23,46 @@ class InputValidation:
     '''
 
     @staticmethod
-    def validate():
+    def validate(cfg):
         """
         Reads all configuration variables / user inputs and checks for validity
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
-        server_sync = InputValidation.server_sync()
+        server_sync = InputValidation.server_sync(cfg)
         if not server_sync:
             log.error("Please check Server Sync input variables")
             return False
 
-        master_met = InputValidation.master_met()
+        master_met = InputValidation.master_met(cfg)
         if not master_met:
             log.error("Please check Master met input variables")
             return False
 
-        master_met_eddypro = InputValidation.master_met_eddypro()
+        master_met_eddypro = InputValidation.master_met_eddypro(cfg)
         if not master_met_eddypro:
             # only one file checked here. print statements in respective method
             return False
 
-        eddypro_headless = InputValidation.eddypro_headless()
+        eddypro_headless = InputValidation.eddypro_headless(cfg)
         if not eddypro_headless:
             log.error("Please check EddyPro Run input variables")
             return False
 
-        pyfluxpro = InputValidation.pyfluxpro()
+        pyfluxpro = InputValidation.pyfluxpro(cfg)
         if not pyfluxpro:
             log.error("Please check PyFluxpro input sheets input variables")
             return False
 
-        l1format = InputValidation.l1format()
+        l1format = InputValidation.l1format(cfg)
         if not l1format:
             log.error("Please check Pyfluxpro L1 variables")
             return False
 
-        l2format = InputValidation.l2format()
+        l2format = InputValidation.l2format(cfg)
         if not l2format:
             log.error("Please check Pyfluxpro L2 variables")
             return False
@@ -71,11 +71,12 @@ class InputValidation:
         return True
 
     @staticmethod
-    def server_sync():
+    def server_sync(cfg):
         """
         Checks if all env variables related to rsync / server sync is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -106,11 +107,12 @@ class InputValidation:
             return True
 
     @staticmethod
-    def master_met():
+    def master_met(cfg):
         """
         Checks if all env variables related to creation of master met data is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -173,11 +175,12 @@ class InputValidation:
         return True
 
     @staticmethod
-    def master_met_eddypro():
+    def master_met_eddypro(cfg):
         """
         Checks if all env variables related to formatting of master met data for EddyPro is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -193,11 +196,12 @@ class InputValidation:
             return True
 
     @staticmethod
-    def eddypro_headless():
+    def eddypro_headless(cfg):
         """
         Checks if all env variables related to EddyPro Run is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -264,11 +268,12 @@ class InputValidation:
         return True
 
     @staticmethod
-    def pyfluxpro():
+    def pyfluxpro(cfg):
         """
         Checks if all env variables related to creation of pyfluxpro input sheets is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -304,15 +309,21 @@ class InputValidation:
         if not pyfluxpro_input_ameriflux_success:
             log.error("Expected an excel file for PYFLUXPRO_INPUT_AMERIFLUX")
 
+        data_dtype_success = cfg.DATA_DTYPE in data_util.DATA_DTYPES
+        if not data_dtype_success:
+            log.error("Expected one of %s for DATA_DTYPE", ', '.join(data_util.DATA_DTYPES))
+            return False
+
         # all validations true
         return True
 
     @staticmethod
-    def l1format():
+    def l1format(cfg):
         """
         Checks if all env variables related to creation of pyfluxpro L1 is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -386,11 +397,12 @@ class InputValidation:
         return True
 
     @staticmethod
-    def l2format():
+    def l2format(cfg):
         """
         Checks if all env variables related to creation of pyfluxpro L2 is valid
         Return True if valid and False if not.
-        Args: None
+        Args:
+            cfg (obj): Config object with the settings of the run
         Returns:
             (bool): True if valid, False if not
         """
@@ -428,3 +440,37 @@ class InputValidation:
 
         # all validations true
         return True
+
+    @staticmethod
+    def watcher(cfg):
+        """
+        Checks if all env variables related to the pipeline watcher are valid
+        Return True if valid and False if not.
+        Args:
+            cfg (obj): Config object with the settings of the run
+        Returns:
+            (bool): True if valid, False if not
+        """
+        watch_poll_interval = str(cfg.WATCH_POLL_INTERVAL)
+        watch_poll_interval_success = \
+            DataValidation.float_validation(watch_poll_interval) and float(watch_poll_interval) > 0
+        if not watch_poll_interval_success:
+            log.error("Expected positive floating point for WATCH_POLL_INTERVAL")
+            return False
+
+        for name in ['WATCH_DEBOUNCE', 'WATCH_MAX_WAIT']:
+            seconds = str(getattr(cfg, name))
+            seconds_success = DataValidation.float_validation(seconds) and float(seconds) >= 0
+            if not seconds_success:
+                log.error("Expected non-negative floating point for %s", name)
+                return False
+
+        watch_max_failures = str(cfg.WATCH_MAX_FAILURES)
+        watch_max_failures_success = \
+            DataValidation.integer_validation(watch_max_failures) and int(watch_max_failures) > 0
+        if not watch_max_failures_success:
+            log.error("Expected positive integer for WATCH_MAX_FAILURES")
+            return False
+
+        # all validations true
+        return True
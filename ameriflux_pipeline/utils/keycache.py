@@ -0,0 +1,246 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import re
+import hashlib
+import pickle
+import tempfile
+import logging
+
+import utils.data_util as data_util
+from utils.process_validation import DataValidation
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class KeyCache:
+    """
+    Class to read the reference key workbooks like Ameriflux-Mainstem key, L1 erroring variables key and Soils key.
+    Each workbook is read and validated once. The normalized key is cached on disk by the hash of the workbook,
+    so that pre-pyfluxpro and post-pyfluxpro runs for all sites and years share the parsed keys.
+    """
+    # increase the version when the normalization of any key changes, to ignore the keys cached before
+    CACHE_VERSION = 1
+    # keys read in this process, by key name and workbook hash
+    _keys = {}
+
+    @staticmethod
+    def read_ameriflux_mainstem_key(file_path, cache_dir):
+        """
+        Read the Ameriflux-Mainstem key with standard column names
+
+        Args:
+            file_path (str): File path of Ameriflux-Mainstem-Key.xlsx
+            cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        return KeyCache.read_key(file_path, 'ameriflux_mainstem', KeyCache.normalize_ameriflux_mainstem_key,
+                                 cache_dir)
+
+    @staticmethod
+    def read_erroring_variables_key(file_path, cache_dir):
+        """
+        Read the L1 erroring variables key with Ameriflux label and PyFluxPro label columns
+
+        Args:
+            file_path (str): File path of L1_erroring_variables.xlsx
+            cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        return KeyCache.read_key(file_path, 'erroring_variables', KeyCache.normalize_erroring_variables_key,
+                                 cache_dir)
+
+    @staticmethod
+    def read_soils_key(file_path, cache_dir):
+        """
+        Read the Soils key
+
+        Args:
+            file_path (str): File path of Soils_key.xlsx
+            cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        return KeyCache.read_key(file_path, 'soils', KeyCache.normalize_soils_key, cache_dir)
+
+    @staticmethod
+    def read_key(file_path, key_name, normalize, cache_dir):
+        """
+        Get the normalized key from the cache. Read, validate and cache the key if it is not cached.
+        Invalid keys are not cached.
+
+        Args:
+            file_path (str): File path of the key workbook
+            key_name (str): Name of the key, used in the cache file name
+            normalize (function): Function to validate and normalize the dataframe read from the workbook.
+                                    Returns None if the key is not valid
+            cache_dir (str): Directory for the cached keys. Keys are not cached on disk if empty
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        file_hash = KeyCache.get_file_hash(file_path)
+        if file_hash is None:
+            return None
+        cache_key = (key_name, file_hash)
+        if cache_key not in KeyCache._keys:
+            cache_file = KeyCache.get_cache_file(cache_dir, key_name, file_hash)
+            df = KeyCache.load(cache_file)
+            if df is None:
+                df = normalize(data_util.read_excel(file_path))
+                if df is None:
+                    return None
+                KeyCache.save(df, cache_file)
+            KeyCache._keys[cache_key] = df
+        # copy so that changes made by the caller do not change the cached key
+        return KeyCache._keys[cache_key].copy()
+
+    @staticmethod
+    def get_file_hash(file_path):
+        """
+        Get the SHA-256 hash of the file content
+
+        Args:
+            file_path (str): File path
+        Returns:
+            (str): Hexadecimal hash. None if the file cannot be read
+        """
+        sha256 = hashlib.sha256()
+        try:
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    sha256.update(block)
+        except OSError as e:
+            log.error("Cannot read key file %s: %s", file_path, e)
+            return None
+        return sha256.hexdigest()
+
+    @staticmethod
+    def get_cache_file(cache_dir, key_name, file_hash):
+        """
+        Get the file path of the cached key
+
+        Args:
+            cache_dir (str): Directory for the cached keys
+            key_name (str): Name of the key
+            file_hash (str): Hash of the key workbook
+        Returns:
+            (str): File path. None if cache directory is not set
+        """
+        if not cache_dir:
+            return None
+        return os.path.join(cache_dir, "{}_v{}_{}.pkl".format(key_name, KeyCache.CACHE_VERSION, file_hash))
+
+    @staticmethod
+    def load(cache_file):
+        """
+        Load the cached key
+
+        Args:
+            cache_file (str): File path of the cached key
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not cached or cannot be read
+        """
+        if cache_file is None or not os.path.isfile(cache_file):
+            return None
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            log.warning("Cannot read cached key %s: %s. Reading the key workbook", cache_file, e)
+            return None
+
+    @staticmethod
+    def save(df, cache_file):
+        """
+        Save the key to the cache. The file is written to a temporary file and moved, so that other processes
+        never read a partly written key.
+
+        Args:
+            df (obj): Pandas DataFrame object
+            cache_file (str): File path of the cached key
+        Returns:
+            None
+        """
+        if cache_file is None:
+            return
+        cache_dir = os.path.dirname(cache_file)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_file, cache_file)
+            except BaseException:
+                os.remove(tmp_file)
+                raise
+        except OSError as e:
+            log.warning("Cannot cache key to %s: %s", cache_file, e)
+
+    @staticmethod
+    def normalize_ameriflux_mainstem_key(df):
+        """
+        Validate the Ameriflux-Mainstem key and rename the columns to standard names
+
+        Args:
+            df (obj): Pandas DataFrame object read from the workbook
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        if not DataValidation.is_valid_ameriflux_mainstem_key(df):
+            return None
+        # get column names matching Ameriflux
+        ameriflux_cols = df.filter(regex=re.compile("^ameriflux", re.IGNORECASE)).columns.to_list()
+        # get column names matching Original
+        original_cols = df.filter(regex=re.compile("^original", re.IGNORECASE)).columns.to_list()
+        # get column names matching Input sheet or Met tower
+        input_cols = df.filter(regex=re.compile("^input|^met", re.IGNORECASE)).columns.to_list()
+        # get units column
+        units_col = df.filter(regex=re.compile("^units", re.IGNORECASE)).columns.to_list()
+        # rename columns
+        df.rename(columns={ameriflux_cols[0]: 'Ameriflux variable name',
+                           original_cols[0]: 'Original variable name',
+                           input_cols[0]: 'Input sheet variable name',
+                           units_col[0]: 'Units after formatting'}, inplace=True)
+        return df
+
+    @staticmethod
+    def normalize_erroring_variables_key(df):
+        """
+        Validate the L1 erroring variables key and add Ameriflux label and PyFluxPro label columns
+
+        Args:
+            df (obj): Pandas DataFrame object read from the workbook
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        # validation strips the column names of extra spaces and converts to lowercase
+        if not DataValidation.is_valid_erroring_variables_key(df):
+            return None
+        ameriflux_col = df.filter(regex="ameriflux").columns.to_list()
+        pyfluxpro_col = df.filter(regex="pyfluxpro").columns.to_list()
+        # the variable name mapping is case sensitive as L2.txt is generated using the same
+        df['Ameriflux label'] = df[ameriflux_col[0]]
+        df['PyFluxPro label'] = df[pyfluxpro_col[0]]
+        return df
+
+    @staticmethod
+    def normalize_soils_key(df):
+        """
+        Validate the Soils key
+
+        Args:
+            df (obj): Pandas DataFrame object read from the workbook
+        Returns:
+            (obj): Pandas DataFrame object. None if the key is not valid
+        """
+        if not DataValidation.is_valid_soils_key(df):
+            return None
+        return df
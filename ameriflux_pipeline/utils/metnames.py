@@ -0,0 +1,88 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import re
+import functools
+import pandas as pd
+import logging
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class MetNames:
+    """
+    Class to normalize met tower variable names. See NOTES#20 for details.
+    Some datalogger variable names changed in 2021. Old names are renamed to the standard names when the met data
+    is read, and the met tower names in L1 control files are normalized with the same rules to match the met data.
+    """
+    # rules in the order of matching. Each rule has a name, a regex pattern matched at the start of the variable
+    # name ignoring the case, the new name formatted with the parts of the variable name split by underscore,
+    # and a flag to rename only the first matching column of met data
+    RULES = [('vwc', '^VWC_', 'VWC1_{1}_Avg', False),
+             ('tc', '^TC_', 'TC1_{1}_Avg', False),
+             ('cnrtc', '^CNR[1-9]_?T_?C', 'CNRTC_Avg', True),
+             ('cnrtk', '^CNR[1-9]_?T_?K', 'CNRTK_Avg', True),
+             ('rs_net', '^Rs_net', 'NetRs_Avg', True),
+             ('rl_net', '^Rl_net', 'NetRl_Avg', True),
+             ('albedo', '^albedo', 'Albedo_Avg', True)]
+    # all rules in one pattern, so that each name is matched once. The name of the matched group is the rule name
+    PATTERN = re.compile('|'.join('(?P<{}>{})'.format(rule[0], rule[1]) for rule in RULES), re.IGNORECASE)
+    NEW_NAMES = {rule[0]: rule[2] for rule in RULES}
+    FIRST_ONLY = {rule[0] for rule in RULES if rule[3]}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_rule(name, pattern=PATTERN):
+        """
+        Get the rule matching the variable name and the normalized name
+
+        Args:
+            name (str): Met tower variable name
+            pattern (obj): Compiled regex pattern with a named group for each rule
+        Returns:
+            rule_name (str): Name of the matched rule. None if no rule matches
+            normalized_name (str): Normalized variable name. Same as the input if no rule matches
+        """
+        matched = pattern.match(name) if isinstance(name, str) else None
+        if matched is None:
+            return None, name
+        return matched.lastgroup, MetNames.NEW_NAMES[matched.lastgroup].format(*name.split('_'))
+
+    @staticmethod
+    def normalize(name):
+        """
+        Get the normalized met tower variable name
+
+        Args:
+            name (str): Met tower variable name
+        Returns:
+            (str): Normalized variable name. Same as the input if no rule matches
+        """
+        return MetNames.get_rule(name)[1]
+
+    @staticmethod
+    def normalize_columns(columns):
+        """
+        Get the normalized column names of met data. For rules renaming only the first matching column, like albedo,
+        CNR temperatures and net radiation, the other matching columns are kept as read.
+
+        Args:
+            columns (obj): Pandas Index object or list of column names
+        Returns:
+            (obj): Pandas Index object with normalized column names
+        """
+        columns = pd.Index(columns)
+        rules = columns.map(MetNames.get_rule)
+        renamed = set()  # rules renaming only the first column, that are already applied
+        normalized = []
+        for col, (rule_name, normalized_name) in zip(columns, rules):
+            if rule_name in MetNames.FIRST_ONLY:
+                if rule_name in renamed:
+                    normalized_name = col
+                renamed.add(rule_name)
+            normalized.append(normalized_name)
+        return pd.Index(normalized, name=columns.name)
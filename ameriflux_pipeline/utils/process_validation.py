@@ -416,8 +416,6 @@ class L1Validation:
     # define patterns to match
     # variable names have alphanumeric characters and underscores with two square brackets
     VAR_PATTERN = '^\\[\\[[a-zA-Z0-9_]+\\]\\]$'
-    # variable name lines starts with 4 spaces and ends with new line
-    VAR_PATTERN_WITH_SPACE = '^ {4}\\[\\[[a-zA-Z0-9_]+\\]\\]\n$'
     XL_PATTERN = '^\\[\\[\\[xl\\]\\]\\]$'  # to match [[xl]] line
     ATTR_PATTERN = '^\\[\\[\\[Attr\\]\\]\\]$|^\\[\\[\\[attr\\]\\]\\]$'  # to match [[Attr]] or [[attr]] line
     UNITS_PATTERN = 'units'
@@ -431,45 +429,41 @@ class L1Validation:
     # TODO :Check if sheet name corresponds to cfg.FULL_OUTPUT_PYFLUXPRO and cfg.MET_DATA_30_PYFLUXPRO
 
     @staticmethod
-    def check_l1_format(lines, met_data_sheet_name, full_output_sheet_name):
+    def check_l1_format(control_file, met_data_sheet_name, full_output_sheet_name):
         """
-            Check if the formatting for L1 is as expected
+            Check if the formatting for L1 is as expected. Errors are added to the diagnostics of the control file
             Args:
-                lines (list): List of strings. Lines in L1.txt
+                control_file (obj): ControlFile object. Parsed L1.txt
                 met_data_sheet_name (str): Sheet name for met_data sheet
                 full_output_sheet_name (str): Sheet name for full output
             Returns:
                 (bool) : Returns True if the format is as expected, else return False
         """
         # check Level section
-        line0 = lines[0].rstrip('\n')
-        if not L1Validation.check_level_line(line0):
-            log.error("Incorrect format in Level line")
-            return False
-        # check Files section
-        files_line_index = lines.index('[Files]\n')
-        # check Global section
-        global_line_index = lines.index('[Global]\n')
-        # check Variables section
-        variables_line_index = lines.index('[Variables]\n')
-        if files_line_index and global_line_index:
-            if L1Validation.check_files_line(lines[files_line_index + 1:global_line_index]):
-                if L1Validation.check_global_line(lines[global_line_index + 1:variables_line_index]):
-                    if L1Validation.check_variables_line(lines[variables_line_index + 1:],
-                                                         met_data_sheet_name, full_output_sheet_name):
-                        return True
-                    else:
-                        log.error("Incorrect format in L1 Variables section")
-                        return False
-                else:
-                    log.error("Incorrect format in L1 Global section")
-                    return False
-            else:
-                log.error("Incorrect format in L1 Files section")
-                return False
-        else:
-            log.error("Undefined L1 Files and Global section")
+        if not L1Validation.check_level_line(control_file.level_line):
+            control_file.add_diagnostic("Incorrect format in Level line", logging.ERROR)
             return False
+        # check Files, Global and Variables section
+        files_section = control_file.get_section('Files')
+        global_section = control_file.get_section('Global')
+        variables_section = control_file.get_section('Variables')
+        if files_section is None or global_section is None or variables_section is None:
+            control_file.add_diagnostic("Undefined L1 Files, Global and Variables section", logging.ERROR)
+            return False
+        # indentation is checked on the lines as read from the file
+        if not L1Validation.check_files_line(files_section.get_raw_lines()[1:]):
+            control_file.add_diagnostic("Incorrect format in L1 Files section", logging.ERROR)
+            return False
+        if not L1Validation.check_global_line(global_section.get_raw_lines()[1:]):
+            control_file.add_diagnostic("Incorrect format in L1 Global section", logging.ERROR)
+            return False
+        # only the first variable is checked
+        if not variables_section.sections or \
+                not L1Validation.check_variables_line(variables_section.sections[0].get_raw_lines(),
+                                                      met_data_sheet_name, full_output_sheet_name):
+            control_file.add_diagnostic("Incorrect format in L1 Variables section", logging.ERROR)
+            return False
+        return True
 
     @staticmethod
     def check_level_line(line, level_line=LEVEL_LINE):
@@ -565,7 +559,7 @@ class L1Validation:
             Check if the formatting for L1 Variables section is as expected.
             This check if done only for the first variable
             Args:
-                lines (list): List of strings. Lines in L1.txt
+                lines (list): List of strings. Lines of the first variable in L1.txt
                 met_data_sheet_name (str): Sheet name for met_data sheet
                 full_output_sheet_name (str): Sheet name for full output
                 var_pattern (str): Regex pattern to find the starting line for [Variables] section
@@ -643,51 +637,38 @@ class L2Validation:
     # define global variables
     SPACES = "    "  # set 4 spaces as default for a section in L2
     LEVEL_LINE = "level = L2"  # set the level
-    VAR_PATTERN_WITH_SPACE = '^ {4}\\[\\[[a-zA-Z0-9_]+\\]\\]\n$'  # variable name pattern
-    DEPENDENCYCHECK_PATTERN = '^\\[\\[\\[DependencyCheck\\]\\]\\]$'
-    EXCLUDEDATES_PATTERN = '^\\[\\[\\[ExcludeDates\\]\\]\\]$'
-    RANGECHECK_PATTERN = '^\\[\\[\\[RangeCheck\\]\\]\\]$'
-    SOURCE_PATTERN = '^ {12}source'  # to match the source in DependencyCheck
-    LOWER_PATTERN = '^ {12}lower'  # to match the lower in RangeCheck
-    UPPER_PATTERN = '^ {12}upper'  # to match the lower in RangeCheck
+    # check sections of a variable
+    DEPENDENCYCHECK = 'DependencyCheck'
+    EXCLUDEDATES = 'ExcludeDates'
+    RANGECHECK = 'RangeCheck'
+    SOURCE_KEY = 'source'  # key of the source line in DependencyCheck
+    LOWER_KEY = 'lower'  # key of the lower line in RangeCheck
+    UPPER_KEY = 'upper'  # key of the upper line in RangeCheck
 
     @staticmethod
-    def check_l2_format(lines):
+    def check_l2_format(control_file):
         """
-            Check if the formatting for L1 is as expected
+            Check if the formatting for L2 is as expected. Errors are added to the diagnostics of the control file
             Args:
-                lines (list): List of strings. Lines in L1.txt
+                control_file (obj): ControlFile object. Parsed L2.txt
             Returns:
                 (bool) : Returns True if the format is as expected, else return False
         """
         # check Level section
-        line0 = lines[0].rstrip('\n')
-        if not L2Validation.check_level_line(line0):
-            log.error("Incorrect format in Level section")
+        if not L2Validation.check_level_line(control_file.level_line):
+            control_file.add_diagnostic("Incorrect format in Level section", logging.ERROR)
             return False
         # check Variables section
-        try:
-            variables_line_index = lines.index('[Variables]\n')
-        except ValueError:
-            log.error("ERROR : No [Variables] present in L2.txt.")
+        variables_section = control_file.get_section('Variables')
+        if variables_section is None:
+            control_file.add_diagnostic("No [Variables] present in L2.txt", logging.ERROR)
             return False
-        try:
-            plots_line_index = lines.index('[Plots]\n')
-        except ValueError:
-            log.warning("WARNING: no [Plots] present in L2.txt")
-            plots_line_index = None
-        if variables_line_index and plots_line_index:
-            if L2Validation.check_variables_line(lines[variables_line_index + 1:plots_line_index]):
-                return True
-            else:
-                log.error("Incorrect format in L2 Variables section")
-                return False
-        elif variables_line_index:
-            if L2Validation.check_variables_line(lines[variables_line_index + 1:]):
-                return True
-            else:
-                log.error("Undefined L2 Variables and Plots sections")
-                return False
+        if control_file.get_section('Plots') is None:
+            control_file.add_diagnostic("No [Plots] present in L2.txt")
+        if not L2Validation.check_variables_line(variables_section):
+            control_file.add_diagnostic("Incorrect format in L2 Variables section", logging.ERROR)
+            return False
+        return True
 
     @staticmethod
     def check_level_line(line, level_line=LEVEL_LINE):
@@ -705,179 +686,91 @@ class L2Validation:
             return False
 
     @staticmethod
-    def check_variables_line(lines, var_pattern=VAR_PATTERN_WITH_SPACE, dependencycheck_pattern=DEPENDENCYCHECK_PATTERN,
-                             excludedates_pattern=EXCLUDEDATES_PATTERN, rangecheck_pattern=RANGECHECK_PATTERN,
-                             source_pattern=SOURCE_PATTERN, lower_pattern=LOWER_PATTERN, upper_pattern=UPPER_PATTERN):
+    def check_variables_line(variables_section):
         """
             Check if the formatting for L2 Variables section is as expected
             Args:
-                lines (list): List of strings. Lines in L1.txt
-                var_pattern (str): Regex pattern to find the starting line for [Variables] section
-                dependencycheck_pattern (str): Regex pattern to find the [[[DependencyCheck]]] section
-                excludedates_pattern (str): Regex pattern to find the [[[ExcludeDates]]] section in Variables section
-                rangecheck_pattern (str): Regex pattern to find the [[[RangeCheck]]] section in Variables
-                source_pattern (str): Regex pattern to find the source line within DependencyCheck
-                lower_pattern (str): Regex pattern to find the lower line within RangeCheck
-                upper_pattern (str): Regex pattern to find the upper line within RangeCheck
+                variables_section (obj): ControlSection object for Variables section of L2.txt
             Returns:
                 (bool) : Returns True if the format is as expected, else return False
         """
-        var_start_end = L2Validation.get_variables_index(lines, var_pattern)
         # check if excludedates, rangecheck and dependencycheck follow the expected format
-        for start, end in var_start_end:
-            is_success = L2Validation.check_var_sections(lines[start:end], dependencycheck_pattern, rangecheck_pattern,
-                                                         excludedates_pattern, source_pattern,
-                                                         lower_pattern, upper_pattern)
-            if not is_success:
+        for var in variables_section.sections:
+            if not L2Validation.check_var_sections(var):
                 return False
         # all validations done
         return True
 
     @staticmethod
-    def get_variables_index(text, var_pattern):
-        """
-            Get all variables and start and end index for each variable from the pyfluxpro control file
-
-            Args:
-                text (list): List with all variable lines from L2.txt
-                var_pattern (str): Regex pattern of variable names
-            Returns:
-                var_start_end (list): List of tuple, the starting and ending index for each variable
-        """
-        var_indexes = [i for i, item in enumerate(text) if re.match(var_pattern, item)]
-        var_start_end = []
-        for i in range(len(var_indexes)-1):
-            start_ind = var_indexes[i]
-            end_ind = var_indexes[i+1]
-            var_start_end.append((start_ind, end_ind))
-        return var_start_end
-
-    @staticmethod
-    def check_var_sections(lines, dependencycheck_pattern, rangecheck_pattern, excludedates_pattern, source_pattern,
-                           lower_pattern, upper_pattern):
+    def check_var_sections(var):
         """
         Method to validate each sections of a Variable.
         Method checks if excludedates, rangecheck and dependencycheck follow the expected format
         Check if rangecheck has lower and upper lines. Check if source line exists for DependencyCheck
         Check if excludedates has from and to dates that are comma separated and if the dates are valid
         Args:
-            lines (list): Lines of a variable from L2.txt
-            dependencycheck_pattern (str): Regex pattern of dependency check section
-            rangecheck_pattern (str): Regex pattern of range check section
-            excludedates_pattern (str): Regex pattern of exclude dates section
-            source_pattern (str): Regex pattern for source line in Dependency check section
-            lower_pattern (str): Regex pattern for lower line in Range check section
-            upper_pattern (str): Regex pattern for upper line in Range check section
+            var (obj): ControlSection object for a variable in L2.txt. Check sections are its subsections
         Returns:
             (bool): Returns True if all section validations are complete, else returns False
         """
-        var_checks = L2Validation.get_variable_check_indexes(lines)
         # check if excludedates, rangecheck and dependencycheck follow the expected format
         depcheck_flag, rangecheck_flag, excludedates_flag = True, True, True
-        for check, check_start, check_end in var_checks:
+        for check in var.sections:
+            if not check.lines:
+                # empty check section. it is not written to l2_ameriflux
+                continue
+            items = check.get_items()
             # validate range check section
-            if bool(re.match(rangecheck_pattern, check)):
-                # range check section found. format it
-                first_line = lines[check_start]
-                second_line = lines[check_end]
-                lower_line, upper_line = '', ''
-                # check if the first line or second line matches the lower pattern
-                if bool(re.match(lower_pattern, first_line)):
-                    lower_line = first_line
-                    upper_line = second_line
-                elif bool(re.match(upper_pattern, first_line)):
-                    lower_line = second_line
-                    upper_line = first_line
+            if check.name == L2Validation.RANGECHECK:
+                lower_item, upper_item = None, None
+                # check if the first line or last line is the lower line
+                if items and items[0].name == L2Validation.LOWER_KEY:
+                    lower_item, upper_item = items[0], items[-1]
+                elif items and items[0].name == L2Validation.UPPER_KEY:
+                    lower_item, upper_item = items[-1], items[0]
                 else:
-                    log.error("Check lower and upper lines in Range Check %s", check)
+                    log.error("Check lower and upper lines in Range Check %s", check.header.strip())
+                    rangecheck_flag = False
+                    break  # break out of the loop
+                lower_items = lower_item.value.split(',')
+                upper_items = upper_item.value.split(',')
+                # NOTES 21
+                if len(lower_items) in [1, 12] and len(upper_items) in [1, 12]:
+                    rangecheck_flag = True
+                else:
+                    log.error("Check number of items in lower and upper ranges %s", check.header.strip())
                     rangecheck_flag = False
                     break  # break out of the loop
-                if lower_line and upper_line:
-                    lower_items = lower_line.strip().split('=')[1].split(',')
-                    upper_items = upper_line.strip().split('=')[1].split(',')
-                    if lower_items and upper_items:
-                        # NOTES 21
-                        lower_items_num = len(lower_items)
-                        upper_items_num = len(upper_items)
-                        if (lower_items_num == 1 or lower_items_num == 12) and (
-                                upper_items_num == 1 or upper_items_num == 12):
-                            rangecheck_flag = True
-                        else:
-                            log.error("Check number of items in lower and upper ranges %s", check)
-                            rangecheck_flag = False
-                            break  # break out of the loop
-                    else:
-                        log.error("Check format for %s", check)
-                        rangecheck_flag = False
-                        break  # break out of the loop
 
             # validate dependency check section
-            elif bool(re.match(dependencycheck_pattern, check)):
+            elif check.name == L2Validation.DEPENDENCYCHECK:
                 # dependency section exists
-                if re.match(source_pattern, lines[check_start]):
+                if items and items[0].name == L2Validation.SOURCE_KEY:
                     depcheck_flag = True
                 else:
-                    log.error("Check format for %s", check)
+                    log.error("Check format for %s", check.header.strip())
                     depcheck_flag = False
                     break  # break out of the loop
 
             # validate exclude dates section
-            elif bool(re.match(excludedates_pattern, check)):
+            elif check.name == L2Validation.EXCLUDEDATES:
                 # if ExcludeDates section is present, check if the dates are valid
-                for line in lines[check_start: check_end]:
-                    date_line = line.split('=')[1]
-                    dates = date_line.strip().split(',')
-                    start_date, end_date = dates[0].strip(), dates[1].strip()
-                    if DataValidation.datetime_validation(start_date) and \
-                            DataValidation.datetime_validation(end_date) and \
-                            pd.to_datetime(end_date) > pd.to_datetime(start_date):
+                for item in items:
+                    dates = item.value.split(',')
+                    if len(dates) == 2 and \
+                            DataValidation.datetime_validation(dates[0].strip()) and \
+                            DataValidation.datetime_validation(dates[1].strip()) and \
+                            pd.to_datetime(dates[1].strip()) > pd.to_datetime(dates[0].strip()):
                         excludedates_flag = True
                     else:
                         excludedates_flag = False
-                        log.error("Check dateformat in line %s", line.strip())
+                        log.error("Check dateformat in line %s", item.line.strip())
                         break  # break out of the loop
+                if not excludedates_flag:
+                    break  # break out of the loop
         # end of for loop
         if not all([depcheck_flag, rangecheck_flag, excludedates_flag]):
-            log.error("Incorrect section format for variable {}".format(lines[0].strip()))
+            log.error("Incorrect section format for variable {}".format(var.header.strip()))
             return False
         # all validations done
         return True
-
-    @staticmethod
-    def get_variable_check_indexes(var_lines):
-        """
-            Get the starting and ending indexes for each variable in the L2 input file
-            Args:
-                var_lines (list): List of variable lines from L2 input file
-            Returns:
-                var_start_end (list) : List of tuple, the starting and ending index for each variable
-        """
-        check_start_end = []
-        # get the starting and ending indexes for each check
-        for ind, line in enumerate(var_lines):
-            if L2Validation.is_check_line(line.strip()):
-                # found a check, get start and end indexes
-                start_ind = ind + 1
-                end_ind = ind + 1
-                while end_ind < len(var_lines) and not L2Validation.is_check_line(var_lines[end_ind].strip()):
-                    end_ind += 1
-                if start_ind == end_ind:
-                    # empty check section. proceed with other checks without writing to l2_ameriflux
-                    continue
-                else:
-                    check_start_end.append((line.strip(), start_ind, end_ind - 1))
-        return check_start_end
-
-    @staticmethod
-    def is_check_line(line):
-        """
-            Check if the line is a check line
-            Args:
-                line (str): A string of a line from L2 input file
-            Returns:
-                (bool) : True if the line is a check line, False otherwise
-        """
-        if line.startswith('[[[') and line.endswith(']]]'):
-            return True
-        else:
-            return False
@@ -0,0 +1,280 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import json
+import pickle
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+import logging
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+from utils.keycache import KeyCache
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class StageCache:
+    """
+    Class to skip the stages of a pipeline whose inputs are unchanged since the previous run.
+    A manifest in the cache directory holds, for each stage, the hashes of the input files and config values
+    and the hashes of the output files written by the stage. The result returned by the stage is pickled next to it,
+    in a file named by the hash of the stage name and input hashes, and the hash of the pickle is kept in the manifest.
+    A stage is up to date if the inputs have the same hashes and the outputs are on disk as the stage wrote them.
+    The manifest is written under a file lock, so that processes sharing the cache directory do not lose entries.
+    """
+    # increase the version when the outputs of any stage change for the same inputs, to rerun all stages
+    CACHE_VERSION = 2
+    MANIFEST_FILE = 'stages.json'
+    LOCK_FILE = 'stages.lock'
+
+    def __init__(self, cache_dir):
+        """
+        Constructor for the class
+
+        Args:
+            cache_dir (str): Directory for the manifest and the stage results. Stages are always run if empty
+        """
+        self.cache_dir = cache_dir
+        self.manifest = {}
+        # stages run in threads update the manifest
+        self.lock = threading.Lock()
+
+    def get_input_hashes(self, input_files, config_values):
+        """
+        Get the hashes of the inputs of a stage. Take the hashes before the stage is run
+
+        Args:
+            input_files (dict): Input name to file path. The file content is hashed
+            config_values (dict): Config name to a value that can be written to json, like paths, flags and mappings
+        Returns:
+            (dict): Input name to hash. None if the cache is not used or an input file cannot be read
+        """
+        if not self.is_enabled():
+            return None
+        input_hashes = {}
+        for name, file_path in input_files.items():
+            input_hashes[name] = StageCache.get_file_hash(file_path)
+            if input_hashes[name] is None:
+                return None
+        for name, value in config_values.items():
+            input_hashes[name] = hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8'))\
+                .hexdigest()
+        return input_hashes
+
+    @staticmethod
+    def get_file_hash(file_path):
+        """
+        Get the hash of a file
+
+        Args:
+            file_path (str): File path
+        Returns:
+            (str): Hexadecimal hash. None if the file does not exist
+        """
+        if not file_path or not os.path.isfile(file_path):
+            return None
+        return KeyCache.get_file_hash(file_path)
+
+    def is_enabled(self):
+        """
+        Check if the stage cache is used
+
+        Returns:
+            (bool): True if the cache directory is set
+        """
+        return bool(self.cache_dir)
+
+    def read_manifest(self):
+        """
+        Read the manifest of the stages from the cache directory. The manifest is read again on each call,
+        as other processes sharing the cache directory may have updated it
+
+        Returns:
+            (dict): Stage name to the inputs, outputs, result file and result hash of the stage
+        """
+        self.manifest = {}
+        manifest_file = os.path.join(self.cache_dir, StageCache.MANIFEST_FILE)
+        if os.path.isfile(manifest_file):
+            try:
+                with open(manifest_file) as f:
+                    manifest = json.load(f)
+                if manifest.get('version') == StageCache.CACHE_VERSION:
+                    self.manifest = manifest.get('stages', {})
+            except (OSError, ValueError) as e:
+                log.warning("Cannot read stage manifest %s: %s. Running all stages", manifest_file, e)
+        return self.manifest
+
+    @contextmanager
+    def lock_manifest(self):
+        """
+        Lock the manifest against other threads and processes, while it is read and written
+
+        Returns:
+            None
+        """
+        with self.lock:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(os.path.join(self.cache_dir, StageCache.LOCK_FILE), 'a+b') as lock_file:
+                if os.name == 'nt':
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if os.name == 'nt':
+                        lock_file.seek(0)
+                        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+                    else:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def get_result_file(name, input_hashes):
+        """
+        Get the file name of the result of a stage, from the hash of the stage name and its input hashes,
+        so that runs with other inputs sharing the cache directory do not overwrite the result
+
+        Args:
+            name (str): Name of the stage
+            input_hashes (dict): Input name to hash from get_input_hashes
+        Returns:
+            (str): File name of the pickled result
+        """
+        key = json.dumps({'stage': name, 'inputs': input_hashes}, sort_keys=True)
+        return name + '-' + hashlib.sha256(key.encode('utf-8')).hexdigest() + '.pkl'
+
+    def get_result(self, name, input_hashes, output_files):
+        """
+        Get the result of the stage from the previous run if the stage is up to date
+
+        Args:
+            name (str): Name of the stage
+            input_hashes (dict): Input name to hash from get_input_hashes
+            output_files (list): File paths written by the stage
+        Returns:
+            (obj): Result of the stage. None if the stage is to be run
+        """
+        if input_hashes is None:
+            return None
+        with self.lock:
+            entry = self.read_manifest().get(name)
+        if entry is None or entry['inputs'] != input_hashes:
+            return None
+        if entry['result_file'] != StageCache.get_result_file(name, input_hashes):
+            log.warning("Result file of stage %s does not match its inputs", name)
+            return None
+        if entry['outputs'] != {file_path: StageCache.get_file_hash(file_path) for file_path in output_files}:
+            log.info("Outputs of stage %s changed since the previous run", name)
+            return None
+        try:
+            with open(os.path.join(self.cache_dir, entry['result_file']), 'rb') as f:
+                data = f.read()
+            # a truncated or replaced result is not loaded
+            if hashlib.sha256(data).hexdigest() != entry['result_hash']:
+                log.warning("Result of stage %s does not match its hash in the manifest", name)
+                return None
+            result = pickle.loads(data)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError) as e:
+            log.warning("Cannot read result of stage %s: %s", name, e)
+            return None
+        log.info("Skipping stage %s as its inputs are unchanged", name)
+        return result
+
+    def save(self, name, input_hashes, output_files, result):
+        """
+        Save the result of the stage and the hashes of its inputs and outputs to the manifest
+
+        Args:
+            name (str): Name of the stage
+            input_hashes (dict): Input name to hash from get_input_hashes, taken before the stage is run
+            output_files (list): File paths written by the stage
+            result (obj): Result of the stage that can be pickled
+        Returns:
+            None
+        """
+        if input_hashes is None:
+            return
+        try:
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            entry = {'inputs': input_hashes,
+                     'outputs': {file_path: StageCache.get_file_hash(file_path) for file_path in output_files},
+                     'result_file': StageCache.get_result_file(name, input_hashes),
+                     'result_hash': hashlib.sha256(data).hexdigest()}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            StageCache.write_atomic(os.path.join(self.cache_dir, entry['result_file']), data)
+            # the manifest on disk is read again under the lock, so that entries saved by other processes are kept
+            with self.lock_manifest():
+                manifest = self.read_manifest()
+                previous = manifest.get(name)
+                manifest[name] = entry
+                StageCache.write_atomic(os.path.join(self.cache_dir, StageCache.MANIFEST_FILE),
+                                        json.dumps({'version': StageCache.CACHE_VERSION, 'stages': manifest},
+                                                   indent=2).encode('utf-8'))
+                # the result of the replaced entry is removed, unless another stage entry uses it
+                if previous is not None and previous['result_file'] != entry['result_file'] and \
+                        all(other['result_file'] != previous['result_file'] for other in manifest.values()):
+                    result_file = os.path.join(self.cache_dir, previous['result_file'])
+                    if os.path.isfile(result_file):
+                        os.remove(result_file)
+        except (OSError, pickle.PicklingError) as e:
+            log.warning("Cannot save stage %s to %s: %s", name, self.cache_dir, e)
+
+    def run(self, name, func, input_files, config_values, output_files, args=(), kwargs=None):
+        """
+        Run the stage if it is not up to date, else get its result from the previous run.
+        A stage fails if it returns None or False. Failed stages are not saved.
+
+        Args:
+            name (str): Name of the stage
+            func (function): Function to run the stage
+            input_files (dict): Input name to file path read by the stage
+            config_values (dict): Config name to value used by the stage
+            output_files (list): File paths written by the stage
+            args (tuple): Positional arguments passed to func
+            kwargs (dict): Keyword arguments passed to func
+        Returns:
+            (obj): Result of the stage
+        """
+        input_hashes = self.get_input_hashes(input_files, config_values)
+        result = self.get_result(name, input_hashes, output_files)
+        if result is not None:
+            return result
+        result = func(*args, **(kwargs or {}))
+        if result is not None and result is not False:
+            self.save(name, input_hashes, output_files, result)
+        return result
+
+    @staticmethod
+    def write_atomic(file_path, data):
+        """
+        Write the data to a temporary file and move it, so that a partly written file is never read.
+        The data is flushed to disk before the move, so that the file is complete after a crash
+
+        Args:
+            file_path (str): File path
+            data (bytes): Content of the file
+        Returns:
+            None
+        """
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, file_path)
+        except BaseException:
+            os.remove(tmp_file)
+            raise
@@ -0,0 +1,225 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import os
+import json
+import time
+import tempfile
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import logging
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class StageScheduler:
+    """
+    Class to run the stages of a process concurrently in threads.
+    A stage starts as soon as the stages it depends on are complete, and gets their results as its first arguments.
+    A stage fails if it raises an exception or returns None or False. Stages depending on a failed stage are skipped.
+    Only the stages needed for the requested target stages are run. The status of each stage can be kept in a file.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCESS = 'success'
+    FAILED = 'failed'
+    SKIPPED = 'skipped'
+
+    def __init__(self, max_workers=None, status_file=None):
+        """
+        Constructor for the class
+
+        Args:
+            max_workers (int): Number of threads. Number of stages if None
+            status_file (str): A file path for the json file with the status of each stage. Not written if None
+        """
+        self.max_workers = max_workers
+        self.status_file = status_file
+        # stage name to function, names of stages it depends on, names of stages it runs after, args and kwargs
+        self.stages = {}
+        self.status = {}
+        # stages run in threads update the status
+        self.lock = threading.Lock()
+
+    def add_stage(self, name, func, depends_on=(), args=(), kwargs=None, after=()):
+        """
+        Add a stage. The stages it depends on and runs after are to be added before it.
+
+        Args:
+            name (str): Name of the stage
+            func (function): Function to run the stage
+            depends_on (list): Names of the stages to complete before this stage. Their results are passed to func
+                                as the first positional arguments, in the same order. These stages are always run
+                                with this stage
+            args (tuple): Positional arguments passed to func after the results of the stages it depends on
+            kwargs (dict): Keyword arguments passed to func
+            after (list): Names of the stages to complete before this stage only if they are run too, like stages
+                        writing files that this stage reads. Their results are not passed to func
+        Returns:
+            (bool): True if the stage is added, False if the name is already used or a stage it depends on is unknown
+        """
+        if name in self.stages:
+            log.error("Stage %s is already added", name)
+            return False
+        unknown_stages = [stage for stage in list(depends_on) + list(after) if stage not in self.stages]
+        if unknown_stages:
+            log.error("Stage %s depends on stages %s that are not added", name, unknown_stages)
+            return False
+        self.stages[name] = (func, list(depends_on), list(after), args, kwargs or {})
+        return True
+
+    def get_stages(self, targets=None):
+        """
+        Get the stages to run for the target stages. These are the targets and the stages they depend on
+
+        Args:
+            targets (list): Names of the target stages. All stages if None
+        Returns:
+            (list): Names of the stages in the order they are added. None if a target is unknown
+        """
+        if targets is None:
+            return list(self.stages)
+        unknown_stages = [stage for stage in targets if stage not in self.stages]
+        if unknown_stages:
+            log.error("Target stages %s are not added", unknown_stages)
+            return None
+        selected = set()
+        pending = list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in selected:
+                selected.add(name)
+                pending.extend(self.stages[name][1])
+        return [name for name in self.stages if name in selected]
+
+    @staticmethod
+    def is_failed(result):
+        """
+        Check if the result of a stage is a failure
+
+        Args:
+            result (obj): Result returned by the stage
+        Returns:
+            (bool): True if result is None or False
+        """
+        return result is None or result is False
+
+    def run_stage(self, name, dependencies):
+        """
+        Wait for the stages it depends on and run the stage
+
+        Args:
+            name (str): Name of the stage
+            dependencies (dict): Stage name to Future object of the stages it depends on and runs after
+        Returns:
+            (obj): Result of the stage. None if the stage failed or is skipped
+        """
+        func, depends_on, _, args, kwargs = self.stages[name]
+        dependency_results = {stage: future.result() for stage, future in dependencies.items()}
+        failed_stages = [stage for stage, result in dependency_results.items() if StageScheduler.is_failed(result)]
+        if failed_stages:
+            log.error("Skipping stage %s as stages %s failed", name, failed_stages)
+            self.set_status(name, StageScheduler.SKIPPED)
+            return None
+        log.info("Starting stage %s", name)
+        self.set_status(name, StageScheduler.RUNNING)
+        start = time.time()
+        try:
+            result = func(*[dependency_results[stage] for stage in depends_on], *args, **kwargs)
+        except Exception as e:
+            log.exception("Stage %s failed: %s", name, e)
+            self.set_status(name, StageScheduler.FAILED, time.time() - start)
+            return None
+        if StageScheduler.is_failed(result):
+            log.error("Stage %s failed", name)
+            self.set_status(name, StageScheduler.FAILED, time.time() - start)
+        else:
+            log.info("Stage %s completed in %.2f seconds", name, time.time() - start)
+            self.set_status(name, StageScheduler.SUCCESS, time.time() - start)
+        return result
+
+    def run(self, targets=None):
+        """
+        Run the stages needed for the target stages and wait for them to complete
+
+        Args:
+            targets (list): Names of the target stages. All stages if None
+        Returns:
+            (dict): Stage name to the result of the stages that are run. None if the stage failed or is skipped.
+                    Empty if a target is unknown
+        """
+        stages = self.get_stages(targets)
+        if stages is None:
+            return {}
+        # status of the stages not run now is kept from the previous runs
+        self.status = self.read_status()
+        for name in stages:
+            self.set_status(name, StageScheduler.PENDING)
+        futures = {}
+        max_workers = self.max_workers or max(len(stages), 1)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='stage') as executor:
+            # stages are submitted after the stages they depend on, so waiting stages never block the others
+            for name in stages:
+                _, depends_on, after, _, _ = self.stages[name]
+                dependencies = {stage: futures[stage] for stage in depends_on + after if stage in futures}
+                futures[name] = executor.submit(self.run_stage, name, dependencies)
+        return {name: future.result() for name, future in futures.items()}
+
+    def is_success(self, results):
+        """
+        Check if all stages that are run completed successfully
+
+        Args:
+            results (dict): Stage name to result from run
+        Returns:
+            (bool): True if stages are run and no stage failed or is skipped
+        """
+        return len(results) > 0 and all(not StageScheduler.is_failed(result) for result in results.values())
+
+    def read_status(self):
+        """
+        Read the status of the stages from the status file
+
+        Returns:
+            (dict): Stage name to status. Empty if the status file is not set or cannot be read
+        """
+        if not self.status_file or not os.path.isfile(self.status_file):
+            return {}
+        try:
+            with open(self.status_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Cannot read stage status %s: %s", self.status_file, e)
+            return {}
+
+    def set_status(self, name, status, elapsed=None):
+        """
+        Set the status of the stage and write the status of all stages to the status file
+
+        Args:
+            name (str): Name of the stage
+            status (str): pending, running, success, failed or skipped
+            elapsed (float): Seconds taken by the stage. None if the stage is not complete
+        Returns:
+            None
+        """
+        with self.lock:
+            self.status[name] = {'status': status, 'updated': datetime.now().isoformat(timespec='seconds'),
+                                 'elapsed': None if elapsed is None else round(elapsed, 2)}
+            if not self.status_file:
+                return
+            try:
+                status_dir = os.path.dirname(os.path.abspath(self.status_file))
+                os.makedirs(status_dir, exist_ok=True)
+                # written to a temporary file and moved, so that a partly written status is never read
+                fd, tmp_file = tempfile.mkstemp(dir=status_dir, suffix='.tmp')
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(self.status, f, indent=2)
+                os.replace(tmp_file, self.status_file)
+            except OSError as e:
+                log.warning("Cannot write stage status to %s: %s", self.status_file, e)
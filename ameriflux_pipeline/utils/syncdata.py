@@ -5,60 +5,610 @@
 # and is available at https://www.mozilla.org/en-US/MPL/2.0/
 
 import os
+import re
+import json
+import hashlib
+import tempfile
+import fnmatch
+import posixpath
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import pysftp
 import stat
 import paramiko
 import logging
 
-from config import Config as cfg
-
 # create log object with current module name
 log = logging.getLogger(__name__)
 
 
+class SFTPPool:
+    """
+    Class to share a pool of SFTP connections between threads. Each connection is used by one thread at a time.
+    Connections are opened when they are first needed, up to the size of the pool.
+    """
+
+    def __init__(self, connect, size):
+        """
+        Constructor for the class
+
+        Args:
+            connect (function): Function opening a new connection, like pysftp.Connection
+            size (int): Maximum number of connections
+        """
+        self.connect = connect
+        self.size = size
+        self.idle = queue.Queue()
+        self.connections = []
+        # connections opened or being opened
+        self.num_opened = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection from the pool. Waits for a connection if all connections are in use.
+        A connection raising an error is closed and not returned to the pool.
+
+        Returns:
+            (obj): SFTP connection
+        """
+        try:
+            sftp = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                # counted before connecting, so that the pool does not open more connections than its size
+                is_new = self.num_opened < self.size
+                if is_new:
+                    self.num_opened += 1
+            if is_new:
+                try:
+                    sftp = self.connect()
+                except BaseException:
+                    with self.lock:
+                        self.num_opened -= 1
+                    raise
+                with self.lock:
+                    self.connections.append(sftp)
+            else:
+                sftp = self.idle.get()
+        try:
+            yield sftp
+        except BaseException:
+            self.discard(sftp)
+            raise
+        self.idle.put(sftp)
+
+    def discard(self, sftp):
+        """
+        Close a connection and remove it from the pool
+
+        Args:
+            sftp (obj): SFTP connection
+        Returns:
+            None
+        """
+        with self.lock:
+            if sftp in self.connections:
+                self.connections.remove(sftp)
+                self.num_opened -= 1
+        try:
+            sftp.close()
+        except Exception as e:
+            log.warning("Cannot close SFTP connection: %s", e)
+
+    def close(self):
+        """
+        Close all connections of the pool
+
+        Returns:
+            None
+        """
+        with self.lock:
+            connections = self.connections
+            self.connections = []
+            self.num_opened = 0
+        for sftp in connections:
+            try:
+                sftp.close()
+            except Exception as e:
+                log.warning("Cannot close SFTP connection: %s", e)
+
+
 class SyncData:
+    # number of SFTP connections used when SFTP_CONNECTIONS is not valid
+    DEFAULT_CONNECTIONS = 4
+    # file in each local directory with the size, modification time and checksum of the synced files
+    MANIFEST_FILE = '.sync_manifest.json'
+    # bytes read from the server and written to the temporary file at a time
+    CHUNK_SIZE = 1024 * 1024
+    # minimum seconds between writes of the manifests while files are downloaded
+    MANIFEST_WRITE_INTERVAL = 5.0
+
+    @staticmethod
+    def read_manifest(local_path):
+        """
+        Read the sync manifest of a local directory
+
+        Args:
+            local_path (str): Local directory
+        Returns:
+            (dict): File name to size, modification time on the server and checksum of the synced files.
+                    Empty if there is no manifest or it cannot be read
+        """
+        manifest_file = os.path.join(local_path, SyncData.MANIFEST_FILE)
+        if not os.path.isfile(manifest_file):
+            return {}
+        try:
+            with open(manifest_file) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            log.warning("Cannot read sync manifest %s: %s. Local files are checked again", manifest_file, e)
+            return {}
+
+    @staticmethod
+    def write_manifest(local_path, manifest):
+        """
+        Write the sync manifest of a local directory
+
+        Args:
+            local_path (str): Local directory
+            manifest (dict): File name to size, modification time on the server and checksum of the synced files
+        Returns:
+            None
+        """
+        try:
+            # written to a temporary file and moved, so that a partly written manifest is never read
+            fd, tmp_file = tempfile.mkstemp(dir=local_path, prefix='.', suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, os.path.join(local_path, SyncData.MANIFEST_FILE))
+        except OSError as e:
+            log.warning("Cannot write sync manifest to %s: %s", local_path, e)
+
+    @staticmethod
+    def get_checksum(file_path):
+        """
+        Get the sha256 checksum of a file
+
+        Args:
+            file_path (str): File path
+        Returns:
+            (str): Hex digest of the file contents
+        """
+        checksum = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(SyncData.CHUNK_SIZE), b''):
+                checksum.update(chunk)
+        return checksum.hexdigest()
+
+    @staticmethod
+    def get_part_file_path(local_file_path, size, mtime):
+        """
+        Get the temporary file a file is downloaded to. The name holds the size and modification time of the file on
+        the server, so that an interrupted download is only resumed for the same version of the file
+
+        Args:
+            local_file_path (str): Local file path
+            size (int): Size of the file on the server
+            mtime (int): Modification time of the file on the server
+        Returns:
+            (str): File path of the hidden temporary file
+        """
+        local_path, file_name = os.path.split(local_file_path)
+        return os.path.join(local_path, ".%s.%d-%d.part" % (file_name, size, int(mtime)))
+
+    @staticmethod
+    def get_prototype_pattern(file_prototype):
+        """
+        Get the pattern of the file names in the EddyPro file prototype format, like
+        yyyy-mm-ddTHHMM??_Sorghum-00137.ghg, where yyyy or yy is the year, mm the month, dd the day, ddd the day of
+        year, HH the hour, MM the minute and ? any character
+
+        Args:
+            file_prototype (str): File name prototype
+        Returns:
+            (obj): Compiled pattern with the date fields as named groups. None if the prototype has no dates
+        """
+        fields = {'yyyy': r'(?P<year>\d{4})', 'yy': r'(?P<year>\d{2})', 'ddd': r'(?P<doy>\d{3})',
+                  'dd': r'(?P<day>\d{2})', 'mm': r'(?P<month>\d{2})', 'HH': r'(?P<hour>\d{2})',
+                  'MM': r'(?P<minute>\d{2})', '?': '.'}
+        tokens = re.split(r'(yyyy|yy|ddd|dd|mm|HH|MM|\?)', file_prototype or '')
+        try:
+            pattern = re.compile(''.join(fields.get(token, re.escape(token)) for token in tokens))
+        except re.error as e:
+            log.warning("Cannot read the dates of the file prototype %s: %s", file_prototype, e)
+            return None
+        if 'year' not in pattern.groupindex:
+            return None
+        return pattern
+
+    @staticmethod
+    def get_file_time(file_name, pattern):
+        """
+        Get the timestamp of a file from its name
+
+        Args:
+            file_name (str): File name
+            pattern (obj): Pattern of the file names from get_prototype_pattern
+        Returns:
+            (datetime): Timestamp of the file. None if the file name does not match the pattern
+        """
+        match = pattern.fullmatch(file_name)
+        if match is None:
+            return None
+        fields = {name: int(value) for name, value in match.groupdict().items() if value is not None}
+        year = fields['year'] if fields['year'] >= 100 else 2000 + fields['year']
+        try:
+            if 'doy' in fields:
+                file_time = datetime(year, 1, 1) + timedelta(days=fields['doy'] - 1)
+            else:
+                file_time = datetime(year, fields.get('month', 1), fields.get('day', 1))
+            return file_time + timedelta(hours=fields.get('hour', 0), minutes=fields.get('minute', 0))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def get_processing_period(proj_file_template):
+        """
+        Get the processing period of EddyPro from the project file template. The period is set with pr_subset,
+        pr_start_date, pr_start_time, pr_end_date and pr_end_time
+
+        Args:
+            proj_file_template (str): A file path for the EddyPro project file template
+        Returns:
+            (tuple): Start and end datetime of the period. None if the template has no period or cannot be read
+        """
+        settings = {}
+        try:
+            with open(proj_file_template, encoding='utf-8') as f:
+                for line in f:
+                    key, _, value = line.strip().partition('=')
+                    settings[key.lower()] = value.strip()
+        except (OSError, TypeError, UnicodeDecodeError) as e:
+            log.warning("Cannot read the processing period from %s: %s", proj_file_template, e)
+            return None
+        if settings.get('pr_subset') != '1':
+            return None
+        try:
+            start = datetime.strptime(settings['pr_start_date'] + ' ' + settings.get('pr_start_time', '00:00'),
+                                      '%Y-%m-%d %H:%M')
+            end = datetime.strptime(settings['pr_end_date'] + ' ' + settings.get('pr_end_time', '23:59'),
+                                    '%Y-%m-%d %H:%M')
+        except (KeyError, ValueError) as e:
+            log.warning("Cannot read the processing period from %s: %s", proj_file_template, e)
+            return None
+        return start, end
+
+    @staticmethod
+    def get_patterns(patterns):
+        """
+        Get the list of file name patterns from a comma separated setting
+
+        Args:
+            patterns (str): Comma separated patterns, like *.ghg,*.metadata
+        Returns:
+            (list): Patterns. Empty if the setting is empty
+        """
+        return [pattern.strip() for pattern in str(patterns or '').split(',') if pattern.strip()]
+
+    @staticmethod
+    def is_matched(relative_path, patterns):
+        """
+        Check if a file or directory matches any of the patterns, by its path relative to the synced directory or
+        by its name
+
+        Args:
+            relative_path (str): Path relative to the synced directory, like 2021/file.ghg
+            patterns (list): File name patterns
+        Returns:
+            (bool): True if a pattern matches
+        """
+        name = posixpath.basename(relative_path)
+        return any(fnmatch.fnmatchcase(relative_path, pattern) or fnmatch.fnmatchcase(name, pattern)
+                   for pattern in patterns)
+
+    @staticmethod
+    def list_remote_files(sftp, remote_path, recursive=False, include=(), exclude=(), period=None, pattern=None):
+        """
+        List the files on the server to sync
+
+        Args:
+            sftp (obj): SFTP connection
+            remote_path (str): Directory on the server
+            recursive (bool): If True, the sub directories are listed too
+            include (list): Patterns of the files to sync. All files are synced if empty
+            exclude (list): Patterns of the files and sub directories not to sync
+            period (tuple): Start and end datetime of the files to sync. Files are not selected by time if None
+            pattern (obj): Pattern of the file names with their timestamps. Files not matching it are synced
+        Returns:
+            (dict): Path relative to remote_path, with / separators, to attributes of the files
+        """
+        files = {}
+        directories = ['']
+        while directories:
+            directory = directories.pop()
+            for file in sftp.listdir_attr(posixpath.join(remote_path, directory) if directory else remote_path):
+                relative_path = posixpath.join(directory, file.filename) if directory else file.filename
+                if SyncData.is_matched(relative_path, exclude):
+                    continue
+                if stat.S_ISDIR(file.st_mode):
+                    if recursive:
+                        directories.append(relative_path)
+                    continue
+                if include and not SyncData.is_matched(relative_path, include):
+                    continue
+                if period is not None and pattern is not None:
+                    file_time = SyncData.get_file_time(file.filename, pattern)
+                    if file_time is not None and not period[0] <= file_time <= period[1]:
+                        continue
+                files[relative_path] = file
+        return files
+
+    @staticmethod
+    def get_local_files(local_path, recursive=False):
+        """
+        List the local files, with one listing of each directory
+
+        Args:
+            local_path (str): Local directory
+            recursive (bool): If True, the sub directories are listed too
+        Returns:
+            (set): Paths relative to local_path, with / separators
+        """
+        if not recursive:
+            return set(os.listdir(local_path))
+        local_files = set()
+        for root, _, files in os.walk(local_path):
+            directory = os.path.relpath(root, local_path)
+            for file_name in files:
+                local_files.add(file_name if directory == '.' else
+                                posixpath.join(directory.replace(os.sep, '/'), file_name))
+        return local_files
+
+    @staticmethod
+    def list_changed_files(pool, remote_path, local_path, verify_checksum=False, recursive=False, include=(),
+                           exclude=(), period=None, pattern=None):
+        """
+        List the files on the server that are not synced, by comparing the size and modification time on the server
+        with the sync manifest. Local files are not checked one by one, only listed.
+        Local files synced before the manifest was kept are added to the manifest if they have the size of the
+        file on the server and are not older.
+
+        Args:
+            pool (obj): SFTPPool object
+            remote_path (str): Directory on the server
+            local_path (str): Local directory
+            verify_checksum (bool): If True, local files are checked against the checksum in the manifest
+            recursive (bool): If True, the sub directories are synced too
+            include (list): Patterns of the files to sync. All files are synced if empty
+            exclude (list): Patterns of the files and sub directories not to sync
+            period (tuple): Start and end datetime of the files to sync. Files are not selected by time if None
+            pattern (obj): Pattern of the file names with their timestamps. Files not matching it are synced
+        Returns:
+            (list, dict): Tuples of remote file path, local file path, size and modification time of the files to
+                          download, and the manifest of the local directory
+        """
+        with pool.connection() as sftp:
+            files = SyncData.list_remote_files(sftp, remote_path, recursive, include, exclude, period, pattern)
+        os.makedirs(local_path, exist_ok=True)
+        local_files = SyncData.get_local_files(local_path, recursive)
+        # files removed from the local directory or not synced from the server are forgotten
+        manifest = {name: entry for name, entry in SyncData.read_manifest(local_path).items()
+                    if name in local_files and name in files}
+        changed_files = []
+        for relative_path, file in sorted(files.items()):
+            local_file_path = os.path.join(local_path, *relative_path.split('/'))
+            entry = manifest.get(relative_path)
+            if entry is None and relative_path in local_files:
+                local_stat = os.stat(local_file_path)
+                if local_stat.st_size == file.st_size and local_stat.st_mtime >= file.st_mtime:
+                    entry = {'size': file.st_size, 'mtime': file.st_mtime}
+                    if verify_checksum:
+                        entry['checksum'] = SyncData.get_checksum(local_file_path)
+                    manifest[relative_path] = entry
+            if entry is not None and entry['size'] == file.st_size and entry['mtime'] == file.st_mtime:
+                if not verify_checksum:
+                    continue
+                checksum = SyncData.get_checksum(local_file_path)
+                # files synced without checksums get the checksum of the local file
+                if entry.setdefault('checksum', checksum) == checksum:
+                    continue
+                log.warning("Checksum of %s does not match the sync manifest", local_file_path)
+            changed_files.append((posixpath.join(remote_path, relative_path), local_file_path, file.st_size,
+                                  file.st_mtime))
+        return changed_files, manifest
+
+    @staticmethod
+    def download_file(pool, remote_file_path, local_file_path, size, mtime, verify_checksum=False):
+        """
+        Download a file from the server with a connection of the pool. The file is downloaded to a temporary file,
+        which is moved to the local file path when it is complete. An interrupted download is kept in the temporary
+        file and resumed from where it stopped in the next sync
+
+        Args:
+            pool (obj): SFTPPool object
+            remote_file_path (str): File path on the server
+            local_file_path (str): Local file path
+            size (int): Size of the file on the server when it was listed
+            mtime (int): Modification time of the file on the server when it was listed
+            verify_checksum (bool): If True, the checksum of the downloaded file is added to the manifest entry
+        Returns:
+            (dict, int): Manifest entry of the file, and the number of bytes downloaded
+        """
+        part_file_path = SyncData.get_part_file_path(local_file_path, size, mtime)
+        local_path, file_name = os.path.split(local_file_path)
+        os.makedirs(local_path, exist_ok=True)
+        # temporary files of other versions of the file cannot be resumed
+        part_pattern = re.compile(re.escape(".%s." % file_name) + r"\d+-\d+\.part")
+        for name in os.listdir(local_path):
+            if part_pattern.fullmatch(name) and name != os.path.basename(part_file_path):
+                os.remove(os.path.join(local_path, name))
+        offset = os.path.getsize(part_file_path) if os.path.isfile(part_file_path) else 0
+        if offset > size:
+            os.remove(part_file_path)
+            offset = 0
+        if offset > 0:
+            log.info("Resuming download of %s from %d of %d bytes..." % (remote_file_path, offset, size))
+        else:
+            log.info("Downloading %s..." % remote_file_path)
+        with pool.connection() as sftp:
+            with sftp.open(remote_file_path, 'rb') as remote_file, open(part_file_path, 'ab') as part_file:
+                remote_file.seek(offset)
+                # reads ahead of the writes, from the offset to the listed size
+                remote_file.prefetch(size)
+                position = offset
+                # the file is read up to the listed size, as met files on the server may be appended while syncing
+                while position < size:
+                    chunk = remote_file.read(min(SyncData.CHUNK_SIZE, size - position))
+                    if not chunk:
+                        raise OSError("%s is smaller on the server than when it was listed" % remote_file_path)
+                    part_file.write(chunk)
+                    position += len(chunk)
+                part_file.flush()
+                os.fsync(part_file.fileno())
+        entry = {'size': size, 'mtime': mtime}
+        if verify_checksum:
+            entry['checksum'] = SyncData.get_checksum(part_file_path)
+        os.utime(part_file_path, (mtime, mtime))
+        os.replace(part_file_path, local_file_path)
+        return entry, size - offset
+
     @staticmethod
-    def sync_data():
+    def get_throughput(stats):
+        """
+        Get the throughput of a sync
+
+        Args:
+            stats (dict): Number of files, bytes and seconds taken
+        Returns:
+            (dict): stats with the throughput in MB per second and files per second
+        """
+        elapsed = max(stats['elapsed'], 1e-6)
+        return dict(stats, elapsed=round(stats['elapsed'], 2), mb_per_second=round(stats['bytes'] / 1e6 / elapsed, 2),
+                    files_per_second=round(stats['files'] / elapsed, 2))
+
+    @staticmethod
+    def sync_data(cfg):
+        """
+        Download the GHG and met files that are new or changed on the server, if SFTP_CONFIRMATION is Y.
+        The GHG and met directories are synced together, and the files are downloaded in parallel over
+        SFTP_CONNECTIONS connections. The synced files are kept in the sync manifest of each local directory.
+        Sub directories are synced if SFTP_RECURSIVE is True. GHG files are selected with SFTP_GHG_INCLUDE and
+        SFTP_GHG_EXCLUDE, and met files with SFTP_MET_INCLUDE and SFTP_MET_EXCLUDE. If SFTP_GHG_PERIOD_ONLY is
+        True, only the GHG files in the processing period of the EddyPro project file template are synced.
+
+        Args:
+            cfg (obj): Config object with the settings of the run
+        Returns:
+            (dict): Number of files downloaded, failed and skipped, bytes, seconds taken and throughput of ghg, met
+                    and total. None if the data is not synced
+        """
         # if there is unknown host error,
         # connect to server using sftp in command line prompt to add host_keys
 
-        if cfg.SFTP_CONFIRMATION.lower() == "y":
-            # sync ghg files
-            try:
-                with pysftp.Connection(cfg.SFTP_SERVER, username=cfg.SFTP_USERNAME, password=cfg.SFTP_PASSWORD) as sftp:
-                    sftp.cwd(cfg.SFTP_GHG_REMOTE_PATH)
-                    log.info("GHG file sync started.")
-                    for file in sftp.listdir_attr():
-                        if not stat.S_ISDIR(file.st_mode):
-                            # print("Checking %s..." % f.filename)
-                            local_file_path = os.path.join(cfg.SFTP_GHG_LOCAL_PATH, file.filename)
-                            if ((not os.path.isfile(local_file_path)) or
-                                    (file.st_mtime > os.path.getmtime(local_file_path))):
-                                log.info("Downloading %s..." % file.filename)
-                                sftp.get(file.filename, local_file_path)
-                    log.info("GHG file sync completed.")
-                    # sync met files
-                    sftp.cwd(cfg.SFTP_MET_REMOTE_PATH)
-                    log.info("MET file sync started.")
-                    for file in sftp.listdir_attr():
-                        if not stat.S_ISDIR(file.st_mode):
-                            # print("Checking %s..." % f.filename)
-                            local_file_path = os.path.join(cfg.SFTP_MET_LOCAL_PATH, file.filename)
-                            if ((not os.path.isfile(local_file_path)) or
-                                    (file.st_mtime > os.path.getmtime(local_file_path))):
-                                log.info("Downloading %s..." % file.filename)
-                                sftp.get(file.filename, local_file_path)
-                    log.info("GHG file sync completed.")
-                sftp.close()
-            except (paramiko.ssh_exception.SSHException, AttributeError,
-                    paramiko.ssh_exception.AuthenticationException) as e:
-                if isinstance(e, paramiko.ssh_exception.SSHException):
-                    log.error("Can not connect to the remote URL.")
-                    log.error("Checkout the local known_hosts file "
-                              "and try to connect using ssh in command prompt first.")
-                elif isinstance(e, paramiko.ssh_exception.AuthenticationException):
-                    log.error("Authentication Failed.")
-                elif isinstance(e, AttributeError):
-                    log.error("Can not connect to the remote URL.")
-                else:
-                    log.error("There was an error in syncing the files.")
+        if cfg.SFTP_CONFIRMATION.lower() != "y":
+            return None
+        try:
+            num_connections = max(int(cfg.SFTP_CONNECTIONS), 1)
+        except (TypeError, ValueError):
+            log.warning("Expected a number for SFTP_CONNECTIONS. Using %d connections", SyncData.DEFAULT_CONNECTIONS)
+            num_connections = SyncData.DEFAULT_CONNECTIONS
+        folders = {'ghg': (cfg.SFTP_GHG_REMOTE_PATH, cfg.SFTP_GHG_LOCAL_PATH),
+                   'met': (cfg.SFTP_MET_REMOTE_PATH, cfg.SFTP_MET_LOCAL_PATH)}
+        verify_checksum = cfg.SFTP_VERIFY_CHECKSUM
+        folder_filters = {'ghg': {'recursive': cfg.SFTP_RECURSIVE,
+                                  'include': SyncData.get_patterns(cfg.SFTP_GHG_INCLUDE),
+                                  'exclude': SyncData.get_patterns(cfg.SFTP_GHG_EXCLUDE)},
+                          'met': {'recursive': cfg.SFTP_RECURSIVE,
+                                  'include': SyncData.get_patterns(cfg.SFTP_MET_INCLUDE),
+                                  'exclude': SyncData.get_patterns(cfg.SFTP_MET_EXCLUDE)}}
+        if cfg.SFTP_GHG_PERIOD_ONLY:
+            period = SyncData.get_processing_period(cfg.EDDYPRO_PROJ_FILE_TEMPLATE)
+            pattern = SyncData.get_prototype_pattern(cfg.EDDYPRO_FILE_PROTOTYPE)
+            if period is None or pattern is None:
+                log.warning("No processing period or file dates in EDDYPRO_PROJ_FILE_TEMPLATE and "
+                            "EDDYPRO_FILE_PROTOTYPE. All GHG files are synced")
+            else:
+                log.info("Syncing GHG files from %s to %s", period[0], period[1])
+                folder_filters['ghg'].update(period=period, pattern=pattern)
+        stats = {folder: {'files': 0, 'failed': 0, 'skipped': 0, 'bytes': 0, 'elapsed': 0.0}
+                 for folder in list(folders) + ['total']}
+        # manifests of the listed directories, and the directories with manifests to write
+        manifests = {}
+        changed_manifests = set()
+        last_manifest_write = time.time()
+        pool = SFTPPool(lambda: pysftp.Connection(cfg.SFTP_SERVER, username=cfg.SFTP_USERNAME,
+                                                  password=cfg.SFTP_PASSWORD), num_connections)
+        start = time.time()
+        try:
+            with ThreadPoolExecutor(max_workers=num_connections, thread_name_prefix='sftp') as executor:
+                # both directories are listed together, and downloads start as soon as a directory is listed
+                listings = {executor.submit(SyncData.list_changed_files, pool, remote_path, local_path,
+                                            verify_checksum, **folder_filters[folder]): folder
+                            for folder, (remote_path, local_path) in folders.items()}
+                downloads = {}
+                for future in as_completed(listings):
+                    folder = listings[future]
+                    changed_files, manifests[folder] = future.result()
+                    changed_manifests.add(folder)
+                    stats[folder]['skipped'] = len(manifests[folder])
+                    log.info("%s file sync started. %d files to download", folder.upper(), len(changed_files))
+                    for remote_file_path, local_file_path, size, mtime in changed_files:
+                        download = executor.submit(SyncData.download_file, pool, remote_file_path, local_file_path,
+                                                   size, mtime, verify_checksum)
+                        # manifest entries are named by the path relative to the local directory
+                        name = os.path.relpath(local_file_path, folders[folder][1]).replace(os.sep, '/')
+                        downloads[download] = (folder, remote_file_path, name)
+                        # files downloaded again are not counted as skipped
+                        if name in manifests[folder]:
+                            stats[folder]['skipped'] -= 1
+                for future in as_completed(downloads):
+                    folder, remote_file_path, name = downloads[future]
+                    try:
+                        entry, downloaded_bytes = future.result()
+                    except (OSError, paramiko.ssh_exception.SSHException) as e:
+                        # other files are downloaded. The failed file is resumed in the next sync
+                        log.error("Download of %s failed: %s", remote_file_path, e)
+                        stats[folder]['failed'] += 1
+                        continue
+                    manifests[folder][name] = entry
+                    changed_manifests.add(folder)
+                    stats[folder]['files'] += 1
+                    stats[folder]['bytes'] += downloaded_bytes
+                    stats[folder]['elapsed'] = time.time() - start
+                    # the manifests are written while downloading, so that an interrupted sync keeps the synced files
+                    if time.time() - last_manifest_write >= SyncData.MANIFEST_WRITE_INTERVAL:
+                        for changed_folder in changed_manifests:
+                            SyncData.write_manifest(folders[changed_folder][1], manifests[changed_folder])
+                        changed_manifests = set()
+                        last_manifest_write = time.time()
+        except (paramiko.ssh_exception.SSHException, pysftp.ConnectionException, AttributeError, OSError) as e:
+            if isinstance(e, paramiko.ssh_exception.AuthenticationException):
+                log.error("Authentication Failed.")
+            elif isinstance(e, (paramiko.ssh_exception.SSHException, pysftp.ConnectionException, AttributeError)):
+                log.error("Can not connect to the remote URL.")
+                log.error("Checkout the local known_hosts file "
+                          "and try to connect using ssh in command prompt first.")
+            else:
+                log.error("There was an error in syncing the files: %s", e)
+            return None
+        finally:
+            for folder in changed_manifests:
+                SyncData.write_manifest(folders[folder][1], manifests[folder])
+            pool.close()
+
+        for key in ['files', 'failed', 'skipped', 'bytes']:
+            stats['total'][key] = stats['ghg'][key] + stats['met'][key]
+        stats['total']['elapsed'] = time.time() - start
+        stats = {folder: SyncData.get_throughput(folder_stats) for folder, folder_stats in stats.items()}
+        for folder, folder_stats in stats.items():
+            log.info("%s file sync completed. %d files, %d failed, %d unchanged, %.2f MB in %.2fs, %.2f MB/s, "
+                     "%.2f files/s", folder.upper(), folder_stats['files'], folder_stats['failed'],
+                     folder_stats['skipped'], folder_stats['bytes'] / 1e6,
+                     folder_stats['elapsed'], folder_stats['mb_per_second'], folder_stats['files_per_second'])
+        return stats
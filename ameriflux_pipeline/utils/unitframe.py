@@ -0,0 +1,201 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+
+import pandas as pd
+import numpy as np
+import logging
+
+import utils.data_util as data_util
+
+# create log object with current module name
+log = logging.getLogger(__name__)
+
+
+class UnitFrame:
+    """
+    Class to hold the data of a met data or flux data sheet along with the units and descriptions of the variables.
+    Units are not stored as a row in the data so that all data columns keep their numerical data type.
+    """
+
+    def __init__(self, data, units=None, descriptions=None):
+        """
+        Constructor for the class
+
+        Args:
+            data (obj): Pandas DataFrame object having the data
+            units (dict): Mapping of variable name to its unit
+            descriptions (dict): Mapping of variable name to its description, like Avg or Min for met data
+        """
+        self.data = data
+        self.units = dict(units) if units is not None else {}
+        self.descriptions = dict(descriptions) if descriptions is not None else {}
+
+    @property
+    def columns(self):
+        """
+        Variable names in the data
+        """
+        return self.data.columns
+
+    def get_unit(self, col):
+        """
+        Get the unit of a variable
+
+        Args:
+            col (str): Variable name
+        Returns:
+            (str): Unit of the variable. NaN if the variable does not have a unit
+        """
+        return self.units.get(col, np.nan)
+
+    def set_unit(self, col, unit):
+        """
+        Set the unit of a variable
+
+        Args:
+            col (str): Variable name
+            unit (str): Unit of the variable
+        Returns:
+            None
+        """
+        self.units[col] = unit
+
+    def add_column(self, col, values, unit, description=None):
+        """
+        Add a new variable with its unit. An existing variable with the same name is replaced.
+
+        Args:
+            col (str): Variable name
+            values (obj): Pandas Series or array with the values of the variable
+            unit (str): Unit of the variable
+            description (str): Description of the variable
+        Returns:
+            None
+        """
+        self.data[col] = values
+        self.units[col] = unit
+        if description is not None:
+            self.descriptions[col] = description
+
+    def rename(self, columns):
+        """
+        Rename variables in data, units and descriptions
+
+        Args:
+            columns (dict): Mapping of old variable names to new variable names
+        Returns:
+            None
+        """
+        self.data = self.data.rename(columns=columns)
+        self.units = {columns.get(col, col): unit for col, unit in self.units.items()}
+        self.descriptions = {columns.get(col, col): desc for col, desc in self.descriptions.items()}
+
+    def drop(self, columns):
+        """
+        Remove variables from data, units and descriptions
+
+        Args:
+            columns (list): List of variable names to remove
+        Returns:
+            None
+        """
+        self.data = self.data.drop(columns, axis=1)
+        for col in columns:
+            self.units.pop(col, None)
+            self.descriptions.pop(col, None)
+
+    def copy(self):
+        """
+        Deep copy of the data, units and descriptions
+
+        Returns:
+            (obj): UnitFrame object
+        """
+        return UnitFrame(self.data.copy(), self.units, self.descriptions)
+
+    def get_units_row(self):
+        """
+        Get the units as a one row dataframe in the same column order as the data.
+        This is the units row written below the column names in the output files.
+
+        Returns:
+            (obj): Pandas DataFrame object
+        """
+        return pd.DataFrame([[self.get_unit(col) for col in self.columns]], columns=self.columns)
+
+    @staticmethod
+    def from_units_row(data, df_meta, descriptions=None):
+        """
+        Create the object from data and a one row dataframe of units
+
+        Args:
+            data (obj): Pandas DataFrame object having the data
+            df_meta (obj): Pandas DataFrame object having the units of all variables in the first row
+            descriptions (dict): Mapping of variable name to its description
+        Returns:
+            (obj): UnitFrame object
+        """
+        return UnitFrame(data, df_meta.iloc[0].to_dict(), descriptions)
+
+    @staticmethod
+    def read_csv(file_path, data_dtype='float64', header_row=0):
+        """
+        Read a csv file having the column names followed by a row of units
+
+        Args:
+            file_path (str): File path to read data
+            data_dtype (str): Numeric storage type of the data. float64 or float32
+            header_row (int): Row number of the column names. Units are expected in the next row
+        Returns:
+            (obj): UnitFrame object
+        """
+        df, df_meta = data_util.read_data_with_units(file_path, data_dtype, header_row)
+        return UnitFrame.from_units_row(df, df_meta)
+
+    @staticmethod
+    def read_excel(file_path, sheet_name, data_dtype='float64'):
+        """
+        Read an excel sheet having the column names followed by a row of units
+
+        Args:
+            file_path (str): File path to read data
+            sheet_name (str): Name of the excel sheet
+            data_dtype (str): Numeric storage type of the data. float64 or float32
+        Returns:
+            (obj): UnitFrame object
+        """
+        log.info("Read excel sheet %s from %s", sheet_name, file_path)
+        df = pd.read_excel(file_path, sheet_name=sheet_name, na_values=data_util.MISSING_VALUES)
+        units = df.iloc[0].to_dict()
+        # excel cells are already typed. infer the column types once the units row is removed
+        df = df.iloc[1:, :].reset_index(drop=True).infer_objects()
+        df = data_util.set_data_dtype(df, data_dtype)
+        return UnitFrame(df, units)
+
+    def write_csv(self, output_data, na_rep=''):
+        """
+        Write the data to csv file with the units written in the row below the column names
+
+        Args:
+            output_data (str): File path to save output data
+            na_rep (str): Missing value sentinel written in place of NaN
+        Returns:
+            None
+        """
+        data_util.write_data_with_units_to_csv(self.data, self.get_units_row(), output_data, na_rep)
+
+    def write_excel(self, writer, sheet_name, na_rep=''):
+        """
+        Write the data to an excel sheet with the units written in the row below the column names
+
+        Args:
+            writer (object): Pandas ExcelWriter object using xlsxwriter engine
+            sheet_name (str): Name of the excel sheet
+            na_rep (str): Missing value sentinel written in place of NaN
+        Returns:
+            None
+        """
+        data_util.write_data_with_units_to_excel(writer, self.data, self.get_units_row(), sheet_name, na_rep)
@@ -0,0 +1,194 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from utils.controlfile import ControlFile  # noqa: E402
+from utils.process_validation import L1Validation, L2Validation  # noqa: E402
+from pyfluxpro.l1format import L1Format  # noqa: E402
+from pyfluxpro.l2format import L2Format  # noqa: E402
+
+INPUT_DIR = os.path.join(ROOT_FOLDER, 'ameriflux_pipeline', 'example_data', 'pyfluxpro', 'input')
+# expected L1 and L2 control files and variable mappings for the example data
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), 'data', 'controlfile')
+TEMPLATES = ['L1_mainstem.txt', 'L1_Ameriflux_ONLY.txt', 'L2_mainstem.txt', 'L2_AF.txt']
+MET_DATA_SHEET_NAME = 'Met_data_30'
+FULL_OUTPUT_SHEET_NAME = 'full_output'
+
+
+def read_lines(file_path):
+    with open(file_path) as file:
+        return file.read().splitlines()
+
+
+def get_template_lines(file_name):
+    return read_lines(os.path.join(INPUT_DIR, file_name))
+
+
+def get_sheet_variables(sheet_name):
+    """Names of the variables read from the sheet by the L1 templates"""
+    names = set()
+    for file_name in TEMPLATES[:2]:
+        control_file = ControlFile.parse(get_template_lines(file_name))
+        for var in control_file.get_section('Variables').sections:
+            xl = var.get_section('xl', ignore_case=True)
+            if xl is not None and xl.get_value('sheet') == sheet_name:
+                names.add(xl.get_value('name'))
+    return sorted(names)
+
+
+def get_soil_variables():
+    """Soil moisture and temperature variables of the Soils key, for a variable in the L1 template and a new one"""
+    moisture = {'Moisture6_Avg': {'Eddypro label': 'SWC_1_1_1', 'Pyfluxpro label': 'Sws_10cma', 'Depth (cm)': 10,
+                                  'Instrument': 'CS655'},
+                'VWC_extra_Avg': {'Eddypro label': 'SWC_1_9_1', 'Pyfluxpro label': 'Sws_90cm', 'Depth (cm)': 90,
+                                  'Instrument': 'CS650'}}
+    temp = {'SoilTemp6_Avg': {'Eddypro label': 'TS_1_1_1', 'Pyfluxpro label': 'Ts_10cma', 'Depth (cm)': 10,
+                              'Instrument': 'CS655'},
+            'TC_extra_Avg': {'Eddypro label': 'TS_1_9_1', 'Pyfluxpro label': 'Ts_90cm', 'Depth (cm)': 90,
+                             'Instrument': 'TC'}}
+    return moisture, temp
+
+
+def write_l1(tmp_path, erroring_variable_flag):
+    file_meta_data_file = str(tmp_path / 'file_meta.csv')
+    with open(file_meta_data_file, 'w') as file:
+        file.write('TOA5,station,logger,serial,os,table,signature,name\n'
+                   'TOA5,CPU:Maize_Flux,CR3000,1,CR3000.Std,CPU:Maize_Basalt_Flux.CR3,1,Flux\n')
+    # a variable of each sheet is missing, so that it is not written
+    met_data_variables = [name for name in get_sheet_variables(MET_DATA_SHEET_NAME) if name != 'Ah_fromRH']
+    met_data_variables += ['VWC_extra_Avg', 'TC_extra_Avg']
+    full_output_variables = [name for name in get_sheet_variables(FULL_OUTPUT_SHEET_NAME) if name != 'co2_var']
+    soil_moisture_variables, soil_temp_variables = get_soil_variables()
+    l1_ameriflux_output = str(tmp_path / 'L1_Ameriflux.txt')
+    mapping = L1Format.data_formatting('/data/pyfluxpro/pyfluxpro_input.xlsx',
+                                       os.path.join(INPUT_DIR, 'L1_mainstem.txt'),
+                                       os.path.join(INPUT_DIR, 'L1_Ameriflux_ONLY.txt'),
+                                       os.path.join(INPUT_DIR, 'Ameriflux-Mainstem-Key.xlsx'), file_meta_data_file,
+                                       '/data/pyfluxpro/L1.nc', l1_ameriflux_output, erroring_variable_flag,
+                                       os.path.join(INPUT_DIR, 'L1_erroring_variables.xlsx'),
+                                       soil_moisture_variables, soil_temp_variables,
+                                       full_output_variables, met_data_variables,
+                                       MET_DATA_SHEET_NAME, FULL_OUTPUT_SHEET_NAME)
+    return l1_ameriflux_output, mapping
+
+
+def read_expected_mapping(erroring_variable_flag):
+    with open(os.path.join(EXPECTED_DIR, 'L1_mapping_%s.json' % erroring_variable_flag)) as file:
+        return json.load(file)
+
+
+@pytest.mark.parametrize('file_name', TEMPLATES)
+def test_template_round_trip(file_name):
+    lines = get_template_lines(file_name)
+    control_file = ControlFile.parse(lines)
+    assert control_file.diagnostics == []
+    # trailing spaces of key = value lines are not kept
+    assert control_file.to_lines() == [line.rstrip() for line in lines]
+
+
+def test_multi_line_value_is_written_as_read():
+    lines = ['level = L1',
+             '[Global]',
+             "  acknowledgement = '''First line",
+             'second line = with an equal sign',
+             '',
+             "  last line'''",
+             '  site_name = Maize']
+    assert ControlFile.parse(lines).to_lines() == ['level = L1',
+                                                   '[Global]',
+                                                   "    acknowledgement = '''First line",
+                                                   'second line = with an equal sign',
+                                                   '',
+                                                   "  last line'''",
+                                                   '    site_name = Maize']
+
+
+@pytest.mark.parametrize('erroring_variable_flag', ['Y', 'N'])
+def test_l1_output(tmp_path, erroring_variable_flag):
+    l1_ameriflux_output, mapping = write_l1(tmp_path, erroring_variable_flag)
+    expected_file = os.path.join(EXPECTED_DIR, 'L1_Ameriflux_%s.txt' % erroring_variable_flag)
+    assert read_lines(l1_ameriflux_output) == read_lines(expected_file)
+    assert mapping == read_expected_mapping(erroring_variable_flag)
+
+
+def test_l2_output(tmp_path):
+    l2_ameriflux_output = str(tmp_path / 'L2_Ameriflux.txt')
+    L2Format.data_formatting(read_expected_mapping('N'), os.path.join(INPUT_DIR, 'L2_mainstem.txt'),
+                             os.path.join(INPUT_DIR, 'L2_AF.txt'), '/data/pyfluxpro/L1.nc', '/data/pyfluxpro/L2.nc',
+                             l2_ameriflux_output)
+    assert read_lines(l2_ameriflux_output) == read_lines(os.path.join(EXPECTED_DIR, 'L2_Ameriflux.txt'))
+
+
+def replace_line(lines, old, new):
+    """Replace the first line equal to old"""
+    lines = list(lines)
+    lines[lines.index(old)] = new
+    return lines
+
+
+def insert_line(lines, after, new):
+    """Insert a line after the first line equal to after"""
+    lines = list(lines)
+    lines.insert(lines.index(after) + 1, new)
+    return lines
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda lines: insert_line(lines, '[Variables]', '    [[Broken]'), 'Line 38: unbalanced square brackets'),
+    (lambda lines: insert_line(lines, '[Variables]', '        [[[[Deep]]]]'), 'more than one level below its parent'),
+    (lambda lines: insert_line(lines, 'level = L1', 'stray line'), 'Line 2: stray line is outside of a section'),
+])
+def test_parse_diagnostics(change, message):
+    control_file = ControlFile.parse(change(get_template_lines('L1_mainstem.txt')))
+    assert [level for level, _ in control_file.diagnostics] == [logging.WARNING]
+    assert message in control_file.diagnostics[0][1]
+    assert control_file.is_valid()
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda lines: replace_line(lines, 'level = L1', 'level = L2'), 'Incorrect format in Level line'),
+    (lambda lines: replace_line(lines, '[Files]', '[Input]'), 'Undefined L1 Files, Global and Variables section'),
+    (lambda lines: replace_line(lines, '    file_path = C:\\sorghum\\', '  file_path = C:\\sorghum\\'),
+     'Incorrect format in L1 Files section'),
+    (lambda lines: replace_line(lines, '    site_name = Sorghum', '    site = Sorghum'),
+     'Incorrect format in L1 Global section'),
+    (lambda lines: replace_line(lines, '            sheet = Met_data_30', '            sheet = Other'),
+     'Incorrect format in L1 Variables section'),
+])
+def test_l1_diagnostics(change, message):
+    control_file = ControlFile.parse(change(get_template_lines('L1_mainstem.txt')))
+    assert not L1Validation.check_l1_format(control_file, MET_DATA_SHEET_NAME, FULL_OUTPUT_SHEET_NAME)
+    assert control_file.diagnostics == [(logging.ERROR, message)]
+    assert not control_file.is_valid()
+
+
+@pytest.mark.parametrize('change, message', [
+    (lambda lines: replace_line(lines, 'level = L2', 'level = L1'), 'Incorrect format in Level section'),
+    (lambda lines: replace_line(lines, '[Variables]', '[Series]'), 'No [Variables] present in L2.txt'),
+    (lambda lines: replace_line(lines, '            lower = 0.5', '            low = 0.5'),
+     'Incorrect format in L2 Variables section'),
+])
+def test_l2_diagnostics(change, message):
+    control_file = ControlFile.parse(change(get_template_lines('L2_AF.txt')))
+    assert not L2Validation.check_l2_format(control_file)
+    assert control_file.diagnostics == [(logging.ERROR, message)]
+    assert not control_file.is_valid()
+
+
+def test_l2_without_plots_is_valid():
+    lines = get_template_lines('L2_AF.txt')
+    control_file = ControlFile.parse(lines[:lines.index('[Plots]')])
+    assert L2Validation.check_l2_format(control_file)
+    assert control_file.diagnostics == [(logging.WARNING, 'No [Plots] present in L2.txt')]
+    assert control_file.is_valid()
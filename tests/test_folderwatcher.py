@@ -0,0 +1,74 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import os
+import sys
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from config import Config  # noqa: E402
+from utils.folderwatcher import FolderWatcher  # noqa: E402
+from utils.input_validation import InputValidation  # noqa: E402
+
+
+def write_file(file_path, text):
+    with open(file_path, 'w') as file:
+        file.write(text)
+
+
+def get_watcher(tmp_path, max_failures=2):
+    return FolderWatcher([str(tmp_path / 'met')], ['*.dat'], debounce=10, max_wait=100,
+                         state_file=str(tmp_path / 'state.json'), max_failures=max_failures)
+
+
+def test_burst_is_reported_after_debounce(tmp_path):
+    os.makedirs(tmp_path / 'met')
+    write_file(tmp_path / 'met' / 'a.dat', 'a')
+    write_file(tmp_path / 'met' / 'notes.txt', 'notes')
+    watcher = get_watcher(tmp_path)
+    assert watcher.poll(now=0) == {}
+    files = watcher.poll(now=10)
+    assert list(files) == [str(tmp_path / 'met' / 'a.dat')]
+    watcher.commit(files)
+    assert watcher.poll(now=20) == {}
+    # processed files are kept in the state file
+    assert get_watcher(tmp_path).poll(now=30) == {}
+
+
+def test_failed_file_is_set_aside(tmp_path):
+    os.makedirs(tmp_path / 'met')
+    good_file, bad_file = str(tmp_path / 'met' / 'a.dat'), str(tmp_path / 'met' / 'b.dat')
+    write_file(good_file, 'a')
+    write_file(bad_file, 'b')
+    watcher = get_watcher(tmp_path)
+    watcher.poll(now=0)
+    files = watcher.poll(now=10)
+    watcher.commit({good_file: files[good_file]})
+    assert watcher.fail({bad_file: files[bad_file]}, now=10) == []
+    # the failed file is retried after the debounce time
+    assert watcher.poll(now=15) == {}
+    files = watcher.poll(now=25)
+    assert list(files) == [bad_file]
+    assert watcher.fail(files, now=25) == [bad_file]
+    assert watcher.poll(now=100) == {}
+    # new files are reported while the failed file is set aside
+    new_file = str(tmp_path / 'met' / 'c.dat')
+    write_file(new_file, 'c')
+    watcher.poll(now=110)
+    assert list(watcher.poll(now=120)) == [new_file]
+    # set aside files are kept in the state file, and reported again when they change
+    watcher = get_watcher(tmp_path)
+    assert list(watcher.set_aside) == [bad_file]
+    write_file(bad_file, 'b fixed')
+    watcher.poll(now=200)
+    assert sorted(watcher.poll(now=210)) == [bad_file, new_file]
+
+
+def test_watcher_settings_are_validated():
+    assert InputValidation.watcher(Config())
+    assert not InputValidation.watcher(Config.load(None, {'WATCH_DEBOUNCE': 'two minutes'}))
+    assert not InputValidation.watcher(Config.load(None, {'WATCH_POLL_INTERVAL': '0'}))
+    assert not InputValidation.watcher(Config.load(None, {'WATCH_MAX_FAILURES': '0'}))
@@ -0,0 +1,37 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import os
+import sys
+
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from utils.metnames import MetNames  # noqa: E402
+
+
+@pytest.mark.parametrize('name, normalized_name', [
+    ('VWC_6_Avg', 'VWC1_6_Avg'),
+    ('TC_2_Avg', 'TC1_2_Avg'),
+    ('cnr4_T_C_Avg', 'CNRTC_Avg'),
+    ('CNR4TK_Avg', 'CNRTK_Avg'),
+    ('Rs_net_Avg', 'NetRs_Avg'),
+    ('rl_net', 'NetRl_Avg'),
+    ('albedo_Avg', 'Albedo_Avg'),
+    ('Ta_Avg', 'Ta_Avg'),
+])
+def test_normalize(name, normalized_name):
+    assert MetNames.normalize(name) == normalized_name
+
+
+def test_columns_are_unique():
+    columns = ['TIMESTAMP', 'Rs_net_Avg', 'Rs_net_Std', 'Rl_net_Avg', 'Rl_net_Std', 'albedo_Avg', 'albedo_Std',
+               'CNR4_T_C_Avg', 'CNR4_T_C_Std', 'VWC_1_Avg', 'VWC_2_Avg']
+    normalized = MetNames.normalize_columns(columns)
+    assert list(normalized) == ['TIMESTAMP', 'NetRs_Avg', 'Rs_net_Std', 'NetRl_Avg', 'Rl_net_Std', 'Albedo_Avg',
+                                'albedo_Std', 'CNRTC_Avg', 'CNR4_T_C_Std', 'VWC1_1_Avg', 'VWC1_2_Avg']
+    assert normalized.is_unique
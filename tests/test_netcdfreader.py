@@ -0,0 +1,98 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import datetime
+import os
+import sys
+
+import netCDF4
+import numpy as np
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+import pyfluxpro.netcdfreader as netcdfreader  # noqa: E402
+from pyfluxpro.netcdfreader import NetCDFReader  # noqa: E402
+
+TIME_UNITS = 'days since 1800-01-01 00:00:00.0'
+START = datetime.datetime(2020, 1, 1)
+# two years of 30 min timestamps
+NUM_ROWS = 2 * 17568
+
+
+def write_time(file_path, values, units=TIME_UNITS):
+    with netCDF4.Dataset(file_path, 'w') as dataset:
+        dataset.createDimension('time', len(values))
+        time_var = dataset.createVariable('time', 'f8', ('time',), fill_value=-9999.0)
+        time_var.units = units
+        time_var[:] = values
+
+
+def read_timestamps(file_path):
+    with netCDF4.Dataset(file_path) as dataset:
+        return NetCDFReader.get_timestamps(dataset.variables['time'])
+
+
+def get_expected_timestamps(num_rows):
+    return np.datetime64(START, 'us') + np.arange(num_rows) * np.timedelta64(30, 'm')
+
+
+def test_float_days_snap_to_whole_seconds(tmp_path):
+    file_path = str(tmp_path / 'time.nc')
+    # float days are not a whole number of seconds, like the time axis written by PyFluxPro
+    values = netCDF4.date2num(START, TIME_UNITS) + np.arange(NUM_ROWS) / 48.0
+    assert (values.astype(np.longdouble) * 86400000000 % 1000000 != 0).any()
+    write_time(file_path, values)
+    timestamps = read_timestamps(file_path)
+    assert timestamps.dtype == np.dtype('datetime64[us]')
+    np.testing.assert_array_equal(timestamps, get_expected_timestamps(NUM_ROWS))
+    # the same timestamps as num2date
+    times = netCDF4.num2date(values, units=TIME_UNITS, calendar='gregorian')
+    np.testing.assert_array_equal(timestamps, np.array([t.isoformat() for t in times], dtype='datetime64[us]'))
+
+
+def test_other_units_are_converted(tmp_path):
+    file_path = str(tmp_path / 'time.nc')
+    write_time(file_path, np.arange(4) * 1800.0, 'seconds since 2020-01-01 00:00:00')
+    np.testing.assert_array_equal(read_timestamps(file_path), get_expected_timestamps(4))
+    write_time(file_path, np.arange(4) * 0.5, 'hours since 2020-01-01')
+    np.testing.assert_array_equal(read_timestamps(file_path), get_expected_timestamps(4))
+
+
+def test_masked_time_uses_num2date(tmp_path, monkeypatch):
+    file_path = str(tmp_path / 'time.nc')
+    values = np.ma.masked_array(netCDF4.date2num(START, TIME_UNITS) + np.arange(4) / 48.0,
+                                mask=[False, False, True, False])
+    write_time(file_path, values)
+    calls = []
+
+    def num2date(*args, **kwargs):
+        calls.append(args)
+        return netCDF4.num2date(*args, **kwargs)
+
+    monkeypatch.setattr(netcdfreader, 'num2date', num2date)
+    timestamps = read_timestamps(file_path)
+    assert len(calls) == 1
+    assert np.ma.is_masked(calls[0][0])
+    expected = get_expected_timestamps(4)
+    np.testing.assert_array_equal(timestamps[[0, 1, 3]], expected[[0, 1, 3]])
+
+
+def test_integer_variables_with_missing_values_are_floats(tmp_path):
+    file_path = str(tmp_path / 'count.nc')
+    with netCDF4.Dataset(file_path, 'w') as dataset:
+        dataset.createDimension('time', 4)
+        for name in ['count', 'masked_count']:
+            dataset.createVariable(name, 'i4', ('time',), fill_value=-9999)[:] = np.arange(4)
+        dataset.variables['masked_count'][3] = np.ma.masked
+    with netCDF4.Dataset(file_path) as dataset:
+        var_names = ['count', 'masked_count']
+        int_var_names = NetCDFReader.get_integer_variables(dataset, var_names)
+        assert int_var_names == ['count']
+        # the rows read have no missing values, but the variable has
+        df = NetCDFReader.read_variables(dataset, var_names, 0, 2, int_var_names=int_var_names)
+        assert df.to_csv(index=False) == 'count,masked_count\n0,0.0\n1,1.0\n'
+        df = NetCDFReader.read_variables(dataset, var_names, 0, 2)
+        assert df.to_csv(index=False) == 'count,masked_count\n0,0\n1,1\n'
@@ -0,0 +1,112 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import datetime
+import os
+import sys
+
+import netCDF4
+import numpy as np
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+import utils.data_util as data_util  # noqa: E402
+from pyfluxpro.outputformat import OutputFormat  # noqa: E402
+
+# Ameriflux csv written from L2.nc by OutputFormat.data_formatting before the output was streamed and split by year
+EXPECTED_DIR = os.path.join(os.path.dirname(__file__), 'data', 'outputformat')
+EXPECTED_FILE_NAME = 'US-UiE_HH_202012290000_202101030000.csv'
+TIME_UNITS = 'days since 1800-01-01 00:00:00.0'
+# rows from Dec 29 2020 00:00 to Jan 03 2021 00:00
+START = datetime.datetime(2020, 12, 29)
+NUM_ROWS = 5 * 48
+
+
+def write_l2_output(file_path):
+    """PyFluxPro L2 output spanning two calendar years"""
+    with netCDF4.Dataset(file_path, 'w') as l2:
+        l2.createDimension('time', NUM_ROWS)
+        l2.createDimension('latitude', 1)
+        l2.createDimension('longitude', 1)
+        time_var = l2.createVariable('time', 'f8', ('time',))
+        time_var.units = TIME_UNITS
+        # float time axis as written by PyFluxPro, not a whole number of seconds
+        time_var[:] = netCDF4.date2num(START, TIME_UNITS) + np.arange(NUM_ROWS) / 48.0
+        for name in ['latitude', 'longitude']:
+            l2.createVariable(name, 'f8', (name,))[:] = [40.0]
+        rows = np.arange(NUM_ROWS)
+        dims = ('time', 'latitude', 'longitude')
+        for name, values in [('Fc', np.sin(rows / 7.0) * 20), ('Ta', np.cos(rows / 5.0) * 10 + 2.5),
+                             ('xlDateTime', rows / 48.0), ('Fc_QCFlag', rows % 3)]:
+            var = l2.createVariable(name, 'i4' if name.endswith('QCFlag') else 'f8', dims, fill_value=-9999)
+            var[:] = values.reshape(-1, 1, 1)
+        fc = l2.variables['Fc']
+        # values rounded half to even, and missing values
+        fc[5:8] = np.full((3, 1, 1), 1.0005)
+        fc[10::11] = np.ma.masked
+        count = l2.createVariable('Ah_count', 'i4', dims, fill_value=-9999)
+        count[:] = (rows % 4).reshape(-1, 1, 1)
+        count[3::17] = np.ma.masked
+
+
+@pytest.fixture
+def l2_output(tmp_path):
+    input_file = str(tmp_path / 'L2.nc')
+    write_l2_output(input_file)
+    file_meta_data_file = str(tmp_path / 'file_meta.csv')
+    with open(file_meta_data_file, 'w') as file:
+        file.write('TOA5,station,logger,serial,os,table,signature,name\n'
+                   'TOA5,Flux_Sorghum,CR3000,1,CR3000.Std,CPU:Sorghum_Basalt_Flux.CR3,1,Flux\n')
+    os.makedirs(tmp_path / 'output')
+    return input_file, file_meta_data_file, str(tmp_path / 'output')
+
+
+def read_bytes(file_path):
+    with open(file_path, 'rb') as file:
+        return file.read()
+
+
+def test_year_rows():
+    time_data = np.array(['2020-12-31T23:00', '2020-12-31T23:30', '2021-01-01T00:00', '2021-12-31T23:30',
+                          '2022-01-01T00:00'], dtype='datetime64[us]')
+    # the row starting at Dec 31 23:30 ends at Jan 01 00:00, and is the last row of the year
+    assert OutputFormat.get_year_rows(time_data) == [(2020, 0, 2), (2021, 2, 4), (2022, 4, 5)]
+    assert OutputFormat.get_year_rows(time_data[1:2]) == [(2020, 0, 1)]
+
+
+def test_single_file_is_unchanged(l2_output):
+    input_file, file_meta_data_file, output_dir = l2_output
+    df, file_name = OutputFormat.data_formatting(input_file, file_meta_data_file, 'Y', None)
+    assert file_name + '.csv' == EXPECTED_FILE_NAME
+    output_file = os.path.join(output_dir, EXPECTED_FILE_NAME)
+    data_util.write_data_to_csv(df, output_file)
+    assert read_bytes(output_file) == read_bytes(os.path.join(EXPECTED_DIR, EXPECTED_FILE_NAME))
+
+
+@pytest.mark.parametrize('chunk_rows', [OutputFormat.CHUNK_ROWS, 50])
+def test_streamed_file_is_unchanged(l2_output, chunk_rows):
+    input_file, file_meta_data_file, output_dir = l2_output
+    output_file = OutputFormat.write_ameriflux_csv(input_file, file_meta_data_file, 'Y', None, output_dir,
+                                                   chunk_rows=chunk_rows)
+    assert os.path.basename(output_file) == EXPECTED_FILE_NAME
+    assert read_bytes(output_file) == read_bytes(os.path.join(EXPECTED_DIR, EXPECTED_FILE_NAME))
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_year_files_are_unchanged(l2_output, max_workers):
+    input_file, file_meta_data_file, output_dir = l2_output
+    output_files = OutputFormat.write_ameriflux_csv_by_year(input_file, file_meta_data_file, 'Y', None, output_dir,
+                                                            max_workers=max_workers, chunk_rows=50)
+    assert [os.path.basename(output_file) for output_file in output_files] == [
+        'US-UiE_HH_202012290000_202101010000.csv', 'US-UiE_HH_202101010000_202101030000.csv']
+    first_year, second_year = [read_bytes(output_file).splitlines(keepends=True) for output_file in output_files]
+    assert first_year[-1].startswith(b'202012312330,202101010000,')
+    assert second_year[1].startswith(b'202101010000,202101010030,')
+    # the files of each year have the header and the rows of the single file
+    expected = read_bytes(os.path.join(EXPECTED_DIR, EXPECTED_FILE_NAME)).splitlines(keepends=True)
+    assert first_year[0] == second_year[0] == expected[0]
+    assert first_year + second_year[1:] == expected
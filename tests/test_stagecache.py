@@ -0,0 +1,125 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import os
+import pickle
+import sys
+
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from utils.stagecache import StageCache  # noqa: E402
+
+
+def write_file(file_path, text):
+    with open(file_path, 'w') as file:
+        file.write(text)
+
+
+class Stage:
+    """Stage copying its input file to its output file, counting its runs"""
+
+    def __init__(self, tmp_path):
+        self.input_file = str(tmp_path / 'input.csv')
+        self.output_file = str(tmp_path / 'output.csv')
+        self.runs = 0
+        write_file(self.input_file, 'a,b\n1,2\n')
+
+    def __call__(self, suffix):
+        self.runs += 1
+        with open(self.input_file) as file:
+            text = file.read()
+        write_file(self.output_file, text + suffix)
+        return {'rows': text.count('\n'), 'suffix': suffix}
+
+    def run(self, stage_cache, suffix='', name='stage'):
+        return stage_cache.run(name, self, {'input': self.input_file}, {'suffix': suffix}, [self.output_file],
+                               args=(suffix,))
+
+
+@pytest.fixture
+def stage(tmp_path):
+    return Stage(tmp_path)
+
+
+@pytest.fixture
+def stage_cache(tmp_path):
+    return StageCache(str(tmp_path / 'cache'))
+
+
+def get_result_file(stage_cache, name='stage'):
+    return os.path.join(stage_cache.cache_dir, stage_cache.read_manifest()[name]['result_file'])
+
+
+def test_unchanged_stage_is_skipped(stage, stage_cache):
+    assert stage.run(stage_cache) == {'rows': 2, 'suffix': ''}
+    assert stage.run(stage_cache) == {'rows': 2, 'suffix': ''}
+    assert stage.runs == 1
+
+
+def test_changed_input_file_reruns_stage(stage, stage_cache):
+    stage.run(stage_cache)
+    write_file(stage.input_file, 'a,b\n1,2\n3,4\n')
+    assert stage.run(stage_cache) == {'rows': 3, 'suffix': ''}
+    assert stage.runs == 2
+
+
+def test_changed_config_value_reruns_stage(stage, stage_cache):
+    stage.run(stage_cache)
+    assert stage.run(stage_cache, suffix='#') == {'rows': 2, 'suffix': '#'}
+    assert stage.runs == 2
+
+
+def test_modified_output_reruns_stage(stage, stage_cache):
+    stage.run(stage_cache)
+    write_file(stage.output_file, 'edited')
+    stage.run(stage_cache)
+    assert stage.runs == 2
+    os.remove(stage.output_file)
+    stage.run(stage_cache)
+    assert stage.runs == 3
+
+
+def test_tampered_result_is_rejected(stage, stage_cache):
+    stage.run(stage_cache)
+    with open(get_result_file(stage_cache), 'wb') as file:
+        file.write(pickle.dumps({'rows': 100, 'suffix': ''}))
+    assert stage.run(stage_cache) == {'rows': 2, 'suffix': ''}
+    assert stage.runs == 2
+
+
+def test_truncated_result_is_rejected(stage, stage_cache):
+    stage.run(stage_cache)
+    result_file = get_result_file(stage_cache)
+    with open(result_file, 'rb') as file:
+        data = file.read()
+    with open(result_file, 'wb') as file:
+        file.write(data[:len(data) // 2])
+    assert stage.run(stage_cache) == {'rows': 2, 'suffix': ''}
+    assert stage.runs == 2
+
+
+def test_shared_cache_directory_keeps_entries(tmp_path, stage_cache):
+    os.makedirs(tmp_path / 'first')
+    os.makedirs(tmp_path / 'second')
+    first_stage, second_stage = Stage(tmp_path / 'first'), Stage(tmp_path / 'second')
+    other_cache = StageCache(stage_cache.cache_dir)
+    first_stage.run(stage_cache, name='first')
+    second_stage.run(other_cache, name='second')
+    # each object saved its stage after reading the manifest written by the other
+    assert sorted(stage_cache.read_manifest()) == ['first', 'second']
+    assert first_stage.run(other_cache, name='first') == {'rows': 2, 'suffix': ''}
+    assert second_stage.run(stage_cache, name='second') == {'rows': 2, 'suffix': ''}
+    assert first_stage.runs == 1
+    assert second_stage.runs == 1
+
+
+def test_disabled_cache_runs_stage(stage):
+    stage_cache = StageCache('')
+    stage.run(stage_cache)
+    stage.run(stage_cache)
+    assert stage.runs == 2
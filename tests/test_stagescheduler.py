@@ -0,0 +1,159 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import importlib
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from config import Config  # noqa: E402
+from utils.stagescheduler import StageScheduler  # noqa: E402
+
+
+class Stages:
+    """Stub stages recording the stages run and the arguments they get"""
+
+    def __init__(self, failing=()):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.failing = failing
+
+    def get_stage(self, name):
+        def stage(*args, **kwargs):
+            with self.lock:
+                self.calls[name] = args
+            if name in self.failing:
+                raise ValueError("Stage %s failed" % name)
+            return name
+        return stage
+
+
+def get_scheduler(stages, status_file=None):
+    """
+    Scheduler with the stages
+    read -> parse -> report
+    write (after read) -> check (after write)
+    """
+    scheduler = StageScheduler(status_file=status_file)
+    scheduler.add_stage('read', stages.get_stage('read'), args=(1,))
+    scheduler.add_stage('parse', stages.get_stage('parse'), depends_on=['read'], args=(2,))
+    scheduler.add_stage('write', stages.get_stage('write'), after=['read'])
+    scheduler.add_stage('report', stages.get_stage('report'), depends_on=['parse'], kwargs={'title': 'report'})
+    scheduler.add_stage('check', stages.get_stage('check'), after=['write'])
+    return scheduler
+
+
+def test_depends_on_stages_are_selected():
+    scheduler = get_scheduler(Stages())
+    assert scheduler.get_stages() == ['read', 'parse', 'write', 'report', 'check']
+    assert scheduler.get_stages(['report']) == ['read', 'parse', 'report']
+    # stages run after are not selected
+    assert scheduler.get_stages(['check']) == ['check']
+    assert scheduler.get_stages(['write', 'check']) == ['write', 'check']
+    assert scheduler.get_stages(['unknown']) is None
+
+
+def test_results_are_passed_to_stages():
+    stages = Stages()
+    results = get_scheduler(stages).run(['report'])
+    assert results == {'read': 'read', 'parse': 'parse', 'report': 'report'}
+    assert stages.calls == {'read': (1,), 'parse': ('read', 2), 'report': ('parse',)}
+
+
+def test_stages_run_after_are_ordered():
+    stages = Stages()
+    order = []
+    scheduler = StageScheduler()
+    scheduler.add_stage('first', lambda: order.append('first') or True)
+    scheduler.add_stage('second', lambda: order.append('second') or True, after=['first'])
+    assert scheduler.is_success(scheduler.run())
+    assert order == ['first', 'second']
+    # the result of a stage run after is not passed
+    scheduler = get_scheduler(stages)
+    scheduler.run(['write', 'check'])
+    assert stages.calls == {'write': (), 'check': ()}
+
+
+@pytest.mark.parametrize('failing, targets, results', [
+    (['read'], None, {'read': None, 'parse': None, 'write': None, 'report': None, 'check': None}),
+    (['parse'], None, {'read': 'read', 'parse': None, 'write': 'write', 'report': None, 'check': 'check'}),
+    (['write'], ['write', 'check'], {'write': None, 'check': None}),
+])
+def test_stages_after_failed_stages_are_skipped(failing, targets, results):
+    stages = Stages(failing)
+    scheduler = get_scheduler(stages)
+    assert scheduler.run(targets) == results
+    assert not scheduler.is_success(results)
+    assert sorted(stages.calls) == sorted(name for name, result in results.items() if result or name in failing)
+
+
+def test_stage_returning_false_fails():
+    scheduler = StageScheduler()
+    scheduler.add_stage('first', lambda: False)
+    scheduler.add_stage('second', lambda result: True, depends_on=['first'])
+    assert scheduler.run() == {'first': False, 'second': None}
+    assert scheduler.status['first']['status'] == StageScheduler.FAILED
+    assert scheduler.status['second']['status'] == StageScheduler.SKIPPED
+
+
+def test_status_file(tmp_path):
+    status_file = str(tmp_path / 'cache' / 'status.json')
+    scheduler = get_scheduler(Stages(['write']), status_file)
+    scheduler.run(['report', 'write'])
+    with open(status_file) as file:
+        status = json.load(file)
+    assert {name: stage['status'] for name, stage in status.items()} == {
+        'read': StageScheduler.SUCCESS, 'parse': StageScheduler.SUCCESS, 'write': StageScheduler.FAILED,
+        'report': StageScheduler.SUCCESS}
+    assert all(stage['elapsed'] is not None for stage in status.values())
+    # the status of the stages not run is kept from the previous run
+    scheduler = get_scheduler(Stages(), status_file)
+    scheduler.run(['check'])
+    status = scheduler.read_status()
+    assert status['write']['status'] == StageScheduler.FAILED
+    assert status['check']['status'] == StageScheduler.SUCCESS
+    assert status == scheduler.status
+
+
+@pytest.fixture
+def pre_pyfluxpro(tmp_path, monkeypatch):
+    # the module writes its log file to the current directory when imported
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('pre_pyfluxpro')
+
+
+def get_pipeline_scheduler(pre_pyfluxpro, stages):
+    """Scheduler of the pre-pyfluxpro stages with the functions replaced by stub stages"""
+    scheduler = pre_pyfluxpro.get_stage_scheduler('file_meta.csv', 'N', Config())
+    for name, (_, depends_on, after, args, kwargs) in scheduler.stages.items():
+        scheduler.stages[name] = (stages.get_stage(name), depends_on, after, args, kwargs)
+    return scheduler
+
+
+def test_pyfluxpro_targets_do_not_run_eddypro(pre_pyfluxpro):
+    stages = Stages()
+    results = get_pipeline_scheduler(pre_pyfluxpro, stages).run(pre_pyfluxpro.PYFLUXPRO_TARGETS)
+    assert 'eddypro_run' not in results
+    assert sorted(stages.calls) == sorted(results) == ['ameriflux_formatting', 'eddypro_biomet', 'l1_control_file',
+                                                       'l2_control_file', 'pyfluxpro_ameriflux_input',
+                                                       'pyfluxpro_input']
+
+
+def test_eddypro_run_targets_run_only_eddypro(pre_pyfluxpro):
+    stages = Stages()
+    results = get_pipeline_scheduler(pre_pyfluxpro, stages).run(pre_pyfluxpro.EDDYPRO_RUN_TARGETS)
+    assert list(results) == list(stages.calls) == ['eddypro_run']
+
+
+def test_eddypro_preprocessing_targets(pre_pyfluxpro):
+    stages = Stages()
+    results = get_pipeline_scheduler(pre_pyfluxpro, stages).run(pre_pyfluxpro.EDDYPRO_PREPROCESSING_TARGETS)
+    assert list(results) == list(stages.calls) == ['eddypro_biomet']
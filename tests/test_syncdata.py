@@ -0,0 +1,190 @@
+# Copyright (c) 2022 University of Illinois and others. All rights reserved.
+#
+# This program and the accompanying materials are made available under the
+# terms of the Mozilla Public License v2.0 which accompanies this distribution,
+# and is available at https://www.mozilla.org/en-US/MPL/2.0/
+import filecmp
+import os
+import sys
+import threading
+import time
+
+import pysftp
+import pytest
+
+ROOT_FOLDER = os.path.dirname(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(ROOT_FOLDER, 'ameriflux_pipeline'))
+
+from config import Config  # noqa: E402
+from utils.syncdata import SyncData  # noqa: E402
+
+CHUNK_SIZE = 1024
+FILE_SIZE = 4 * CHUNK_SIZE
+
+
+class FakeServer:
+    """Local directory served by FakeConnection, with the calls made to it"""
+
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.opened = []
+        self.active = 0
+        self.max_active = 0
+        # remote file name to the read calls that fail on it
+        self.failing_reads = {}
+
+
+class FakeAttributes:
+    """Attributes of a file as returned by listdir_attr"""
+
+    def __init__(self, file_path):
+        file_stat = os.stat(file_path)
+        self.filename = os.path.basename(file_path)
+        self.st_mode = file_stat.st_mode
+        self.st_mtime = int(file_stat.st_mtime)
+        self.st_size = file_stat.st_size
+
+
+class FakeRemoteFile:
+    """Remote file opened by FakeConnection"""
+
+    def __init__(self, server, file_path):
+        self.server = server
+        self.file_path = file_path
+        self.file = open(file_path, 'rb')
+        self.reads = 0
+
+    def __enter__(self):
+        with self.server.lock:
+            self.server.active += 1
+            self.server.max_active = max(self.server.max_active, self.server.active)
+        return self
+
+    def __exit__(self, *args):
+        with self.server.lock:
+            self.server.active -= 1
+        self.file.close()
+
+    def seek(self, offset):
+        self.file.seek(offset)
+
+    def prefetch(self, size):
+        pass
+
+    def read(self, size):
+        self.reads += 1
+        if self.reads in self.server.failing_reads.get(os.path.basename(self.file_path), ()):
+            raise OSError("Connection lost")
+        # slow reads, so that the downloads overlap
+        time.sleep(0.01)
+        return self.file.read(size)
+
+
+def get_connection_class(server):
+    """Returns a class with the methods of pysftp.Connection used by SyncData, serving the server directory"""
+
+    class FakeConnection:
+        def __init__(self, host, username=None, password=None):
+            pass
+
+        def listdir_attr(self, remote_path):
+            local_path = server.root + remote_path
+            return [FakeAttributes(os.path.join(local_path, name)) for name in os.listdir(local_path)]
+
+        def open(self, remote_path, mode):
+            server.opened.append(remote_path)
+            return FakeRemoteFile(server, server.root + remote_path)
+
+        def close(self):
+            pass
+
+    return FakeConnection
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    server = FakeServer(str(tmp_path / 'server'))
+    for folder, num_files in [('ghg', 8), ('met', 2)]:
+        os.makedirs(os.path.join(server.root, folder))
+        for i in range(num_files):
+            with open(os.path.join(server.root, folder, 'file%02d.%s' % (i, folder)), 'wb') as file:
+                file.write(os.urandom(FILE_SIZE))
+    monkeypatch.setattr(pysftp, 'Connection', get_connection_class(server))
+    monkeypatch.setattr(SyncData, 'CHUNK_SIZE', CHUNK_SIZE)
+    return server
+
+
+def get_config(tmp_path, **values):
+    return Config.load(None, dict({'SFTP_CONFIRMATION': 'Y', 'SFTP_SERVER': 'server', 'SFTP_CONNECTIONS': '4',
+                                   'SFTP_GHG_REMOTE_PATH': '/ghg', 'SFTP_GHG_LOCAL_PATH': str(tmp_path / 'ghg'),
+                                   'SFTP_MET_REMOTE_PATH': '/met', 'SFTP_MET_LOCAL_PATH': str(tmp_path / 'met')},
+                                  **values))
+
+
+@pytest.fixture
+def cfg(tmp_path):
+    return get_config(tmp_path)
+
+
+def assert_synced(server, local_path, folder):
+    remote_path = os.path.join(server.root, folder)
+    names = sorted(os.listdir(remote_path))
+    assert sorted(name for name in os.listdir(local_path) if not name.startswith('.')) == names
+    assert all(filecmp.cmp(os.path.join(remote_path, name), os.path.join(local_path, name), shallow=False)
+               for name in names)
+
+
+def test_parallel_download(server, cfg):
+    stats = SyncData.sync_data(cfg)
+    assert stats['ghg']['files'] == 8
+    assert stats['met']['files'] == 2
+    assert stats['total']['bytes'] == 10 * FILE_SIZE
+    assert server.max_active > 1
+    assert_synced(server, cfg.SFTP_GHG_LOCAL_PATH, 'ghg')
+    assert_synced(server, cfg.SFTP_MET_LOCAL_PATH, 'met')
+
+
+def test_failed_chunk_is_resumed(server, cfg):
+    server.failing_reads['file03.ghg'] = {3}
+    stats = SyncData.sync_data(cfg)
+    assert stats['ghg']['files'] == 7
+    assert stats['ghg']['failed'] == 1
+    local_file_path = os.path.join(cfg.SFTP_GHG_LOCAL_PATH, 'file03.ghg')
+    assert not os.path.exists(local_file_path)
+    # the two chunks read before the failure are kept in the temporary file
+    part_file_names = [name for name in os.listdir(cfg.SFTP_GHG_LOCAL_PATH) if name.endswith('.part')]
+    assert len(part_file_names) == 1
+    assert os.path.getsize(os.path.join(cfg.SFTP_GHG_LOCAL_PATH, part_file_names[0])) == 2 * CHUNK_SIZE
+
+    server.failing_reads.clear()
+    server.opened.clear()
+    stats = SyncData.sync_data(cfg)
+    assert server.opened == ['/ghg/file03.ghg']
+    assert stats['ghg']['files'] == 1
+    assert stats['ghg']['skipped'] == 7
+    assert stats['ghg']['bytes'] == FILE_SIZE - 2 * CHUNK_SIZE
+    assert not [name for name in os.listdir(cfg.SFTP_GHG_LOCAL_PATH) if name.endswith('.part')]
+    assert_synced(server, cfg.SFTP_GHG_LOCAL_PATH, 'ghg')
+
+
+def test_unchanged_files_are_skipped(server, cfg):
+    SyncData.sync_data(cfg)
+    server.opened.clear()
+    stats = SyncData.sync_data(cfg)
+    assert server.opened == []
+    assert stats['total']['files'] == 0
+    assert stats['total']['skipped'] == 10
+    assert SyncData.read_manifest(cfg.SFTP_GHG_LOCAL_PATH).keys() == set(os.listdir(os.path.join(server.root, 'ghg')))
+
+
+def test_include_patterns_by_folder(server, tmp_path):
+    with open(os.path.join(server.root, 'ghg', 'notes.txt'), 'w') as file:
+        file.write('notes')
+    cfg = get_config(tmp_path, SFTP_GHG_INCLUDE='*.ghg', SFTP_MET_EXCLUDE='file01.met')
+    stats = SyncData.sync_data(cfg)
+    # the GHG include patterns do not apply to the met files
+    assert stats['ghg']['files'] == 8
+    assert stats['met']['files'] == 1
+    assert sorted(SyncData.read_manifest(cfg.SFTP_GHG_LOCAL_PATH)) == ['file%02d.ghg' % i for i in range(8)]
+    assert sorted(SyncData.read_manifest(cfg.SFTP_MET_LOCAL_PATH)) == ['file00.met']